@@ -37,10 +37,12 @@ except Exception:
         return -np.sum(hist * np.log2(hist))
 import warnings
 
+from block_dct import BlockDCT
+from config import TEXTURE_GLCM_LEVELS
+from image_stats import ensure_stats_plane, histogram_moments, histogram_entropy
+
 # Conditional imports dengan error handling
 try:
-    from skimage.feature import graycomatrix, graycoprops, local_binary_pattern
-    from skimage.filters import sobel, prewitt, roberts
     from skimage.measure import shannon_entropy
     SKIMAGE_AVAILABLE = True
 except Exception:
@@ -105,91 +107,120 @@ def safe_entropy(data):
 
 # ======================= Noise Analysis =======================
 
-def analyze_noise_consistency(image_pil, block_size=32):
+def _stack_blocks(array, row_start, row_stop, blocks_w, block_h, block_w):
+    """Contiguous (n_blocks, block_h, block_w[, c]) stack of the blocks in block rows [row_start, row_stop)."""
+    region = array[row_start*block_h:row_stop*block_h, :blocks_w*block_w]
+    n_rows = row_stop - row_start
+    stacked = region.reshape(n_rows, block_h, blocks_w, block_w, *array.shape[2:]).swapaxes(1, 2)
+    return np.ascontiguousarray(stacked).reshape(n_rows*blocks_w, block_h, block_w, *array.shape[2:])
+
+def _batched_moments(flat, mean, std):
+    """Skewness and kurtosis per row, same formulas as calculate_skewness/calculate_kurtosis"""
+    valid = std != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (flat - mean[:, None]) / std[:, None]
+        skewness = np.mean(z ** 3, axis=1)
+        kurtosis = np.mean(z ** 4, axis=1) - 3
+    return np.where(valid, skewness, 0.0), np.where(valid, kurtosis, 0.0)
+
+def noise_block_features(image_array, lab, gray, blocks_h, blocks_w, block_h, block_w, max_blocks=4096):
+    """
+    Per-block noise features for the whole image with batched NumPy ops.
+    Block rows are processed in chunks of at most ``max_blocks`` blocks to bound memory.
+    """
+    # Pita frekuensi tinggi sama untuk semua blok (ukuran blok seragam)
+    quarter_h, quarter_w = max(1, block_h//4), max(1, block_w//4)
+    three_quarter_h = min(block_h, 3*block_h//4)
+    three_quarter_w = min(block_w, 3*block_w//4)
+    if three_quarter_h > quarter_h and three_quarter_w > quarter_w:
+        band = (slice(None), slice(quarter_h, three_quarter_h), slice(quarter_w, three_quarter_w))
+    else:
+        band = (slice(None), slice(None), slice(None))
+
+    features = {key: [] for key in ('laplacian_var', 'high_freq_energy', 'rgb_std', 'lab_std',
+                                    'mean_intensity', 'std_intensity', 'skewness', 'kurtosis')}
+    rows_per_chunk = max(1, max_blocks // blocks_w)
+    for row_start in range(0, blocks_h, rows_per_chunk):
+        row_stop = min(blocks_h, row_start + rows_per_chunk)
+        gray_blocks = _stack_blocks(gray, row_start, row_stop, blocks_w, block_h, block_w)
+        n_blocks = len(gray_blocks)
+        flat = gray_blocks.reshape(n_blocks, -1)
+
+        # Laplacian 4-tetangga dengan border reflect-101 per blok (sama dengan cv2.Laplacian per blok)
+        padded = np.pad(gray_blocks.astype(np.float64), ((0, 0), (1, 1), (1, 1)), mode='reflect')
+        laplacian = (padded[:, :-2, 1:-1] + padded[:, 2:, 1:-1] + padded[:, 1:-1, :-2]
+                     + padded[:, 1:-1, 2:] - 4*padded[:, 1:-1, 1:-1])
+        features['laplacian_var'].append(laplacian.reshape(n_blocks, -1).var(axis=1))
+
+        magnitude_spectrum = np.log(np.abs(np.fft.fftshift(np.fft.fft2(gray_blocks), axes=(-2, -1))) + 1)
+        features['high_freq_energy'].append(magnitude_spectrum[band].sum(axis=(1, 2)))
+
+        features['rgb_std'].append(_stack_blocks(image_array, row_start, row_stop, blocks_w, block_h, block_w).std(axis=(1, 2)))
+        features['lab_std'].append(_stack_blocks(lab, row_start, row_stop, blocks_w, block_h, block_w).std(axis=(1, 2)))
+
+        mean_intensity = flat.mean(axis=1)
+        std_intensity = flat.std(axis=1)
+        skewness, kurtosis = _batched_moments(flat, mean_intensity, std_intensity)
+        features['mean_intensity'].append(mean_intensity)
+        features['std_intensity'].append(std_intensity)
+        features['skewness'].append(skewness)
+        features['kurtosis'].append(kurtosis)
+
+    return {key: np.concatenate(values) for key, values in features.items()}
+
+def noise_consistency_scores(laplacian_vars, high_freq_energies, std_intensities):
+    """Laplacian, frequency, intensity and overall inconsistency (std/mean over non-zero block values)"""
+    # Filter out zero/nan values to prevent ZeroDivisionError
+    laplacian_vars_filtered = [v for v in laplacian_vars if v != 0 and not np.isnan(v)]
+    high_freq_energies_filtered = [v for v in high_freq_energies if v != 0 and not np.isnan(v)]
+    std_intensities_filtered = [v for v in std_intensities if v != 0 and not np.isnan(v)]
+
+    laplacian_consistency = np.std(laplacian_vars_filtered) / (np.mean(laplacian_vars_filtered) + 1e-6) if laplacian_vars_filtered else 0.0
+    freq_consistency = np.std(high_freq_energies_filtered) / (np.mean(high_freq_energies_filtered) + 1e-6) if high_freq_energies_filtered else 0.0
+    intensity_consistency = np.std(std_intensities_filtered) / (np.mean(std_intensities_filtered) + 1e-6) if std_intensities_filtered else 0.0
+    
+    # Overall inconsistency score
+    overall_inconsistency = (laplacian_consistency + freq_consistency + intensity_consistency) / 3
+    return laplacian_consistency, freq_consistency, intensity_consistency, overall_inconsistency
+
+def analyze_noise_consistency(image_pil, block_size=32, plane=None):
     """Advanced noise consistency analysis"""
     print("  - Advanced noise consistency analysis...")
     
     try:
-        image_array = np.array(image_pil.convert('RGB'))
-        
-        # Convert to different color spaces for comprehensive analysis
-        lab = cv2.cvtColor(image_array, cv2.COLOR_RGB2LAB)
+        # RGB, LAB dan grayscale dari plane statistik (dipakai bersama tahap lain)
+        plane = ensure_stats_plane(image_pil, plane)
+        image_array, lab, gray = plane.rgb, plane.lab, plane.gray
         
         h, w, c = image_array.shape
         blocks_h = max(1, h // block_size)
         blocks_w = max(1, w // block_size)
+        block_h, block_w = min(block_size, h), min(block_size, w)
         
         noise_characteristics = []
         
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                # Safe block extraction
-                y_start, y_end = i*block_size, min((i+1)*block_size, h)
-                x_start, x_end = j*block_size, min((j+1)*block_size, w)
-                
-                rgb_block = image_array[y_start:y_end, x_start:x_end]
-                lab_block = lab[y_start:y_end, x_start:x_end]
-                
-                if rgb_block.size == 0: # Skip empty blocks if they occur
-                    continue
-
-                # Noise estimation using Laplacian variance
-                gray_block = cv2.cvtColor(rgb_block, cv2.COLOR_RGB2GRAY)
-                try:
-                    if gray_block.size == 0 or np.all(gray_block == gray_block[0,0]): # Skip if block is uniform
-                        laplacian_var = 0.0
-                    else:
-                        laplacian = cv2.Laplacian(gray_block, cv2.CV_64F)
-                        laplacian_var = laplacian.var()
-                except Exception as cv_err:
-                    # Fallback manual Laplacian
-                    kernel = np.array([[0, -1, 0], [-1, 4, -1], [0, -1, 0]])
-                    if gray_block.ndim == 2 and gray_block.shape[0] >= 3 and gray_block.shape[1] >= 3:
-                        laplacian = cv2.filter2D(gray_block.astype(np.float64), -1, kernel)
-                        laplacian_var = laplacian.var()
-                    else:
-                        laplacian_var = 0.0 # Cannot compute for too small blocks
-                
-                # High frequency content analysis with safe indexing
-                try:
-                    f_transform = np.fft.fft2(gray_block)
-                    f_shift = np.fft.fftshift(f_transform)
-                    magnitude_spectrum = np.log(np.abs(f_shift) + 1)
-                    
-                    # Safe frequency range calculation
-                    h_block, w_block = magnitude_spectrum.shape
-                    quarter_h, quarter_w = max(1, h_block//4), max(1, w_block//4)
-                    three_quarter_h = min(h_block, 3*h_block//4)
-                    three_quarter_w = min(w_block, 3*w_block//4)
-                    
-                    if three_quarter_h > quarter_h and three_quarter_w > quarter_w:
-                        high_freq_energy = np.sum(magnitude_spectrum[quarter_h:three_quarter_h, 
-                                                                   quarter_w:three_quarter_w])
-                    else:
-                        high_freq_energy = np.sum(magnitude_spectrum)
-                except Exception:
-                    high_freq_energy = 0.0
-                
-                # Color noise analysis
-                rgb_std = np.std(rgb_block, axis=(0, 1)) if rgb_block.size > 0 else [0.0, 0.0, 0.0]
-                lab_std = np.std(lab_block, axis=(0, 1)) if lab_block.size > 0 else [0.0, 0.0, 0.0]
-                
-                # Statistical moments
-                mean_intensity = np.mean(gray_block) if gray_block.size > 0 else 0.0
-                std_intensity = np.std(gray_block) if gray_block.size > 0 else 0.0
-                skewness = calculate_skewness(gray_block.flatten())
-                kurtosis = calculate_kurtosis(gray_block.flatten())
-                
+        if h > 0 and w > 0:
+            features = noise_block_features(image_array, lab, gray, blocks_h, blocks_w, block_h, block_w)
+            laplacian_vars = features['laplacian_var'].tolist()
+            high_freq_energies = features['high_freq_energy'].tolist()
+            rgb_stds = features['rgb_std'].tolist()
+            lab_stds = features['lab_std'].tolist()
+            mean_intensities = features['mean_intensity'].tolist()
+            std_intensities = features['std_intensity'].tolist()
+            skewnesses = features['skewness'].tolist()
+            kurtoses = features['kurtosis'].tolist()
+            
+            for k in range(blocks_h * blocks_w):
                 noise_characteristics.append({
-                    'position': (i, j),
-                    'laplacian_var': float(laplacian_var),
-                    'high_freq_energy': float(high_freq_energy),
-                    'rgb_std': rgb_std.tolist(),
-                    'lab_std': lab_std.tolist(),
-                    'mean_intensity': float(mean_intensity),
-                    'std_intensity': float(std_intensity),
-                    'skewness': float(skewness),
-                    'kurtosis': float(kurtosis)
+                    'position': (k // blocks_w, k % blocks_w),
+                    'laplacian_var': laplacian_vars[k],
+                    'high_freq_energy': high_freq_energies[k],
+                    'rgb_std': rgb_stds[k],
+                    'lab_std': lab_stds[k],
+                    'mean_intensity': mean_intensities[k],
+                    'std_intensity': std_intensities[k],
+                    'skewness': skewnesses[k],
+                    'kurtosis': kurtoses[k]
                 })
         
         # Analyze consistency across blocks
@@ -198,17 +229,8 @@ def analyze_noise_consistency(image_pil, block_size=32):
             high_freq_energies = [block['high_freq_energy'] for block in noise_characteristics]
             std_intensities = [block['std_intensity'] for block in noise_characteristics]
             
-            # Filter out zero/nan values to prevent ZeroDivisionError
-            laplacian_vars_filtered = [v for v in laplacian_vars if v != 0 and not np.isnan(v)]
-            high_freq_energies_filtered = [v for v in high_freq_energies if v != 0 and not np.isnan(v)]
-            std_intensities_filtered = [v for v in std_intensities if v != 0 and not np.isnan(v)]
-
-            laplacian_consistency = np.std(laplacian_vars_filtered) / (np.mean(laplacian_vars_filtered) + 1e-6) if laplacian_vars_filtered else 0.0
-            freq_consistency = np.std(high_freq_energies_filtered) / (np.mean(high_freq_energies_filtered) + 1e-6) if high_freq_energies_filtered else 0.0
-            intensity_consistency = np.std(std_intensities_filtered) / (np.mean(std_intensities_filtered) + 1e-6) if std_intensities_filtered else 0.0
-            
-            # Overall inconsistency score
-            overall_inconsistency = (laplacian_consistency + freq_consistency + intensity_consistency) / 3
+            laplacian_consistency, freq_consistency, intensity_consistency, overall_inconsistency = \
+                noise_consistency_scores(laplacian_vars, high_freq_energies, std_intensities)
             
             # Detect outlier blocks with error handling
             outliers = []
@@ -309,29 +331,17 @@ def analyze_frequency_domain(image_pil):
         
         # Block-wise DCT analysis
         block_size = 8
-        blocks_h = max(1, h // block_size)
-        blocks_w = max(1, w // block_size)
-        
-        block_freq_variations = []
-        
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                y_start, y_end = i*block_size, min((i+1)*block_size, h)
-                x_start, x_end = j*block_size, min((j+1)*block_size, w)
-                
-                block = image_array[y_start:y_end, x_start:x_end]
-                
-                try:
-                    # Only attempt DCT if block is valid
-                    if block.shape[0] == block_size and block.shape[1] == block_size:
-                        block_dct = cv2.dct(block.astype(np.float32))
-                        block_energy = np.sum(np.abs(block_dct))
-                    else: # Handle partial blocks or too-small images
-                        block_energy = np.sum(np.abs(block.astype(np.float32))) # Sum magnitude for consistency
-                except Exception:
-                    block_energy = np.sum(np.abs(block.astype(np.float32))) # Fallback for other errors
-                
-                block_freq_variations.append(float(block_energy))
+        if h >= block_size and w >= block_size:
+            # Semua blok 8x8 ditransformasi sekaligus
+            block_dct = BlockDCT(image_array, block_size)
+            block_freq_variations = block_dct.band_energy(slice(None), slice(None)).tolist()
+        else:
+            # Handle partial blocks or too-small images: sum magnitude for consistency
+            block_freq_variations = []
+            for i in range(max(1, h // block_size)):
+                for j in range(max(1, w // block_size)):
+                    block = image_array[i*block_size:(i+1)*block_size, j*block_size:(j+1)*block_size]
+                    block_freq_variations.append(float(np.sum(np.abs(block.astype(np.float32)))))
         
         # Calculate frequency inconsistency
         if len(block_freq_variations) > 0 and np.mean(block_freq_variations) != 0:
@@ -362,99 +372,108 @@ def analyze_frequency_domain(image_pil):
 
 # ======================= Texture Analysis =======================
 
-def analyze_texture_consistency(image_pil, block_size=64):
+def _lbp_sampling_table(block_h, block_w, n_points=8, radius=1):
+    """
+    Bilinear sampling table for circular LBP with the same sample points and interpolation
+    weights as skimage's local_binary_pattern: per point the integer row/column offsets of
+    the four neighbours and the per-row/per-column fractional weights.
+    """
+    rp = np.round(-radius * np.sin(2 * np.pi * np.arange(n_points) / n_points), 5)
+    cp = np.round(radius * np.cos(2 * np.pi * np.arange(n_points) / n_points), 5)
+    rows = np.arange(block_h, dtype=np.float64)
+    cols = np.arange(block_w, dtype=np.float64)
+    table = []
+    for p in range(n_points):
+        r, c = rows + rp[p], cols + cp[p]
+        min_r, min_c = np.floor(r), np.floor(c)
+        table.append((int(np.floor(rp[p])), int(np.ceil(rp[p])), (r - min_r)[:, None],
+                      int(np.floor(cp[p])), int(np.ceil(cp[p])), (c - min_c)[None, :]))
+    return table
+
+def _uniform_lbp(blocks, n_points=8, radius=1):
+    """Uniform LBP codes (0..n_points+1) of every block; pixels outside a block count as 0"""
+    n_blocks, block_h, block_w = blocks.shape
+    padded = np.pad(blocks.astype(np.float64), ((0, 0), (radius, radius), (radius, radius)))
+
+    def shifted(dy, dx):
+        return padded[:, radius + dy:radius + dy + block_h, radius + dx:radius + dx + block_w]
+
+    center = shifted(0, 0)
+    bits = []
+    for min_r, max_r, dr, min_c, max_c, dc in _lbp_sampling_table(block_h, block_w, n_points, radius):
+        top = (1 - dc) * shifted(min_r, min_c) + dc * shifted(min_r, max_c)
+        bottom = (1 - dc) * shifted(max_r, min_c) + dc * shifted(max_r, max_c)
+        bits.append((1 - dr) * top + dr * bottom - center >= 0)
+    bits = np.stack(bits)
+    changes = np.count_nonzero(bits[1:] != bits[:-1], axis=0)
+    return np.where(changes <= 2, bits.sum(axis=0), n_points + 1)
+
+def _texture_block_features(image_gray, blocks_h, blocks_w, block_h, block_w, levels=256, max_bins=1 << 22):
+    """
+    Contrast, dissimilarity, homogeneity, energy (horizontal GLCM, distance 1, symmetric, normed)
+    and LBP histogram entropy for every block, as an (n_blocks, 5) array.
+
+    Gray values are quantized to ``levels``; co-occurrence counts of a chunk of blocks come from
+    one ``np.bincount`` over (block, i, j) pair indices.
+    """
+    n_points = 8
+    blocks_per_chunk = max(1, max_bins // (levels * levels))
+    rows_per_chunk = max(1, blocks_per_chunk // blocks_w)
+    features = []
+    for row_start in range(0, blocks_h, rows_per_chunk):
+        row_stop = min(blocks_h, row_start + rows_per_chunk)
+        blocks = _stack_blocks(image_gray, row_start, row_stop, blocks_w, block_h, block_w)
+        n_blocks = len(blocks)
+        quantized = blocks if levels == 256 else (blocks.astype(np.int32) * levels // 256)
+        
+        # GLCM sudut 0 (pasangan horizontal); simetris: setiap pasangan dihitung dua arah
+        left = quantized[:, :, :-1].reshape(n_blocks, -1).astype(np.intp)
+        right = quantized[:, :, 1:].reshape(n_blocks, -1).astype(np.intp)
+        diff = left - right
+        diff_sq = diff ** 2
+        contrast = diff_sq.mean(axis=1)
+        dissimilarity = np.abs(diff).mean(axis=1)
+        homogeneity = (1.0 / (1.0 + diff_sq)).mean(axis=1)
+        
+        pair_index = (np.arange(n_blocks)[:, None] * levels + left) * levels + right
+        counts = np.bincount(pair_index.ravel(), minlength=n_blocks * levels * levels).reshape(n_blocks, levels, levels)
+        symmetric = (counts + counts.transpose(0, 2, 1)).reshape(n_blocks, -1).astype(np.float64)
+        energy = np.sqrt(np.einsum('ij,ij->i', symmetric, symmetric)) / (2.0 * left.shape[1])
+        
+        # LBP (uniform, P=8, R=1) per blok, histogram per blok dari satu bincount
+        if block_h >= 3 and block_w >= 3:
+            codes = _uniform_lbp(blocks, n_points, 1).reshape(n_blocks, -1)
+            hist = np.bincount((np.arange(n_blocks)[:, None] * (n_points + 2) + codes).ravel(),
+                               minlength=n_blocks * (n_points + 2)).reshape(n_blocks, n_points + 2)
+            hist = hist / hist.sum(axis=1, keepdims=True)
+            lbp_value = -np.sum(np.where(hist > 0, hist * np.log2(hist + 1e-10), 0.0), axis=1)
+        else:  # Too small for LBP: fallback to block pixel entropy
+            lbp_value = np.array([safe_entropy(block) for block in blocks])
+        
+        features.append(np.column_stack([contrast, dissimilarity, homogeneity, energy, lbp_value]))
+    return np.concatenate(features)
+
+def analyze_texture_consistency(image_pil, block_size=64, glcm_levels=TEXTURE_GLCM_LEVELS):
     """Analyze texture consistency using GLCM and LBP"""
     try:
         image_gray = np.array(image_pil.convert('L'))
         
-        # Local Binary Pattern analysis dengan fallback (moved to internal block for localized LBP)
-        
-        # Block-wise texture analysis
+        # Block-wise texture analysis (semua blok sekaligus)
         h, w = image_gray.shape
         blocks_h = max(1, h // block_size)
         blocks_w = max(1, w // block_size)
+        block_h, block_w = min(block_size, h), min(block_size, w)
         
         texture_features = []
-        
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                y_start, y_end = i*block_size, min((i+1)*block_size, h)
-                x_start, x_end = j*block_size, min((j+1)*block_size, w)
-                
-                block = image_gray[y_start:y_end, x_start:x_end]
-                if block.size == 0 or block.shape[0] < 2 or block.shape[1] < 2: # Skip too small blocks
-                    continue
-
-                # GLCM analysis dengan fallback
-                if SKIMAGE_AVAILABLE:
-                    try:
-                        # Ensure enough levels for GLCM
-                        max_level = np.max(block)
-                        levels = min(max_level + 1, 256) if max_level is not None else 256
-
-                        # For small blocks, distances and angles might need to be adapted,
-                        # or reduce levels if many bins are empty.
-                        if levels > 1: # graycomatrix requires more than 1 unique gray level
-                            glcm = graycomatrix(block, distances=[1], angles=[0, 45, 90, 135],
-                                            levels=levels, symmetric=True, normed=True)
-                            
-                            contrast = graycoprops(glcm, 'contrast')[0, 0]
-                            dissimilarity = graycoprops(glcm, 'dissimilarity')[0, 0]
-                            homogeneity = graycoprops(glcm, 'homogeneity')[0, 0]
-                            energy = graycoprops(glcm, 'energy')[0, 0]
-                        else: # Uniform block
-                             contrast = 0.0
-                             dissimilarity = 0.0
-                             homogeneity = 1.0
-                             energy = 1.0
-                    except Exception:
-                        # Fallback measures
-                        contrast = float(np.var(block))
-                        dissimilarity = float(np.std(block))
-                        homogeneity = 1.0 / (1.0 + np.var(block)) if np.var(block) != 0 else 1.0
-                        energy = float(np.mean(block ** 2) / 255**2)
-                else:
-                    # Fallback measures
-                    contrast = float(np.var(block))
-                    dissimilarity = float(np.std(block))
-                    homogeneity = 1.0 / (1.0 + np.var(block)) if np.var(block) != 0 else 1.0
-                    energy = float(np.mean(block ** 2) / 255**2)
-                
-                # LBP calculation for block
-                radius = 1 # Use smaller radius for blocks
-                n_points = 8 * radius
-                lbp_value = 0.0
-                if SKIMAGE_AVAILABLE:
-                    try:
-                        # Ensure block size is sufficient for LBP calculation (at least 3x3 for radius 1)
-                        if block.shape[0] >= (2 * radius + 1) and block.shape[1] >= (2 * radius + 1):
-                            block_lbp = local_binary_pattern(block, n_points, radius, method='uniform')
-                            lbp_hist, _ = np.histogram(block_lbp, bins=range(n_points + 3)) # Max bins for uniform LBP is n_points + 2
-                            lbp_hist = lbp_hist / np.sum(lbp_hist)
-                            lbp_hist = lbp_hist[lbp_hist > 0]
-                            if lbp_hist.size > 0:
-                                lbp_value = -np.sum(lbp_hist * np.log2(lbp_hist + 1e-10)) # Entropy of LBP histogram
-                        else: # Too small for LBP
-                            lbp_value = safe_entropy(block) # Fallback to block pixel entropy
-                    except Exception:
-                        lbp_value = safe_entropy(block) # Fallback if skimage.feature.local_binary_pattern fails
-                else:
-                    lbp_value = safe_entropy(block) # Fallback if skimage is not available
-
-                texture_features.append([
-                    float(contrast), 
-                    float(dissimilarity), 
-                    float(homogeneity), 
-                    float(energy), 
-                    float(lbp_value) # Using lbp_value now
-                ])
+        if block_h >= 2 and block_w >= 2:  # Skip too small blocks
+            texture_features = _texture_block_features(image_gray, blocks_h, blocks_w, block_h, block_w,
+                                                       levels=glcm_levels)
         
         # Analyze consistency
         texture_consistency = {}
         feature_names = ['contrast', 'dissimilarity', 'homogeneity', 'energy', 'lbp_uniformity']
         
         if len(texture_features) > 0:
-            texture_features = np.array(texture_features)
             for i, name in enumerate(feature_names):
                 feature_values = texture_features[:, i]
                 # Filter out zeros from mean calculation to prevent large consistency scores for uniform blocks
@@ -491,72 +510,21 @@ def analyze_texture_consistency(image_pil, block_size=64):
 
 # ======================= Edge Analysis =======================
 
-def analyze_edge_consistency(image_pil):
+def analyze_edge_consistency(image_pil, plane=None):
     """Analyze edge density consistency"""
     try:
-        image_gray = np.array(image_pil.convert('L'))
-        if image_gray.size == 0 or image_gray.shape[0] < 3 or image_gray.shape[1] < 3: # Handle too small images
+        plane = ensure_stats_plane(image_pil, plane)
+        h, w = plane.shape
+        if h < 3 or w < 3: # Handle too small images
             return {
                 'edge_inconsistency': 0.0,
                 'edge_densities': [],
                 'edge_variance': 0.0
             }
 
-        # Multiple edge detectors dengan fallback
-        combined_edges = None
-
-        if SKIMAGE_AVAILABLE:
-            try:
-                edges_sobel = sobel(image_gray.astype(np.float32))
-                edges_prewitt = prewitt(image_gray.astype(np.float32))
-                edges_roberts = roberts(image_gray.astype(np.float32))
-                combined_edges = (edges_sobel + edges_prewitt + edges_roberts) / 3
-            except Exception:
-                # Fallback to OpenCV Sobel if skimage fails
-                pass # Combined edges will be None, triggering the next fallback
-
-        if combined_edges is None: # Fallback to OpenCV Sobel
-            try:
-                grad_x = cv2.Sobel(image_gray, cv2.CV_64F, 1, 0, ksize=3)
-                grad_y = cv2.Sobel(image_gray, cv2.CV_64F, 0, 1, ksize=3)
-                combined_edges = np.sqrt(grad_x**2 + grad_y**2)
-            except Exception as sobel_err:
-                # Manual gradient calculation fallback
-                kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-                kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-                if image_gray.shape[0] >= 3 and image_gray.shape[1] >= 3:
-                    grad_x = cv2.filter2D(image_gray.astype(np.float64), -1, kernel_x)
-                    grad_y = cv2.filter2D(image_gray.astype(np.float64), -1, kernel_y)
-                    combined_edges = np.sqrt(grad_x**2 + grad_y**2)
-                else: # Block too small even for manual 3x3 kernel
-                    combined_edges = np.zeros_like(image_gray, dtype=np.float32)
-
-        if combined_edges is None: # Last resort fallback
-            combined_edges = np.zeros_like(image_gray, dtype=np.float32)
-
-        # Normalize edge map to 0-255 if not already
-        if np.max(combined_edges) > 0:
-            combined_edges = (combined_edges / np.max(combined_edges)) * 255
-        
-        # Block-wise edge density
-        block_size = 32
-        h, w = image_gray.shape
-        blocks_h = max(1, h // block_size)
-        blocks_w = max(1, w // block_size)
-        
-        edge_densities = []
-        
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                y_start, y_end = i*block_size, min((i+1)*block_size, h)
-                x_start, x_end = j*block_size, min((j+1)*block_size, w)
-                
-                block_edges = combined_edges[y_start:y_end, x_start:x_end]
-                if block_edges.size > 0:
-                    edge_density = np.mean(block_edges)
-                    edge_densities.append(float(edge_density))
-        
-        edge_densities = np.array(edge_densities)
+        # Block-wise edge density: rata-rata peta tepi gabungan (Sobel/Prewitt/Roberts, 0-255)
+        # per blok, langsung dari integral image
+        edge_densities = plane.block_mean('edge_strength', *plane.block_grid(32))
         
         if len(edge_densities) > 0 and np.mean(edge_densities) != 0:
             edge_inconsistency = np.std(edge_densities) / (np.mean(edge_densities) + 1e-6)
@@ -584,11 +552,12 @@ def analyze_edge_consistency(image_pil):
 
 # ======================= Illumination Analysis =======================
 
-def analyze_illumination_consistency(image_pil):
+def analyze_illumination_consistency(image_pil, plane=None):
     """Advanced illumination consistency analysis"""
     try:
-        image_array = np.array(image_pil)
-        if image_array.size == 0:
+        plane = ensure_stats_plane(image_pil, plane)
+        h, w = plane.shape
+        if h == 0 or w == 0:
             return {
                 'illumination_mean_consistency': 0.0,
                 'illumination_std_consistency': 0.0,
@@ -596,65 +565,12 @@ def analyze_illumination_consistency(image_pil):
                 'overall_illumination_inconsistency': 0.0
             }
         
-        # Convert to RGB if needed, then to LAB for L channel
-        if len(image_array.shape) == 2 or image_array.shape[2] == 1:
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2RGB) # Convert grayscale to RGB for consistent LAB conversion
-        
-        lab = cv2.cvtColor(image_array, cv2.COLOR_RGB2LAB)
-        
-        # Illumination map (L channel in LAB)
-        illumination = lab[:, :, 0]
-        
-        # Gradient analysis with robust error handling
-        try:
-            if illumination.shape[0] >= 3 and illumination.shape[1] >= 3:
-                grad_x = cv2.Sobel(illumination, cv2.CV_64F, 1, 0, ksize=3)
-                grad_y = cv2.Sobel(illumination, cv2.CV_64F, 0, 1, ksize=3)
-                gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-            else: # Image too small for Sobel
-                gradient_magnitude = np.zeros_like(illumination, dtype=np.float32)
-        except Exception as sobel_err:
-            print(f"  Warning: Sobel operation failed: {sobel_err}")
-            # Manual gradient calculation fallback
-            kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-            kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
-            if illumination.shape[0] >= 3 and illumination.shape[1] >= 3:
-                grad_x = cv2.filter2D(illumination.astype(np.float64), -1, kernel_x)
-                grad_y = cv2.filter2D(illumination.astype(np.float64), -1, kernel_y)
-                gradient_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-            else: # Image too small for manual kernel
-                gradient_magnitude = np.zeros_like(illumination, dtype=np.float32)
-        
-        # Block-wise illumination analysis
-        block_size = 64
-        h, w = illumination.shape
-        blocks_h = max(1, h // block_size)
-        blocks_w = max(1, w // block_size)
-        
-        illumination_means = []
-        illumination_stds = []
-        gradient_means = []
-        
-        for i in range(blocks_h):
-            for j in range(blocks_w):
-                y_start, y_end = i*block_size, min((i+1)*block_size, h)
-                x_start, x_end = j*block_size, min((j+1)*block_size, w)
-                
-                block_illum = illumination[y_start:y_end, x_start:x_end]
-                block_grad = gradient_magnitude[y_start:y_end, x_start:x_end]
-                
-                if block_illum.size > 0:
-                    illumination_means.append(np.mean(block_illum))
-                    illumination_stds.append(np.std(block_illum))
-                else: # Skip empty blocks
-                    illumination_means.append(0.0)
-                    illumination_stds.append(0.0)
-                
-                if block_grad.size > 0:
-                    gradient_means.append(np.mean(block_grad))
-                else: # Skip empty blocks
-                    gradient_means.append(0.0)
-
+        # Illumination map (L channel in LAB) dan gradiennya (Sobel) dari plane statistik;
+        # mean/std per blok 64x64 adalah query O(1) pada integral image
+        grid = plane.block_grid(64)
+        illumination_means = plane.block_mean('illumination', *grid)
+        illumination_stds = plane.block_std('illumination', *grid)
+        gradient_means = plane.block_mean('illumination_gradient', *grid)
 
         # Consistency metrics
         illum_mean_consistency = 0.0
@@ -711,22 +627,24 @@ def detect_forgery_mm_fusion(image_pil):
     print("  - MM Fusion: Menganalisis gambar untuk potensi pemalsuan...")
     
     try:
-        image_array = np.array(image_pil.convert('RGB'))
+        # Plane statistik bersama: konversi warna, gradien dan integral image dihitung sekali
+        plane = ensure_stats_plane(image_pil)
+        image_array = plane.rgb
         
         # 1. Noise Pattern Analysis
-        noise_analysis = analyze_noise_consistency(image_pil)
+        noise_analysis = analyze_noise_consistency(image_pil, plane=plane)
         
         # 2. Frequency Domain Analysis
         freq_analysis = analyze_frequency_domain(image_pil)
         
         # 3. Edge Consistency Analysis
-        edge_analysis = analyze_edge_consistency(image_pil)
+        edge_analysis = analyze_edge_consistency(image_pil, plane=plane)
         
         # 4. Color Space Analysis
-        color_analysis = perform_statistical_analysis(image_pil)
+        color_analysis = perform_statistical_analysis(image_pil, plane=plane)
         
         # 5. Illumination Consistency
-        illumination_analysis = analyze_illumination_consistency(image_pil)
+        illumination_analysis = analyze_illumination_consistency(image_pil, plane=plane)
         
         # Calculate composite forgery score (0-100%)
         forgery_score = 0.0
@@ -844,7 +762,8 @@ def detect_forgery_trufor(image_pil):
     print("  - TruFor: Melakukan analisis forensik lanjutan...")
     
     try:
-        image_array = np.array(image_pil.convert('RGB'))
+        plane = ensure_stats_plane(image_pil)
+        image_array = plane.rgb
         h, w = image_array.shape[:2]
         
         # Initialize forgery localization map
@@ -861,14 +780,16 @@ def detect_forgery_trufor(image_pil):
                 new_height = int(image_array.shape[0] * scale)
                 scaled_img = cv2.resize(image_array, (new_width, new_height))
                 scaled_pil = Image.fromarray(scaled_img)
+                scale_plane = ensure_stats_plane(scaled_pil)
             else:
                 scaled_pil = image_pil
+                scale_plane = plane
             
             # Perform analysis at this scale
             scale_analysis = {
                 'scale': scale,
-                'noise_analysis': analyze_noise_consistency(scaled_pil),
-                'edge_analysis': analyze_edge_consistency(scaled_pil)
+                'noise_analysis': analyze_noise_consistency(scaled_pil, plane=scale_plane),
+                'edge_analysis': analyze_edge_consistency(scaled_pil, plane=scale_plane)
             }
             multi_scale_results.append(scale_analysis)
             
@@ -889,10 +810,10 @@ def detect_forgery_trufor(image_pil):
                         forgery_map[y_start:y_end, x_start:x_end] += weight * 0.3
         
         # Compression artifact analysis
-        compression_analysis = analyze_compression_artifacts(image_pil)
+        compression_analysis = analyze_compression_artifacts(image_pil, plane=plane)
         
         # Advanced tampering localization using multiple cues
-        tampering_map = generate_trufor_tampering_map(image_pil, multi_scale_results, compression_analysis)
+        tampering_map = generate_trufor_tampering_map(image_pil, multi_scale_results, compression_analysis, plane=plane)
         
         # Combine forgery map with tampering map
         if tampering_map is not None and tampering_map.size > 0:
@@ -995,21 +916,21 @@ def generate_forgery_heatmap(image_array, noise_analysis, freq_analysis, edge_an
         return {'error': str(e)}
 
 
-def analyze_compression_artifacts(image_pil):
+def analyze_compression_artifacts(image_pil, plane=None):
     """Analyze compression artifacts and double compression signs"""
     try:
-        image_array = np.array(image_pil.convert('RGB'))
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+        gray = ensure_stats_plane(image_pil, plane).gray
         
         # DCT-based compression analysis
         dct_analysis = perform_dct_analysis(gray)
         
-        # Block artifact analysis
-        block_analysis = analyze_block_artifacts(gray)
+        # Block artifact analysis (blok 8x8 dibagi dengan deteksi kompresi ganda)
+        block_dct = BlockDCT(gray)
+        block_analysis = analyze_block_artifacts(gray, block_dct=block_dct)
         
         return {
             'compression_quality_estimate': estimate_compression_quality(gray),
-            'double_compression_likelihood': detect_double_compression(gray),
+            'double_compression_likelihood': detect_double_compression(gray, block_dct=block_dct),
             'dct_coefficient_analysis': dct_analysis,
             'block_artifact_metrics': block_analysis,
             'overall_compression_confidence': calculate_compression_confidence(dct_analysis, block_analysis)
@@ -1087,12 +1008,11 @@ def generate_forensic_report(multi_scale_results, compression_analysis, trufor_s
     return report
 
 
-def generate_trufor_tampering_map(image_pil, multi_scale_results, compression_analysis):
+def generate_trufor_tampering_map(image_pil, multi_scale_results, compression_analysis, plane=None):
     """Generate tampering localization map using TruFor methodology"""
     try:
-        image_array = np.array(image_pil.convert('RGB'))
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        h, w = gray.shape
+        plane = ensure_stats_plane(image_pil, plane)
+        h, w = plane.shape
         
         # Initialize tampering map
         tampering_map = np.zeros((h, w), dtype=np.float32)
@@ -1130,21 +1050,24 @@ def generate_trufor_tampering_map(image_pil, multi_scale_results, compression_an
             if 'block_variance_mean' in block_metrics and block_metrics['block_variance_mean'] > 0:
                 # Areas with abnormal compression patterns
                 block_size = 8
-                for i in range(0, h - block_size, block_size):
-                    for j in range(0, w - block_size, block_size):
-                        block = gray[i:i+block_size, j:j+block_size]
-                        block_var = np.var(block)
-                        
-                        # Compare with expected variance
-                        expected_var = block_metrics['block_variance_mean']
-                        if expected_var > 0:
-                            deviation = abs(block_var - expected_var) / expected_var
-                            if deviation > 1.5:  # Significant deviation
-                                tampering_map[i:i+block_size, j:j+block_size] += min(deviation * 0.1, 0.3)
+                rows = np.arange(0, h - block_size, block_size)
+                cols = np.arange(0, w - block_size, block_size)
+                if rows.size > 0 and cols.size > 0:
+                    # Varians semua blok 8x8 sekaligus dari integral image
+                    y0, x0 = np.meshgrid(rows, cols, indexing='ij')
+                    block_vars = plane.block_var('gray', y0, y0 + block_size, x0, x0 + block_size)
+                    
+                    # Compare with expected variance
+                    expected_var = block_metrics['block_variance_mean']
+                    deviation = np.abs(block_vars - expected_var) / expected_var
+                    # Significant deviation
+                    weights = np.where(deviation > 1.5, np.minimum(deviation * 0.1, 0.3), 0.0)
+                    covered = (slice(0, rows.size * block_size), slice(0, cols.size * block_size))
+                    tampering_map[covered] += np.kron(weights, np.ones((block_size, block_size)))
         
         # 3. Edge discontinuity mapping
         # Detect unnatural edges that might indicate splicing
-        edges = cv2.Canny(gray, 50, 150)
+        edges = plane.canny
         
         # Dilate edges to create regions
         kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
@@ -1209,18 +1132,19 @@ def perform_dct_analysis(gray_image):
         return {'error': 'DCT analysis failed'}
 
 
-def analyze_block_artifacts(gray_image):
+def analyze_block_artifacts(gray_image, block_dct=None):
     """Analyze block artifacts from JPEG compression"""
     try:
         h, w = gray_image.shape
         block_size = 8
+        if block_dct is None:
+            block_dct = BlockDCT(gray_image, block_size)
         
-        block_vars = []
-        for i in range(0, h - block_size, block_size):
-            for j in range(0, w - block_size, block_size):
-                block = gray_image[i:i+block_size, j:j+block_size]
-                if block.size > 0:
-                    block_vars.append(np.var(block))
+        # Blok yang dimulai sebelum (h - block_size, w - block_size), seperti loop aslinya
+        rows = len(range(0, h - block_size, block_size))
+        cols = len(range(0, w - block_size, block_size))
+        grid = block_dct.block_variance().reshape(block_dct.blocks_h, block_dct.blocks_w)
+        block_vars = grid[:rows, :cols].ravel().tolist()
         
         return {
             'block_variance_mean': float(np.mean(block_vars)) if block_vars else 0.0,
@@ -1242,12 +1166,12 @@ def estimate_compression_quality(gray_image):
         return 50  # Default quality estimate
 
 
-def detect_double_compression(gray_image):
+def detect_double_compression(gray_image, block_dct=None):
     """Detect likelihood of double JPEG compression"""
     # Placeholder implementation
     try:
         # Simple heuristic based on block artifact consistency
-        block_analysis = analyze_block_artifacts(gray_image)
+        block_analysis = analyze_block_artifacts(gray_image, block_dct=block_dct)
         block_var_std = block_analysis.get('block_variance_std', 0)
         
         # Higher std of block variances suggests possible double compression
@@ -1271,10 +1195,10 @@ def calculate_compression_confidence(dct_analysis, block_analysis):
 
 # ======================= Statistical Analysis =======================
 
-def perform_statistical_analysis(image_pil):
+def perform_statistical_analysis(image_pil, plane=None):
     """Comprehensive statistical analysis"""
     try:
-        image_array = np.array(image_pil)
+        image_array = np.array(image_pil) if plane is None else plane.rgb
         stats = {}
         
         if image_array.ndim != 3 or image_array.shape[2] not in [3, 4]:
@@ -1294,14 +1218,16 @@ def perform_statistical_analysis(image_pil):
             stats['overall_entropy'] = safe_entropy(gray_channel)
             return stats
 
-        # Per-channel statistics
+        # Per-channel statistics dari histogram 256-bin (satu pass, bukan lima per channel)
+        plane = ensure_stats_plane(image_pil, plane)
+        histograms = plane.histogram('rgb')
         for i, channel in enumerate(['R', 'G', 'B']):
-            channel_data = image_array[:, :, i].flatten()
-            stats[f'{channel}_mean'] = float(np.mean(channel_data)) if channel_data.size > 0 else 0.0
-            stats[f'{channel}_std'] = float(np.std(channel_data)) if channel_data.size > 0 else 0.0
-            stats[f'{channel}_skewness'] = calculate_skewness(channel_data)
-            stats[f'{channel}_kurtosis'] = calculate_kurtosis(channel_data)
-            stats[f'{channel}_entropy'] = safe_entropy(image_array[:, :, i])
+            mean, std, skewness, kurtosis = histogram_moments(histograms[i])
+            stats[f'{channel}_mean'] = mean
+            stats[f'{channel}_std'] = std
+            stats[f'{channel}_skewness'] = skewness
+            stats[f'{channel}_kurtosis'] = kurtosis
+            stats[f'{channel}_entropy'] = histogram_entropy(histograms[i])
         
         # Cross-channel correlation
         r_channel = image_array[:, :, 0].flatten()
@@ -1324,7 +1250,7 @@ def perform_statistical_analysis(image_pil):
         else: stats['gb_correlation'] = 0.0
         
         # Overall statistics
-        stats['overall_entropy'] = safe_entropy(image_array)
+        stats['overall_entropy'] = histogram_entropy(histograms.sum(axis=0))
         
         return stats
         
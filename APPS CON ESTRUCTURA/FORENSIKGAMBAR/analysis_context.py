@@ -0,0 +1,75 @@
+"""
+Per-image analysis context for the Forensic Image Analysis System
+
+An ``AnalysisContext`` wraps one image and memoizes intermediate products
+(decoded arrays, recompression responses, ghost maps, ...) so that analysis
+functions that need the same intermediate reuse it instead of recomputing it.
+"""
+
+import threading
+
+import numpy as np
+
+from jpeg_recompression import image_digest
+
+
+class AnalysisContext:
+    """Memo store for intermediates computed from a single image."""
+
+    def __init__(self, image_pil):
+        if image_pil.mode != 'RGB':
+            image_pil = image_pil.convert('RGB')
+        self.image = image_pil
+        self._digest = None
+        self._memo = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def digest(self):
+        """Content digest of the wrapped image (computed once)."""
+        if self._digest is None:
+            self._digest = image_digest(self.image)
+        return self._digest
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def rgb_array(self):
+        """Read-only RGB uint8 array of the wrapped image."""
+        def _decode():
+            array = np.array(self.image)
+            array.setflags(write=False)
+            return array
+        return self.memoize('rgb_array', _decode)
+
+    def memoize(self, key, factory):
+        """Return the value stored under ``key``, computing it with ``factory()`` on first use."""
+        with self._lock:
+            if key in self._memo:
+                self.hits += 1
+                return self._memo[key]
+            self.misses += 1
+            value = factory()
+            self._memo[key] = value
+            return value
+
+    def has(self, key):
+        with self._lock:
+            return key in self._memo
+
+    def release(self, *keys):
+        """Drop memoized values that are no longer needed."""
+        with self._lock:
+            for key in keys:
+                self._memo.pop(key, None)
+
+
+def ensure_context(image_pil, context=None):
+    """Return ``context`` if given, otherwise a fresh context for ``image_pil``."""
+    if context is not None:
+        return context
+    return AnalysisContext(image_pil)
@@ -0,0 +1,305 @@
+"""
+Typed container for the results of one analysis run
+
+``AnalysisResults`` replaces the free-form ``analysis_results`` dict of the
+pipeline. It is a slotted dataclass with one field per result and stores the
+large values in explicit, compact dtypes:
+
+- ``enhanced_gray``, ``roi_mask`` and ``noise_map`` as uint8,
+- ``ela_variance`` as float16 and ``jpeg_ghost`` as float32 (cv2.resize, used
+  by the combined heatmap, does not accept float16),
+- SIFT/ORB/AKAZE keypoints and RANSAC matches as structured numpy arrays
+  (KEYPOINT_DTYPE / DMATCH_DTYPE) instead of lists of cv2 objects.
+
+It still behaves like the dict it replaces (``results['ela_mean']``,
+``results.get(...)``, ``in``, ``keys()``/``items()``), and item access to
+keypoint/match entries returns cv2 objects rebuilt from the arrays, so
+visualization and export code is unchanged. Attribute access returns the
+compact form. Entries without a field of their own go to ``extras``.
+
+``save_bundle``/``load_bundle`` write and read a single uncompressed ``.npz``
+file; on load the arrays are memory-mapped straight out of the file.
+"""
+
+import json
+import mmap
+import struct
+import zipfile
+import dataclasses
+from collections.abc import MutableMapping
+
+import numpy as np
+import cv2
+
+from result_cache import encode_value, decode_value
+
+BUNDLE_VERSION = 1
+
+KEYPOINT_DTYPE = np.dtype([('x', np.float32), ('y', np.float32), ('size', np.float32), ('angle', np.float32),
+                           ('response', np.float32), ('octave', np.int32), ('class_id', np.int32)])
+DMATCH_DTYPE = np.dtype([('query_idx', np.int32), ('train_idx', np.int32), ('img_idx', np.int32),
+                         ('distance', np.float32)])
+
+# Explicit dtypes of the full-size maps
+MAP_DTYPES = {
+    'enhanced_gray': np.uint8,
+    'roi_mask': np.uint8,
+    'noise_map': np.uint8,
+    'ela_variance': np.float16,
+    'jpeg_ghost': np.float32,
+}
+
+
+class _Unset:
+    """Marker for entries the pipeline has not produced (absent from the mapping)."""
+
+    def __repr__(self):
+        return '<unset>'
+
+    def __reduce__(self):
+        return '_UNSET'
+
+
+_UNSET = _Unset()
+
+
+# ======================= Compact conversions =======================
+
+def keypoints_to_array(keypoints):
+    """Structured KEYPOINT_DTYPE array of a sequence of cv2.KeyPoint."""
+    if isinstance(keypoints, np.ndarray) and keypoints.dtype == KEYPOINT_DTYPE:
+        return keypoints
+    return np.array([(kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id)
+                     for kp in (keypoints if keypoints is not None else ())], dtype=KEYPOINT_DTYPE)
+
+
+def array_to_keypoints(array):
+    return [cv2.KeyPoint(x, y, size, angle, response, octave, class_id)
+            for x, y, size, angle, response, octave, class_id in array.tolist()]
+
+
+def matches_to_array(matches):
+    """Structured DMATCH_DTYPE array of a sequence of cv2.DMatch."""
+    if isinstance(matches, np.ndarray) and matches.dtype == DMATCH_DTYPE:
+        return matches
+    return np.array([(m.queryIdx, m.trainIdx, m.imgIdx, m.distance) for m in (matches if matches is not None else ())],
+                    dtype=DMATCH_DTYPE)
+
+
+def array_to_matches(array):
+    return [cv2.DMatch(query_idx, train_idx, img_idx, distance)
+            for query_idx, train_idx, img_idx, distance in array.tolist()]
+
+
+def _compact_map(value, dtype):
+    array = np.asarray(value)
+    if array.dtype == dtype:
+        return array
+    if np.issubdtype(dtype, np.integer) and not np.issubdtype(array.dtype, np.integer) and array.dtype != bool:
+        array = np.rint(np.clip(array, 0, 255))
+    return array.astype(dtype)
+
+
+def _compact_feature_sets(feature_sets):
+    return {name: (keypoints_to_array(keypoints), descriptors)
+            for name, (keypoints, descriptors) in (feature_sets or {}).items()}
+
+
+def _compact(name, value):
+    """Stored form of ``value`` for field ``name``."""
+    if value is _UNSET:
+        return value
+    if name in MAP_DTYPES and value is not None:
+        return _compact_map(value, MAP_DTYPES[name])
+    if name == 'sift_keypoints':
+        return keypoints_to_array(value)
+    if name == 'ransac_matches':
+        return matches_to_array(value)
+    if name == 'feature_sets':
+        return _compact_feature_sets(value)
+    return value
+
+
+def _expand(name, value):
+    """Value of field ``name`` as the pipeline dict held it (cv2 objects instead of arrays)."""
+    if name == 'sift_keypoints':
+        return array_to_keypoints(value)
+    if name == 'ransac_matches':
+        return array_to_matches(value)
+    if name == 'feature_sets':
+        return {detector: (array_to_keypoints(keypoints), descriptors)
+                for detector, (keypoints, descriptors) in value.items()}
+    return value
+
+
+# ======================= Result container =======================
+
+@dataclasses.dataclass(slots=True, eq=False, repr=False)
+class AnalysisResults(MutableMapping):
+    """Results of one analysis run; a slotted, dtype-explicit stand-in for the old results dict."""
+
+    metadata: dict = dataclasses.field(default_factory=dict)
+    ela_image: object = None
+    ela_mean: float = 0.0
+    ela_std: float = 0.0
+    ela_regional_stats: dict = dataclasses.field(default_factory=dict)
+    ela_quality_stats: list = dataclasses.field(default_factory=list)
+    ela_variance: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, np.float16))
+    feature_sets: dict = dataclasses.field(default_factory=dict)
+    sift_keypoints: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, KEYPOINT_DTYPE))
+    sift_descriptors: object = None
+    sift_matches: int = 0
+    ransac_matches: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, DMATCH_DTYPE))
+    ransac_inliers: int = 0
+    geometric_transform: object = None
+    block_matches: list = dataclasses.field(default_factory=list)
+    noise_analysis: dict = dataclasses.field(default_factory=dict)
+    noise_map: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, np.uint8))
+    jpeg_analysis: dict = dataclasses.field(default_factory=dict)
+    jpeg_ghost: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, np.float32))
+    jpeg_ghost_suspicious_ratio: float = 0.0
+    frequency_analysis: dict = dataclasses.field(default_factory=dict)
+    texture_analysis: dict = dataclasses.field(default_factory=dict)
+    edge_analysis: dict = dataclasses.field(default_factory=dict)
+    illumination_analysis: dict = dataclasses.field(default_factory=dict)
+    statistical_analysis: dict = dataclasses.field(default_factory=dict)
+    color_analysis: dict = dataclasses.field(default_factory=dict)
+    roi_mask: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, np.uint8))
+    enhanced_gray: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(0, np.uint8))
+    localization_analysis: dict = dataclasses.field(default_factory=dict)
+    classification: dict = dataclasses.field(default_factory=dict)
+    processing_time: str = "0s"
+    pipeline_status: dict = dataclasses.field(default_factory=dict)
+    # Only present once the stage has run
+    tiled_analysis: object = _UNSET
+    mm_fusion_analysis: object = _UNSET
+    trufor_analysis: object = _UNSET
+    # Entries without a field of their own
+    extras: dict = dataclasses.field(default_factory=dict)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, _compact(name, value))
+
+    # --- Mapping interface (same keys and values as the old dict) ---
+
+    def __getitem__(self, key):
+        if key in _FIELD_NAMES:
+            value = getattr(self, key)
+            if value is _UNSET:
+                raise KeyError(key)
+            return _expand(key, value)
+        return self.extras[key]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_NAMES:
+            setattr(self, key, value)
+        else:
+            self.extras[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_NAMES:
+            if getattr(self, key) is _UNSET:
+                raise KeyError(key)
+            setattr(self, key, _UNSET)
+        else:
+            del self.extras[key]
+
+    def __iter__(self):
+        for name in _FIELD_NAMES:
+            if getattr(self, name) is not _UNSET:
+                yield name
+        yield from self.extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"AnalysisResults({len(self)} entries, {self.nbytes() / 2**20:.1f} MB of top-level arrays)"
+
+    def nbytes(self):
+        """Bytes held by the top-level arrays (maps, keypoints, matches, descriptors)."""
+        total = 0
+        for name in _FIELD_NAMES:
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray):
+                total += value.nbytes
+            elif name == 'feature_sets':
+                total += sum(k.nbytes + (d.nbytes if isinstance(d, np.ndarray) else 0) for k, d in value.values())
+        return total
+
+    def to_dict(self):
+        """Plain dict with cv2 keypoints/matches, as the pipeline produced before."""
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, results):
+        container = cls()
+        container.update(results)
+        return container
+
+    # --- .npz bundle ---
+
+    def save_bundle(self, path):
+        """Write all entries to one uncompressed .npz file (arrays stored as-is)."""
+        arrays = []
+        stored = {name: getattr(self, name) for name in _FIELD_NAMES if getattr(self, name) is not _UNSET}
+        stored['extras'] = self.extras
+        manifest = {'version': BUNDLE_VERSION, 'fields': encode_value(stored, arrays)}
+        members = {f"array_{index}": np.ascontiguousarray(array) for index, array in enumerate(arrays)}
+        for key, array in members.items():
+            if array.dtype.hasobject:
+                raise TypeError(f"Cannot bundle object array ({key})")
+        members['manifest'] = np.frombuffer(json.dumps(manifest).encode('utf-8'), dtype=np.uint8)
+        np.savez(path, **members)
+        return path
+
+
+def load_bundle(path, mmap=True):
+    """Read an ``AnalysisResults`` written by ``save_bundle``.
+
+    With ``mmap=True`` arrays are copy-on-write views of one memory map of the
+    file, so loading costs almost nothing until a map is actually read.
+    """
+    members = _npz_memmaps(path) if mmap else None
+    if members is None:
+        with np.load(path, allow_pickle=False) as npz:
+            members = {name: npz[name] for name in npz.files}
+    manifest = json.loads(bytes(members['manifest']).decode('utf-8'))
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version {manifest.get('version')}")
+    fields = decode_value(manifest['fields'], lambda index: members[f"array_{index}"])
+    container = AnalysisResults()
+    for name, value in fields.items():
+        setattr(container, name, value)
+    return container
+
+
+def _npz_memmaps(path):
+    """Memory maps of the members of an uncompressed .npz; None when the file cannot be mapped."""
+    members = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        # One copy-on-write mapping of the whole file; every array is a view into it
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                return None
+            # Data starts after the local file header (30 bytes + name + extra field)
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            elif version == (2, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            else:
+                return None
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if dtype.hasobject:
+                return None
+            members[name] = np.ndarray(shape, dtype=dtype, buffer=mapping, offset=f.tell(),
+                                       order='F' if fortran_order else 'C')
+    return members
+
+
+_FIELD_NAMES = tuple(field.name for field in dataclasses.fields(AnalysisResults) if field.name != 'extras')
@@ -16,6 +16,8 @@ import zipfile # Diperlukan untuk ekspor gambar proses
 # ======================= IMPORT BARU & PENTING =======================
 import signal
 from utils import load_analysis_history, save_analysis_to_history, delete_all_history, delete_selected_history, get_history_count, clear_empty_thumbnail_folder
+from utils import get_history_thumbnail, get_history_verdicts
+from config import HISTORY_PAGE_SIZE
 from export_utils import (export_to_advanced_docx, export_report_pdf,
                           export_visualization_png, generate_all_process_images, 
                           export_comprehensive_package, DOCX_AVAILABLE) # <-- Ditambah export_comprehensive_package dan generate_all_process_images dari export_utils
@@ -29,6 +31,7 @@ from validator import ForensicValidator # <-- Import dari file validator.py
 # Bagian ini memastikan semua modul backend dimuat dengan benar
 try:
     from main import analyze_image_comprehensive_advanced as main_analysis_func
+    from result_cache import get_result_cache
     # GANTI BLOK IMPORT DI ATAS DENGAN YANG INI:
     from visualization import (
         create_feature_match_visualization, create_block_match_visualization,
@@ -41,7 +44,8 @@ try:
         create_probability_bars,
         create_uncertainty_visualization
     )
-    from config import BLOCK_SIZE
+    from config import BLOCK_SIZE, JOB_SERVER_ENABLED
+    from job_server import get_job_server, format_job_status, FINAL_STATUSES, DONE
     IMPORTS_SUCCESSFUL = True
     IMPORT_ERROR_MESSAGE = ""
 except ImportError as e:
@@ -734,8 +738,8 @@ def display_history_tab():
     with col_header1:
         st.markdown("Berikut daftar semua analisis yang telah dilakukan, diurutkan dari yang terbaru.")
     
-    history_data = load_analysis_history()
-    history_count = len(history_data)
+    # Hanya jumlah dan satu halaman yang dibaca dari database, bukan seluruh riwayat
+    history_count = get_history_count()
     
     # Tampilkan jumlah riwayat
     with col_header2:
@@ -767,11 +771,37 @@ def display_history_tab():
                 st.session_state['confirm_delete_all'] = False
                 st.rerun()
     
-    if not history_data:
+    if history_count == 0:
         st.info("Belum ada riwayat analisis. Lakukan analisis pertama Anda!")
         return
     
-    # Initialize session state untuk checkbox
+    # Filter: hasil (verdict), rentang tanggal, dan nama file
+    col_f1, col_f2, col_f3, col_f4 = st.columns([1.5, 1, 1, 1.5])
+    with col_f1:
+        verdict_filter = st.selectbox("Hasil", ["Semua"] + get_history_verdicts(), key="history_verdict")
+    with col_f2:
+        date_from = st.date_input("Dari tanggal", value=None, key="history_date_from")
+    with col_f3:
+        date_to = st.date_input("Sampai tanggal", value=None, key="history_date_to")
+    with col_f4:
+        search_text = st.text_input("Cari nama file", key="history_search").strip()
+    history_filters = {
+        'verdict': None if verdict_filter == "Semua" else verdict_filter,
+        'date_from': date_from,
+        'date_to': date_to,
+        'search': search_text or None,
+    }
+    
+    filtered_count = get_history_count(**history_filters)
+    total_pages = max(1, (filtered_count + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE)
+    col_page1, col_page2 = st.columns([1, 3])
+    with col_page1:
+        page_number = st.number_input("Halaman", min_value=1, max_value=total_pages, value=1, step=1, key="history_page")
+    with col_page2:
+        st.caption(f"{filtered_count} dari {history_count} riwayat cocok dengan filter · {total_pages} halaman")
+    history_data = load_analysis_history(page=int(page_number) - 1, per_page=HISTORY_PAGE_SIZE, **history_filters)
+    
+    # Initialize session state untuk checkbox (berisi id entri riwayat)
     if 'selected_history' not in st.session_state:
         st.session_state.selected_history = []
     
@@ -798,11 +828,8 @@ def display_history_tab():
         with col_conf1:
             if st.button("✅ Ya, Hapus", type="primary", key="confirm_del_selected"):
                 with st.spinner("Menghapus riwayat yang dipilih..."):
-                    # Convert indices from reversed list to original indices (since we iterate history_data[::-1])
-                    # Ensure indices are valid (filter duplicates if any were somehow added)
-                    original_indices_to_delete = sorted(list(set(len(history_data) - 1 - idx for idx in st.session_state.selected_history)))
-
-                    success = delete_selected_history(original_indices_to_delete)
+                    # Id entri tetap valid lintas halaman/filter; semua dihapus dalam satu transaksi
+                    success = delete_selected_history(sorted(set(st.session_state.selected_history)))
                     if success:
                         st.success(f"Berhasil menghapus {len(st.session_state.selected_history)} riwayat!")
                         st.session_state.selected_history = []
@@ -819,15 +846,16 @@ def display_history_tab():
     
     st.markdown("---")
     
-    # Tampilkan riwayat dengan checkbox
-    # Using reversed(history_data) for newest first display
-    for idx, entry in enumerate(reversed(history_data)):
-        # Calculate the original index for proper selection/deletion
-        original_entry_idx = len(history_data) - 1 - idx
+    if not history_data:
+        st.info("Tidak ada riwayat yang cocok dengan filter.")
+        return
+    
+    # Tampilkan riwayat dengan checkbox (halaman sudah terurut dari yang terbaru)
+    for entry in history_data:
+        entry_id = entry['id']
         
         timestamp, image_name = entry.get('timestamp', 'N/A'), entry.get('image_name', 'N/A')
         summary, result_type = entry.get('analysis_summary', {}), entry.get('analysis_summary', {}).get('type', 'N/A')
-        thumbnail_path = entry.get('thumbnail_path')
         
         if "Splicing" in result_type or "Complex" in result_type or "Manipulasi" in result_type or "Forgery" in result_type:
             icon, color = "🚨", "#ff4b4b"
@@ -841,12 +869,12 @@ def display_history_tab():
             col_chk, col_exp = st.columns([0.05, 1])
             
             with col_chk:
-                # Checkbox for selecting item (use original_entry_idx as value for accurate tracking)
-                is_selected = st.checkbox("Pilih", key=f"select_{original_entry_idx}", value=original_entry_idx in st.session_state.selected_history, label_visibility="hidden")
-                if is_selected and original_entry_idx not in st.session_state.selected_history:
-                    st.session_state.selected_history.append(original_entry_idx)
-                elif not is_selected and original_entry_idx in st.session_state.selected_history:
-                    st.session_state.selected_history.remove(original_entry_idx)
+                # Checkbox for selecting item (use the entry id for accurate tracking)
+                is_selected = st.checkbox("Pilih", key=f"select_{entry_id}", value=entry_id in st.session_state.selected_history, label_visibility="hidden")
+                if is_selected and entry_id not in st.session_state.selected_history:
+                    st.session_state.selected_history.append(entry_id)
+                elif not is_selected and entry_id in st.session_state.selected_history:
+                    st.session_state.selected_history.remove(entry_id)
             
             with col_exp:
                 expander_title = f"{icon} **{timestamp}** | `{image_name}` | **Hasil:** {result_type}"
@@ -856,8 +884,9 @@ def display_history_tab():
                     col1_detail, col2_detail = st.columns([1, 3])
                     with col1_detail:
                         st.markdown("**Gambar Asli**")
-                        if thumbnail_path and os.path.exists(thumbnail_path):
-                            st.image(thumbnail_path, width=300)  # Fixed: changed 'stretch' to numeric width
+                        thumbnail = get_history_thumbnail(entry_id) if entry.get('has_thumbnail') else None
+                        if thumbnail:
+                            st.image(thumbnail, width=300)  # Fixed: changed 'stretch' to numeric width
                         else:
                             st.caption("Thumbnail tidak tersedia.")
                     
@@ -980,6 +1009,80 @@ def lakukan_validasi_sistem(analysis_results):
     return combined_results, final_score, summary_text, failed_validations
 
 
+def display_stage_profile(pipeline_status):
+    """
+    Menampilkan profil kinerja per tahap (waktu, CPU, memori, ukuran output)
+    beserta unduhan JSON dan Chrome trace.
+    """
+    import json
+    import pandas as pd
+    from stage_profiler import profile_data, chrome_trace
+
+    stages = {name: detail for name, detail in pipeline_status.get('stage_details', {}).items() if isinstance(detail, dict)}
+    st.subheader("⏱️ Profil Kinerja per Tahap", anchor=False)
+    if not stages:
+        st.info("Data profil tahap tidak tersedia untuk hasil analisis ini.")
+        return
+
+    profile = pipeline_status.get('profile', {})
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Waktu (wall)", f"{profile.get('wall_time', 0):.2f}s")
+    col2.metric("Total Waktu CPU (proses utama)", f"{profile.get('cpu_time', 0):.2f}s")
+    col3.metric("Puncak RSS", f"{profile.get('peak_rss_mb', 0):.0f} MB")
+
+    df = pd.DataFrame([{
+        'Tahap': name.replace('_', ' ').title(),
+        'Status': ('♻️ Cache' if detail.get('cached') else '✅') if detail.get('success') else '❌',
+        'Wall (s)': round(detail.get('wall_time', 0.0), 3),
+        'CPU (s)': round(detail.get('cpu_time', 0.0), 3),
+        'Δ RSS (MB)': round(detail.get('rss_delta_mb', 0.0), 1),
+        'Output (MB)': round(detail.get('output_bytes', 0) / (1024 * 1024), 2),
+        'Proses': detail.get('worker', 'main'),
+    } for name, detail in stages.items()])
+    st.dataframe(df, use_container_width=True)
+
+    fig = go.Figure(go.Bar(x=df['Wall (s)'], y=df['Tahap'], orientation='h', marker_color='#1f77b4'))
+    fig.update_layout(title="Waktu per Tahap", xaxis_title="Detik", yaxis={'autorange': 'reversed'}, height=max(300, 28 * len(df)))
+    st.plotly_chart(fig, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Unduh Profil (JSON)", json.dumps(profile_data(pipeline_status), indent=2, default=float),
+                           file_name="stage_profile.json", mime="application/json")
+    with col2:
+        st.download_button("Unduh Chrome Trace", json.dumps(chrome_trace(pipeline_status), default=float),
+                           file_name="stage_trace.json", mime="application/json",
+                           help="Buka di chrome://tracing atau ui.perfetto.dev")
+
+
+def poll_analysis_job():
+    """
+    Menampilkan status job analisis (mode job server) di sidebar dan memindahkan
+    hasilnya ke session state setelah selesai. Mengembalikan True selama job masih berjalan.
+    """
+    job_id = st.session_state.get('analysis_job_id')
+    if not job_id:
+        return False
+    server = get_job_server()
+    record = server.status(job_id)
+    if record is None:
+        st.session_state.analysis_job_id = None
+        return False
+    if record['status'] not in FINAL_STATUSES:
+        st.sidebar.info(format_job_status(record))
+        return True
+
+    st.session_state.analysis_job_id = None
+    if record['status'] == DONE:
+        st.session_state.analysis_results = server.result(job_id)
+        st.sidebar.success(format_job_status(record))
+    else:
+        st.sidebar.error(format_job_status(record))
+        st.session_state.analysis_results = None
+    server.forget(job_id)
+    return False
+
+
 def display_validation_tab_baru(analysis_results):
     """
     Menampilkan tab validasi sistem (Tahap 5) dengan pendekatan validasi silang
@@ -1185,6 +1288,8 @@ def display_validation_tab_baru(analysis_results):
             st.success("✅ **Tidak Ada Kegagalan Validasi yang Terdeteksi**")
             st.markdown("Semua algoritma menunjukkan hasil yang konsisten dan terpenuhi kriteria validasi minimum.")
 
+        display_stage_profile(analysis_results.get('pipeline_status', {}))
+
     with tab3:
         st.subheader("Dokumentasi Forensik Digital", anchor=False)
         
@@ -1445,6 +1550,7 @@ def main_app():
     if 'analysis_results' not in st.session_state: st.session_state.analysis_results = None
     if 'original_image' not in st.session_state: st.session_state.original_image = None
     if 'last_uploaded_file' not in st.session_state: st.session_state.last_uploaded_file = None
+    if 'analysis_job_id' not in st.session_state: st.session_state.analysis_job_id = None
     
     # Header dengan logo dan judul - sidebar (responsif)
     st.sidebar.markdown("""
@@ -1480,6 +1586,7 @@ def main_app():
         type=['jpg', 'jpeg', 'png', 'bmp', 'tiff']
     )
 
+    job_pending = False
     if uploaded_file is not None:
         # Periksa apakah ini file baru atau sama dengan yang terakhir
         if st.session_state.last_uploaded_file is None or st.session_state.last_uploaded_file.name != uploaded_file.name:
@@ -1507,6 +1614,9 @@ def main_app():
                 temp_dir = "/tmp/temp_uploads" if os.path.exists("/tmp") else "temp_uploads"
             os.makedirs(temp_dir, exist_ok=True)
             filename = st.session_state.original_image_name
+            if JOB_SERVER_ENABLED:
+                # Beberapa sesi bisa menganalisis file dengan nama yang sama secara bersamaan
+                filename = f"{int(time.time() * 1000)}_{os.getpid()}_{filename}"
             temp_filepath = os.path.join(temp_dir, filename)
             
             # Tulis ulang file dari buffer
@@ -1514,18 +1624,30 @@ def main_app():
             with open(temp_filepath, "wb") as f:
                 f.write(st.session_state.last_uploaded_file.getbuffer())
 
-            with st.spinner('Melakukan analisis 17 tahap... Ini mungkin memakan waktu beberapa saat.'):
+            if JOB_SERVER_ENABLED:
+                # Analisis berjalan di worker job server; UI hanya memantau statusnya
                 try:
-                    # Pastikan main_analysis_func dipanggil dengan path file yang benar
-                    results = main_analysis_func(temp_filepath)
-                    st.session_state.analysis_results = results
+                    st.session_state.analysis_job_id = get_job_server().submit(temp_filepath, delete_input=True)
                 except Exception as e:
-                    st.error(f"Terjadi kesalahan saat analisis: {e}")
-                    st.exception(e)
-                    st.session_state.analysis_results = None
-                finally:
+                    st.error(f"Gagal mengirim job analisis: {e}")
                     if os.path.exists(temp_filepath):
                         os.remove(temp_filepath)
+            else:
+                with st.spinner('Melakukan analisis 17 tahap... Ini mungkin memakan waktu beberapa saat.'):
+                    try:
+                        # Pastikan main_analysis_func dipanggil dengan path file yang benar
+                        # Unggahan ulang file yang sama memakai hasil tahap yang sudah di-cache
+                        results = main_analysis_func(temp_filepath, result_cache=get_result_cache())
+                        st.session_state.analysis_results = results
+                    except Exception as e:
+                        st.error(f"Terjadi kesalahan saat analisis: {e}")
+                        st.exception(e)
+                        st.session_state.analysis_results = None
+                    finally:
+                        if os.path.exists(temp_filepath):
+                            os.remove(temp_filepath)
+
+        job_pending = poll_analysis_job()
 
         st.sidebar.markdown("---")
         st.sidebar.subheader("Kontrol Sesi")
@@ -1533,6 +1655,7 @@ def main_app():
         # Tombol Mulai Ulang (tidak ada perubahan)
         if st.sidebar.button("🔄 Mulai Ulang Analisis", use_container_width=True):
             st.session_state.analysis_results = None
+            st.session_state.analysis_job_id = None
             st.session_state.original_image = None
             st.session_state.last_uploaded_file = None
             st.rerun()
@@ -1750,6 +1873,11 @@ def main_app():
         with main_page_tabs[1]:
             display_history_tab()
 
+    if job_pending:
+        # Pantau job server tanpa memblokir worker analisis
+        time.sleep(1)
+        st.rerun()
+
 # Pastikan Anda memanggil fungsi main_app() di akhir
 if __name__ == '__main__':
     # Anda harus menempatkan semua fungsi helper (seperti display_core_analysis, dll.)
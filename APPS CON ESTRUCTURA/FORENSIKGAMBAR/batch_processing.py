@@ -0,0 +1,331 @@
+"""
+Batch / folder mode for the Forensic Image Analysis System
+
+Streams the images of a folder (or a manifest file) to a pool of worker
+processes. Every worker warms up its OpenCV detectors once and then analyzes
+images one after another. Results are appended to a JSONL summary file as soon
+as each image finishes (flushed and fsync'ed), and images whose SHA-256 already
+has a final record in that file are skipped, so an interrupted run can simply be
+started again. Every record also carries the classifier features of the image;
+``feature_table.py build`` turns summaries into a table for batch re-scoring.
+"""
+
+import os
+import json
+import time
+import hashlib
+import contextlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config import VALID_EXTENSIONS
+
+# Records with these statuses are final; anything else is retried on the next run
+FINAL_STATUSES = ('ok', 'invalid')
+MAX_ATTEMPTS = 2
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def iter_batch_inputs(batch_dir=None, manifest=None, exclude_dir=None):
+    """
+    Yield image paths from a folder (recursive, sorted) and/or a manifest.
+
+    The manifest is a text file with one path per line; relative paths are
+    resolved against the manifest's folder, blank lines and '#' comments are ignored.
+    ``exclude_dir`` (the output folder) is never scanned, so exported images are not re-analyzed.
+    """
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    if manifest:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                path = line.strip()
+                if not path or path.startswith('#'):
+                    continue
+                yield path if os.path.isabs(path) else os.path.join(manifest_dir, path)
+    if batch_dir:
+        for root, dirs, files in os.walk(batch_dir):
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude_dir)
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in VALID_EXTENSIONS:
+                    yield os.path.join(root, name)
+
+
+def load_completed_hashes(summary_path):
+    """SHA-256 values that already have a final record in the JSONL summary."""
+    completed = set()
+    if not os.path.exists(summary_path):
+        return completed
+    skipped = []
+    with open(summary_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                skipped.append(line_number)  # Baris bisa terpotong jika proses sebelumnya crash
+                continue
+            if isinstance(record, dict) and record.get('status') in FINAL_STATUSES and record.get('sha256'):
+                completed.add(record['sha256'])
+    if skipped:
+        print(f"⚠️ {summary_path}: skipped {len(skipped)} unreadable line(s): {skipped[:10]}")
+    return completed
+
+
+class JsonlSink:
+    """Append-only JSONL writer; every record is flushed and fsync'ed before returning."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._ends_mid_line(path):
+            # Terminate a line cut off by a crash so the next record starts on its own line
+            self._file.write('\n')
+            self._file.flush()
+
+    @staticmethod
+    def _ends_mid_line(path):
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# ======================= WORKER PROCESS =======================
+
+_worker_options = {}
+
+
+def _init_batch_worker(options):
+    """Runs once per worker process: warm up imports and OpenCV detectors."""
+    import cv2
+    from feature_detection import warm_up_detectors
+    from stage_scheduler import configure_stage_workers
+    from lazy_imports import preload_stage_modules
+
+    # main.py imports its analysis modules lazily; load them all once per worker
+    preload_stage_modules(include_export=bool(options.get('export')))
+
+    # Parallelism comes from the batch workers; avoid oversubscribing the cores
+    cv2.setNumThreads(1)
+    configure_stage_workers(1)
+    if options.get('export'):
+        from report_artifacts import configure_export_workers
+        configure_export_workers(1)
+    warm_up_detectors(sift_nfeatures=500)
+    _worker_options.update(options)
+
+
+def _summarize_results(analysis_results):
+    from feature_table import extract_features, features_to_json
+
+    classification = analysis_results.get('classification', {}) or {}
+    uncertainty = classification.get('uncertainty_analysis', {}) or {}
+    report = uncertainty.get('report', {}) or {}
+    probabilities = uncertainty.get('probabilities', {}) or {}
+    pipeline_status = analysis_results.get('pipeline_status', {}) or {}
+    localization = analysis_results.get('localization_analysis', {}) or {}
+    return {
+        'assessment': report.get('primary_assessment', classification.get('type', 'N/A')),
+        'reliability': report.get('assessment_reliability', classification.get('confidence', 'N/A')),
+        'authentic_probability': float(probabilities.get('authentic_probability', 0.0)),
+        'copy_move_probability': float(probabilities.get('copy_move_probability', 0.0)),
+        'splicing_probability': float(probabilities.get('splicing_probability', 0.0)),
+        'tampering_percentage': float(localization.get('tampering_percentage', 0.0)),
+        'ransac_inliers': int(analysis_results.get('ransac_inliers', 0) or 0),
+        'block_matches': len(analysis_results.get('block_matches', []) or []),
+        'completed_stages': pipeline_status.get('completed_stages', 0),
+        'failed_stages': list(pipeline_status.get('failed_stages', [])),
+        'processing_time': analysis_results.get('processing_time', '0s'),
+        # Wall time per stage, to find the stage that blows the time budget on a given exhibit
+        'stage_times': {name: round(detail['wall_time'], 3)
+                        for name, detail in pipeline_status.get('stage_details', {}).items()
+                        if isinstance(detail, dict) and 'wall_time' in detail},
+        # Classifier inputs, so the archive can be re-scored without re-running (feature_table.py)
+        'features': features_to_json(extract_features(analysis_results)),
+    }
+
+
+def _analyze_one(path, sha256):
+    """Analyze one image inside a worker; returns a JSON-serializable summary record."""
+    from main import analyze_image_comprehensive_advanced, export_analysis_outputs
+    from PIL import Image
+
+    output_dir = _worker_options['output_dir']
+    log_dir = os.path.join(output_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{sha256[:16]}.log")
+    started = time.time()
+
+    record = {'path': path, 'sha256': sha256, 'worker_pid': os.getpid(), 'log': log_path}
+    with open(log_path, 'w', encoding='utf-8') as log_file, contextlib.redirect_stdout(log_file):
+        try:
+            analysis_results = analyze_image_comprehensive_advanced(path, output_dir, test_mode=False, save_history=False)
+            record.update(_summarize_results(analysis_results))
+            if {'file_validation', 'image_loading'} & set(record['failed_stages']):
+                record['status'] = 'invalid'
+            else:
+                record['status'] = 'ok'
+                if _worker_options.get('export'):
+                    base_name = f"{os.path.splitext(os.path.basename(path))[0]}_{sha256[:8]}"
+                    with Image.open(path) as original_image:
+                        export_analysis_outputs(original_image, analysis_results,
+                                                os.path.join(output_dir, base_name), **_worker_options['export'])
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = str(e)
+    record['elapsed'] = round(time.time() - started, 3)
+    record['finished_at'] = datetime.now().isoformat()
+    return record
+
+
+# ======================= PARENT PROCESS =======================
+
+def run_batch(batch_dir=None, manifest=None, output_dir='./results', workers=None,
+              summary_path=None, export_options=None):
+    """
+    Analyze every image of a folder/manifest with a pool of worker processes.
+
+    Args:
+        batch_dir: Folder scanned recursively for images with VALID_EXTENSIONS
+        manifest: Text file with one image path per line
+        output_dir: Folder for per-image logs/exports and the default summary file
+        workers: Number of worker processes (default: cpu count)
+        summary_path: JSONL summary file (default: <output_dir>/batch_summary.jsonl)
+        export_options: Keyword arguments for main.export_analysis_outputs, or None for no export
+
+    Returns:
+        Dict with counts: total, skipped, ok, invalid, failed, duplicates
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = summary_path or os.path.join(output_dir, 'batch_summary.jsonl')
+    workers = max(1, workers or os.cpu_count() or 1)
+    completed = load_completed_hashes(summary_path)
+    stats = {'total': 0, 'skipped': 0, 'ok': 0, 'invalid': 0, 'failed': 0, 'duplicates': 0}
+    options = {'output_dir': output_dir, 'export': export_options}
+
+    print(f"📦 Batch mode: {workers} workers, summary → {summary_path}")
+    if completed:
+        print(f"  Resuming: {len(completed)} images already done")
+
+    sink = JsonlSink(summary_path)
+    seen = {}
+    inputs = iter_batch_inputs(batch_dir, manifest, exclude_dir=output_dir)
+    max_in_flight = workers * 2
+    start_time = time.time()
+
+    def next_job():
+        """Next (path, sha256) to analyze, recording skips and duplicates on the way."""
+        for path in inputs:
+            stats['total'] += 1
+            try:
+                sha256 = file_sha256(path)
+            except OSError as e:
+                stats['failed'] += 1
+                sink.write({'path': path, 'sha256': None, 'status': 'failed', 'error': f"Cannot read file: {e}",
+                            'finished_at': datetime.now().isoformat()})
+                continue
+            if sha256 in completed:
+                stats['skipped'] += 1
+                continue
+            if sha256 in seen:
+                stats['duplicates'] += 1
+                sink.write({'path': path, 'sha256': sha256, 'status': 'duplicate', 'duplicate_of': seen[sha256],
+                            'finished_at': datetime.now().isoformat()})
+                continue
+            seen[sha256] = path
+            return path, sha256
+        return None
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(options,))
+
+    pool = new_pool()
+    running = {}
+    attempts = {}
+    retry_queue = []
+    exhausted = False
+    try:
+        while True:
+            # Keep a bounded number of jobs in flight so huge folders are streamed
+            while len(running) < max_in_flight:
+                job = retry_queue.pop(0) if retry_queue else (None if exhausted else next_job())
+                if job is None:
+                    exhausted = True
+                    break
+                attempts[job[1]] = attempts.get(job[1], 0) + 1
+                running[pool.submit(_analyze_one, *job)] = job
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            for future in done:
+                path, sha256 = running.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    pool_broken = True
+                    if attempts[sha256] < MAX_ATTEMPTS:
+                        retry_queue.append((path, sha256))
+                        continue
+                    record = {'path': path, 'sha256': sha256, 'status': 'failed',
+                              'error': 'Worker process crashed', 'finished_at': datetime.now().isoformat()}
+                except Exception as e:
+                    record = {'path': path, 'sha256': sha256, 'status': 'failed', 'error': str(e),
+                              'finished_at': datetime.now().isoformat()}
+                record['attempts'] = attempts[sha256]
+                sink.write(record)
+                stats[record['status']] = stats.get(record['status'], 0) + 1
+                icon = '✅' if record['status'] == 'ok' else '❌'
+                print(f"{icon} [{stats['ok'] + stats['invalid'] + stats['failed']}] {os.path.basename(path)}: "
+                      f"{record.get('assessment', record.get('error', record['status']))} ({record.get('elapsed', 0):.1f}s)")
+
+            if pool_broken:
+                # Jobs still in the broken pool fail too; requeue them and start fresh workers
+                print("⚠️ A worker process crashed, restarting the worker pool...")
+                for future, job in running.items():
+                    retry_queue.append(job)
+                running.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    except KeyboardInterrupt:
+        print("\n⚠️ Batch interrupted; completed results are kept in the summary file.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        sink.close()
+    pool.shutdown(wait=True)
+
+    elapsed = time.time() - start_time
+    processed = stats['ok'] + stats['invalid'] + stats['failed']
+    print(f"\n{'='*80}")
+    print(f"BATCH COMPLETE - {processed} analyzed, {stats['skipped']} skipped, "
+          f"{stats['duplicates']} duplicates in {elapsed:.1f}s")
+    print(f"📊 OK: {stats['ok']}, Invalid: {stats['invalid']}, Failed: {stats['failed']}")
+    if processed:
+        print(f"📊 Throughput: {processed / elapsed * 60:.1f} images/min")
+    print(f"{'='*80}\n")
+    return stats
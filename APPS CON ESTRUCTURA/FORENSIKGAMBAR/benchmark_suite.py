@@ -0,0 +1,452 @@
+"""
+Benchmark suite for the FORENSIKGAMBAR analysis stages
+
+Generates deterministic synthetic test images (authentic, copy-move, splice)
+with known forged regions at several sizes, times every stage function and
+the end-to-end pipeline, and scores detection accuracy against the ground
+truth masks. Each run is appended to a JSON history; compared with the
+previous run on the same machine, a stage that became slower than the
+tolerance or less accurate is reported as a regression (exit code 1).
+
+Stage functions get the image the pipeline would give them (downsized to
+TARGET_MAX_DIM by preprocessing); ``--native`` feeds them the full-size image.
+Every timed call starts cold: the shared JPEG recompression cache is cleared and
+the stage worker pool (whose processes keep caches of their own) is restarted.
+
+Usage:
+    python benchmark_suite.py                              # 0.5 and 2 MP
+    python benchmark_suite.py --sizes 0.5 2 8 24 --repeat 3
+    python benchmark_suite.py --stages ela_analysis jpeg_ghost --no-pipeline
+    python benchmark_suite.py --check-only                 # compare the last two runs
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from validation import advanced_preprocess_image
+from ela_analysis import perform_multi_quality_ela
+from feature_detection import extract_multi_detector_features
+from copy_move_detection import detect_copy_move_advanced, detect_copy_move_blocks, kmeans_tampering_localization
+from advanced_analysis import (analyze_noise_consistency, analyze_frequency_domain,
+                               analyze_texture_consistency, analyze_edge_consistency,
+                               analyze_illumination_consistency, perform_statistical_analysis)
+from jpeg_analysis import jpeg_ghost_analysis, comprehensive_jpeg_analysis
+from jpeg_recompression import get_recompressor
+from stage_scheduler import shutdown_stage_pool
+from config import BLOCK_SIZE
+
+DEFAULT_SIZES = (0.5, 2.0)
+CASE_KINDS = ('authentic', 'copy_move', 'splicing')
+BASE_QUALITY = 90
+SPLICE_QUALITY = 60
+# Accuracy metrics are "higher is better"; a drop larger than this counts as a regression
+ACCURACY_TOLERANCE = 0.02
+TIME_TOLERANCE = 0.25
+# Time differences below this (seconds) are treated as noise
+MIN_TIME_DELTA = 0.05
+
+
+# ======================= Synthetic test images =======================
+
+def _image_shape(megapixels):
+    width = int(round(np.sqrt(megapixels * 1e6 * 4 / 3) / 16)) * 16
+    height = int(round(width * 3 / 4 / 16)) * 16
+    return height, width
+
+
+def _synthetic_scene(height, width, seed):
+    """Textured natural-looking scene: smooth color field, shapes and sensor noise."""
+    rng = np.random.default_rng(seed)
+    field = rng.normal(0, 1, (max(2, height // 64), max(2, width // 64), 3)).astype(np.float32)
+    scene = cv2.resize(field, (width, height), interpolation=cv2.INTER_CUBIC) * 40 + 120
+    scene += cv2.resize(rng.normal(0, 1, (max(2, height // 8), max(2, width // 8), 3)).astype(np.float32),
+                        (width, height), interpolation=cv2.INTER_LINEAR) * 12
+    # Fine texture, so flat areas do not produce trivial block matches
+    scene += cv2.resize(rng.normal(0, 1, (max(2, height // 2), max(2, width // 2), 3)).astype(np.float32),
+                        (width, height), interpolation=cv2.INTER_LINEAR) * 8
+    scale = max(1, int(np.sqrt(height * width) / 600))
+    for _ in range(int(height * width / 4000)):
+        color = tuple(float(c) for c in rng.uniform(0, 255, 3))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if rng.random() < 0.5:
+            cv2.circle(scene, (x, y), int(rng.integers(2, 12)) * scale, color, -1)
+        else:
+            cv2.rectangle(scene, (x, y), (x + int(rng.integers(3, 20)) * scale, y + int(rng.integers(3, 20)) * scale), color, -1)
+    scene += rng.normal(0, 2.0, scene.shape).astype(np.float32)
+    return np.clip(scene, 0, 255).astype(np.uint8)
+
+
+def _jpeg_roundtrip(pixels, quality):
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, 'JPEG', quality=quality)
+    buffer.seek(0)
+    return np.array(Image.open(buffer).convert('RGB'))
+
+
+def make_forged_image(megapixels, kind, seed=0):
+    """
+    Deterministic synthetic exhibit with a known forged region.
+
+    Args:
+        megapixels: Image size in MP (4:3)
+        kind: 'authentic', 'copy_move' (region duplicated inside the image) or
+            'splicing' (region from another scene with a different JPEG history and noise)
+
+    Returns:
+        (RGB uint8 array, bool mask of the forged pixels) — for copy-move both source and copy are marked
+    """
+    height, width = _image_shape(megapixels)
+    pixels = _jpeg_roundtrip(_synthetic_scene(height, width, seed), BASE_QUALITY)
+    mask = np.zeros((height, width), dtype=bool)
+    side = max(32, min(height, width) // 6) // 8 * 8
+    rng = np.random.default_rng(seed + 1000)
+    sy, sx = int(rng.integers(side // 2, height // 2 - side)), int(rng.integers(side // 2, width // 2 - side))
+    ty, tx = height - side - sy, width - side - sx
+
+    if kind == 'copy_move':
+        pixels[ty:ty + side, tx:tx + side] = pixels[sy:sy + side, sx:sx + side]
+        mask[sy:sy + side, sx:sx + side] = True
+        mask[ty:ty + side, tx:tx + side] = True
+    elif kind == 'splicing':
+        donor = _synthetic_scene(side, side, seed + 1)
+        donor = np.clip(donor.astype(np.float32) + rng.normal(0, 6, donor.shape), 0, 255).astype(np.uint8)
+        pixels[ty:ty + side, tx:tx + side] = _jpeg_roundtrip(donor, SPLICE_QUALITY)
+        mask[ty:ty + side, tx:tx + side] = True
+    elif kind != 'authentic':
+        raise ValueError(f"Unknown case kind: {kind}")
+    return pixels, mask
+
+
+def write_case(megapixels, kind, work_dir, seed=0):
+    """Save the synthetic exhibit as a JPEG (reused when it already exists); returns (path, mask)."""
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, f"{kind}_{megapixels:g}mp_s{seed}.jpg")
+    pixels, mask = make_forged_image(megapixels, kind, seed)
+    if not os.path.exists(path):
+        Image.fromarray(pixels).save(path, 'JPEG', quality=BASE_QUALITY)
+    return path, mask
+
+
+# ======================= Accuracy metrics =======================
+
+def map_auc(score_map, mask):
+    """ROC AUC of a per-pixel score map against the ground-truth mask (0.5 = chance)."""
+    scores = np.asarray(score_map, dtype=np.float64)
+    if scores.ndim == 3:
+        scores = scores.mean(axis=2)
+    if scores.shape != mask.shape:
+        scores = cv2.resize(scores, (mask.shape[1], mask.shape[0]), interpolation=cv2.INTER_LINEAR)
+    positives = int(mask.sum())
+    negatives = mask.size - positives
+    if positives == 0 or negatives == 0:
+        return None
+    # Mann-Whitney U with average ranks for ties
+    flat = scores.ravel()
+    order = np.argsort(flat, kind='mergesort')
+    sorted_scores = flat[order]
+    _, first, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    ranks = np.empty(flat.size)
+    ranks[order] = np.repeat(first + (counts + 1) / 2.0, counts)
+    rank_sum = ranks[mask.ravel()].sum()
+    return float((rank_sum - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def mask_iou(predicted, mask):
+    predicted = np.asarray(predicted).astype(bool)
+    if predicted.shape != mask.shape:
+        predicted = cv2.resize(predicted.astype(np.uint8), (mask.shape[1], mask.shape[0]),
+                               interpolation=cv2.INTER_NEAREST).astype(bool)
+    union = np.logical_or(predicted, mask).sum()
+    return float(np.logical_and(predicted, mask).sum() / union) if union else 1.0
+
+
+def _points_in_mask(points, mask):
+    if not len(points):
+        return 0.0
+    points = np.asarray(points, dtype=np.float64)
+    xs = np.clip(points[:, 0].astype(int), 0, mask.shape[1] - 1)
+    ys = np.clip(points[:, 1].astype(int), 0, mask.shape[0] - 1)
+    return float(mask[ys, xs].mean())
+
+
+def _block_match_accuracy(matches, mask, kind, block_size=BLOCK_SIZE):
+    if kind != 'copy_move':
+        return {'false_matches': len(matches)}
+    centers = [(m[key][0] + block_size / 2, m[key][1] + block_size / 2) for m in matches for key in ('block1_pos', 'block2_pos')]
+    return {'precision': _points_in_mask(centers, mask), 'detected': float(_points_in_mask(centers, mask) >= 0.5)}
+
+
+def _feature_match_accuracy(result, keypoints, mask, kind):
+    matches, inliers = result[0], result[1]
+    if kind != 'copy_move':
+        return {'false_inliers': int(inliers)}
+    points = [keypoints[m.queryIdx].pt for m in matches] + [keypoints[m.trainIdx].pt for m in matches]
+    return {'precision': _points_in_mask(points, mask), 'detected': float(inliers > 0 and _points_in_mask(points, mask) > 0.5)}
+
+
+def _map_accuracy(score_map, mask, kind):
+    auc = map_auc(score_map, mask) if kind != 'authentic' else None
+    return {'auc': auc} if auc is not None else {}
+
+
+def _pipeline_accuracy(results, mask, kind):
+    probabilities = results.get('classification', {}).get('uncertainty_analysis', {}).get('probabilities', {})
+    predicted = max(CASE_KINDS, key=lambda k: probabilities.get(
+        {'authentic': 'authentic_probability', 'copy_move': 'copy_move_probability',
+         'splicing': 'splicing_probability'}[k], 0.0))
+    accuracy = {'correct': float(predicted == kind), 'predicted': predicted}
+    combined = results.get('localization_analysis', {}).get('combined_tampering_mask')
+    if kind != 'authentic' and combined is not None and np.size(combined):
+        accuracy['iou'] = mask_iou(combined, mask)
+    return accuracy
+
+
+# ======================= Stage registry =======================
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _ela(context):
+    return perform_multi_quality_ela(context['image'].copy())
+
+
+def _features(context):
+    ela_image, ela_mean, ela_std = context['ela'][0], context['ela'][1], context['ela'][2]
+    return extract_multi_detector_features(context['image'].copy(), ela_image, ela_mean, ela_std)
+
+
+# name -> (run(context), accuracy(result, context) or None)
+STAGES = {
+    'preprocessing': (lambda c: advanced_preprocess_image(c['original'].copy()), None),
+    'ela_analysis': (_ela, lambda r, c: _map_accuracy(np.array(r[0]), c['mask'], c['kind'])),
+    'feature_extraction': (_features, None),
+    'feature_based_copymove_detection': (
+        lambda c: detect_copy_move_advanced(c['features'][0], c['image'].size),
+        lambda r, c: _feature_match_accuracy(r, c['features'][0].get('sift', ([], None))[0], c['mask'], c['kind'])),
+    'block_based_copymove_detection': (
+        lambda c: detect_copy_move_blocks(c['image'].copy()),
+        lambda r, c: _block_match_accuracy(r, c['mask'], c['kind'])),
+    'noise_analysis': (lambda c: analyze_noise_consistency(c['image'].copy()), None),
+    'jpeg_ghost': (lambda c: jpeg_ghost_analysis(c['image'].copy()),
+                   lambda r, c: _map_accuracy(r[0], c['mask'], c['kind'])),
+    'jpeg_analysis': (lambda c: comprehensive_jpeg_analysis(c['image'].copy()), None),
+    'frequency_analysis': (lambda c: analyze_frequency_domain(c['image'].copy()), None),
+    'texture_analysis': (lambda c: analyze_texture_consistency(c['image'].copy()), None),
+    'edge_analysis': (lambda c: analyze_edge_consistency(c['image'].copy()), None),
+    'illumination_analysis': (lambda c: analyze_illumination_consistency(c['image'].copy()), None),
+    'statistical_analysis': (lambda c: perform_statistical_analysis(c['image'].copy()), None),
+    'localization_analysis': (
+        lambda c: kmeans_tampering_localization(c['image'].copy(), np.array(c['ela'][0])),
+        lambda r, c: ({'iou': mask_iou(r['tampering_mask'], c['mask'])} if c['kind'] != 'authentic' else
+                      {'false_positive_rate': float(np.mean(r['tampering_mask']))})),
+}
+
+
+def _reset_caches():
+    """Drop process-wide caches so a timed call does not reuse work of the previous one."""
+    get_recompressor().clear()
+    shutdown_stage_pool()
+
+
+def _time_call(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        _reset_caches()
+        started = time.perf_counter()
+        result = _quiet(func)
+        times.append(time.perf_counter() - started)
+    return result, times
+
+
+def _entry(times, accuracy=None):
+    entry = {'time_min': min(times), 'time_median': float(np.median(times)), 'runs': len(times)}
+    if accuracy:
+        entry['accuracy'] = accuracy
+    return entry
+
+
+def benchmark_case(path, mask, kind, stages=None, repeat=1, native=False, pipeline=True, output_dir=None):
+    """Time (and score) the selected stages on one exhibit; returns {stage: entry}."""
+    stages = list(STAGES) if stages is None else list(stages)
+    original = Image.open(path).convert('RGB')
+    image = original if native else _quiet(advanced_preprocess_image, original.copy())[0]
+    context = {'original': original, 'image': image, 'kind': kind,
+               'mask': cv2.resize(mask.astype(np.uint8), image.size, interpolation=cv2.INTER_NEAREST).astype(bool)}
+    # Inputs of dependent stages, computed once outside the timed region
+    context['ela'] = _quiet(_ela, context)
+    if 'feature_based_copymove_detection' in stages:
+        context['features'] = _quiet(_features, context)
+
+    results = {}
+    for name in stages:
+        run, score = STAGES[name]
+        try:
+            result, times = _time_call(lambda: run(context), repeat)
+            accuracy = score(result, context) if score is not None else None
+            results[name] = _entry(times, accuracy)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+
+    if pipeline:
+        from main import analyze_image_comprehensive_advanced
+        output_dir = output_dir or os.path.join(os.path.dirname(path), 'pipeline_results')
+        result, times = _time_call(lambda: analyze_image_comprehensive_advanced(path, output_dir, save_history=False), repeat)
+        results['pipeline'] = _entry(times, _pipeline_accuracy(result, mask, kind))
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, kinds=CASE_KINDS, stages=None, repeat=1, native=False,
+                   pipeline=True, work_dir='./benchmark_results', seed=0):
+    """Benchmark every (size, kind) case; returns a run record for the history file."""
+    started = time.time()
+    results = {}
+    for megapixels in sizes:
+        for kind in kinds:
+            path, mask = write_case(megapixels, kind, os.path.join(work_dir, 'images'), seed)
+            print(f"⏱️ {megapixels:g} MP / {kind}...")
+            for stage, entry in benchmark_case(path, mask, kind, stages, repeat, native, pipeline,
+                                               os.path.join(work_dir, 'pipeline_results')).items():
+                results[f"{megapixels:g}MP/{kind}/{stage}"] = entry
+                if 'error' in entry:
+                    print(f"  ❌ {stage}: {entry['error']}")
+                else:
+                    print(f"  {stage:34s} {entry['time_median']:8.3f}s  {_format_accuracy(entry.get('accuracy'))}")
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'settings': {'sizes': list(sizes), 'kinds': list(kinds), 'repeat': repeat, 'native': native, 'seed': seed},
+        'elapsed': time.time() - started,
+        'results': results,
+    }
+
+
+def _format_accuracy(accuracy):
+    if not accuracy:
+        return ''
+    return ', '.join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in accuracy.items())
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ======================= History and regression check =======================
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {'runs': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def append_history(path, run):
+    history = load_history(path)
+    history['runs'].append(run)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2, default=float)
+    return history
+
+
+def find_baseline(history, run):
+    """Most recent earlier run on the same host with the same native/seed settings."""
+    for candidate in reversed(history['runs']):
+        if candidate is run or candidate.get('timestamp') == run.get('timestamp'):
+            continue
+        same_settings = all(candidate.get('settings', {}).get(key) == run['settings'].get(key) for key in ('native', 'seed'))
+        if candidate.get('host') == run.get('host') and same_settings:
+            return candidate
+    return None
+
+
+def compare_runs(baseline, current, time_tolerance=TIME_TOLERANCE, accuracy_tolerance=ACCURACY_TOLERANCE,
+                 min_time_delta=MIN_TIME_DELTA):
+    """List of regressions of ``current`` against ``baseline`` (slower stages, lower accuracy, new errors)."""
+    regressions = []
+    for key, entry in current['results'].items():
+        before = baseline['results'].get(key)
+        if before is None or 'error' in before:
+            continue
+        if 'error' in entry:
+            regressions.append(f"{key}: now fails ({entry['error']})")
+            continue
+        old_time, new_time = before['time_min'], entry['time_min']
+        if new_time > old_time * (1 + time_tolerance) and new_time - old_time > min_time_delta:
+            regressions.append(f"{key}: {old_time:.3f}s -> {new_time:.3f}s (+{(new_time / old_time - 1) * 100:.0f}%)")
+        for metric, old_value in (before.get('accuracy') or {}).items():
+            new_value = (entry.get('accuracy') or {}).get(metric)
+            if metric.startswith('false_'):
+                continue  # Counts/rates on authentic images: lower is better, reported but not gated
+            if isinstance(old_value, (int, float)) and isinstance(new_value, (int, float)) and \
+                    new_value < old_value - accuracy_tolerance:
+                regressions.append(f"{key}: {metric} {old_value:.3f} -> {new_value:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FORENSIKGAMBAR stages on synthetic forged images')
+    parser.add_argument('--sizes', type=float, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Image sizes in megapixels (default: 0.5 2)')
+    parser.add_argument('--kinds', nargs='+', default=list(CASE_KINDS), choices=CASE_KINDS)
+    parser.add_argument('--stages', nargs='+', default=None, choices=list(STAGES),
+                        help='Stage functions to time (default: all)')
+    parser.add_argument('--no-pipeline', action='store_true', help='Skip the end-to-end pipeline run')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed runs per stage (min and median are kept)')
+    parser.add_argument('--native', action='store_true', help='Run stage functions on the full-size image')
+    parser.add_argument('--work-dir', default='./benchmark_results', help='Folder for images and pipeline output')
+    parser.add_argument('--history', default=None, help='JSON history file (default: <work-dir>/benchmark_history.json)')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE,
+                        help='Allowed slowdown against the baseline run (default: 0.25 = 25%%)')
+    parser.add_argument('--check-only', action='store_true', help='Only compare the last run with its baseline')
+    args = parser.parse_args()
+
+    history_path = args.history or os.path.join(args.work_dir, 'benchmark_history.json')
+    if args.check_only:
+        history = load_history(history_path)
+        if not history['runs']:
+            print(f"❌ No benchmark runs in {history_path}")
+            sys.exit(1)
+        run = history['runs'][-1]
+    else:
+        run = run_benchmarks(args.sizes, args.kinds, args.stages, max(1, args.repeat), args.native,
+                             not args.no_pipeline, args.work_dir)
+        history = append_history(history_path, run)
+        print(f"💾 Results appended to {history_path}")
+
+    baseline = find_baseline(history, run)
+    if baseline is None:
+        print("ℹ️ No baseline run to compare with yet")
+        return
+    regressions = compare_runs(baseline, run, time_tolerance=args.time_tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {baseline['timestamp']} ({baseline.get('commit')}):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print(f"✅ No regressions against {baseline['timestamp']} ({baseline.get('commit')})")
+
+
+if __name__ == '__main__':
+    main()
@@ -27,6 +27,7 @@ except Exception:
         return arr/denom
 import warnings
 from uncertainty_classification import UncertaintyClassifier, format_probability_results
+from config import DETECTION_THRESHOLD, CONFIDENCE_THRESHOLD
 
 warnings.filterwarnings('ignore')
 
@@ -237,8 +238,8 @@ def classify_with_advanced_ml(feature_vector):
     
     return ensemble_copy_move, ensemble_splicing, scores
 
-def simulate_random_forest_classification(features, manipulation_type):
-    """Simulate Random Forest classification"""
+def random_forest_weights(manipulation_type, n_features):
+    """Feature weights of the simulated Random Forest, padded/truncated to ``n_features``"""
     # Assuming a feature vector of around 28-30 elements
     if manipulation_type == 'copy_move':
         # Weights focused on geometric & copy-move artifacts
@@ -248,12 +249,16 @@ def simulate_random_forest_classification(features, manipulation_type):
         weights = np.array([0.9, 0.9, 0.7, 0.7, 0.8, 0.7, 0.1, 0.05, 0.02, 0.05, 0.9, 0.7, 0.6, 0.7, 0.8, 0.7, 0.8, 0.8, 0.8, 0.6, 0.6, 0.6, 0.5, 0.5, 0.4, 0.7, 0.3, 0.4])
     
     # Pad or truncate weights to match feature vector length
-    if len(weights) > len(features):
-        weights = weights[:len(features)]
-    elif len(weights) < len(features):
+    if len(weights) > n_features:
+        weights = weights[:n_features]
+    elif len(weights) < n_features:
         # Default to a small, non-zero weight for padded features
-        weights = np.pad(weights, (0, len(features) - len(weights)), 'constant', constant_values=0.1) 
-    
+        weights = np.pad(weights, (0, n_features - len(weights)), 'constant', constant_values=0.1) 
+    return weights
+
+def simulate_random_forest_classification(features, manipulation_type):
+    """Simulate Random Forest classification"""
+    weights = random_forest_weights(manipulation_type, len(features))
     weighted_features = features * weights
     score = np.sum(weighted_features) / len(features) * 100
     
@@ -451,6 +456,160 @@ def classify_manipulation_advanced(analysis_results):
             }
         }
 
+# ======================= Batch Classification (Feature Table) =======================
+
+def validate_feature_matrix(feature_matrix):
+    """validate_feature_vector for every row of an (N, 28) matrix"""
+    feature_matrix = np.nan_to_num(np.asarray(feature_matrix), nan=0.0, posinf=1.0, neginf=0.0)
+    feature_matrix = np.clip(feature_matrix, -1e6, 1e6)
+    # SIFT matches, RANSAC inliers, block matches >= 0; tampering percentage 0-100
+    feature_matrix[:, [6, 7, 9]] = np.maximum(0.0, feature_matrix[:, [6, 7, 9]])
+    feature_matrix[:, 25] = np.clip(feature_matrix[:, 25], 0.0, 100.0)
+    return feature_matrix
+
+def normalize_feature_matrix(feature_matrix):
+    """normalize_feature_vector for every row"""
+    if SKLEARN_AVAILABLE:
+        try:
+            return sk_normalize(feature_matrix, norm='l2', axis=1)
+        except Exception as e:
+            print(f"  Warning: sklearn normalization failed: {e}, falling back to manual.")
+    feature_min = feature_matrix.min(axis=1, keepdims=True)
+    feature_range = feature_matrix.max(axis=1, keepdims=True) - feature_min
+    return np.where(feature_range > 0, (feature_matrix - feature_min) / np.where(feature_range > 0, feature_range, 1), 0)
+
+def classify_with_advanced_ml_batch(feature_matrix):
+    """
+    classify_with_advanced_ml for an (N, 28) matrix of feature vectors.
+    Returns (ensemble_copy_move, ensemble_splicing, scores) with one value per row.
+    """
+    features = normalize_feature_matrix(validate_feature_matrix(feature_matrix))
+    n_features = features.shape[1]
+    scores = {}
+
+    # Random Forest: same weights (and padding) as simulate_random_forest_classification
+    rf = []
+    for manipulation_type in ('copy_move', 'splicing'):
+        weights = random_forest_weights(manipulation_type, n_features)
+        rf.append(np.clip(np.sum(features * weights, axis=1) / n_features * 100, 0, 100))
+    scores['random_forest'] = tuple(rf)
+
+    # SVM: mean of the key features minus a bias
+    svm = []
+    for key_indices, bias_threshold in (([7, 9, 8, 3], 0.4), ([0, 1, 10, 11, 14, 16], 0.35)):
+        key_indices = [idx for idx in key_indices if idx < n_features]
+        if key_indices:
+            decision = (np.sum(features[:, key_indices], axis=1) / len(key_indices) - bias_threshold) * 200
+        else:
+            decision = np.zeros(len(features))
+        svm.append(np.clip(decision, 0, 100))
+    scores['svm'] = tuple(svm)
+
+    # Neural network: two fixed layers, then boosted output weights per manipulation type
+    hidden1 = tanh_activation(features * np.linspace(-0.5, 0.5, n_features) + 0.1)
+    hidden2 = sigmoid(hidden1 * np.linspace(0.2, 1.2, n_features) - 0.2)
+    nn = []
+    for manipulation_type in ('copy_move', 'splicing'):
+        output_weights = np.ones(n_features)
+        if manipulation_type == 'copy_move':
+            if n_features > 9:
+                output_weights[[7, 8, 9]] *= 3.0
+            if n_features > 25:
+                output_weights[25] *= 1.5
+        else:
+            if n_features > 11:
+                output_weights[[0, 1, 10, 11]] *= 2.5
+            if n_features > 18:
+                output_weights[[14, 16, 17, 18]] *= 2.0
+        max_possible_sum = np.sum(output_weights[output_weights > 0.0])
+        nn.append(np.clip(np.sum(hidden2 * output_weights, axis=1) / (max_possible_sum + 1e-9) * 100, 0, 100))
+    scores['neural_network'] = tuple(nn)
+
+    ensemble_copy_move = (scores['random_forest'][0] + scores['svm'][0].astype(np.float64) + scores['neural_network'][0]) / 3
+    ensemble_splicing = (scores['random_forest'][1] + scores['svm'][1].astype(np.float64) + scores['neural_network'][1]) / 3
+    return ensemble_copy_move, ensemble_splicing, scores
+
+def heuristic_scores_batch(table):
+    """Heuristic copy-move/splicing scores of classify_manipulation_advanced for every row of a FeatureTable"""
+    ransac_inliers = table.column('ransac_inliers', 0.0)
+    block_matches = table.column('block_matches', 0.0)
+    ela_mean = table.column('ela_mean', 0.0)
+    noise_inconsistency = table.column('noise_inconsistency', 0.0)
+
+    copy_move = np.select([ransac_inliers >= 50, ransac_inliers >= 20, ransac_inliers >= 10], [60, 50, 30], 0)
+    copy_move = copy_move + np.select([block_matches >= 30, block_matches >= 10], [50, 30], 0)
+    copy_move = copy_move + np.where(table.column('geometric_transform', 0.0) > 0, 30, 0)
+    splicing = np.select([ela_mean > 15.0, ela_mean > 8.0], [50, 35], 0)
+    splicing = splicing + np.select([noise_inconsistency >= 0.7, noise_inconsistency > 0.35], [50, 35], 0)
+    return np.minimum(copy_move, 100), np.minimum(splicing, 100)
+
+def classify_manipulation_batch(table, uncertainty_classifier=None):
+    """
+    classify_manipulation_advanced for every row of a FeatureTable (feature_table.py), vectorized.
+
+    Returns a dict of arrays, one value per image: 'type', 'confidence', 'copy_move_score',
+    'splicing_score', the ML and heuristic scores, the three probabilities, 'uncertainty_level'
+    and 'reliability_score'. Pass an UncertaintyClassifier with other confidence_thresholds
+    to re-score with different reliability cut-offs.
+    """
+    uncertainty_classifier = uncertainty_classifier or UncertaintyClassifier()
+    probabilities = uncertainty_classifier.calculate_manipulation_probability_batch(table)
+    assessment = uncertainty_classifier.assessment_batch(probabilities)
+
+    ml_copy_move, ml_splicing, ml_scores = classify_with_advanced_ml_batch(table.feature_matrix())
+    heuristic_copy_move, heuristic_splicing = heuristic_scores_batch(table)
+    raw_copy_move = heuristic_copy_move * 0.8 + ml_copy_move * 0.2
+    raw_splicing = heuristic_splicing * 0.8 + ml_splicing * 0.2
+
+    return {
+        'type': np.char.replace(assessment['primary_assessment'], 'Indikasi: ', ''),
+        'confidence': assessment['assessment_reliability'],
+        'primary_assessment_code': assessment['primary_assessment_code'],
+        'reliability_score': assessment['reliability_score'],
+        'copy_move_score': np.clip(np.trunc(raw_copy_move), 0, 100).astype(int),
+        'splicing_score': np.clip(np.trunc(raw_splicing), 0, 100).astype(int),
+        'ml_scores': {'copy_move': ml_copy_move, 'splicing': ml_splicing, 'detailed_ml_scores': ml_scores},
+        'traditional_scores': {'copy_move': heuristic_copy_move, 'splicing': heuristic_splicing},
+        'copy_move_probability': probabilities['copy_move_probability'],
+        'splicing_probability': probabilities['splicing_probability'],
+        'authentic_probability': probabilities['authentic_probability'],
+        'uncertainty_level': probabilities['uncertainty_level'],
+        'confidence_intervals': probabilities['confidence_intervals'],
+    }
+
+def threshold_sweep(batch_scores, detection_thresholds=(DETECTION_THRESHOLD,),
+                    confidence_thresholds=(CONFIDENCE_THRESHOLD,), labels=None):
+    """
+    Grid-search of DETECTION_THRESHOLD and CONFIDENCE_THRESHOLD over scores of classify_manipulation_batch.
+
+    An image is flagged when max(copy_move_score, splicing_score) >= detection threshold and
+    its reliability score (in %) >= confidence threshold. Returns (D, C) arrays: 'flagged' and,
+    with ground truth ``labels`` (1 = manipulated, 0 = authentic, -1 = unknown), 'precision',
+    'recall' and 'f1'.
+    """
+    detection_thresholds = np.asarray(detection_thresholds, dtype=np.float64)
+    confidence_thresholds = np.asarray(confidence_thresholds, dtype=np.float64)
+    score = np.maximum(batch_scores['copy_move_score'], batch_scores['splicing_score'])
+    reliability = batch_scores['reliability_score'] * 100
+
+    # flagged[d, c] = sum_i detected[d, i] * confident[c, i]: one matrix product per count
+    detected = (score[None, :] >= detection_thresholds[:, None]).astype(np.float64)
+    confident = (reliability[None, :] >= confidence_thresholds[:, None]).astype(np.float64)
+    grid = {'detection_thresholds': detection_thresholds, 'confidence_thresholds': confidence_thresholds,
+            'flagged': detected @ confident.T}
+    if labels is not None:
+        labels = np.asarray(labels)
+        known = labels >= 0
+        true_positive = (detected * (labels == 1)) @ confident.T
+        flagged_known = (detected * known) @ confident.T
+        positives = np.sum(labels == 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grid['precision'] = np.where(flagged_known > 0, true_positive / flagged_known, 0.0)
+            grid['recall'] = np.where(positives > 0, true_positive / max(positives, 1), 0.0)
+            total = grid['precision'] + grid['recall']
+            grid['f1'] = np.where(total > 0, 2 * grid['precision'] * grid['recall'] / np.where(total > 0, total, 1), 0.0)
+    return grid
+
 # ======================= Confidence and Detail Functions (Tidak diubah, tetap sebagai referensi internal) =======================
 
 def get_enhanced_confidence_level(score):
@@ -8,6 +8,7 @@ ELA_SCALE_FACTOR = 10 #ASLINYA 20
 BLOCK_SIZE = 16 #aslinya 16
 NOISE_BLOCK_SIZE = 32
 TEXTURE_BLOCK_SIZE = 64
+TEXTURE_GLCM_LEVELS = 256  # Gray levels for the texture GLCM (lower = faster, coarser)
 
 # Feature detection parameters
 SIFT_FEATURES = 3000
@@ -17,6 +18,8 @@ SIFT_EDGE_THRESHOLD = 10
 ORB_FEATURES = 2000
 ORB_SCALE_FACTOR = 1.2
 ORB_LEVELS = 8
+# Binary descriptor sets (ORB/AKAZE) up to this size are self-matched exactly; larger ones use FLANN LSH
+BINARY_EXACT_KNN_MAX = 10000
 
 # Copy-move detection parameters
 RATIO_THRESH = 0.75 # Increased from 0.65 for more matches
@@ -34,4 +37,54 @@ MIN_FILE_SIZE = 50000  # 50KB
 
 # Processing parameters
 TARGET_MAX_DIM = 2000
-MAX_SAMPLES_DBSCAN = 50000
\ No newline at end of file
+MAX_SAMPLES_DBSCAN = 50000
+# Tampering localization: K-means on the sampling grid (MiniBatch, then warm-started Lloyd refinement)
+LOCALIZATION_MINIBATCH_SIZE = 4096
+LOCALIZATION_REFINE_ITERATIONS = 100
+
+# JPEG recompression cache (shared by ELA and JPEG analysis stages)
+RECOMPRESSION_CACHE_MB = 512
+# Chroma subsampling of the JPEG stage recompressions (0 = 4:4:4), shared by the basic analysis and the ghost sweep.
+# ELA keeps the encoder default (4:2:0): its chroma error is part of the ELA statistics.
+# Changing it moves the basic quality responses by ~2-12% and response_variance by up to ~20%, which feed
+# classification (pinned by test_jpeg_analysis.test_basic_quality_response_is_pinned).
+RECOMPRESSION_SUBSAMPLING = 0
+
+# Parallel stage scheduler (None = one worker per CPU core, 1 = run stages sequentially)
+STAGE_WORKERS = None
+
+# Feature detector threads (SIFT/ORB/AKAZE run concurrently; None = ThreadPoolExecutor default)
+FEATURE_THREADS = None
+
+# Local job server for the Streamlit app (analyses run in warm worker processes instead of the web process)
+JOB_SERVER_ENABLED = False
+JOB_SERVER_WORKERS = 2  # None = one worker per CPU core
+JOB_SERVER_TIMEOUT = None  # Seconds before a running job is killed; None = no limit
+JOB_SERVER_KEEP_RESULTS = 8  # Finished results kept in memory until the UI collects them
+JOB_SERVER_START_METHOD = 'spawn'
+
+# Report export: each figure is rendered once into an artifact store, in a process pool (Agg backend)
+EXPORT_RENDER_WORKERS = None  # None = one worker per CPU core; 1 = render in-process
+EXPORT_RENDER_START_METHOD = 'spawn'
+EXPORT_FIGURE_DPI = 150
+# Outputs of the comprehensive package: 'process_images', 'png', 'docx', 'pdf', 'html'
+EXPORT_PACKAGE_FORMATS = ('process_images', 'png', 'docx', 'html')
+
+# Pipeline result cache (content-addressed, per stage). Bump PIPELINE_VERSION to invalidate everything.
+PIPELINE_VERSION = "2.0"
+RESULT_CACHE_MB = 2048
+
+# Tiled full-resolution analysis (ELA, JPEG ghost, noise, block DCT on the original, without downsizing)
+TILED_ANALYSIS = False
+TILE_SIZE = None  # Tile side in pixels; None = derived from TILED_MEMORY_BUDGET_MB
+TILE_OVERLAP = 32
+TILED_MEMORY_BUDGET_MB = 1024
+
+# Analysis history (SQLite, see history_store.py): entries per page in the history tab
+HISTORY_PAGE_SIZE = 20
+
+# Startup budget for `python main.py --help` in ms (checked by import_benchmark.py)
+IMPORT_BUDGET_MS = 300
+
+# Stage profiling: also trace Python/NumPy allocations with tracemalloc (slower; RSS is always recorded)
+PROFILE_TRACEMALLOC = False
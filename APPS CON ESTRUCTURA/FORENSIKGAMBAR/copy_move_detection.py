@@ -6,8 +6,10 @@ Implements feature-based and block-based copy-move forgery detection
 import numpy as np
 import cv2
 from PIL import Image
-from sklearn.cluster import KMeans, DBSCAN
-from config import RATIO_THRESH, MIN_DISTANCE, RANSAC_THRESH, MIN_INLIERS, BLOCK_SIZE
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from config import (RATIO_THRESH, MIN_DISTANCE, RANSAC_THRESH, MIN_INLIERS, BLOCK_SIZE, MAX_SAMPLES_DBSCAN,
+                    LOCALIZATION_MINIBATCH_SIZE, LOCALIZATION_REFINE_ITERATIONS)
+from feature_detection import self_knn, keypoint_arrays, unique_pair_mask, to_dmatches
 
 
 def detect_copy_move_advanced(feature_sets, image_shape):
@@ -30,55 +32,27 @@ def detect_copy_move_advanced(feature_sets, image_shape):
         if descriptors is None or len(keypoints) < 10:
             return [], 0, None, 0
         
-        # Create matcher - use FLANN for better performance with SIFT
-        FLANN_INDEX_KDTREE = 1
-        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-        search_params = dict(checks=50)
-        flann = cv2.FlannBasedMatcher(index_params, search_params)
+        # One FLANN KD-tree query (5 trees, 50 checks, k=3) against the set itself
+        knn = self_knn(descriptors, k=3, trees=5, checks=50)
+        points = keypoint_arrays(keypoints)[0]
+        query_idx = np.arange(len(knn))
+        train_idx = knn.other_indices[:, 0]
+        best_dist = knn.other_distances[:, 0]
         
-        # Match descriptors with k=3 to ensure we have at least 2 neighbors
-        matches = flann.knnMatch(descriptors, descriptors, k=min(3, len(descriptors)))
+        # Lowe's ratio test on the two best non-self neighbors; a single non-self neighbor
+        # uses a fixed threshold (reasonable for SIFT)
+        second_dist = knn.other_distances[:, 1] if knn.other_indices.shape[1] > 1 else np.full(len(knn), np.inf)
+        keep = (((knn.other_count >= 2) & (best_dist < RATIO_THRESH * second_dist)) |
+                ((knn.other_count == 1) & (best_dist < 100)))
         
-        # Apply ratio test and filter self-matches
-        good_matches = []
-        unique_pairs = set()  # To avoid duplicate pairs
+        # Check minimum spatial distance
+        train_idx = np.where(knn.other_count >= 1, train_idx, 0)
+        keep &= np.linalg.norm(points - points[train_idx], axis=1) > MIN_DISTANCE
         
-        for match_list in matches:
-            if len(match_list) < 2:
-                continue
-                
-            # Find first non-self match
-            valid_matches = [m for m in match_list if m.queryIdx != m.trainIdx]
-            
-            if len(valid_matches) >= 2:
-                # Apply Lowe's ratio test on the two best non-self matches
-                m, n = valid_matches[0], valid_matches[1]
-                
-                if m.distance < RATIO_THRESH * n.distance:
-                    # Check minimum spatial distance
-                    kp1 = keypoints[m.queryIdx]
-                    kp2 = keypoints[m.trainIdx]
-                    distance = np.sqrt((kp1.pt[0] - kp2.pt[0])**2 + (kp1.pt[1] - kp2.pt[1])**2)
-                    
-                    if distance > MIN_DISTANCE:
-                        # Avoid duplicate pairs (i->j and j->i)
-                        pair = tuple(sorted([m.queryIdx, m.trainIdx]))
-                        if pair not in unique_pairs:
-                            unique_pairs.add(pair)
-                            good_matches.append(m)
-            elif len(valid_matches) == 1:
-                # If we only have one valid match, use a fixed threshold
-                m = valid_matches[0]
-                if m.distance < 100:  # Reasonable threshold for SIFT
-                    kp1 = keypoints[m.queryIdx]
-                    kp2 = keypoints[m.trainIdx]
-                    distance = np.sqrt((kp1.pt[0] - kp2.pt[0])**2 + (kp1.pt[1] - kp2.pt[1])**2)
-                    
-                    if distance > MIN_DISTANCE:
-                        pair = tuple(sorted([m.queryIdx, m.trainIdx]))
-                        if pair not in unique_pairs:
-                            unique_pairs.add(pair)
-                            good_matches.append(m)
+        # Avoid duplicate pairs (i->j and j->i)
+        query_idx, train_idx, best_dist = query_idx[keep], train_idx[keep], best_dist[keep]
+        unique = unique_pair_mask(query_idx, train_idx)
+        good_matches = to_dmatches(query_idx[unique], train_idx[unique], best_dist[unique])
         
         total_matches = len(good_matches)
         
@@ -149,13 +123,99 @@ def detect_copy_move_advanced(feature_sets, image_shape):
         return [], 0, None, 0
 
 
-def detect_copy_move_blocks(image_pil, block_size=BLOCK_SIZE):
+def _block_dct_basis(block_size):
+    """Orthonormal 1-D DCT-II basis vectors, one row per frequency."""
+    n = np.arange(block_size)
+    basis = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * block_size))
+    basis[0] *= np.sqrt(1.0 / block_size)
+    basis[1:] *= np.sqrt(2.0 / block_size)
+    return basis.astype(np.float32)
+
+
+def _overlapping_block_features(gray_f32, block_size, max_freq=3, n_projections=16):
+    """
+    Sort keys and distance sketches of every overlapping block, normalized for NCC.
+
+    Both are computed for all block positions at once with separable filters
+    (anchor at the block's top-left corner) on the mean/std-normalized block:
+
+    - ``sort_keys``: quantized low-frequency DCT coefficients, stable under
+      recompression noise, used to bring similar blocks next to each other.
+    - ``sketches``: separable random-sign projections (fixed seed). The squared
+      distance between two sketches is an unbiased estimate of 2 * (1 - NCC),
+      so high-frequency content is taken into account when filtering candidates.
+
+    Returns:
+        Tuple of (sort_keys (Hb, Wb, K) int16, sketches (Hb, Wb, P) float32, block_stds (Hb, Wb))
+    """
+    h, w = gray_f32.shape
+    hb, wb = h - block_size + 1, w - block_size + 1
+    anchor = (0, 0)
+
+    def block_filter(kernel_x, kernel_y):
+        return cv2.sepFilter2D(gray_f32, cv2.CV_32F, kernel_x, kernel_y,
+                               anchor=anchor, borderType=cv2.BORDER_REPLICATE)[:hb, :wb]
+
+    ones = np.ones(block_size, dtype=np.float32)
+    block_sums = block_filter(ones, ones)
+    block_means = block_sums / (block_size * block_size)
+    block_sq_means = cv2.boxFilter(gray_f32 * gray_f32, cv2.CV_32F, (block_size, block_size),
+                                   anchor=anchor, normalize=True, borderType=cv2.BORDER_REPLICATE)[:hb, :wb]
+    block_stds = np.sqrt(np.maximum(block_sq_means - block_means ** 2, 0))
+    inv_stds = 1.0 / np.maximum(block_stds, 1e-10)
+
+    # Low-frequency AC coefficients (DC basis is orthogonal, so the mean drops out)
+    basis = _block_dct_basis(block_size)
+    frequencies = [(u, v) for u in range(max_freq + 1) for v in range(max_freq + 1) if 0 < u + v <= max_freq]
+    sort_keys = np.empty((hb, wb, len(frequencies)), dtype=np.int16)
+    for k, (u, v) in enumerate(frequencies):
+        coefficient = block_filter(basis[v], basis[u]) * inv_stds / block_size
+        sort_keys[:, :, k] = np.round(coefficient / 0.1)
+
+    # Random-sign sketches: r^T (block - mean) s / std, scaled so E[dist^2] = 2 * (1 - NCC)
+    rng = np.random.default_rng(0)
+    signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=(n_projections, 2, block_size))
+    sketch_scale = inv_stds / (block_size * np.sqrt(n_projections))
+    sketches = np.empty((hb, wb, n_projections), dtype=np.float32)
+    for k in range(n_projections):
+        row_signs, col_signs = signs[k]
+        projection = block_filter(col_signs, row_signs) - block_means * (row_signs.sum() * col_signs.sum())
+        sketches[:, :, k] = projection * sketch_scale
+
+    return sort_keys, sketches, block_stds
+
+
+def _verify_block_pairs(gray_img, block_size, ys1, xs1, ys2, xs2):
+    """Exact normalized cross-correlation for candidate block pairs (vectorized)."""
+    windows = np.lib.stride_tricks.sliding_window_view(gray_img, (block_size, block_size))
+    block1 = windows[ys1, xs1].reshape(len(ys1), -1).astype(np.float32)
+    block2 = windows[ys2, xs2].reshape(len(ys2), -1).astype(np.float32)
+    block1 -= block1.mean(axis=1, keepdims=True)
+    block2 -= block2.mean(axis=1, keepdims=True)
+    numerator = np.einsum('ij,ij->i', block1, block2)
+    denominator = np.sqrt(np.einsum('ij,ij->i', block1, block1) * np.einsum('ij,ij->i', block2, block2))
+    return numerator.astype(np.float64) / (denominator.astype(np.float64) + 1e-10)
+
+
+def detect_copy_move_blocks(image_pil, block_size=BLOCK_SIZE, correlation_threshold=0.95,
+                            stride=1, sort_window=8, min_block_std=1.0, max_matches=50):
     """
     Detect copy-move forgery using block-based method.
     
+    Every overlapping block (``stride`` pixels apart) is described by its
+    normalized low-frequency DCT coefficients. Blocks are sorted
+    lexicographically on the quantized features, neighbours within
+    ``sort_window`` positions become candidates, and candidates are confirmed
+    with the exact normalized cross-correlation. The result is deterministic.
+    
     Args:
         image_pil: PIL Image object
         block_size: Size of blocks to compare
+        correlation_threshold: Minimum normalized cross-correlation for a match
+        stride: Step between block positions (1 = every overlapping block)
+        sort_window: Number of sorted neighbours compared with each block
+        min_block_std: Blocks flatter than this are skipped (no usable texture)
+        max_matches: Maximum number of matches returned (highest correlation first)
     
     Returns:
         List of matched block pairs
@@ -168,69 +228,86 @@ def detect_copy_move_blocks(image_pil, block_size=BLOCK_SIZE):
             gray_img = np.array(image_pil)
         
         h, w = gray_img.shape
-        block_matches = []
         
         # Skip if image is too small
         if h < block_size * 2 or w < block_size * 2:
             return []
         
-        # Extract blocks
-        blocks = []
-        positions = []
-        
-        # Sliding window with stride
-        stride = block_size // 2
-        for y in range(0, h - block_size + 1, stride):
-            for x in range(0, w - block_size + 1, stride):
-                block = gray_img[y:y+block_size, x:x+block_size]
-                blocks.append(block.flatten())
-                positions.append((x, y))
+        gray_f32 = gray_img.astype(np.float32)
+        sort_keys, sketches, block_stds = _overlapping_block_features(gray_f32, block_size)
         
-        if len(blocks) < 2:
+        # Block grid (top-left corners) at the requested stride, textured blocks only
+        grid_y, grid_x = np.nonzero(block_stds[::stride, ::stride] > min_block_std)
+        if len(grid_y) < 2:
             return []
+        pos_y = (grid_y * stride).astype(np.int32)
+        pos_x = (grid_x * stride).astype(np.int32)
+        
+        # Lexicographic sort on quantized DCT features (first coefficient is the primary key)
+        flat_index = grid_y * stride * sort_keys.shape[1] + grid_x * stride
+        order = np.lexsort(sort_keys.reshape(-1, sort_keys.shape[-1])[flat_index].T[::-1])
+        sorted_index = flat_index[order]
+        sorted_sketches = sketches.reshape(-1, sketches.shape[-1])[sorted_index]
+        sketch_head = np.ascontiguousarray(sorted_sketches[:, :4])
+        sorted_y = pos_y[order]
+        sorted_x = pos_x[order]
+        
+        # Sketch distances estimate 2 * (1 - NCC); the margin keeps true matches
+        max_sketch_dist_sq = 2.0 * 2.0 * (1.0 - correlation_threshold)
+        min_distance_sq = MIN_DISTANCE ** 2
+        
+        candidates = []
+        for offset in range(1, min(sort_window, len(order) - 1) + 1):
+            # Partial sketch sums only grow, so rejecting on the first dimensions is exact
+            head_diff = sketch_head[offset:] - sketch_head[:-offset]
+            keep = np.einsum('ij,ij->i', head_diff, head_diff) < max_sketch_dist_sq
+            dy = sorted_y[offset:] - sorted_y[:-offset]
+            dx = sorted_x[offset:] - sorted_x[:-offset]
+            keep &= dx * dx + dy * dy > min_distance_sq
+            first = np.nonzero(keep)[0]
+            sketch_diff = sorted_sketches[first + offset] - sorted_sketches[first]
+            first = first[np.einsum('ij,ij->i', sketch_diff, sketch_diff) < max_sketch_dist_sq]
+            if len(first):
+                candidates.append(np.stack([first, first + offset], axis=1))
+        
+        if not candidates:
+            return []
+        candidates = np.concatenate(candidates)
+        
+        # Canonical pair order (lower row-major position first) and deduplication
+        index1 = order[candidates[:, 0]]
+        index2 = order[candidates[:, 1]]
+        swap = index1 > index2
+        index1, index2 = np.where(swap, index2, index1), np.where(swap, index1, index2)
+        pairs = np.unique(np.stack([index1, index2], axis=1), axis=0)
+        
+        # Exact verification in chunks to bound memory
+        correlations = np.empty(len(pairs), dtype=np.float64)
+        chunk = 65536
+        for start in range(0, len(pairs), chunk):
+            p = pairs[start:start + chunk]
+            correlations[start:start + chunk] = _verify_block_pairs(
+                gray_img, block_size, pos_y[p[:, 0]], pos_x[p[:, 0]], pos_y[p[:, 1]], pos_x[p[:, 1]])
+        
+        matched = correlations > correlation_threshold
+        pairs = pairs[matched]
+        correlations = correlations[matched]
+        
+        # Highest correlation first; ties broken by position for a stable result
+        ranking = np.lexsort((pairs[:, 1], pairs[:, 0], -correlations))[:max_matches]
         
-        blocks_array = np.array(blocks)
-        
-        # Use DBSCAN clustering to find similar blocks
-        if len(blocks_array) > 1000:
-            # Sample for performance
-            indices = np.random.choice(len(blocks_array), 1000, replace=False)
-            sampled_blocks = blocks_array[indices]
-            sampled_positions = [positions[i] for i in indices]
-        else:
-            sampled_blocks = blocks_array
-            sampled_positions = positions
-        
-        # Compute pairwise distances and find matches
-        for i in range(len(sampled_blocks)):
-            for j in range(i + 1, len(sampled_blocks)):
-                # Calculate normalized cross-correlation
-                block1 = sampled_blocks[i].reshape(block_size, block_size)
-                block2 = sampled_blocks[j].reshape(block_size, block_size)
-                
-                # Normalize blocks
-                block1_norm = (block1 - np.mean(block1)) / (np.std(block1) + 1e-10)
-                block2_norm = (block2 - np.mean(block2)) / (np.std(block2) + 1e-10)
-                
-                # Compute correlation
-                correlation = np.sum(block1_norm * block2_norm) / (block_size * block_size)
-                
-                # Check if blocks are similar enough and far apart
-                if correlation > 0.95:  # High correlation threshold
-                    pos1 = sampled_positions[i]
-                    pos2 = sampled_positions[j]
-                    distance = np.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)
-                    
-                    if distance > MIN_DISTANCE:
-                        block_matches.append({
-                            'block1_pos': pos1,
-                            'block2_pos': pos2,
-                            'correlation': float(correlation),
-                            'distance': float(distance)
-                        })
-        
-        # Limit number of matches to avoid overwhelming results
-        block_matches = sorted(block_matches, key=lambda x: x['correlation'], reverse=True)[:50]
+        block_matches = []
+        for idx in ranking:
+            i, j = pairs[idx]
+            pos1 = (int(pos_x[i]), int(pos_y[i]))
+            pos2 = (int(pos_x[j]), int(pos_y[j]))
+            distance = np.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)
+            block_matches.append({
+                'block1_pos': pos1,
+                'block2_pos': pos2,
+                'correlation': float(correlations[idx]),
+                'distance': float(distance)
+            })
         
         return block_matches
         
@@ -239,6 +316,122 @@ def detect_copy_move_blocks(image_pil, block_size=BLOCK_SIZE):
         return []
 
 
+def localization_grid_features(ela_gray, step_size, window_size=5):
+    """
+    Feature vectors for tampering localization on a regular sampling grid.
+    
+    Every ``step_size``-th pixel gets [ELA value, local std, local mean,
+    normalized x, normalized y, gradient magnitude]; the local statistics cover
+    a ``window_size`` window clipped to the image and come from integral images.
+    
+    Returns:
+        Tuple of (features (n, 6), sample y coordinates, sample x coordinates), row-major
+    """
+    height, width = ela_gray.shape
+    if ela_gray.dtype not in (np.uint8, np.float32, np.float64):
+        ela_gray = ela_gray.astype(np.float64)
+    ys, xs = np.meshgrid(np.arange(0, height, step_size), np.arange(0, width, step_size), indexing='ij')
+    ys, xs = ys.ravel(), xs.ravel()
+    ela_values = ela_gray[ys, xs].astype(np.float64)
+    
+    # Local texture features (local mean and standard deviation)
+    integral, integral_sq = cv2.integral2(ela_gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    y0, y1 = np.maximum(0, ys - window_size // 2), np.minimum(height, ys + window_size // 2 + 1)
+    x0, x1 = np.maximum(0, xs - window_size // 2), np.minimum(width, xs + window_size // 2 + 1)
+    count = (y1 - y0) * (x1 - x0)
+    window_sum = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    window_sq = integral_sq[y1, x1] - integral_sq[y0, x1] - integral_sq[y1, x0] + integral_sq[y0, x0]
+    texture_mean = window_sum / count
+    texture_std = np.sqrt(np.maximum(window_sq / count - texture_mean ** 2, 0))
+    
+    # Gradient information (central differences, zero on the image border)
+    interior = (ys > 0) & (ys < height - 1) & (xs > 0) & (xs < width - 1)
+    ela_float = ela_gray.astype(np.float64)
+    grad_x = ela_float[ys, np.minimum(xs + 1, width - 1)] - ela_float[ys, np.maximum(xs - 1, 0)]
+    grad_y = ela_float[np.minimum(ys + 1, height - 1), xs] - ela_float[np.maximum(ys - 1, 0), xs]
+    gradient_mag = np.where(interior, np.sqrt(grad_x ** 2 + grad_y ** 2), 0)
+    
+    features = np.column_stack([ela_values, texture_std, texture_mean,
+                                xs / width, ys / height, gradient_mag])
+    return features, ys, xs
+
+
+def _cluster_grid_features(features, n_clusters):
+    """MiniBatchKMeans labels, refined by a few full Lloyd iterations warm-started from its centres."""
+    coarse = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3,
+                             batch_size=LOCALIZATION_MINIBATCH_SIZE).fit(features)
+    refined = KMeans(n_clusters=n_clusters, init=coarse.cluster_centers_, n_init=1,
+                     max_iter=LOCALIZATION_REFINE_ITERATIONS, random_state=42)
+    return refined.fit_predict(features)
+
+
+def grid_dbscan(features, grid_shape, spacing, eps, min_samples=5):
+    """
+    DBSCAN for feature vectors sampled on a regular grid (row-major).
+    
+    The sampling grid is the spatial hash: ``spacing`` is the (row, column)
+    distance between neighbouring samples along the spatial features, so only
+    grid offsets within ``eps`` of each other can hold neighbours, and each
+    offset is checked for all samples at once.
+    
+    Returns:
+        Cluster label per sample, -1 for noise (as sklearn's DBSCAN)
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    
+    rows, cols = grid_shape
+    grid = features.reshape(rows, cols, -1)
+    index = np.arange(rows * cols).reshape(rows, cols)
+    row_spacing, col_spacing = spacing
+    eps_sq = eps * eps
+    max_dy = min(rows - 1, int(eps / row_spacing)) if row_spacing > 0 else rows - 1
+    max_dx = min(cols - 1, int(eps / col_spacing)) if col_spacing > 0 else cols - 1
+    
+    # Neighbour pairs (each once) within eps
+    pairs_a, pairs_b = [], []
+    for dy in range(max_dy + 1):
+        for dx in range(-max_dx, max_dx + 1):
+            if (dy == 0 and dx <= 0) or (dy * row_spacing) ** 2 + (dx * col_spacing) ** 2 > eps_sq * (1 + 1e-9):
+                continue
+            a_cols = slice(max(0, -dx), cols - max(0, dx))
+            b_cols = slice(max(0, dx), cols + min(0, dx))
+            diff = grid[:rows - dy, a_cols] - grid[dy:, b_cols]
+            close = np.einsum('ijk,ijk->ij', diff, diff) <= eps_sq
+            pairs_a.append(index[:rows - dy, a_cols][close])
+            pairs_b.append(index[dy:, b_cols][close])
+    n = rows * cols
+    pairs_a = np.concatenate(pairs_a) if pairs_a else np.zeros(0, dtype=int)
+    pairs_b = np.concatenate(pairs_b) if pairs_b else np.zeros(0, dtype=int)
+    
+    # Core samples have min_samples neighbours (including themselves)
+    neighbour_count = 1 + np.bincount(pairs_a, minlength=n) + np.bincount(pairs_b, minlength=n)
+    core = neighbour_count >= min_samples
+    
+    # Clusters are connected components of core samples; border samples join a core neighbour's cluster
+    labels = np.full(n, -1, dtype=np.int64)
+    core_pairs = core[pairs_a] & core[pairs_b]
+    graph = coo_matrix((np.ones(np.count_nonzero(core_pairs)), (pairs_a[core_pairs], pairs_b[core_pairs])),
+                       shape=(n, n))
+    _, components = connected_components(graph, directed=False)
+    labels[core] = np.unique(components[core], return_inverse=True)[1]
+    border_a = core[pairs_b] & ~core[pairs_a]
+    border_b = core[pairs_a] & ~core[pairs_b]
+    labels[pairs_a[border_a]] = labels[pairs_b[border_a]]
+    labels[pairs_b[border_b]] = labels[pairs_a[border_b]]
+    return labels
+
+
+def _splat_boxes(shape, ys, xs, weights, radius):
+    """Full-resolution map where each sample adds its weight to the box of ``radius`` around it (clipped)."""
+    deposit = np.zeros(shape, dtype=np.float64)
+    deposit[ys, xs] = weights
+    # Unnormalized box filter with zero border = sum over the clipped boxes around each sample
+    box = cv2.boxFilter(deposit, -1, (2 * radius + 1, 2 * radius + 1), normalize=False,
+                        borderType=cv2.BORDER_CONSTANT)
+    return box.astype(np.float32)
+
+
 def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoints=None, n_clusters=8):
     """
     Advanced tampering localization using multiple clustering approaches and feature-based validation.
@@ -263,48 +456,13 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
         height, width = ela_gray.shape
         
         # 1. Multi-feature clustering approach
-        # Create feature vectors combining ELA, texture, and spatial information
-        feature_vectors = []
-        coordinates = []
-        
-        # Sample points for clustering (to manage computational complexity)
+        # Feature vectors (ELA, texture, spatial, gradient) on a regular sampling grid.
+        # The grid is capped at MAX_SAMPLES_DBSCAN points, so clustering cost does not grow with image size
         step_size = max(1, min(width, height) // 100)  # Adaptive sampling
-        
-        for y in range(0, height, step_size):
-            for x in range(0, width, step_size):
-                # ELA value
-                ela_val = ela_gray[y, x]
-                
-                # Local texture features (using local standard deviation)
-                window_size = 5
-                y_start = max(0, y - window_size//2)
-                y_end = min(height, y + window_size//2 + 1)
-                x_start = max(0, x - window_size//2)
-                x_end = min(width, x + window_size//2 + 1)
-                
-                local_patch = ela_gray[y_start:y_end, x_start:x_end]
-                texture_std = np.std(local_patch)
-                texture_mean = np.mean(local_patch)
-                
-                # Spatial coordinates (normalized)
-                norm_x = x / width
-                norm_y = y / height
-                
-                # Gradient information
-                if y > 0 and y < height-1 and x > 0 and x < width-1:
-                    grad_x = float(ela_gray[y, x+1]) - float(ela_gray[y, x-1])
-                    grad_y = float(ela_gray[y+1, x]) - float(ela_gray[y-1, x])
-                    gradient_mag = np.sqrt(grad_x**2 + grad_y**2)
-                else:
-                    gradient_mag = 0
-                
-                feature_vectors.append([
-                    ela_val, texture_std, texture_mean, 
-                    norm_x, norm_y, gradient_mag
-                ])
-                coordinates.append((x, y))
-        
-        feature_vectors = np.array(feature_vectors)
+        while (-(-height // step_size)) * (-(-width // step_size)) > MAX_SAMPLES_DBSCAN:
+            step_size += 1
+        feature_vectors, sample_ys, sample_xs = localization_grid_features(ela_gray, step_size)
+        grid_shape = (len(np.unique(sample_ys)), len(np.unique(sample_xs)))
         
         # Normalize features
         from sklearn.preprocessing import StandardScaler
@@ -314,10 +472,9 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
         # 2. Apply multiple clustering algorithms
         clustering_results = {}
         
-        # K-means clustering
+        # K-means clustering (MiniBatch, refined by warm-started Lloyd iterations)
         try:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            kmeans_labels = kmeans.fit_predict(feature_vectors_normalized)
+            kmeans_labels = _cluster_grid_features(feature_vectors_normalized, n_clusters)
             clustering_results['kmeans'] = kmeans_labels
         except:
             clustering_results['kmeans'] = np.zeros(len(feature_vectors))
@@ -326,15 +483,19 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
         try:
             # Adaptive eps based on image size
             eps = 0.3 * (min(width, height) / 1000)
-            dbscan = DBSCAN(eps=eps, min_samples=5)
-            dbscan_labels = dbscan.fit_predict(feature_vectors_normalized)
+            # Spacing of neighbouring samples along the (normalized) x/y features
+            spacing = (step_size / height / scaler.scale_[4], step_size / width / scaler.scale_[3])
+            dbscan_labels = grid_dbscan(feature_vectors_normalized, grid_shape, spacing, eps, min_samples=5)
             clustering_results['dbscan'] = dbscan_labels
         except:
             clustering_results['dbscan'] = np.zeros(len(feature_vectors))
         
         # 3. Create comprehensive localization map
-        localization_map = np.zeros((height, width), dtype=np.float32)
-        tampering_confidence = np.zeros((height, width), dtype=np.float32)
+        # Per-sample weights, spread over a box around each sample at full resolution
+        localization_weights = np.zeros(len(feature_vectors))
+        confidence_weights = np.zeros(len(feature_vectors))
+        kernel_size = max(3, step_size)
+        all_ela_values = feature_vectors[:, 0]
         
         # Process K-means results
         if 'kmeans' in clustering_results:
@@ -352,7 +513,6 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
             cluster_ela_means.sort(key=lambda x: x[1], reverse=True)
             
             # Dynamic threshold based on ELA distribution - diperbaiki untuk lebih selektif
-            all_ela_values = feature_vectors[:, 0]
             # Adaptive threshold based on distribution statistics
             ela_mean = np.mean(all_ela_values)
             ela_std = np.std(all_ela_values)
@@ -385,51 +545,30 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
                     suspicious_clusters = [top_cluster[0]]
             
             # Map back to image coordinates
-            for i, (x, y) in enumerate(coordinates):
-                if kmeans_labels[i] in suspicious_clusters:
-                    # Use Gaussian kernel for smooth localization
-                    kernel_size = max(3, step_size)
-                    y_start = max(0, y - kernel_size)
-                    y_end = min(height, y + kernel_size + 1)
-                    x_start = max(0, x - kernel_size)
-                    x_end = min(width, x + kernel_size + 1)
-                    
-                    # Hitung confidence berdasarkan seberapa jauh dari mean
-                    ela_value = feature_vectors[i, 0]
-                    # Confidence tinggi hanya untuk nilai yang signifikan di atas mean
-                    if ela_value > ela_mean + 2 * ela_std:
-                        confidence = min(1.0, (ela_value - ela_mean) / (3 * ela_std))
-                    else:
-                        confidence = 0.1  # Confidence rendah untuk nilai normal
-                    
-                    localization_map[y_start:y_end, x_start:x_end] += confidence * 0.3
-                    tampering_confidence[y_start:y_end, x_start:x_end] += confidence * 0.5
+            in_suspicious = np.isin(kmeans_labels, suspicious_clusters)
+            # Hitung confidence berdasarkan seberapa jauh dari mean
+            # Confidence tinggi hanya untuk nilai yang signifikan di atas mean, rendah untuk nilai normal
+            with np.errstate(divide='ignore', invalid='ignore'):
+                confidence = np.where(all_ela_values > ela_mean + 2 * ela_std,
+                                      np.minimum(1.0, (all_ela_values - ela_mean) / (3 * ela_std)), 0.1)
+            localization_weights += np.where(in_suspicious, confidence * 0.3, 0)
+            confidence_weights += np.where(in_suspicious, confidence * 0.5, 0)
         
         # Process DBSCAN results (focus on outliers and dense regions)
         if 'dbscan' in clustering_results:
             dbscan_labels = clustering_results['dbscan']
             
-            # Outliers (label = -1) and dense clusters with high ELA
-            for i, (x, y) in enumerate(coordinates):
-                label = dbscan_labels[i]
-                ela_val = feature_vectors[i, 0]
-                
-                # Kriteria DBSCAN lebih selektif: hanya outlier dengan ELA sangat tinggi
-                if label == -1 and ela_val > ela_threshold:  # Outlier DAN high ELA
-                    kernel_size = max(3, step_size)
-                    y_start = max(0, y - kernel_size)
-                    y_end = min(height, y + kernel_size + 1)
-                    x_start = max(0, x - kernel_size)
-                    x_end = min(width, x + kernel_size + 1)
-                    
-                    # Confidence berdasarkan deviasi dari mean
-                    if ela_val > ela_mean + 2.5 * ela_std:
-                        confidence = min(1.0, (ela_val - ela_mean) / (3 * ela_std))
-                        localization_map[y_start:y_end, x_start:x_end] += confidence * 0.2
-                        tampering_confidence[y_start:y_end, x_start:x_end] += confidence * 0.3
-                    else:
-                        # Abaikan jika tidak cukup signifikan
-                        pass
+            # Kriteria DBSCAN lebih selektif: hanya outlier (label = -1) dengan ELA sangat tinggi,
+            # confidence berdasarkan deviasi dari mean; abaikan jika tidak cukup signifikan
+            significant = ((dbscan_labels == -1) & (all_ela_values > ela_threshold) &
+                           (all_ela_values > ela_mean + 2.5 * ela_std))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                confidence = np.minimum(1.0, (all_ela_values - ela_mean) / (3 * ela_std))
+            localization_weights += np.where(significant, confidence * 0.2, 0)
+            confidence_weights += np.where(significant, confidence * 0.3, 0)
+        
+        localization_map = _splat_boxes((height, width), sample_ys, sample_xs, localization_weights, kernel_size)
+        tampering_confidence = _splat_boxes((height, width), sample_ys, sample_xs, confidence_weights, kernel_size)
         
         # 4. Feature-based validation (if matches are provided)
         if matches and keypoints:
@@ -490,9 +629,9 @@ def advanced_tampering_localization(image_pil, ela_array, matches=None, keypoint
         num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(tampering_mask_uint8)
         min_area = max(100, (width * height) // 5000)  # Minimum 0.02% of image area atau 100 pixels
         
-        for i in range(1, num_labels):
-            if stats[i, cv2.CC_STAT_AREA] < min_area:
-                tampering_mask_uint8[labels == i] = 0
+        small_components = stats[:, cv2.CC_STAT_AREA] < min_area
+        small_components[0] = False
+        tampering_mask_uint8[small_components[labels]] = 0
         
         final_tampering_mask = tampering_mask_uint8 > 128
         
@@ -2,19 +2,17 @@
 Enhanced Error Level Analysis (ELA) functions with advanced features
 """
 
-import os
 import numpy as np
 import cv2
+from numpy.lib.stride_tricks import sliding_window_view
 from PIL import Image, ImageChops, ImageStat, ImageFilter
-from scipy import ndimage, signal
 from scipy.stats import entropy
 from config import ELA_QUALITIES, ELA_SCALE_FACTOR
 from utils import detect_outliers_iqr
+from jpeg_recompression import image_digest, recompress_jpeg
 
 def perform_multi_quality_ela(image_pil, quality_steps=ELA_QUALITIES, scale_factor=ELA_SCALE_FACTOR):
     """Enhanced multi-quality ELA with advanced features for better manipulation detection"""
-    temp_filename = "temp_ela_multi.jpg"
-    
     if image_pil.mode != 'RGB':
         image_rgb = image_pil.convert('RGB')
     else:
@@ -23,55 +21,53 @@ def perform_multi_quality_ela(image_pil, quality_steps=ELA_QUALITIES, scale_fact
     # Convert to numpy for advanced processing
     original_array = np.array(image_rgb)
     h, w = original_array.shape[:2]
+    gray_original = cv2.cvtColor(original_array, cv2.COLOR_RGB2GRAY)
+    
+    # The contrast-adaptive scale only depends on the original, so it is computed once for all qualities
+    adaptive_scale = scale_factor * _local_contrast_factor(gray_original)
     
-    ela_results = []
+    # Enhanced ELA maps are uint8; all qualities share one buffer (no float64 copy per quality)
+    ela_results = np.empty((len(quality_steps), h, w), dtype=np.uint8)
     quality_stats = []
     frequency_features = []
+    digest = image_digest(image_rgb)
     
-    for q in quality_steps:
-        # Save and reload with JPEG compression
-        image_rgb.save(temp_filename, 'JPEG', quality=q)
-        with Image.open(temp_filename) as compressed_rgb:
-            # Calculate difference
-            diff_rgb = ImageChops.difference(image_rgb, compressed_rgb)
-            diff_l = diff_rgb.convert('L')
-            ela_np = np.array(diff_l, dtype=float)
+    for index, q in enumerate(quality_steps):
+        # Recompress in memory (shared cache with the JPEG analysis stages)
+        compressed_rgb = recompress_jpeg(image_rgb, q, digest=digest)
+        diff_l = np.asarray(ImageChops.difference(image_rgb, compressed_rgb).convert('L'))
 
         # Advanced ELA processing
-        processed_ela = _enhance_ela_signal(ela_np, original_array, scale_factor)
-        ela_results.append(processed_ela)
-        
-        # Enhanced statistics for this quality
-        stat = ImageStat.Stat(Image.fromarray(processed_ela.astype(np.uint8)))
+        processed_ela = ela_results[index]
+        processed_ela[...] = _enhance_ela_signal(diff_l, adaptive_scale)
         
         # Add frequency domain analysis
         freq_features = _analyze_frequency_domain(processed_ela)
         frequency_features.append(freq_features)
         
+        # Enhanced statistics for this quality (from the histogram of the uint8 map)
         quality_stats.append({
             'quality': q,
-            'mean': stat.mean[0],
-            'stddev': stat.stddev[0],
-            'max': np.max(processed_ela),
-            'percentile_95': np.percentile(processed_ela, 95),
-            'entropy': entropy(processed_ela.flatten() + 1),  # +1 to avoid log(0)
+            **_quality_statistics(processed_ela),
             'edge_response': _calculate_edge_response(processed_ela),
             'frequency_energy': freq_features['high_freq_energy']
         })
     
     # Cross-quality analysis with enhanced variance computation
-    ela_variance = np.var(ela_results, axis=0)
+    ela_variance = _cross_quality_variance(ela_results)
     
     # Adaptive weighted averaging based on image characteristics
     weights = _calculate_adaptive_weights(quality_stats, original_array)
-    final_ela = np.average(ela_results, axis=0, weights=weights)
+    final_ela = np.zeros((h, w), dtype=np.float32)
+    for weight, ela in zip(weights, ela_results):
+        final_ela += np.float32(weight) * ela
     
     # Multi-scale enhancement for better visualization
-    final_ela_enhanced = _apply_multiscale_enhancement(final_ela, original_array)
+    final_ela_enhanced = _apply_multiscale_enhancement(final_ela, gray_original)
     final_ela_image = Image.fromarray(final_ela_enhanced.astype(np.uint8), mode='L')
     
     # Enhanced regional analysis with texture awareness
-    regional_stats = analyze_ela_regions_enhanced(final_ela_enhanced, ela_variance, original_array)
+    regional_stats = analyze_ela_regions_enhanced(final_ela_enhanced, ela_variance, gray_original)
     
     # Overall statistics
     final_stat = ImageStat.Stat(final_ela_image)
@@ -79,78 +75,36 @@ def perform_multi_quality_ela(image_pil, quality_steps=ELA_QUALITIES, scale_fact
     # Add advanced metrics
     regional_stats['frequency_consistency'] = _analyze_frequency_consistency(frequency_features)
     regional_stats['adaptive_weights'] = weights.tolist()
-    regional_stats['signal_enhancement_ratio'] = np.mean(final_ela_enhanced) / max(np.mean(final_ela), 1e-6)
-    
-    try:
-        os.remove(temp_filename)
-    except:
-        pass
+    regional_stats['signal_enhancement_ratio'] = (np.mean(final_ela_enhanced, dtype=np.float64) /
+                                                  max(np.mean(final_ela, dtype=np.float64), 1e-6))
     
     return (final_ela_image, final_stat.mean[0], final_stat.stddev[0],
             regional_stats, quality_stats, ela_variance)
 
 def analyze_ela_regions_enhanced(ela_array, ela_variance, original_array=None, block_size=32):
     """Enhanced regional ELA analysis with texture awareness and adaptive thresholding"""
-    h, w = ela_array.shape
-    regional_means = []
-    regional_stds = []
-    regional_variances = []
-    suspicious_regions = []
-    texture_features = []
-    
-    # Calculate texture features from original if available
-    texture_map = None
+    # Texture features from the original (RGB or grayscale) if available
+    gray_original = None
     if original_array is not None:
         gray_original = cv2.cvtColor(original_array, cv2.COLOR_RGB2GRAY) if len(original_array.shape) == 3 else original_array
-        texture_map = _calculate_local_texture(gray_original, block_size)
     
-    for i in range(0, h - block_size, block_size//2):
-        for j in range(0, w - block_size, block_size//2):
-            block = ela_array[i:i+block_size, j:j+block_size]
-            var_block = ela_variance[i:i+block_size, j:j+block_size]
-            
-            block_mean = np.mean(block)
-            block_std = np.std(block)
-            block_var = np.mean(var_block)
-            
-            regional_means.append(block_mean)
-            regional_stds.append(block_std)
-            regional_variances.append(block_var)
-            
-            # Texture-aware analysis
-            texture_score = 0.0
-            if texture_map is not None:
-                texture_block = texture_map[i:i+min(block_size, texture_map.shape[0]-i), 
-                                         j:j+min(block_size, texture_map.shape[1]-j)]
-                texture_score = np.mean(texture_block) if texture_block.size > 0 else 0.0
-                texture_features.append(texture_score)
-            
-            # Adaptive thresholding based on texture
-            base_threshold = 15
-            texture_adaptive_threshold = base_threshold * (1 + texture_score * 0.5)
-            
-            # Enhanced suspicious region detection
-            is_suspicious = (
-                block_mean > texture_adaptive_threshold or 
-                block_std > (25 + texture_score * 10) or 
-                block_var > (100 + texture_score * 50) or
-                _detect_edge_inconsistency(block)
-            )
-            
-            if is_suspicious:
-                suspicious_regions.append({
-                    'position': (i, j),
-                    'mean': block_mean,
-                    'std': block_std,
-                    'variance': block_var,
-                    'texture_score': texture_score,
-                    'confidence': _calculate_region_confidence(block, block_var, texture_score)
-                })
-    
-    # Advanced statistical analysis
-    regional_means = np.array(regional_means)
-    regional_stds = np.array(regional_stds)
-    regional_variances = np.array(regional_variances)
+    blocks = compute_block_statistics(ela_array, ela_variance, gray_original, block_size)
+    regional_means = blocks['mean'].ravel()
+    regional_stds = blocks['std'].ravel()
+    regional_variances = blocks['variance'].ravel()
+    texture_features = blocks['texture'].ravel() if gray_original is not None else np.array([])
+    
+    # Enhanced suspicious region detection (adaptive thresholds computed in the kernel)
+    suspicious_regions = []
+    for a, b in zip(*np.nonzero(blocks['suspicious'])):
+        suspicious_regions.append({
+            'position': (int(blocks['rows'][a]), int(blocks['cols'][b])),
+            'mean': float(blocks['mean'][a, b]),
+            'std': float(blocks['std'][a, b]),
+            'variance': float(blocks['variance'][a, b]),
+            'texture_score': float(blocks['texture'][a, b]),
+            'confidence': float(blocks['confidence'][a, b])
+        })
     
     # Calculate entropy-based inconsistency
     entropy_inconsistency = 0.0
@@ -173,39 +127,190 @@ def analyze_ela_regions_enhanced(ela_array, ela_variance, original_array=None, b
         'entropy_inconsistency': entropy_inconsistency,
         'suspicious_regions': suspicious_regions,
         'cross_quality_variance': np.mean(regional_variances),
-        'texture_aware_score': np.mean(texture_features) if texture_features else 0.0,
+        'texture_aware_score': np.mean(texture_features) if texture_features.size else 0.0,
         'adaptive_threshold_used': True,
         'confidence_weighted_score': np.mean([r['confidence'] for r in suspicious_regions]) if suspicious_regions else 0.0
     }
 
 
-def _enhance_ela_signal(ela_array, original_array, scale_factor):
-    """Apply advanced signal enhancement to ELA"""
-    # Adaptive scaling based on image characteristics
-    gray_original = cv2.cvtColor(original_array, cv2.COLOR_RGB2GRAY) if len(original_array.shape) == 3 else original_array
-    
-    # Calculate local contrast to adapt scaling
-    local_contrast = cv2.Laplacian(gray_original, cv2.CV_64F)
-    contrast_factor = 1.0 + np.std(local_contrast) / 100.0
-    
-    # Apply adaptive scaling
-    adaptive_scale = scale_factor * contrast_factor
-    scaled_ela = np.clip(ela_array * adaptive_scale, 0, 255)
+# ======================= Block statistics kernel =======================
+
+# Elements per chunk of blocks when computing gradients (bounds the temporary float32 arrays)
+EDGE_CHUNK_ELEMENTS = 1 << 22
+
+
+def compute_block_statistics(ela_array, ela_variance, gray_original=None, block_size=32):
+    """Per-block statistics on the half-overlapping block grid of the regional ELA analysis.
+
+    Means, standard deviations, cross-quality variance and texture come from
+    integral images; the edge-inconsistency test runs on strided float32 block
+    views, a few block rows at a time. Returns (rows, cols) grids plus the
+    top-left 'rows'/'cols' coordinates of the blocks.
+    """
+    h, w = ela_array.shape
+    step = block_size // 2
+    rows = np.arange(0, h - block_size, step)
+    cols = np.arange(0, w - block_size, step)
+    area = float(block_size * block_size)
+    ela32 = np.asarray(ela_array, dtype=np.float32)
+
+    # Block mean/std of the ELA map and mean cross-quality variance
+    ela_sum, ela_sq_sum = cv2.integral2(ela32, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    block_mean = _block_sums(ela_sum, rows, cols, block_size) / area
+    block_std = np.sqrt(np.maximum(_block_sums(ela_sq_sum, rows, cols, block_size) / area - block_mean ** 2, 0.0))
+    variance_sum = cv2.integral(np.asarray(ela_variance, dtype=np.float32), sdepth=cv2.CV_64F)
+    block_variance = _block_sums(variance_sum, rows, cols, block_size) / area
+
+    # Texture: local standard deviation of the original, normalized, averaged over each block
+    texture = np.zeros((len(rows), len(cols)))
+    if gray_original is not None and len(rows) and len(cols):
+        texture = _block_texture(gray_original, rows, cols, block_size)
+
+    # Edge inconsistency: gradient magnitude spread within each block
+    edge_inconsistent = np.zeros((len(rows), len(cols)), dtype=bool)
+    if len(rows) and len(cols):
+        windows = sliding_window_view(ela32, (block_size, block_size))[::step, ::step][:len(rows), :len(cols)]
+        chunk = max(1, EDGE_CHUNK_ELEMENTS // (len(cols) * block_size * block_size))
+        for start in range(0, len(rows), chunk):
+            grad_y, grad_x = np.gradient(windows[start:start + chunk], axis=(2, 3))
+            magnitude = np.hypot(grad_x, grad_y)
+            edge_inconsistent[start:start + chunk] = (magnitude.std(axis=(2, 3)) >
+                                                      magnitude.mean(axis=(2, 3)) * 1.5)
+
+    # Adaptive thresholds based on texture
+    suspicious = ((block_mean > 15 * (1 + texture * 0.5)) |
+                  (block_std > 25 + texture * 10) |
+                  (block_variance > 100 + texture * 50) |
+                  edge_inconsistent)
+
+    # Confidence: mean, variance and texture factors
+    confidence = np.minimum(1.0, 0.4 * np.minimum(1.0, block_mean / 50.0) +
+                                 0.3 * np.minimum(1.0, block_variance / 200.0) +
+                                 0.3 * np.minimum(1.0, texture))
+
+    return {
+        'rows': rows,
+        'cols': cols,
+        'mean': block_mean,
+        'std': block_std,
+        'variance': block_variance,
+        'texture': texture,
+        'edge_inconsistent': edge_inconsistent,
+        'suspicious': suspicious,
+        'confidence': confidence
+    }
+
+
+def _block_sums(integral, rows, cols, size):
+    """Sums over the size x size blocks at (rows, cols) from an integral image."""
+    r0, r1 = rows[:, None], rows[:, None] + size
+    c0, c1 = cols[None, :], cols[None, :] + size
+    return integral[r1, c1] - integral[r0, c1] - integral[r1, c0] + integral[r0, c0]
+
+
+def _block_texture(gray_image, rows, cols, block_size):
+    """Block average of the local-texture map (block std of the original, overlapping blocks, normalized)."""
+    h, w = gray_image.shape
+    local_std = _local_block_std(gray_image, rows, cols, block_size)
+    local_std = local_std / (np.max(local_std) + 1e-6)
+    # The texture map is piecewise constant: every pixel holds the value of the last block covering
+    # it, so a block average is a weighted sum of local_std with per-axis coverage counts
+    row_counts = _coverage_counts(_last_block_index(h, rows, block_size), rows, block_size)
+    col_counts = _coverage_counts(_last_block_index(w, cols, block_size), cols, block_size)
+    return row_counts @ local_std @ col_counts.T / float(block_size * block_size)
+
+
+def _local_block_std(gray_image, rows, cols, block_size):
+    gray_sum, gray_sq_sum = cv2.integral2(gray_image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    area = float(block_size * block_size)
+    mean = _block_sums(gray_sum, rows, cols, block_size) / area
+    return np.sqrt(np.maximum(_block_sums(gray_sq_sum, rows, cols, block_size) / area - mean ** 2, 0.0))
+
+
+def _last_block_index(length, starts, block_size):
+    """Index of the last block (in scan order) covering each row/column, -1 if none covers it."""
+    step = block_size // 2
+    index = np.minimum(np.arange(length) // step, len(starts) - 1)
+    index[np.arange(length) >= starts[index] + block_size] = -1
+    return index
+
+
+def _coverage_counts(last_index, starts, block_size):
+    """counts[a, k]: pixels of block a (along one axis) whose last covering block is k."""
+    window = last_index[starts[:, None] + np.arange(block_size)]
+    counts = np.zeros((len(starts), len(starts)))
+    covered = window >= 0
+    np.add.at(counts, (np.nonzero(covered)[0], window[covered]), 1)
+    return counts
+
+
+def _local_contrast_factor(gray_original):
+    """Scale boost for high-contrast images (std of the Laplacian)."""
+    local_contrast = cv2.Laplacian(gray_original, cv2.CV_32F)
+    return 1.0 + np.std(local_contrast, dtype=np.float64) / 100.0
+
+
+def _enhance_ela_signal(ela_array, adaptive_scale):
+    """Apply advanced signal enhancement to a uint8 ELA difference map"""
+    # Adaptive scaling as a lookup table (the difference map only has 256 possible values)
+    scale_lut = np.clip(np.arange(256) * adaptive_scale, 0, 255).astype(np.uint8)
+    scaled_ela = scale_lut[ela_array]
     
     # Edge-preserving enhancement using bilateral filter
-    enhanced_ela = cv2.bilateralFilter(scaled_ela.astype(np.uint8), 5, 50, 50).astype(float)
+    enhanced_ela = cv2.bilateralFilter(scaled_ela, 5, 50, 50)
     
     # Local contrast enhancement using CLAHE
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    contrast_enhanced = clahe.apply(enhanced_ela.astype(np.uint8)).astype(float)
+    return clahe.apply(enhanced_ela)
+
+
+def _quality_statistics(ela_u8):
+    """Mean, stddev, max, 95th percentile and entropy of a uint8 ELA map, from its histogram"""
+    hist = np.bincount(ela_u8.ravel(), minlength=256)
+    values = np.arange(256)
+    count = ela_u8.size
+    mean = float(hist @ values) / count
+    stddev = np.sqrt(max(float(hist @ values ** 2) / count - mean ** 2, 0.0))
+    
+    # 95th percentile with numpy's linear interpolation between order statistics
+    cumulative = np.cumsum(hist)
+    position = 0.95 * (count - 1)
+    lower = int(np.floor(position))
+    lower_value = np.searchsorted(cumulative, lower, side='right')
+    upper_value = np.searchsorted(cumulative, min(lower + 1, count - 1), side='right')
+    percentile_95 = lower_value + (position - lower) * (upper_value - lower_value)
+    
+    # Entropy of the pixel values (+1 to avoid log(0)) taken as a distribution
+    present = hist > 0
+    probabilities = (values[present] + 1) / float(hist @ (values + 1))
+    value_entropy = -np.sum(hist[present] * probabilities * np.log(probabilities))
     
-    return contrast_enhanced
+    return {
+        'mean': mean,
+        'stddev': stddev,
+        'max': float(values[present][-1]),
+        'percentile_95': float(percentile_95),
+        'entropy': float(value_entropy)
+    }
+
+
+def _cross_quality_variance(ela_results):
+    """Per-pixel variance across qualities of the uint8 ELA maps, as float32"""
+    count = len(ela_results)
+    total = np.zeros(ela_results.shape[1:], dtype=np.int32)
+    total_sq = np.zeros(ela_results.shape[1:], dtype=np.int32)
+    for ela in ela_results:
+        ela = ela.astype(np.int32)
+        total += ela
+        total_sq += ela * ela
+    # Exact in integers: var = (n * sum(x^2) - sum(x)^2) / n^2
+    return (count * total_sq - total * total).astype(np.float32) / np.float32(count * count)
 
 
 def _analyze_frequency_domain(ela_array):
     """Analyze frequency domain characteristics of ELA"""
-    # Apply 2D FFT
-    f_transform = np.fft.fft2(ela_array)
+    # Apply 2D FFT (single precision)
+    f_transform = np.fft.fft2(ela_array.astype(np.float32))
     f_shift = np.fft.fftshift(f_transform)
     magnitude_spectrum = np.abs(f_shift)
     
@@ -213,13 +318,11 @@ def _analyze_frequency_domain(ela_array):
     h, w = ela_array.shape
     center_h, center_w = h // 2, w // 2
     
-    # High frequency energy (outer regions)
-    mask_high = np.zeros((h, w))
-    mask_high[center_h-h//4:center_h+h//4, center_w-w//4:center_w+w//4] = 1
-    mask_high = 1 - mask_high  # Invert to get high frequencies
-    
-    high_freq_energy = np.sum(magnitude_spectrum * mask_high)
-    total_energy = np.sum(magnitude_spectrum)
+    # High frequency energy (outside the central low-frequency region)
+    total_energy = np.sum(magnitude_spectrum, dtype=np.float64)
+    low_freq_energy = np.sum(magnitude_spectrum[center_h-h//4:center_h+h//4, center_w-w//4:center_w+w//4],
+                             dtype=np.float64)
+    high_freq_energy = total_energy - low_freq_energy
     
     return {
         'high_freq_energy': high_freq_energy / (total_energy + 1e-6),
@@ -278,13 +381,11 @@ def _calculate_adaptive_weights(quality_stats, original_array):
     return base_weights / np.sum(base_weights)
 
 
-def _apply_multiscale_enhancement(ela_array, original_array):
+def _apply_multiscale_enhancement(ela_array, gray_original):
     """Apply multi-scale enhancement for better visual representation"""
     # Create multiple scales
     scales = [1.0, 0.5, 0.25]
-    enhanced_ela = ela_array.copy()
-    
-    gray_original = cv2.cvtColor(original_array, cv2.COLOR_RGB2GRAY) if len(original_array.shape) == 3 else original_array
+    enhanced_ela = ela_array.astype(np.float32)
     
     for scale in scales[1:]:
         # Resize for multi-scale analysis
@@ -304,54 +405,11 @@ def _apply_multiscale_enhancement(ela_array, original_array):
 
 def _calculate_edge_response(ela_array):
     """Calculate edge response in ELA"""
-    # Sobel edge detection
-    sobel_x = cv2.Sobel(ela_array, cv2.CV_64F, 1, 0, ksize=3)
-    sobel_y = cv2.Sobel(ela_array, cv2.CV_64F, 0, 1, ksize=3)
-    edge_magnitude = np.sqrt(sobel_x**2 + sobel_y**2)
-    return np.mean(edge_magnitude)
-
-
-def _calculate_local_texture(gray_image, block_size):
-    """Calculate local texture features using GLCM-inspired approach"""
-    h, w = gray_image.shape
-    texture_map = np.zeros((h, w))
-    
-    for i in range(0, h - block_size, block_size//2):
-        for j in range(0, w - block_size, block_size//2):
-            block = gray_image[i:i+block_size, j:j+block_size]
-            
-            # Simple texture measure: local standard deviation
-            texture_score = np.std(block)
-            texture_map[i:i+block_size, j:j+block_size] = texture_score
-    
-    # Normalize texture map
-    return texture_map / (np.max(texture_map) + 1e-6)
-
-
-def _detect_edge_inconsistency(block):
-    """Detect edge inconsistencies in a block"""
-    # Calculate gradients
-    grad_x = np.gradient(block, axis=1)
-    grad_y = np.gradient(block, axis=0)
-    
-    # Check for unusual gradient patterns
-    grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-    grad_std = np.std(grad_magnitude)
-    
-    # High gradient variance suggests inconsistency
-    return grad_std > np.mean(grad_magnitude) * 1.5
-
-
-def _calculate_region_confidence(block, block_var, texture_score):
-    """Calculate confidence score for a suspicious region"""
-    # Multiple factors contribute to confidence
-    mean_factor = min(1.0, np.mean(block) / 50.0)
-    var_factor = min(1.0, block_var / 200.0)
-    texture_factor = min(1.0, texture_score)
-    
-    # Combine factors with weights
-    confidence = 0.4 * mean_factor + 0.3 * var_factor + 0.3 * texture_factor
-    return min(1.0, confidence)
+    # Sobel edge detection (exact in float32 for a uint8 input)
+    sobel_x = cv2.Sobel(ela_array, cv2.CV_32F, 1, 0, ksize=3)
+    sobel_y = cv2.Sobel(ela_array, cv2.CV_32F, 0, 1, ksize=3)
+    edge_magnitude = cv2.magnitude(sobel_x, sobel_y)
+    return np.mean(edge_magnitude, dtype=np.float64)
 
 
 def _analyze_frequency_consistency(frequency_features):
@@ -366,44 +424,36 @@ def _analyze_frequency_consistency(frequency_features):
 def _calculate_spectral_centroid(magnitude_spectrum):
     """Calculate spectral centroid of magnitude spectrum"""
     h, w = magnitude_spectrum.shape
-    freqs_h = np.arange(h)
-    freqs_w = np.arange(w)
     
-    # Calculate weighted frequency
-    total_magnitude = np.sum(magnitude_spectrum)
+    # Calculate weighted frequency from the row/column marginals
+    total_magnitude = np.sum(magnitude_spectrum, dtype=np.float64)
     if total_magnitude == 0:
         return 0.0
     
-    centroid_h = np.sum(np.outer(freqs_h, np.ones(w)) * magnitude_spectrum) / total_magnitude
-    centroid_w = np.sum(np.outer(np.ones(h), freqs_w) * magnitude_spectrum) / total_magnitude
+    centroid_h = np.arange(h) @ np.sum(magnitude_spectrum, axis=1, dtype=np.float64) / total_magnitude
+    centroid_w = np.arange(w) @ np.sum(magnitude_spectrum, axis=0, dtype=np.float64) / total_magnitude
     
     return np.sqrt(centroid_h**2 + centroid_w**2)
 
 
 def _calculate_spectral_rolloff(magnitude_spectrum):
     """Calculate spectral rolloff (frequency below which 85% of energy is contained)"""
-    total_energy = np.sum(magnitude_spectrum**2)
+    energy = np.square(magnitude_spectrum, dtype=np.float64).ravel()
+    total_energy = np.sum(energy)
     if total_energy == 0:
         return 0.0
     
-    # Flatten and sort by magnitude
-    flat_spectrum = magnitude_spectrum.flatten()
-    sorted_indices = np.argsort(flat_spectrum)[::-1]
-    
-    cumulative_energy = 0
-    for i, idx in enumerate(sorted_indices):
-        cumulative_energy += flat_spectrum[idx]**2
-        if cumulative_energy >= 0.85 * total_energy:
-            return i / len(flat_spectrum)
-    
-    return 1.0
+    # Cumulative energy of the coefficients sorted by magnitude (largest first)
+    cumulative_energy = np.cumsum(np.sort(energy)[::-1])
+    rolloff_index = np.searchsorted(cumulative_energy, 0.85 * total_energy)
+    return min(rolloff_index, len(energy)) / len(energy)
 
 
 def _enhance_details_at_scale(ela_small, original_small):
     """Enhance details at a specific scale"""
     # Apply unsharp masking for detail enhancement
     gaussian_blur = cv2.GaussianBlur(ela_small, (3, 3), 1.0)
-    unsharp_mask = ela_small.astype(float) - gaussian_blur.astype(float)
-    enhanced = ela_small.astype(float) + 0.5 * unsharp_mask
+    unsharp_mask = ela_small.astype(np.float32) - gaussian_blur
+    enhanced = ela_small + 0.5 * unsharp_mask
     
     return np.clip(enhanced, 0, 255)
\ No newline at end of file
@@ -56,6 +56,10 @@ except Exception:
     SKLEARN_METRICS_AVAILABLE = False
     SCIPY_AVAILABLE = False # scipy.stats.gaussian_kde
 
+# Figures are rendered once per export into an artifact store shared by all output formats
+from report_artifacts import ArtifactStore, DOCX_FIGURE_KEYS, PROCESS_IMAGES
+from config import EXPORT_PACKAGE_FORMATS
+
 
 warnings.filterwarnings('ignore')
 
@@ -146,10 +150,14 @@ def export_complete_package(original_pil, analysis_results, base_filename="foren
     
     return export_files
 
-def export_comprehensive_package(original_pil, analysis_results, base_filename="forensic_analysis"):
+def export_comprehensive_package(original_pil, analysis_results, base_filename="forensic_analysis", formats=None):
     """
     Export complete forensic package with all 17 process images and structured reports
     following the DFRWS framework.
+
+    ``formats`` selects the outputs ('process_images', 'png', 'docx', 'pdf', 'html';
+    default EXPORT_PACKAGE_FORMATS). Each figure is rendered once and every
+    requested format is assembled from the cached PNGs.
     """
     print(f"\n{'='*80}")
     print("📦 CREATING COMPREHENSIVE FORENSIC PACKAGE")
@@ -162,6 +170,10 @@ def export_comprehensive_package(original_pil, analysis_results, base_filename="
     
     base_name_only = os.path.basename(base_filename) # Strip path from base_filename
 
+    formats = set(formats or EXPORT_PACKAGE_FORMATS)
+    if 'html' in formats:
+        formats.add('process_images') # The HTML index links to the process images
+
     try:
         # Create a timestamped directory for this comprehensive export package
         package_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -169,36 +181,52 @@ def export_comprehensive_package(original_pil, analysis_results, base_filename="
         os.makedirs(specific_package_dir, exist_ok=True)
         print(f"  Creating package directory: {specific_package_dir}")
 
-        # 1. Create directory for process images (inside the specific package dir)
-        process_images_dir = os.path.join(specific_package_dir, "process_images")
-        os.makedirs(process_images_dir, exist_ok=True)
-        
-        # 2. Generate all 17 process images
-        success_generate_images = generate_all_process_images(original_pil, analysis_results, process_images_dir)
-        if success_generate_images:
-            export_files['process_images_dir'] = process_images_dir
-            print(f"  ✅ Process images generated to {process_images_dir}")
-        else:
-            print(f"  ❌ Failed to generate process images.")
+        # 1. Render every figure the requested formats need, once, in one pass of the render pool
+        store = ArtifactStore(original_pil, analysis_results)
+        needed_figures = []
+        if formats & {'process_images', 'pdf'}:
+            needed_figures += list(PROCESS_IMAGES)
+        if 'docx' in formats and DOCX_AVAILABLE:
+            needed_figures += list(DOCX_FIGURE_KEYS)
+        if MATPLOTLIB_AVAILABLE and needed_figures:
+            store.render(needed_figures)
+            print(f"  Rendered {len(store.artifacts)} figures ({len(store.errors)} failed)")
+
+        # 2. Write all 17 process images (inside the specific package dir)
+        if 'process_images' in formats:
+            process_images_dir = os.path.join(specific_package_dir, "process_images")
+            success_generate_images = generate_all_process_images(original_pil, analysis_results, process_images_dir, store)
+            if success_generate_images:
+                export_files['process_images_dir'] = process_images_dir
+                print(f"  ✅ Process images generated to {process_images_dir}")
+            else:
+                print(f"  ❌ Failed to generate process images.")
             
         # 3. Export visualization PNG (inside the specific package dir)
-        png_file = os.path.join(specific_package_dir, f"{base_name_only}_visualization.png")
-        export_files['png_visualization'] = export_visualization_png(original_pil, analysis_results, png_file)
+        if 'png' in formats:
+            png_file = os.path.join(specific_package_dir, f"{base_name_only}_visualization.png")
+            export_files['png_visualization'] = export_visualization_png(original_pil, analysis_results, png_file)
         
         # 4. Export DOCX report with DFRWS framework (inside the specific package dir)
-        if DOCX_AVAILABLE:
-            docx_file = os.path.join(specific_package_dir, f"{base_name_only}_report.docx")
-            export_files['docx_report'] = export_to_advanced_docx(original_pil, analysis_results, docx_file)
-            # PDF generation removed - not supported in Hugging Face
-        else:
-            print("  Skipping DOCX report generation as python-docx is not installed.")
-
-        # 5. Create index HTML file (inside the specific package dir)
-        html_index = os.path.join(specific_package_dir, f"{base_name_only}_index.html")
-        create_html_index(original_pil, analysis_results, html_index, os.path.basename(process_images_dir)) # Pass relative path for HTML
-        export_files['html_index'] = html_index
+        if 'docx' in formats:
+            if DOCX_AVAILABLE:
+                docx_file = os.path.join(specific_package_dir, f"{base_name_only}_report.docx")
+                export_files['docx_report'] = export_to_advanced_docx(original_pil, analysis_results, docx_file, store)
+            else:
+                print("  Skipping DOCX report generation as python-docx is not installed.")
+
+        # 5. PDF of the process images, assembled from the cached PNGs (no DOCX conversion needed)
+        if 'pdf' in formats:
+            pdf_file = os.path.join(specific_package_dir, f"{base_name_only}_process_images.pdf")
+            export_files['pdf_process_images'] = store.write_pdf(pdf_file)
+
+        # 6. Create index HTML file (inside the specific package dir)
+        if 'html' in formats:
+            html_index = os.path.join(specific_package_dir, f"{base_name_only}_index.html")
+            create_html_index(original_pil, analysis_results, html_index, os.path.basename(process_images_dir)) # Pass relative path for HTML
+            export_files['html_index'] = html_index
         
-        # 6. Create ZIP archive of everything
+        # 7. Create ZIP archive of everything
         zip_file = os.path.join(base_dir, f"{base_name_only}_complete_package_{package_timestamp}.zip")
         import zipfile
         with zipfile.ZipFile(zip_file, 'w') as zipf:
@@ -312,7 +340,7 @@ def export_visualization_pdf(original_pil, analysis_results, output_filename="fo
 
 # ======================= DOCX Export Functions (Diperbarui) =======================
 
-def export_to_advanced_docx(original_pil, analysis_results, output_filename="advanced_forensic_report.docx"):
+def export_to_advanced_docx(original_pil, analysis_results, output_filename="advanced_forensic_report.docx", store=None):
     """Export comprehensive analysis to professional DOCX report with DFRWS framework"""
     if not DOCX_AVAILABLE:
         print("❌ Cannot create DOCX report: python-docx is not installed.")
@@ -320,6 +348,12 @@ def export_to_advanced_docx(original_pil, analysis_results, output_filename="adv
 
     print("📄 Creating advanced DOCX report with DFRWS framework...")
     
+    # Render all report figures up front (in parallel); the sections only embed the cached PNGs
+    if store is None:
+        store = ArtifactStore(original_pil, analysis_results)
+    if MATPLOTLIB_AVAILABLE:
+        store.render(DOCX_FIGURE_KEYS)
+    
     doc = Document()
     
     # Set margins
@@ -336,8 +370,8 @@ def export_to_advanced_docx(original_pil, analysis_results, output_filename="adv
     add_dfrws_identification_section(doc, analysis_results, original_pil)
     add_dfrws_preservation_section(doc, analysis_results)
     add_dfrws_collection_section(doc, analysis_results)
-    add_dfrws_examination_section(doc, analysis_results, original_pil)
-    add_dfrws_analysis_section(doc, analysis_results, original_pil)
+    add_dfrws_examination_section(doc, analysis_results, original_pil, store)
+    add_dfrws_analysis_section(doc, analysis_results, original_pil, store)
     
     add_conclusion_advanced(doc, analysis_results)
     add_recommendations_section(doc, analysis_results)
@@ -763,8 +797,10 @@ def add_dfrws_collection_section(doc, analysis_results):
     doc.add_paragraph("• Konsistensi tekstur dan analisis tepi", style='List Bullet')
     doc.add_paragraph("• Karakteristik statistik kanal warna", style='List Bullet')
 
-def add_dfrws_examination_section(doc, analysis_results, original_pil):
+def add_dfrws_examination_section(doc, analysis_results, original_pil, store=None):
     """Add DFRWS Examination stage section to document with comprehensive images and explanations"""
+    if store is None:
+        store = ArtifactStore(original_pil, analysis_results)
     doc.add_heading('4. Pemeriksaan (Examination)', level=1)
     doc.add_paragraph(
         "Tahap pemeriksaan melibatkan pengolahan mendalam terhadap data yang dikumpulkan "
@@ -797,13 +833,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     # Create metadata visualization
     if MATPLOTLIB_AVAILABLE:
         try:
-            fig, ax = plt.subplots(figsize=(10, 8))
-            from visualization import create_metadata_table
-            create_metadata_table(ax, analysis_results.get('metadata', {}))
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('metadata_table')
             
             doc.add_picture(buf, width=Inches(6.0))
             metadata_score = analysis_results.get('metadata', {}).get('Metadata_Authenticity_Score', 'N/A')
@@ -949,13 +979,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     # Create feature match visualization
     if MATPLOTLIB_AVAILABLE and 'sift_keypoints' in analysis_results and 'ransac_matches' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_feature_match_visualization
-            create_feature_match_visualization(ax, original_pil, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('feature_matching')
             
             doc.add_picture(buf, width=Inches(5.0))
             fm_caption = f"Visualisasi kecocokan fitur. RANSAC inliers: {analysis_results.get('ransac_inliers',0)}"
@@ -992,13 +1016,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     # Create block match visualization
     if MATPLOTLIB_AVAILABLE and 'block_matches' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_block_match_visualization
-            create_block_match_visualization(ax, original_pil, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('block_matching')
             
             doc.add_picture(buf, width=Inches(5.0))
             bm_caption = f"Visualisasi kecocokan blok. Jumlah kecocokan: {len(analysis_results.get('block_matches', []))}"
@@ -1029,13 +1047,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     # Create localization visualization
     if MATPLOTLIB_AVAILABLE and 'localization_analysis' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_localization_visualization
-            create_localization_visualization(ax, original_pil, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('kmeans_localization')
             
             doc.add_picture(buf, width=Inches(5.0))
             loc_analysis = analysis_results.get('localization_analysis', {})
@@ -1077,13 +1089,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     
     if MATPLOTLIB_AVAILABLE and 'frequency_analysis' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_frequency_visualization
-            create_frequency_visualization(ax, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('frequency_analysis')
             
             doc.add_picture(buf, width=Inches(5.0))
             freq_analysis = analysis_results.get('frequency_analysis', {})
@@ -1110,13 +1116,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     
     if MATPLOTLIB_AVAILABLE and 'texture_analysis' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_texture_visualization
-            create_texture_visualization(ax, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('texture_analysis')
             
             doc.add_picture(buf, width=Inches(5.0))
             texture_analysis = analysis_results.get('texture_analysis', {})
@@ -1139,13 +1139,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     
     if MATPLOTLIB_AVAILABLE:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_edge_visualization
-            create_edge_visualization(ax, original_pil, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('edge_analysis')
             
             doc.add_picture(buf, width=Inches(5.0))
             edge_analysis = analysis_results.get('edge_analysis', {})
@@ -1168,13 +1162,7 @@ def add_dfrws_examination_section(doc, analysis_results, original_pil):
     
     if MATPLOTLIB_AVAILABLE:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_illumination_visualization
-            create_illumination_visualization(ax, original_pil, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('illumination_analysis')
             
             doc.add_picture(buf, width=Inches(5.0))
             illum_analysis = analysis_results.get('illumination_analysis', {})
@@ -1473,13 +1461,7 @@ konsistensi pola."""
     
     if MATPLOTLIB_AVAILABLE and 'jpeg_analysis' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_quality_response_plot
-            create_quality_response_plot(ax, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('jpeg_quality_response')
             
             doc.add_picture(buf, width=Inches(5.0))
             jpeg_basic = analysis_results.get('jpeg_analysis', {}).get('basic_analysis', {})
@@ -1606,8 +1588,10 @@ konsistensi pola."""
         "analisis yang komprehensif dan dapat diandalkan untuk deteksi manipulasi gambar."
     )
 
-def add_dfrws_analysis_section(doc, analysis_results, original_pil):
+def add_dfrws_analysis_section(doc, analysis_results, original_pil, store=None):
     """Add DFRWS Analysis stage section to document"""
+    if store is None:
+        store = ArtifactStore(original_pil, analysis_results)
     doc.add_heading('5. Analisis (Analysis)', level=1)
     doc.add_paragraph(
         "Tahap analisis membahas interpretasi hasil pemeriksaan dan penentuan "
@@ -1627,15 +1611,7 @@ def add_dfrws_analysis_section(doc, analysis_results, original_pil):
     loc_analysis_res = analysis_results.get('localization_analysis', {})
     if MATPLOTLIB_AVAILABLE and 'combined_tampering_mask' in loc_analysis_res:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_localization_visualization # Use this unified function
-            create_localization_visualization(ax, original_pil, analysis_results)
-            ax.set_title("Lokalisasi Area Manipulasi dengan K-Means") # Override title set by function if needed
-            
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('kmeans_localization')
             
             doc.add_picture(buf, width=Inches(5.0))
             doc.add_paragraph("Lokalisasi area manipulasi dengan algoritma K-Means clustering.", style='Caption')
@@ -1662,18 +1638,7 @@ def add_dfrws_analysis_section(doc, analysis_results, original_pil):
     # Create combined heatmap
     if MATPLOTLIB_AVAILABLE:
         try:
-            from visualization import create_advanced_combined_heatmap
-            combined_heatmap = create_advanced_combined_heatmap(analysis_results, original_pil.size)
-            fig, ax = plt.subplots(figsize=(8, 6))
-            ax.imshow(original_pil, alpha=0.4)
-            ax.imshow(combined_heatmap, cmap='hot', alpha=0.6)
-            ax.set_title("Peta Kecurigaan Gabungan")
-            ax.axis('off')
-            
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('combined_heatmap')
             
             doc.add_picture(buf, width=Inches(5.0))
             doc.add_paragraph(
@@ -1743,21 +1708,8 @@ def add_dfrws_analysis_section(doc, analysis_results, original_pil):
     classification = analysis_results.get('classification', {})
     if MATPLOTLIB_AVAILABLE and 'uncertainty_analysis' in classification:
         try:
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
-            
-            # Left: Probability bars
-            from visualization import create_probability_bars
-            create_probability_bars(ax1, analysis_results)
-            
-            # Right: Uncertainty visualization
-            from visualization import create_uncertainty_visualization
-            create_uncertainty_visualization(ax2, analysis_results)
-            
-            plt.tight_layout()
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-            plt.close(fig)
-            buf.seek(0)
+            # Left: probability bars, right: uncertainty visualization
+            buf = store.picture('probability_uncertainty')
             
             doc.add_picture(buf, width=Inches(6.5))
             
@@ -1805,13 +1757,7 @@ def add_dfrws_analysis_section(doc, analysis_results, original_pil):
     # Add statistical visualization
     if MATPLOTLIB_AVAILABLE and 'statistical_analysis' in analysis_results:
         try:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            from visualization import create_statistical_visualization
-            create_statistical_visualization(ax, analysis_results)
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', bbox_inches='tight')
-            plt.close(fig)
-            buf.seek(0)
+            buf = store.picture('statistical_analysis')
             
             doc.add_picture(buf, width=Inches(5.0))
             doc.add_paragraph("Analisis entropi kanal warna.", style='Caption')
@@ -1901,7 +1847,7 @@ def add_recommendations_section(doc, analysis_results):
     doc.add_heading('7. Rekomendasi', level=1)
     recs = [
         "Disarankan untuk melakukan verifikasi manual oleh seorang ahli forensik digital bersertifikat untuk menguatkan temuan otomatis ini.",
-        "Simpan laporan ini bersama dengan gambar asli dan file riwayat analisis (`analysis_history.json`) sebagai bagian dari barang bukti digital.",
+        "Simpan laporan ini bersama dengan gambar asli dan database riwayat analisis (`analysis_history.db`) sebagai bagian dari barang bukti digital.",
         "Jika gambar ini akan digunakan dalam proses hukum, pastikan chain of custody (rantai pengawasan) barang bukti terjaga dengan baik.",
     ]
     
@@ -1953,6 +1899,7 @@ def add_system_validation_section(doc, analysis_results=None):
                 # so this module doesn't implicitly depend on `app2.py` or `main.py` directly for runtime functions.
                 # Assuming ForensicValidator is truly exposed globally from `validator` package.
                 from validator import ForensicValidator 
+                from stage_profiler import stage_succeeded
                 
                 # As `validate_pipeline_integrity` is specifically part of Streamlit App (app2.py),
                 # this export util function (export_utils.py) won't have direct access.
@@ -1969,7 +1916,8 @@ def add_system_validation_section(doc, analysis_results=None):
                 if total_stages_run > 0:
                     pipeline_integrity_score = (completed_stages_run / total_stages_run) * 100
                     # Populate the detailed `pipeline_results_display` for DOCX output
-                    for stage_name_key, stage_success in pipeline_status_from_results.get('stage_details', {}).items():
+                    for stage_name_key, stage_detail in pipeline_status_from_results.get('stage_details', {}).items():
+                        stage_success = stage_succeeded(stage_detail)
                         emoji = "✅" if stage_success else "❌"
                         status_text = "[BERHASIL]" if stage_success else "[GAGAL]"
                         # Reformat the stage_name_key (e.g., 'file_validation' -> 'File Validation')
@@ -2801,7 +2749,7 @@ def create_html_index(original_pil, analysis_results, output_filename, process_i
 # This section defines the generate_all_process_images function
 # which was requested to be moved into export_utils.py.
 
-def generate_all_process_images(original_pil, analysis_results, output_dir):
+def generate_all_process_images(original_pil, analysis_results, output_dir, store=None):
     """Generate all 17 process images for comprehensive documentation"""
     if not MATPLOTLIB_AVAILABLE:
         print("❌ Matplotlib not available. Cannot generate process images.")
@@ -2811,170 +2759,10 @@ def generate_all_process_images(original_pil, analysis_results, output_dir):
     # Ensure output_dir exists
     os.makedirs(output_dir, exist_ok=True)
 
-    # Import visualization modules (lazy import to ensure MATPLOTLIB_AVAILABLE is checked first)
-    try:
-        from visualization import (
-            create_feature_match_visualization, create_block_match_visualization,
-            create_localization_visualization, create_edge_visualization,
-            create_illumination_visualization, create_frequency_visualization,
-            create_texture_visualization, create_statistical_visualization,
-            create_quality_response_plot, create_advanced_combined_heatmap,
-            create_summary_report, populate_validation_visuals,
-            create_probability_bars, create_uncertainty_visualization
-        )
-    except Exception as e:
-        print(f"❌ Error importing visualization functions: {e}. Cannot generate process images.")
-        import traceback
-        traceback.print_exc()
-        return False
-
-    # Get data needed from analysis_results safely
-    ela_image_data = analysis_results.get('ela_image')
-    ela_mean = analysis_results.get('ela_mean', 0.0)
-    ela_std = analysis_results.get('ela_std', 0.0)
-    
-    jpeg_ghost_data = analysis_results.get('jpeg_ghost')
-    noise_map_data = analysis_results.get('noise_map')
-
-    # Convert original PIL Image to a numpy array for direct use with OpenCV or matplotlib where preferred
-    original_pil_array = np.array(original_pil.convert('RGB'))
-
-
-    # 1. Original Image
-    original_pil.save(os.path.join(output_dir, "01_original_image.png"))
-    print("  Generated 01_original_image.png")
-    
-    # 2. Error Level Analysis (ELA)
-    if ela_image_data is not None:
-        ela_img_display = None
-        if not isinstance(ela_image_data, Image.Image): # Convert array-like to PIL Image
-            if ela_image_data.ndim == 2:
-                ela_img_display = Image.fromarray((ela_image_data).astype(np.uint8), mode='L') # Already normalized by ELA output
-            else: # Fallback just in case
-                ela_img_display = Image.fromarray(ela_image_data.astype(np.uint8)) 
-        else:
-            ela_img_display = ela_image_data.convert('L') # Ensure it's L for grayscale saving
-
-        if ela_img_display:
-            ela_img_display.save(os.path.join(output_dir, "02_error_level_analysis.png"))
-            print("  Generated 02_error_level_analysis.png")
-    else:
-        print("  Skipped 02_error_level_analysis.png (ELA image data not available)")
-    
-    # Helper to save matplotlib figure to a file
-    def save_plot(fig, filename):
-        fig.savefig(os.path.join(output_dir, filename), dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        print(f"  Generated {filename}")
-
-    # 3. Feature Matching
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_feature_match_visualization(ax, original_pil, analysis_results)
-    ax.set_title(f"3. Feature Matching ({analysis_results.get('ransac_inliers', 0)} inliers)", fontsize=12) # Custom title
-    save_plot(fig, "03_feature_matching.png")
-    
-    # 4. Block Matching
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_block_match_visualization(ax, original_pil, analysis_results)
-    ax.set_title(f"4. Block Matching ({len(analysis_results.get('block_matches', []))} matches)", fontsize=12) # Custom title
-    save_plot(fig, "04_block_matching.png")
-    
-    # 5. Localization K-Means
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_localization_visualization(ax, original_pil, analysis_results)
-    ax.set_title(f"5. K-Means Localization ({analysis_results.get('localization_analysis',{}).get('tampering_percentage',0):.1f}%)", fontsize=12)
-    save_plot(fig, "05_kmeans_localization.png")
-    
-    # 6. Edge Analysis
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_edge_visualization(ax, original_pil, analysis_results)
-    ax.set_title(f"6. Edge Analysis (Inconsistency: {analysis_results.get('edge_analysis',{}).get('edge_inconsistency',0):.2f})", fontsize=12)
-    save_plot(fig, "06_edge_analysis.png")
-    
-    # 7. Illumination Analysis
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_illumination_visualization(ax, original_pil, analysis_results)
-    ax.set_title(f"7. Illumination Analysis (Inconsistency: {analysis_results.get('illumination_analysis',{}).get('overall_illumination_inconsistency',0):.2f})", fontsize=12)
-    save_plot(fig, "07_illumination_analysis.png")
-    
-    # 8. JPEG Ghost Analysis
-    if jpeg_ghost_data is not None:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(jpeg_ghost_data, cmap='hot')
-        ax.set_title(f"8. JPEG Ghost Analysis (Ratio: {analysis_results.get('jpeg_ghost_suspicious_ratio',0):.1%})")
-        ax.axis('off')
-        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04) # Add colorbar explicitly
-        save_plot(fig, "08_jpeg_ghost.png")
-    else:
-        print("  Skipped 08_jpeg_ghost.png (JPEG ghost data not available)")
-    
-    # 9. Combined Heatmap
-    combined_heatmap = create_advanced_combined_heatmap(analysis_results, original_pil.size)
-    fig, ax = plt.subplots(figsize=(10, 8))
-    ax.imshow(original_pil_array, alpha=0.4) # Use numpy array here
-    ax.imshow(combined_heatmap, cmap='hot', alpha=0.6)
-    ax.set_title("9. Combined Suspicion Heatmap")
-    ax.axis('off')
-    save_plot(fig, "09_combined_heatmap.png")
-    
-    # 10. Frequency Analysis
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_frequency_visualization(ax, analysis_results)
-    ax.set_title(f"10. Frequency Analysis (Inconsistency: {analysis_results.get('frequency_analysis',{}).get('frequency_inconsistency',0):.3f})")
-    save_plot(fig, "10_frequency_analysis.png")
-    
-    # 11. Texture Analysis
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_texture_visualization(ax, analysis_results)
-    ax.set_title(f"11. Texture Analysis (Inconsistency: {analysis_results.get('texture_analysis',{}).get('overall_inconsistency',0):.3f})")
-    save_plot(fig, "11_texture_analysis.png")
-    
-    # 12. Statistical Analysis
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_statistical_visualization(ax, analysis_results)
-    ax.set_title(f"12. Statistical Analysis (Overall Entropy: {analysis_results.get('statistical_analysis',{}).get('overall_entropy',0):.3f})")
-    save_plot(fig, "12_statistical_analysis.png")
-    
-    # 13. JPEG Quality Response
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_quality_response_plot(ax, analysis_results)
-    ax.set_title(f"13. JPEG Quality Response (Est. Q: {analysis_results.get('jpeg_analysis',{}).get('basic_analysis',{}).get('estimated_original_quality', 'N/A')})")
-    save_plot(fig, "13_jpeg_quality_response.png")
-    
-    # 14. Noise Map
-    if noise_map_data is not None and noise_map_data.ndim == 2:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(noise_map_data, cmap='gray')
-        ax.set_title(f"14. Noise Map (Overall Inconsistency: {analysis_results.get('noise_analysis',{}).get('overall_inconsistency',0):.3f})")
-        ax.axis('off')
-        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04) # Add colorbar
-        save_plot(fig, "14_noise_map.png")
-    else:
-        print("  Skipped 14_noise_map.png (Noise map data not available)")
-    
-    # 15. DCT Coefficients Visualization (Simulated as no direct "dct_coefficients_map" is stored)
-    fig, ax = plt.subplots(figsize=(10, 8))
-    # You might want to save a real DCT magnitude if computed in frequency_analysis
-    # For now, simulate if a real DCT visual output isn't explicitly saved from frequency_analysis
-    # This will need specific `frequency_analysis` output to generate something meaningful
-    # (e.g., if a 2D DCT array is directly available or can be recreated from stats)
-    # As it's mostly "statistical analysis" in that section now, simple random image to fill.
-    ax.imshow(np.random.rand(128, 128) * (analysis_results.get('frequency_analysis',{}).get('dct_stats',{}).get('high_freq_energy', 1)), cmap='viridis')
-    ax.set_title("15. DCT Coefficient Visualization (Simulated)", fontsize=12)
-    ax.axis('off')
-    save_plot(fig, "15_dct_coefficients.png")
-
-
-    # 16. System Validation
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 8))
-    populate_validation_visuals(ax1, ax2) # This now lives in visualization.py
-    save_plot(fig, "16_system_validation.png")
-
-    # 17. Final Classification Report
-    fig, ax = plt.subplots(figsize=(10, 8))
-    create_summary_report(ax, analysis_results)
-    ax.set_title("17. Final Classification Report", fontsize=14, y=1.05)
-    save_plot(fig, "17_final_classification.png")
+    # Figures come from the artifact store, so ones already rendered (e.g. for the DOCX) are reused
+    if store is None:
+        store = ArtifactStore(original_pil, analysis_results)
+    store.write_process_images(output_dir)
 
     # Create README file
     readme_path = os.path.join(output_dir, "README.txt")
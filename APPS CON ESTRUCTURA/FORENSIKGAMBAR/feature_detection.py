@@ -2,8 +2,12 @@
 Feature detection and matching functions
 """
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
+from PIL import Image
 try:
     from sklearn.preprocessing import normalize as sk_normalize
     SKLEARN_AVAILABLE = True
@@ -15,10 +19,69 @@ except Exception:
         return arr / denom
 from config import *
 
-def extract_multi_detector_features(image_pil, ela_image_pil, ela_mean, ela_stddev, sift_nfeatures=SIFT_FEATURES):
-    """Extract features using multiple detectors (SIFT, ORB, SURF)"""
-    ela_np = np.array(ela_image_pil)
-    
+# OpenCV detector objects are reused per thread instead of being created for every image
+_detector_cache = threading.local()
+_DETECTOR_FACTORIES = {
+    'sift': lambda **params: cv2.SIFT_create(**params),
+    'orb': lambda **params: cv2.ORB_create(**params),
+    'akaze': lambda **params: cv2.AKAZE_create(**params),
+    'clahe': lambda **params: cv2.createCLAHE(**params),
+}
+
+
+def get_cached_detector(kind, **params):
+    """Return a detector ('sift', 'orb', 'akaze', 'clahe') with ``params``, created once per thread."""
+    cache = getattr(_detector_cache, 'detectors', None)
+    if cache is None:
+        cache = _detector_cache.detectors = {}
+    key = (kind, tuple(sorted(params.items())))
+    detector = cache.get(key)
+    if detector is None:
+        detector = cache[key] = _DETECTOR_FACTORIES[kind](**params)
+    return detector
+
+
+def warm_up_detectors(sift_nfeatures=SIFT_FEATURES):
+    """Create the detectors used by extract_multi_detector_features ahead of time (e.g. in worker processes)."""
+    get_cached_detector('clahe', clipLimit=2.0, tileGridSize=(8, 8))
+    for nfeat, contrast_thresh, edge_thresh in _sift_parameter_combinations(sift_nfeatures):
+        get_cached_detector('sift', nfeatures=nfeat, contrastThreshold=contrast_thresh, edgeThreshold=edge_thresh)
+    get_cached_detector('sift', nfeatures=sift_nfeatures, contrastThreshold=SIFT_CONTRAST_THRESHOLD * 0.3,
+                        edgeThreshold=SIFT_EDGE_THRESHOLD)
+    get_cached_detector('orb', nfeatures=ORB_FEATURES, scaleFactor=ORB_SCALE_FACTOR, nlevels=ORB_LEVELS)
+    try:
+        get_cached_detector('akaze')
+    except Exception:
+        pass
+
+
+def _sift_parameter_combinations(sift_nfeatures):
+    return [
+        (sift_nfeatures, SIFT_CONTRAST_THRESHOLD, SIFT_EDGE_THRESHOLD),  # Default
+        (sift_nfeatures * 2, SIFT_CONTRAST_THRESHOLD * 0.5, SIFT_EDGE_THRESHOLD),  # More features, lower contrast threshold
+        (sift_nfeatures, SIFT_CONTRAST_THRESHOLD, SIFT_EDGE_THRESHOLD * 2),  # Higher edge threshold
+    ]
+
+
+# ======================= Shared feature pyramid =======================
+# Every scale of the image is resized, converted to CLAHE-enhanced gray and given its ELA ROI mask
+# once; the detectors then run concurrently in a thread pool (OpenCV releases the GIL while detecting).
+
+_feature_pool = None
+_feature_pool_pid = None
+
+
+def get_feature_pool():
+    """Thread pool shared by the feature detectors (recreated after a fork, e.g. in stage worker processes)."""
+    global _feature_pool, _feature_pool_pid
+    if _feature_pool is None or _feature_pool_pid != os.getpid():
+        _feature_pool = ThreadPoolExecutor(max_workers=FEATURE_THREADS, thread_name_prefix='features')
+        _feature_pool_pid = os.getpid()
+    return _feature_pool
+
+
+def compute_roi_mask(ela_np, ela_mean, ela_stddev):
+    """ELA region-of-interest mask (uint8, 0/255) used to restrict the detectors."""
     # Adaptive thresholding with multiple methods
     thresholds = [
         ela_mean + 1.2 * ela_stddev,  # Standard threshold
@@ -29,104 +92,180 @@ def extract_multi_detector_features(image_pil, ela_image_pil, ela_mean, ela_stdd
     # Try multiple thresholds and select the one that gives reasonable ROI size
     best_roi_mask = None
     best_roi_pixels = 0
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
     
     for thresh_val in thresholds:
         thresh_val = max(min(thresh_val, 200), 20)  # Clamp between 20-200
         temp_mask = (ela_np > thresh_val).astype(np.uint8) * 255
         
         # Apply morphological operations
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
         temp_mask = cv2.morphologyEx(temp_mask, cv2.MORPH_CLOSE, kernel)
         temp_mask = cv2.morphologyEx(temp_mask, cv2.MORPH_OPEN, kernel)
         
-        roi_pixels = np.sum(temp_mask > 0)
-        total_pixels = temp_mask.size
-        roi_percentage = roi_pixels / total_pixels
+        roi_pixels = np.count_nonzero(temp_mask)
+        roi_percentage = roi_pixels / temp_mask.size
         
         # Prefer masks that cover 10-40% of image
         if 0.1 <= roi_percentage <= 0.4 and roi_pixels > best_roi_pixels:
             best_roi_mask = temp_mask
             best_roi_pixels = roi_pixels
     
-    # Fallback to original method if no good mask found
-    if best_roi_mask is None:
-        threshold = ela_mean + 1.5 * ela_stddev
-        threshold = max(min(threshold, 180), 30)
-        roi_mask = (ela_np > threshold).astype(np.uint8) * 255
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
-        roi_mask = cv2.morphologyEx(roi_mask, cv2.MORPH_CLOSE, kernel)
-        roi_mask = cv2.morphologyEx(roi_mask, cv2.MORPH_OPEN, kernel)
-    else:
-        roi_mask = best_roi_mask
-    
-    # Convert to grayscale with enhancement
-    original_image_np = np.array(image_pil.convert('RGB'))
-    gray_original = cv2.cvtColor(original_image_np, cv2.COLOR_RGB2GRAY)
-    
-    # Multiple enhancement techniques
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    gray_enhanced = clahe.apply(gray_original)
-    
-    # Extract features using multiple detectors
-    feature_sets = {}
+    if best_roi_mask is not None:
+        return best_roi_mask
     
-    # 1. SIFT with multiple parameter attempts
+    # Fallback to original method if no good mask found
+    threshold = ela_mean + 1.5 * ela_stddev
+    threshold = max(min(threshold, 180), 30)
+    roi_mask = (ela_np > threshold).astype(np.uint8) * 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+    roi_mask = cv2.morphologyEx(roi_mask, cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(roi_mask, cv2.MORPH_OPEN, kernel)
+
+
+class PyramidLevel:
+    """One scale of a FeaturePyramid: resized image and ELA, gray planes and the ELA ROI mask."""
+
+    def __init__(self, image_pil, ela_image_pil, scale, ela_stats=None):
+        self.scale = scale
+        width, height = image_pil.size
+        self.size = (int(width * scale), int(height * scale))
+        if self.size == image_pil.size:
+            self.image, self.ela = image_pil, ela_image_pil
+        else:
+            self.image = image_pil.resize(self.size, Image.LANCZOS)
+            self.ela = ela_image_pil.resize(self.size, Image.LANCZOS)
+        self.ela_np = np.array(self.ela)
+        if ela_stats is None:
+            ela_stats = (np.mean(self.ela_np), np.std(self.ela_np))
+        self.ela_mean, self.ela_std = ela_stats
+        self.rgb = np.array(self.image.convert('RGB'))
+        self.gray = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+        clahe = get_cached_detector('clahe', clipLimit=2.0, tileGridSize=(8, 8))
+        self.gray_enhanced = clahe.apply(self.gray)
+        self.roi_mask = compute_roi_mask(self.ela_np, self.ela_mean, self.ela_std)
+
+    @property
+    def ela_gray(self):
+        """Single-channel ELA plane (as used by analyze_image_characteristics)."""
+        if self.ela_np.ndim == 3:
+            return cv2.cvtColor(self.ela_np, cv2.COLOR_RGB2GRAY)
+        return self.ela_np
+
+
+class FeaturePyramid:
+    """
+    Image/ELA pair at several scales, each level built once and shared by all detectors.
+
+    ``ela_stats`` (mean, std) overrides the ELA statistics of the scale-1.0 level, e.g. the
+    values of the ELA stage; other levels use the statistics of their resized ELA.
+    """
+
+    def __init__(self, image_pil, ela_image_pil, ela_stats=None):
+        self.image = image_pil
+        self.ela_image = ela_image_pil
+        self.ela_stats = ela_stats
+        self._levels = {}
+
+    def level(self, scale):
+        """PyramidLevel for ``scale``, built on first use."""
+        level = self._levels.get(scale)
+        if level is None:
+            ela_stats = self.ela_stats if scale == 1.0 else None
+            level = self._levels[scale] = PyramidLevel(self.image, self.ela_image, scale, ela_stats)
+        return level
+
+    def build(self, scales, executor=None):
+        """Build several levels concurrently; returns {scale: level or exception}."""
+        executor = executor or get_feature_pool()
+        jobs = {scale: executor.submit(self.level, scale) for scale in scales if scale not in self._levels}
+        levels = {}
+        for scale in scales:
+            try:
+                levels[scale] = jobs[scale].result() if scale in jobs else self._levels[scale]
+            except Exception as e:
+                levels[scale] = e
+        return levels
+
+
+def _run_sift(gray, roi_mask, nfeatures, contrast_threshold, edge_threshold):
+    try:
+        sift = get_cached_detector('sift', nfeatures=nfeatures,
+                                   contrastThreshold=contrast_threshold,
+                                   edgeThreshold=edge_threshold)
+        return sift.detectAndCompute(gray, mask=roi_mask)
+    except Exception:
+        return None
+
+
+def _run_orb(gray, roi_mask):
+    orb = get_cached_detector('orb', nfeatures=ORB_FEATURES,
+                              scaleFactor=ORB_SCALE_FACTOR,
+                              nlevels=ORB_LEVELS)
+    return orb.detectAndCompute(gray, mask=roi_mask)
+
+
+def _run_akaze(gray, roi_mask):
+    try:
+        akaze = get_cached_detector('akaze')
+        return akaze.detectAndCompute(gray, mask=roi_mask)
+    except Exception:
+        return ([], None)
+
+
+def submit_level_detectors(level, sift_nfeatures=SIFT_FEATURES, executor=None):
+    """Queue SIFT (every parameter combination), ORB and AKAZE on ``level``; returns the futures."""
+    executor = executor or get_feature_pool()
+    gray, roi_mask = level.gray_enhanced, level.roi_mask
+    return {
+        'sift': [executor.submit(_run_sift, gray, roi_mask, *params)
+                 for params in _sift_parameter_combinations(sift_nfeatures)],
+        'orb': executor.submit(_run_orb, gray, roi_mask),
+        'akaze': executor.submit(_run_akaze, gray, roi_mask),
+    }
+
+
+def collect_level_features(level, jobs, sift_nfeatures=SIFT_FEATURES):
+    """Feature sets of ``level`` from the futures of submit_level_detectors."""
+    # SIFT: keep the parameter combination with the most keypoints (first one wins ties)
     sift_kps = []
     sift_descs = None
-    
-    # Try multiple parameter combinations for better feature detection
-    param_combinations = [
-        (sift_nfeatures, SIFT_CONTRAST_THRESHOLD, SIFT_EDGE_THRESHOLD),  # Default
-        (sift_nfeatures * 2, SIFT_CONTRAST_THRESHOLD * 0.5, SIFT_EDGE_THRESHOLD),  # More features, lower contrast threshold
-        (sift_nfeatures, SIFT_CONTRAST_THRESHOLD, SIFT_EDGE_THRESHOLD * 2),  # Higher edge threshold
-    ]
-    
-    for nfeat, contrast_thresh, edge_thresh in param_combinations:
-        try:
-            sift = cv2.SIFT_create(nfeatures=nfeat, 
-                                  contrastThreshold=contrast_thresh, 
-                                  edgeThreshold=edge_thresh)
-            kp, desc = sift.detectAndCompute(gray_enhanced, mask=roi_mask)
+    for job in jobs['sift']:
+        result = job.result()
+        if result is not None:
+            kp, desc = result
             if desc is not None and len(kp) > len(sift_kps):
                 sift_kps = kp
                 sift_descs = desc
-        except Exception:
-            continue
     
     # If no features found with mask, try without mask
     if len(sift_kps) < 10:
-        try:
-            sift = cv2.SIFT_create(nfeatures=sift_nfeatures, 
-                                  contrastThreshold=SIFT_CONTRAST_THRESHOLD * 0.3, 
-                                  edgeThreshold=SIFT_EDGE_THRESHOLD)
-            kp, desc = sift.detectAndCompute(gray_enhanced, None)
+        result = _run_sift(level.gray_enhanced, None, sift_nfeatures,
+                           SIFT_CONTRAST_THRESHOLD * 0.3, SIFT_EDGE_THRESHOLD)
+        if result is not None:
+            kp, desc = result
             if desc is not None and len(kp) > len(sift_kps):
                 sift_kps = kp
                 sift_descs = desc
-        except Exception:
-            pass
-    
-    feature_sets['sift'] = (sift_kps, sift_descs)
     
-    # 2. ORB
-    orb = cv2.ORB_create(nfeatures=ORB_FEATURES, 
-                        scaleFactor=ORB_SCALE_FACTOR, 
-                        nlevels=ORB_LEVELS)
-    kp_orb, desc_orb = orb.detectAndCompute(gray_enhanced, mask=roi_mask)
-    feature_sets['orb'] = (kp_orb, desc_orb)
-    
-    # 3. AKAZE
-    try:
-        akaze = cv2.AKAZE_create()
-        kp_akaze, desc_akaze = akaze.detectAndCompute(gray_enhanced, mask=roi_mask)
-        feature_sets['akaze'] = (kp_akaze, desc_akaze)
-    except:
-        feature_sets['akaze'] = ([], None)
-    
-    return feature_sets, roi_mask, gray_enhanced
+    return {
+        'sift': (sift_kps, sift_descs),
+        'orb': jobs['orb'].result(),
+        'akaze': jobs['akaze'].result(),
+    }
+
 
+def extract_multi_detector_features(image_pil, ela_image_pil, ela_mean, ela_stddev, sift_nfeatures=SIFT_FEATURES,
+                                    pyramid=None):
+    """Extract features using multiple detectors (SIFT, ORB, AKAZE)"""
+    if pyramid is None:
+        pyramid = FeaturePyramid(image_pil, ela_image_pil, ela_stats=(ela_mean, ela_stddev))
+    level = pyramid.level(1.0)
+    feature_sets = collect_level_features(level, submit_level_detectors(level, sift_nfeatures), sift_nfeatures)
+    return feature_sets, level.roi_mask, level.gray_enhanced
 
-def extract_multi_scale_features(image_pil, ela_image_pil, ela_mean, ela_stddev, scales=[1.0, 0.8, 1.2]):
+
+def extract_multi_scale_features(image_pil, ela_image_pil, ela_mean, ela_stddev, scales=[1.0, 0.8, 1.2],
+                                 pyramid=None):
     """
     Extract features at multiple scales for robust copy-move detection
     
@@ -136,36 +275,35 @@ def extract_multi_scale_features(image_pil, ela_image_pil, ela_mean, ela_stddev,
         ela_mean: Mean ELA value
         ela_stddev: Standard deviation of ELA values
         scales: List of scale factors to apply
+        pyramid: FeaturePyramid to reuse (levels already built are not recomputed)
     
     Returns:
         Dictionary containing multi-scale feature sets
     """
     multi_scale_features = {}
     original_size = image_pil.size
+    if pyramid is None:
+        # Every level (scale 1.0 included) uses the statistics of its own ELA plane
+        pyramid = FeaturePyramid(image_pil, ela_image_pil)
+    
+    # Skip scales where the resulting image is too small
+    scales = [scale for scale in scales
+              if int(original_size[0] * scale) >= 200 and int(original_size[1] * scale) >= 200]
+    
+    # All levels and all detectors of all levels are queued before any result is collected
+    levels = pyramid.build(scales)
+    jobs = {}
+    for scale in scales:
+        if isinstance(levels[scale], Exception):
+            continue
+        jobs[scale] = submit_level_detectors(levels[scale])
     
     for scale in scales:
         try:
-            # Calculate new dimensions
-            new_width = int(original_size[0] * scale)
-            new_height = int(original_size[1] * scale)
-            
-            # Skip if resulting image is too small
-            if new_width < 200 or new_height < 200:
-                continue
-                
-            # Resize images
-            scaled_image = image_pil.resize((new_width, new_height), Image.LANCZOS)
-            scaled_ela = ela_image_pil.resize((new_width, new_height), Image.LANCZOS)
-            
-            # Adjust ELA statistics for scaled image
-            scaled_ela_array = np.array(scaled_ela)
-            scaled_ela_mean = np.mean(scaled_ela_array)
-            scaled_ela_std = np.std(scaled_ela_array)
-            
-            # Extract features at this scale
-            feature_sets, roi_mask, gray_enhanced = extract_multi_detector_features(
-                scaled_image, scaled_ela, scaled_ela_mean, scaled_ela_std
-            )
+            level = levels[scale]
+            if isinstance(level, Exception):
+                raise level
+            feature_sets = collect_level_features(level, jobs[scale])
             
             # Scale keypoints back to original image coordinates
             for detector_name, (keypoints, descriptors) in feature_sets.items():
@@ -188,9 +326,9 @@ def extract_multi_scale_features(image_pil, ela_image_pil, ela_mean, ela_stddev,
             
             multi_scale_features[f'scale_{scale}'] = {
                 'features': feature_sets,
-                'roi_mask': roi_mask,
+                'roi_mask': level.roi_mask,
                 'scale_factor': scale,
-                'image_size': (new_width, new_height)
+                'image_size': level.size
             }
             
         except Exception as e:
@@ -200,32 +338,38 @@ def extract_multi_scale_features(image_pil, ela_image_pil, ela_mean, ela_stddev,
     return multi_scale_features
 
 
-def optimize_detection_parameters(image_pil, ela_image_pil):
+def optimize_detection_parameters(image_pil, ela_image_pil, pyramid=None):
     """
     Optimize detection parameters based on image characteristics
     
     Args:
         image_pil: PIL Image object
         ela_image_pil: ELA processed image
+        pyramid: FeaturePyramid whose scale-1.0 level (RGB, gray, ELA planes) is reused
     
     Returns:
         Dictionary containing optimized parameters
     """
     try:
-        # Convert images to numpy arrays
-        image_np = np.array(image_pil.convert('RGB'))
-        ela_np = np.array(ela_image_pil)
-        
-        if len(ela_np.shape) == 3:
-            ela_gray = cv2.cvtColor(ela_np, cv2.COLOR_RGB2GRAY)
+        if pyramid is not None:
+            level = pyramid.level(1.0)
+            image_np, ela_gray, gray_image = level.rgb, level.ela_gray, level.gray
         else:
-            ela_gray = ela_np
+            # Convert images to numpy arrays
+            image_np = np.array(image_pil.convert('RGB'))
+            ela_np = np.array(ela_image_pil)
+            
+            if len(ela_np.shape) == 3:
+                ela_gray = cv2.cvtColor(ela_np, cv2.COLOR_RGB2GRAY)
+            else:
+                ela_gray = ela_np
+            gray_image = None
         
         height, width = ela_gray.shape
         image_size = width * height
         
         # 1. Analyze image characteristics
-        characteristics = analyze_image_characteristics(image_np, ela_gray)
+        characteristics = analyze_image_characteristics(image_np, ela_gray, gray_image=gray_image)
         
         # 2. Optimize SIFT parameters
         sift_params = optimize_sift_parameters(characteristics, image_size)
@@ -253,9 +397,11 @@ def optimize_detection_parameters(image_pil, ela_image_pil):
         return get_default_parameters()
 
 
-def analyze_image_characteristics(image_np, ela_gray):
+def analyze_image_characteristics(image_np, ela_gray, gray_image=None):
     """
     Analyze image characteristics to guide parameter optimization
+    
+    ``gray_image`` is the grayscale of ``image_np`` when the caller already has it.
     """
     height, width = ela_gray.shape
     
@@ -269,7 +415,8 @@ def analyze_image_characteristics(image_np, ela_gray):
         size_category = 'large'
     
     # Texture analysis
-    gray_image = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+    if gray_image is None:
+        gray_image = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
     
     # Calculate local standard deviation (texture measure)
     kernel = np.ones((9, 9), np.float32) / 81
@@ -812,6 +959,101 @@ def validate_geometric_consistency(matches, keypoints, transform_info, image_sha
         'quality_retention': len(quality_filtered_matches) / max(len(matches), 1)
     }
 
+# ======================= Self-matching engine =======================
+# Copy-move matching compares one descriptor set with itself. The k-NN index is
+# built once, queried once, and the ratio test, cross-check and spatial filters
+# run on the resulting (N, k) neighbor arrays.
+
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_LSH = 6
+
+
+class SelfMatches:
+    """k nearest neighbors of every descriptor within its own set."""
+
+    def __init__(self, indices, distances):
+        self.indices = indices        # (N, k) int, -1 for empty slots
+        self.distances = distances    # (N, k) float, inf for empty slots
+        n = len(indices)
+        # Neighbors other than the descriptor itself, in distance order
+        valid = (indices != np.arange(n)[:, None]) & (indices >= 0)
+        order = np.argsort(~valid, axis=1, kind='stable')
+        self.other_indices = np.take_along_axis(indices, order, axis=1)
+        self.other_distances = np.take_along_axis(distances, order, axis=1)
+        self.other_count = valid.sum(axis=1)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def reverse_distance(self, query_idx, train_idx):
+        """Distance at which ``query_idx`` appears among the neighbors of ``train_idx`` (nan if absent)."""
+        rows = self.indices[train_idx]
+        hit = rows == query_idx[:, None]
+        found = hit.any(axis=1)
+        distance = np.where(found, self.distances[train_idx, hit.argmax(axis=1)], np.nan)
+        return found, distance
+
+
+def self_knn(descriptors, k, binary=False, trees=8, checks=100, exact_max=BINARY_EXACT_KNN_MAX):
+    """
+    One k-NN query of ``descriptors`` against themselves.
+
+    Float descriptors use a FLANN KD-tree forest (L2 distances, as ``FlannBasedMatcher``
+    reports them). Binary descriptors (ORB/AKAZE) use Hamming distances: sets of up to
+    ``exact_max`` descriptors are searched exactly (same neighbors as ``BFMatcher``),
+    larger ones with an LSH index, which misses a small share of the neighbors.
+    """
+    k = min(k, len(descriptors))
+    if binary:
+        descriptors = np.ascontiguousarray(descriptors, dtype=np.uint8)
+        if len(descriptors) <= exact_max:
+            distances, indices = cv2.batchDistance(descriptors, descriptors, cv2.CV_32S,
+                                                   normType=cv2.NORM_HAMMING, K=k)
+            distances = distances.astype(np.float64)
+            distances[indices < 0] = np.inf
+            return SelfMatches(indices.astype(np.int64), distances)
+        # 12 tables with multi-probe level 2 keep ~99.8% of the exact ORB matches (6 tables, level 1: 63-96%)
+        index_params = dict(algorithm=FLANN_INDEX_LSH, table_number=12, key_size=12, multi_probe_level=2)
+        checks = max(checks, 200)
+    else:
+        descriptors = np.ascontiguousarray(descriptors, dtype=np.float32)
+        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=trees)
+    index = cv2.flann_Index(descriptors, index_params)
+    indices, distances = index.knnSearch(descriptors, k, params=dict(checks=checks))
+    distances = distances.astype(np.float64)
+    if not binary:
+        distances = np.sqrt(distances)  # flann_Index returns squared L2
+    empty = indices < 0
+    distances[empty] = np.inf
+    return SelfMatches(indices.astype(np.int64), distances)
+
+
+def keypoint_arrays(keypoints):
+    """Positions (N, 2), sizes and angles of a keypoint list as arrays."""
+    if not len(keypoints):
+        return np.zeros((0, 2)), np.zeros(0), np.zeros(0)
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float64)
+    sizes = np.array([kp.size for kp in keypoints], dtype=np.float64)
+    angles = np.array([kp.angle for kp in keypoints], dtype=np.float64)
+    return points, sizes, angles
+
+
+def unique_pair_mask(query_idx, train_idx):
+    """True for the first occurrence of every unordered pair (i, j) == (j, i)."""
+    if len(query_idx) == 0:
+        return np.zeros(0, dtype=bool)
+    low, high = np.minimum(query_idx, train_idx), np.maximum(query_idx, train_idx)
+    keys = low * (int(high.max()) + 1) + high
+    _, first = np.unique(keys, return_index=True)
+    keep = np.zeros(len(keys), dtype=bool)
+    keep[first] = True
+    return keep
+
+
+def to_dmatches(query_idx, train_idx, distances):
+    return [cv2.DMatch(int(i), int(j), 0, float(d)) for i, j, d in zip(query_idx, train_idx, distances)]
+
+
 def match_sift_features(keypoints, descriptors, ratio_thresh, min_distance, ransac_thresh, min_inliers):
     """Enhanced SIFT matching with robust cross-checking and geometric validation"""
     # Handle empty descriptors
@@ -820,60 +1062,39 @@ def match_sift_features(keypoints, descriptors, ratio_thresh, min_distance, rans
         
     descriptors_norm = sk_normalize(descriptors, norm='l2', axis=1)
     
-    # FLANN matcher with optimized parameters
-    FLANN_INDEX_KDTREE = 1
-    index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=8)  # More trees for better accuracy
-    search_params = dict(checks=100)  # More checks for better matching
-    flann = cv2.FlannBasedMatcher(index_params, search_params)
+    # FLANN KD-tree (8 trees, 100 checks); one query serves the forward and the backward (cross) check
+    knn = self_knn(descriptors_norm, k=8)
+    points, sizes, angles = keypoint_arrays(keypoints)
     
-    # Forward and backward matching for cross-checking
-    matches_forward = flann.knnMatch(descriptors_norm, descriptors_norm, k=min(8, len(descriptors)))
-    matches_backward = flann.knnMatch(descriptors_norm, descriptors_norm, k=min(8, len(descriptors)))
+    # Lowe's ratio test on the two best non-self neighbors, with adaptive threshold - diperbaiki untuk matching yang lebih baik
+    adaptive_ratio = ratio_thresh * (1.0 + 0.05 * np.log(len(descriptors) / 800.0)) if len(descriptors) > 800 else ratio_thresh * 0.9  # Threshold lebih ketat
+    query_idx = np.nonzero(knn.other_count >= 2)[0]
+    train_idx = knn.other_indices[query_idx, 0]
+    best_dist = knn.other_distances[query_idx, 0]
+    keep = best_dist < adaptive_ratio * knn.other_distances[query_idx, 1]
     
-    # Apply Lowe's ratio test and cross-checking
-    good_matches = []
-    match_pairs = []
-    unique_pairs = set()
+    # Cross-checking: the query must also be among the neighbors of its match
+    found, back_dist = knn.reverse_distance(query_idx, train_idx)
+    keep &= found & (np.nan_to_num(back_dist) < adaptive_ratio * np.nan_to_num(back_dist) * 2)
     
-    for i, match_list in enumerate(matches_forward):
-        if len(match_list) < 2:
-            continue
-            
-        # Find valid non-self matches
-        valid_matches = [m for m in match_list if m.queryIdx != m.trainIdx]
-        
-        if len(valid_matches) >= 2:
-            m, n = valid_matches[0], valid_matches[1]
-            
-            # Lowe's ratio test with adaptive threshold - diperbaiki untuk matching yang lebih baik
-            adaptive_ratio = ratio_thresh * (1.0 + 0.05 * np.log(len(descriptors) / 800.0)) if len(descriptors) > 800 else ratio_thresh * 0.9  # Threshold lebih ketat
-            
-            if m.distance < adaptive_ratio * n.distance:
-                # Cross-checking: verify backward match
-                backward_matches = [bm for bm in matches_backward[m.trainIdx] if bm.trainIdx == i]
-                
-                if backward_matches and backward_matches[0].distance < adaptive_ratio * (backward_matches[1].distance if len(backward_matches) > 1 else backward_matches[0].distance * 2):
-                    # Spatial distance validation
-                    pt1 = keypoints[i].pt
-                    pt2 = keypoints[m.trainIdx].pt
-                    spatial_dist = np.sqrt((pt1[0] - pt2[0])**2 + (pt1[1] - pt2[1])**2)
-                    
-                    # Scale consistency check - diperbaiki untuk toleransi yang lebih baik
-                    scale_ratio = keypoints[i].size / (keypoints[m.trainIdx].size + 1e-6)
-                    scale_consistent = 0.4 <= scale_ratio <= 2.5  # Range diperluas dari 0.5-2.0 ke 0.4-2.5
-                    
-                    # Orientation consistency check - diperbaiki untuk toleransi yang lebih baik
-                    angle_diff = abs(keypoints[i].angle - keypoints[m.trainIdx].angle)
-                    angle_diff = min(angle_diff, 360 - angle_diff)  # Handle circular nature
-                    orientation_consistent = angle_diff < 60  # Diperluas dari 45 ke 60 derajat
-                    
-                    if (spatial_dist > min_distance and scale_consistent and orientation_consistent):
-                        # Avoid duplicate pairs
-                        pair = tuple(sorted([i, m.trainIdx]))
-                        if pair not in unique_pairs:
-                            unique_pairs.add(pair)
-                            good_matches.append(m)
-                            match_pairs.append((i, m.trainIdx))
+    # Spatial distance validation
+    spatial_dist = np.linalg.norm(points[query_idx] - points[train_idx], axis=1)
+    keep &= spatial_dist > min_distance
+    
+    # Scale consistency check - diperbaiki untuk toleransi yang lebih baik (0.4-2.5)
+    scale_ratio = sizes[query_idx] / (sizes[train_idx] + 1e-6)
+    keep &= (scale_ratio >= 0.4) & (scale_ratio <= 2.5)
+    
+    # Orientation consistency check (< 60 derajat, sudut melingkar)
+    angle_diff = np.abs(angles[query_idx] - angles[train_idx])
+    keep &= np.minimum(angle_diff, 360 - angle_diff) < 60
+    
+    # Avoid duplicate pairs
+    query_idx, train_idx, best_dist = query_idx[keep], train_idx[keep], best_dist[keep]
+    unique = unique_pair_mask(query_idx, train_idx)
+    query_idx, train_idx, best_dist = query_idx[unique], train_idx[unique], best_dist[unique]
+    good_matches = to_dmatches(query_idx, train_idx, best_dist)
+    match_pairs = list(zip(query_idx.tolist(), train_idx.tolist()))
     
     if len(match_pairs) < min_inliers:
         return good_matches, 0, None
@@ -940,23 +1161,9 @@ def match_sift_features(keypoints, descriptors, ratio_thresh, min_distance, rans
 
 def match_orb_features(keypoints, descriptors, min_distance, ransac_thresh, min_inliers):
     """ORB feature matching"""
-    # Hamming distance matcher for ORB
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-    matches = bf.knnMatch(descriptors, descriptors, k=6)
-    
-    good_matches = []
-    match_pairs = []
-    
-    for i, match_list in enumerate(matches):
-        for m in match_list[1:]:  # Skip self-match
-            pt1 = keypoints[i].pt
-            pt2 = keypoints[m.trainIdx].pt
-            
-            spatial_dist = np.sqrt((pt1[0] - pt2[0])**2 + (pt1[1] - pt2[1])**2)
-            
-            if spatial_dist > min_distance and m.distance < 80:  # Hamming distance threshold
-                good_matches.append(m)
-                match_pairs.append((i, m.trainIdx))
+    if descriptors is None or len(descriptors) < 2:
+        return [], 0, None
+    good_matches, match_pairs = _match_binary_features(keypoints, descriptors, min_distance, 80)  # Hamming distance threshold
     
     if len(match_pairs) < min_inliers:
         return good_matches, 0, None
@@ -966,26 +1173,21 @@ def match_orb_features(keypoints, descriptors, min_distance, ransac_thresh, min_
 
 def match_akaze_features(keypoints, descriptors, min_distance, ransac_thresh, min_inliers):
     """AKAZE feature matching"""
-    if descriptors is None:
+    if descriptors is None or len(descriptors) < 2:
         return [], 0, None
-    
-    # Hamming distance for AKAZE
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-    matches = bf.knnMatch(descriptors, descriptors, k=6)
-    
-    good_matches = []
-    match_pairs = []
-    
-    for i, match_list in enumerate(matches):
-        if len(match_list) > 1:
-            for m in match_list[1:]:  # Skip self-match
-                pt1 = keypoints[i].pt
-                pt2 = keypoints[m.trainIdx].pt
-                
-                spatial_dist = np.sqrt((pt1[0] - pt2[0])**2 + (pt1[1] - pt2[1])**2)
-                
-                if spatial_dist > min_distance and m.distance < 100:
-                    good_matches.append(m)
-                    match_pairs.append((i, m.trainIdx))
-    
-    return good_matches, len(match_pairs), ('akaze_matches', None)
\ No newline at end of file
+    good_matches, match_pairs = _match_binary_features(keypoints, descriptors, min_distance, 100)
+    return good_matches, len(match_pairs), ('akaze_matches', None)
+
+def _match_binary_features(keypoints, descriptors, min_distance, max_hamming):
+    """All non-self Hamming neighbors (k=6) closer than ``max_hamming`` and farther apart than ``min_distance``."""
+    knn = self_knn(descriptors, k=6, binary=True)
+    points = keypoint_arrays(keypoints)[0]
+    width = knn.other_indices.shape[1]
+    slots = np.arange(width)[None, :] < knn.other_count[:, None]
+    train_idx = np.where(slots, knn.other_indices, 0)
+    spatial_dist = np.linalg.norm(points[:, None, :] - points[train_idx], axis=2)
+    keep = slots & (spatial_dist > min_distance) & (knn.other_distances < max_hamming)
+    query_idx, slot = np.nonzero(keep)
+    train_idx = train_idx[query_idx, slot]
+    good_matches = to_dmatches(query_idx, train_idx, knn.other_distances[query_idx, slot])
+    return good_matches, list(zip(query_idx.tolist(), train_idx.tolist()))
@@ -0,0 +1,335 @@
+"""
+Columnar feature table of analyzed images
+
+One row per analyzed image, one float64 column per scalar the classifiers
+read (FEATURE_COLUMNS). Missing entries are NaN, so every consumer applies
+its own default (``prepare_feature_vector`` and ``UncertaintyClassifier``
+do not always agree, e.g. a missing ``rg_correlation`` is 0 for one and 1
+for the other). With such a table, ``classification.classify_manipulation_batch``
+re-scores a whole archive in one vectorized pass and ``threshold_sweep``
+grid-searches DETECTION_THRESHOLD/CONFIDENCE_THRESHOLD without re-running
+the pipeline.
+
+Tables are built from previous runs (the ``features`` of batch JSONL
+summaries, ``--bundle`` result files, or ``main.py --feature-table``) and
+saved as one uncompressed ``.npz``.
+
+Usage:
+    python feature_table.py build table.npz --summary results/batch_summary.jsonl
+    python feature_table.py score table.npz --csv scores.csv
+    python feature_table.py sweep table.npz --labels labels.csv --detection 40:80:5 --confidence 50:90:5
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from collections.abc import Mapping
+
+import numpy as np
+
+# (column, description); the first 28 columns are the vector of prepare_feature_vector, in order
+FEATURE_COLUMNS = (
+    ('ela_mean', 'ELA mean'),
+    ('ela_std', 'ELA standard deviation'),
+    ('ela_mean_variance', 'ELA regional mean variance'),
+    ('ela_regional_inconsistency', 'ELA regional inconsistency'),
+    ('ela_outlier_regions', 'ELA outlier regions'),
+    ('ela_suspicious_regions', 'Number of ELA suspicious regions'),
+    ('sift_matches', 'SIFT matches'),
+    ('ransac_inliers', 'RANSAC inliers'),
+    ('geometric_transform', '1 if a geometric transform was estimated'),
+    ('block_matches', 'Number of block matches'),
+    ('noise_inconsistency', 'Noise overall inconsistency'),
+    ('jpeg_ghost_ratio', 'JPEG ghost suspicious ratio'),
+    ('jpeg_response_variance', 'JPEG response variance'),
+    ('jpeg_double_compression', 'JPEG double compression indicator'),
+    ('frequency_inconsistency', 'Frequency inconsistency'),
+    ('dct_freq_ratio', 'DCT frequency ratio'),
+    ('texture_inconsistency', 'Texture overall inconsistency'),
+    ('edge_inconsistency', 'Edge inconsistency'),
+    ('illumination_inconsistency', 'Illumination overall inconsistency'),
+    ('R_entropy', 'Red channel entropy'),
+    ('G_entropy', 'Green channel entropy'),
+    ('B_entropy', 'Blue channel entropy'),
+    ('rg_correlation', 'R/G correlation'),
+    ('overall_entropy', 'Overall entropy'),
+    ('metadata_authenticity_score', 'Metadata authenticity score'),
+    ('tampering_percentage', 'Localized tampering percentage'),
+    ('kmeans_cluster_count', 'Number of K-means clusters'),
+    ('kmeans_max_cluster_ela', 'Highest K-means cluster ELA mean'),
+    # Read by the uncertainty classifier only
+    ('rb_correlation', 'R/B correlation'),
+    ('gb_correlation', 'G/B correlation'),
+    ('metadata_inconsistency_count', 'Number of metadata inconsistencies'),
+    ('image_width', 'Image width from metadata Dimensions (0 if unknown)'),
+)
+COLUMN_NAMES = tuple(name for name, _ in FEATURE_COLUMNS)
+FEATURE_VECTOR_COLUMNS = COLUMN_NAMES[:28]
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _image_width(dimensions):
+    """Width the uncertainty classifier derives from metadata 'Dimensions' ("WxH" or (W, H))."""
+    if isinstance(dimensions, str) and 'x' in dimensions:
+        try:
+            return int(dimensions.split('x')[0])
+        except ValueError:
+            return 0
+    if isinstance(dimensions, (tuple, list)) and len(dimensions) > 0:
+        try:
+            return int(dimensions[0])
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def extract_features(analysis_results):
+    """Dict column -> float of one results dict; NaN where the value is missing."""
+    def get(mapping, key):
+        return _number(mapping[key]) if isinstance(mapping, Mapping) and key in mapping else np.nan
+
+    def section(key):
+        value = analysis_results.get(key)
+        return value if isinstance(value, Mapping) else {}
+
+    ela_regional = section('ela_regional_stats')
+    basic_jpeg = section('jpeg_analysis').get('basic_analysis', {})
+    frequency = section('frequency_analysis')
+    statistics = section('statistical_analysis')
+    metadata = section('metadata')
+    localization = section('localization_analysis')
+    cluster_ela_means = (localization.get('kmeans_localization') or {}).get('cluster_ela_means', []) or []
+    suspicious_regions = ela_regional.get('suspicious_regions')
+    block_matches = analysis_results.get('block_matches')
+    inconsistencies = metadata.get('Metadata_Inconsistency')
+
+    row = {
+        'ela_mean': get(analysis_results, 'ela_mean'),
+        'ela_std': get(analysis_results, 'ela_std'),
+        'ela_mean_variance': get(ela_regional, 'mean_variance'),
+        'ela_regional_inconsistency': get(ela_regional, 'regional_inconsistency'),
+        'ela_outlier_regions': get(ela_regional, 'outlier_regions'),
+        'ela_suspicious_regions': float(len(suspicious_regions)) if suspicious_regions is not None else np.nan,
+        'sift_matches': get(analysis_results, 'sift_matches'),
+        'ransac_inliers': get(analysis_results, 'ransac_inliers'),
+        'geometric_transform': 1.0 if analysis_results.get('geometric_transform') is not None else 0.0,
+        'block_matches': float(len(block_matches)) if block_matches is not None else np.nan,
+        'noise_inconsistency': get(section('noise_analysis'), 'overall_inconsistency'),
+        'jpeg_ghost_ratio': get(analysis_results, 'jpeg_ghost_suspicious_ratio'),
+        'jpeg_response_variance': get(basic_jpeg, 'response_variance'),
+        'jpeg_double_compression': get(basic_jpeg, 'double_compression_indicator'),
+        'frequency_inconsistency': get(frequency, 'frequency_inconsistency'),
+        'dct_freq_ratio': get(frequency.get('dct_stats', {}), 'freq_ratio'),
+        'texture_inconsistency': get(section('texture_analysis'), 'overall_inconsistency'),
+        'edge_inconsistency': get(section('edge_analysis'), 'edge_inconsistency'),
+        'illumination_inconsistency': get(section('illumination_analysis'), 'overall_illumination_inconsistency'),
+        'R_entropy': get(statistics, 'R_entropy'),
+        'G_entropy': get(statistics, 'G_entropy'),
+        'B_entropy': get(statistics, 'B_entropy'),
+        'rg_correlation': get(statistics, 'rg_correlation'),
+        'overall_entropy': get(statistics, 'overall_entropy'),
+        'metadata_authenticity_score': get(metadata, 'Metadata_Authenticity_Score'),
+        'tampering_percentage': get(localization, 'tampering_percentage'),
+        'kmeans_cluster_count': float(len(cluster_ela_means)),
+        'kmeans_max_cluster_ela': float(max(cluster_ela_means)) if cluster_ela_means else 0.0,
+        'rb_correlation': get(statistics, 'rb_correlation'),
+        'gb_correlation': get(statistics, 'gb_correlation'),
+        'metadata_inconsistency_count': float(len(inconsistencies)) if inconsistencies is not None else np.nan,
+        'image_width': float(_image_width(metadata.get('Dimensions', (0, 0)))),
+    }
+    return row
+
+
+def features_to_json(row):
+    """JSON-safe copy of a feature row (NaN -> None)."""
+    return {name: (None if value is None or np.isnan(value) else float(value)) for name, value in row.items()}
+
+
+class FeatureTable:
+    """Feature rows of many analyzed images, stored column-wise (float64, NaN = missing)."""
+
+    def __init__(self, ids, columns):
+        self.ids = np.asarray(ids, dtype=str)
+        self.columns = {name: np.asarray(columns[name], dtype=np.float64) if name in columns
+                        else np.full(len(self.ids), np.nan) for name in COLUMN_NAMES}
+        for name, column in self.columns.items():
+            if column.shape != self.ids.shape:
+                raise ValueError(f"Column '{name}' has {len(column)} rows, expected {len(self.ids)}")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"FeatureTable({len(self)} rows, {len(self.columns)} columns)"
+
+    def column(self, name, default=None):
+        """Column ``name``; with ``default``, missing entries (NaN) are replaced by it."""
+        column = self.columns[name]
+        return column if default is None else np.where(np.isnan(column), default, column)
+
+    def feature_matrix(self):
+        """(N, 28) float32 matrix; row i equals prepare_feature_vector of image i."""
+        return np.stack([self.column(name, 0.0) for name in FEATURE_VECTOR_COLUMNS], axis=1).astype(np.float32)
+
+    # --- Construction ---
+
+    @classmethod
+    def from_rows(cls, ids, rows):
+        rows = list(rows)
+        return cls(list(ids), {name: [_number(row.get(name)) for row in rows] for name in COLUMN_NAMES})
+
+    @classmethod
+    def from_results(cls, ids, results):
+        """Table of an iterable of analysis results (dicts or AnalysisResults)."""
+        return cls.from_rows(ids, (extract_features(r) for r in results))
+
+    @classmethod
+    def from_batch_summary(cls, summary_path):
+        """Rows of the 'ok' records of a batch JSONL summary that carry ``features`` (latest record per file)."""
+        rows = {}
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('status') == 'ok' and isinstance(record.get('features'), dict):
+                    rows[record.get('path') or record.get('sha256')] = record['features']
+        return cls.from_rows(rows.keys(), rows.values())
+
+    @classmethod
+    def from_bundles(cls, bundle_paths):
+        """Table of ``*_results.npz`` bundles written by ``main.py --bundle``."""
+        from analysis_results import load_bundle
+        bundle_paths = list(bundle_paths)
+        return cls.from_results(bundle_paths, (load_bundle(path) for path in bundle_paths))
+
+    @classmethod
+    def concat(cls, tables):
+        tables = list(tables)
+        if not tables:
+            return cls([], {})
+        return cls(np.concatenate([t.ids for t in tables]),
+                   {name: np.concatenate([t.columns[name] for t in tables]) for name in COLUMN_NAMES})
+
+    # --- Persistence ---
+
+    def save(self, path):
+        """Write to an uncompressed .npz (written to a temp file, then renamed)."""
+        temp_path = f"{path}.tmp.npz"
+        np.savez(temp_path, ids=self.ids, **{f"col_{name}": column for name, column in self.columns.items()})
+        os.replace(temp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            columns = {name[len('col_'):]: npz[name] for name in npz.files if name.startswith('col_')}
+            return cls(npz['ids'], columns)
+
+
+def append_to_feature_table(path, image_id, analysis_results):
+    """Add the features of one analysis to the table at ``path`` (created if missing)."""
+    row = FeatureTable.from_results([image_id], [analysis_results])
+    table = FeatureTable.concat([FeatureTable.load(path), row]) if os.path.exists(path) else row
+    return table.save(path)
+
+
+# ======================= Command line =======================
+
+def _parse_range(text, default):
+    """'start:stop:step' (stop inclusive) or a comma-separated list."""
+    if not text:
+        return default
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(v) for v in text.split(',')])
+
+
+def _load_labels(path, ids):
+    """Ground truth from a CSV of ``id,manipulated`` (1/0); rows without a label are -1."""
+    labels = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[1].strip() in ('0', '1'):
+                labels[row[0].strip()] = int(row[1])
+    return np.array([labels.get(image_id, -1) for image_id in ids])
+
+
+def main():
+    from config import DETECTION_THRESHOLD, CONFIDENCE_THRESHOLD
+
+    parser = argparse.ArgumentParser(description='Build, re-score and threshold-sweep feature tables')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Build a table from batch summaries and/or result bundles')
+    build.add_argument('table')
+    build.add_argument('--summary', nargs='*', default=[], help='Batch JSONL summaries')
+    build.add_argument('--bundle', nargs='*', default=[], help='*_results.npz bundles')
+    score = sub.add_parser('score', help='Re-score every row with the current classifiers')
+    score.add_argument('table')
+    score.add_argument('--csv', help='Write per-image scores to this CSV file')
+    sweep = sub.add_parser('sweep', help='Grid-search the detection and confidence thresholds')
+    sweep.add_argument('table')
+    sweep.add_argument('--labels', help='CSV of id,manipulated (1/0) for precision/recall')
+    sweep.add_argument('--detection', help=f'Detection thresholds, start:stop:step or list (default: {DETECTION_THRESHOLD})')
+    sweep.add_argument('--confidence', help=f'Confidence thresholds, start:stop:step or list (default: {CONFIDENCE_THRESHOLD})')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        tables = [FeatureTable.from_batch_summary(path) for path in args.summary]
+        if args.bundle:
+            tables.append(FeatureTable.from_bundles(args.bundle))
+        table = FeatureTable.concat(tables)
+        print(f"💾 {table} → {table.save(args.table)}")
+        return
+
+    from classification import classify_manipulation_batch, threshold_sweep
+
+    table = FeatureTable.load(args.table)
+    started = time.perf_counter()
+    scores = classify_manipulation_batch(table)
+    print(f"⏱️ Scored {len(table)} images in {time.perf_counter() - started:.3f}s")
+
+    if args.command == 'score':
+        verdicts, counts = np.unique(scores['type'], return_counts=True)
+        for verdict, count in zip(verdicts, counts):
+            print(f"  {count:8d}  {verdict}")
+        if args.csv:
+            fields = ('type', 'confidence', 'copy_move_score', 'splicing_score', 'copy_move_probability',
+                      'splicing_probability', 'authentic_probability', 'uncertainty_level')
+            with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('id',) + fields)
+                for i, image_id in enumerate(table.ids):
+                    writer.writerow([image_id] + [scores[field][i] for field in fields])
+            print(f"📄 Scores written to {args.csv}")
+        return
+
+    detection = _parse_range(args.detection, np.array([DETECTION_THRESHOLD], dtype=float))
+    confidence = _parse_range(args.confidence, np.array([CONFIDENCE_THRESHOLD], dtype=float))
+    labels = _load_labels(args.labels, table.ids) if args.labels else None
+    grid = threshold_sweep(scores, detection, confidence, labels)
+    header = f"{'detection':>10} {'confidence':>11} {'flagged':>8}"
+    if labels is not None:
+        header += f" {'precision':>10} {'recall':>8} {'f1':>7}"
+    print(header)
+    for i, d in enumerate(detection):
+        for j, c in enumerate(confidence):
+            line = f"{d:10.1f} {c:11.1f} {int(grid['flagged'][i, j]):8d}"
+            if labels is not None:
+                line += f" {grid['precision'][i, j]:10.3f} {grid['recall'][i, j]:8.3f} {grid['f1'][i, j]:7.3f}"
+            print(line)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+SQLite-backed analysis history
+
+Replaces the ``analysis_history.json`` file that was read and rewritten in
+full on every save/delete. Entries live in an indexed table (timestamp,
+verdict, image name), thumbnails as JPEG blobs in a side table so listing
+pages never reads them. The database runs in WAL mode: several Streamlit
+sessions and CLI runs can read while one writes, and every write is a single
+transaction (a crash never leaves a half-written history).
+
+``migrate_json`` imports an old JSON history once (thumbnail files included)
+and renames the JSON file to ``*.migrated``.
+"""
+
+import os
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime, date, timedelta
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    image_name TEXT NOT NULL,
+    verdict TEXT NOT NULL DEFAULT 'N/A',
+    confidence TEXT,
+    processing_time TEXT,
+    summary TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_verdict ON history (verdict, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_image_name ON history (image_name);
+CREATE TABLE IF NOT EXISTS thumbnails (
+    entry_id INTEGER PRIMARY KEY REFERENCES history (id) ON DELETE CASCADE,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_ENTRY_COLUMNS = 'h.id, h.timestamp, h.image_name, h.processing_time, h.summary, t.entry_id IS NOT NULL'
+
+
+def _day_start(value):
+    """'YYYY-MM-DD 00:00:00' of a date/datetime/str."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d 00:00:00')
+    return str(value)[:10] + ' 00:00:00'
+
+
+def _read_thumbnail(thumbnail):
+    """Thumbnail bytes of a bytes object or a file path; None when unavailable."""
+    if thumbnail is None:
+        return None
+    if isinstance(thumbnail, (bytes, bytearray, memoryview)):
+        return bytes(thumbnail)
+    try:
+        with open(thumbnail, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class HistoryStore:
+    """Analysis history in one SQLite database (WAL mode, one connection per operation)."""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _write(self):
+        return _Transaction(self._connect())
+
+    # --- Writes ---
+
+    def add(self, image_name, analysis_summary, processing_time, thumbnail=None, timestamp=None):
+        """Append one entry; ``thumbnail`` is JPEG bytes or a file path. Returns the entry id."""
+        row = (image_name, analysis_summary, processing_time, _read_thumbnail(thumbnail),
+               timestamp or datetime.now().strftime(TIMESTAMP_FORMAT))
+        with self._write() as conn:
+            return self._insert_rows(conn, [row])[0]
+
+    @staticmethod
+    def _insert_rows(conn, rows):
+        ids = []
+        for image_name, summary, processing_time, thumbnail, timestamp in rows:
+            summary = summary if isinstance(summary, dict) else {}
+            cursor = conn.execute(
+                'INSERT INTO history (timestamp, image_name, verdict, confidence, processing_time, summary) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (str(timestamp), str(image_name), str(summary.get('type', 'N/A')),
+                 str(summary.get('confidence', 'N/A')), str(processing_time),
+                 json.dumps(summary, default=str)))
+            if thumbnail:
+                conn.execute('INSERT INTO thumbnails (entry_id, data) VALUES (?, ?)',
+                             (cursor.lastrowid, sqlite3.Binary(thumbnail)))
+            ids.append(cursor.lastrowid)
+        return ids
+
+    def delete(self, entry_ids):
+        """Delete entries (and their thumbnails) in one transaction; returns the number deleted."""
+        entry_ids = [int(i) for i in entry_ids]
+        if not entry_ids:
+            return 0
+        with self._write() as conn:
+            placeholders = ','.join('?' * len(entry_ids))
+            return conn.execute(f'DELETE FROM history WHERE id IN ({placeholders})', entry_ids).rowcount
+
+    def clear(self):
+        with self._write() as conn:
+            conn.execute('DELETE FROM history')
+        # Give the space of the thumbnail blobs back to the file system
+        with closing(self._connect()) as conn:
+            conn.execute('VACUUM')
+
+    # --- Reads ---
+
+    @staticmethod
+    def _where(verdict=None, date_from=None, date_to=None, search=None):
+        clauses, params = [], []
+        if verdict:
+            clauses.append('h.verdict = ?')
+            params.append(verdict)
+        if date_from:
+            clauses.append('h.timestamp >= ?')
+            params.append(_day_start(date_from))
+        if date_to:
+            # Inclusive: everything before the start of the next day
+            day = datetime.strptime(_day_start(date_to), TIMESTAMP_FORMAT) + timedelta(days=1)
+            clauses.append('h.timestamp < ?')
+            params.append(day.strftime(TIMESTAMP_FORMAT))
+        if search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("h.image_name LIKE ? ESCAPE '\\'")
+            params.append(f'%{escaped}%')
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count(self, verdict=None, date_from=None, date_to=None, search=None):
+        where, params = self._where(verdict, date_from, date_to, search)
+        with closing(self._connect()) as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM history h{where}', params).fetchone()[0]
+
+    def query(self, page=0, per_page=20, verdict=None, date_from=None, date_to=None, search=None, newest_first=True):
+        """One page of entries matching the filters (thumbnails not included, see ``thumbnail``)."""
+        where, params = self._where(verdict, date_from, date_to, search)
+        order = 'DESC' if newest_first else 'ASC'
+        sql = (f'SELECT {_ENTRY_COLUMNS} FROM history h LEFT JOIN thumbnails t ON t.entry_id = h.id{where} '
+               f'ORDER BY h.timestamp {order}, h.id {order}')
+        if per_page:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [int(per_page), max(0, int(page)) * int(per_page)]
+        with closing(self._connect()) as conn:
+            return [self._entry(row) for row in conn.execute(sql, params)]
+
+    def all(self):
+        """Every entry, oldest first (the order of the old JSON list)."""
+        return self.query(per_page=None, newest_first=False)
+
+    def verdicts(self):
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute('SELECT DISTINCT verdict FROM history ORDER BY verdict')]
+
+    def thumbnail(self, entry_id):
+        """JPEG bytes of an entry's thumbnail; None if it has none."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT data FROM thumbnails WHERE entry_id = ?', (int(entry_id),)).fetchone()
+        return bytes(row[0]) if row else None
+
+    @staticmethod
+    def _entry(row):
+        entry_id, timestamp, image_name, processing_time, summary, has_thumbnail = row
+        try:
+            summary = json.loads(summary)
+        except (TypeError, ValueError):
+            summary = {}
+        return {'id': entry_id, 'timestamp': timestamp, 'image_name': image_name,
+                'analysis_summary': summary, 'processing_time': processing_time,
+                'has_thumbnail': bool(has_thumbnail)}
+
+    # --- Migration ---
+
+    def migrate_json(self, json_path):
+        """Import an old JSON history once, then rename it to ``*.migrated``. Returns the number imported."""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            history = json.loads(content) if content.strip() else []
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Riwayat JSON '{json_path}' tidak dapat dibaca, migrasi dilewati: {e}")
+            return 0
+        if not isinstance(history, list):
+            history = []
+
+        rows = [(entry.get('image_name', 'N/A'), entry.get('analysis_summary', {}), entry.get('processing_time', 'N/A'),
+                 _read_thumbnail(entry.get('thumbnail_path')),
+                 entry.get('timestamp') or datetime.now().strftime(TIMESTAMP_FORMAT))
+                for entry in history if isinstance(entry, dict)]
+        key = 'migrated:' + os.path.abspath(json_path)
+        with self._write() as conn:
+            # Another session may have migrated the same file meanwhile
+            if conn.execute('SELECT 1 FROM meta WHERE key = ?', (key,)).fetchone():
+                return 0
+            self._insert_rows(conn, rows)
+            conn.execute('INSERT INTO meta (key, value) VALUES (?, ?)',
+                         (key, datetime.now().strftime(TIMESTAMP_FORMAT)))
+        os.replace(json_path, json_path + '.migrated')
+        print(f"📦 {len(rows)} entri riwayat dimigrasikan dari '{json_path}' ke '{self.path}'.")
+        return len(rows)
+
+
+class _Transaction:
+    """Connection context: BEGIN IMMEDIATE on enter, COMMIT/ROLLBACK and close on exit."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.conn.close()
+        return False
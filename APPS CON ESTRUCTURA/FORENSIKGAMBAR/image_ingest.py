@@ -0,0 +1,558 @@
+"""
+Single-read image ingest for the Forensic Image Analysis System
+
+``ingest_image(path)`` memory-maps the file once. Everything the early stages
+need comes from that one mapping:
+
+- the SHA-256 of the file (result cache, batch resume),
+- the container format and pixel dimensions from the header,
+- EXIF (TIFF IFDs, tag names as exifread reports them), XMP packets,
+  JPEG markers, quantization tables, frame/subsampling info and comments,
+  parsed straight from the bytes without decoding any pixels,
+- one decoded PIL image (``open_image``) that is handed to every stage.
+
+``triage_metadata`` runs the parsing part alone over a folder or manifest and
+writes one JSONL record per file, so metadata-only triage of a large folder is
+bound by disk reads, not by JPEG decoding.
+"""
+
+import io
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+import threading
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+# ======================= Tag tables =======================
+
+# Tag names of IFD0 ("Image"), the Exif IFD ("EXIF") and IFD1 ("Thumbnail"), as exifread names them
+EXIF_TAG_NAMES = {
+    0x00FE: 'NewSubfileType', 0x0100: 'ImageWidth', 0x0101: 'ImageLength', 0x0102: 'BitsPerSample',
+    0x0103: 'Compression', 0x0106: 'PhotometricInterpretation', 0x010E: 'ImageDescription',
+    0x010F: 'Make', 0x0110: 'Model', 0x0111: 'StripOffsets', 0x0112: 'Orientation',
+    0x0115: 'SamplesPerPixel', 0x0116: 'RowsPerStrip', 0x0117: 'StripByteCounts',
+    0x011A: 'XResolution', 0x011B: 'YResolution', 0x011C: 'PlanarConfiguration',
+    0x0128: 'ResolutionUnit', 0x0131: 'Software', 0x0132: 'DateTime', 0x013B: 'Artist',
+    0x013E: 'WhitePoint', 0x013F: 'PrimaryChromaticities', 0x0201: 'JPEGInterchangeFormat',
+    0x0202: 'JPEGInterchangeFormatLength', 0x0211: 'YCbCrCoefficients', 0x0213: 'YCbCrPositioning',
+    0x0214: 'ReferenceBlackWhite', 0x02BC: 'ApplicationNotes', 0x4746: 'Rating', 0x8298: 'Copyright',
+    0x829A: 'ExposureTime', 0x829D: 'FNumber', 0x83BB: 'IPTC/NAA', 0x8769: 'ExifOffset',
+    0x8773: 'InterColorProfile', 0x8822: 'ExposureProgram', 0x8824: 'SpectralSensitivity',
+    0x8825: 'GPSInfo', 0x8827: 'ISOSpeedRatings', 0x8830: 'SensitivityType',
+    0x8832: 'RecommendedExposureIndex', 0x9000: 'ExifVersion', 0x9003: 'DateTimeOriginal',
+    0x9004: 'DateTimeDigitized', 0x9010: 'OffsetTime', 0x9011: 'OffsetTimeOriginal',
+    0x9012: 'OffsetTimeDigitized', 0x9101: 'ComponentsConfiguration', 0x9102: 'CompressedBitsPerPixel',
+    0x9201: 'ShutterSpeedValue', 0x9202: 'ApertureValue', 0x9203: 'BrightnessValue',
+    0x9204: 'ExposureBiasValue', 0x9205: 'MaxApertureValue', 0x9206: 'SubjectDistance',
+    0x9207: 'MeteringMode', 0x9208: 'LightSource', 0x9209: 'Flash', 0x920A: 'FocalLength',
+    0x9214: 'SubjectArea', 0x927C: 'MakerNote', 0x9286: 'UserComment', 0x9290: 'SubSecTime',
+    0x9291: 'SubSecTimeOriginal', 0x9292: 'SubSecTimeDigitized', 0x9C9B: 'XPTitle',
+    0x9C9C: 'XPComment', 0x9C9D: 'XPAuthor', 0x9C9E: 'XPKeywords', 0x9C9F: 'XPSubject',
+    0xA000: 'FlashPixVersion', 0xA001: 'ColorSpace', 0xA002: 'ExifImageWidth',
+    0xA003: 'ExifImageLength', 0xA005: 'InteroperabilityOffset', 0xA20E: 'FocalPlaneXResolution',
+    0xA20F: 'FocalPlaneYResolution', 0xA210: 'FocalPlaneResolutionUnit', 0xA215: 'ExposureIndex',
+    0xA217: 'SensingMethod', 0xA300: 'FileSource', 0xA301: 'SceneType', 0xA302: 'CVAPattern',
+    0xA401: 'CustomRendered', 0xA402: 'ExposureMode', 0xA403: 'WhiteBalance',
+    0xA404: 'DigitalZoomRatio', 0xA405: 'FocalLengthIn35mmFilm', 0xA406: 'SceneCaptureType',
+    0xA407: 'GainControl', 0xA408: 'Contrast', 0xA409: 'Saturation', 0xA40A: 'Sharpness',
+    0xA40C: 'SubjectDistanceRange', 0xA420: 'ImageUniqueID', 0xA430: 'CameraOwnerName',
+    0xA431: 'BodySerialNumber', 0xA432: 'LensSpecification', 0xA433: 'LensMake',
+    0xA434: 'LensModel', 0xA435: 'LensSerialNumber', 0xC4A5: 'PrintIM', 0xEA1C: 'Padding',
+    0xEA1D: 'OffsetSchema',
+}
+
+GPS_TAG_NAMES = {
+    0x00: 'GPSVersionID', 0x01: 'GPSLatitudeRef', 0x02: 'GPSLatitude', 0x03: 'GPSLongitudeRef',
+    0x04: 'GPSLongitude', 0x05: 'GPSAltitudeRef', 0x06: 'GPSAltitude', 0x07: 'GPSTimeStamp',
+    0x08: 'GPSSatellites', 0x09: 'GPSStatus', 0x0A: 'GPSMeasureMode', 0x0B: 'GPSDOP',
+    0x0C: 'GPSSpeedRef', 0x0D: 'GPSSpeed', 0x0E: 'GPSTrackRef', 0x0F: 'GPSTrack',
+    0x10: 'GPSImgDirectionRef', 0x11: 'GPSImgDirection', 0x12: 'GPSMapDatum',
+    0x13: 'GPSDestLatitudeRef', 0x14: 'GPSDestLatitude', 0x15: 'GPSDestLongitudeRef',
+    0x16: 'GPSDestLongitude', 0x17: 'GPSDestBearingRef', 0x18: 'GPSDestBearing',
+    0x19: 'GPSDestDistanceRef', 0x1A: 'GPSDestDistance', 0x1B: 'GPSProcessingMethod',
+    0x1C: 'GPSAreaInformation', 0x1D: 'GPSDate', 0x1E: 'GPSDifferential',
+}
+
+INTEROP_TAG_NAMES = {
+    0x0001: 'InteroperabilityIndex', 0x0002: 'InteroperabilityVersion',
+    0x1000: 'RelatedImageFileFormat', 0x1001: 'RelatedImageWidth', 0x1002: 'RelatedImageLength',
+}
+
+# Printable values of enumerated tags
+EXIF_VALUE_NAMES = {
+    'Orientation': {1: 'Horizontal (normal)', 2: 'Mirrored horizontal', 3: 'Rotated 180',
+                    4: 'Mirrored vertical', 5: 'Mirrored horizontal then rotated 90 CCW',
+                    6: 'Rotated 90 CW', 7: 'Mirrored horizontal then rotated 90 CW', 8: 'Rotated 90 CCW'},
+    'Compression': {1: 'Uncompressed', 5: 'LZW', 6: 'JPEG (Old-Style)', 7: 'JPEG', 8: 'Adobe Deflate',
+                    32773: 'PackBits'},
+    'ResolutionUnit': {1: 'Not Absolute', 2: 'Pixels/Inch', 3: 'Pixels/Centimeter'},
+    'ColorSpace': {1: 'sRGB', 2: 'Adobe RGB', 65535: 'Uncalibrated'},
+    'WhiteBalance': {0: 'Auto', 1: 'Manual'},
+    'ExposureMode': {0: 'Auto Exposure', 1: 'Manual Exposure', 2: 'Auto Bracket'},
+    'Flash': {0: 'Flash did not fire', 1: 'Flash fired', 16: 'Flash did not fire, compulsory flash mode',
+              24: 'Flash did not fire, auto mode', 25: 'Flash fired, auto mode'},
+}
+
+# (struct code, size in bytes) of the TIFF field types
+_TIFF_TYPES = {1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('L', 4), 5: ('L', 8), 6: ('b', 1), 7: ('s', 1),
+               8: ('h', 2), 9: ('l', 4), 10: ('l', 8), 11: ('f', 4), 12: ('d', 8), 13: ('L', 4)}
+_MAX_IFD_ENTRIES = 1024
+
+# Natural (row-major) index of each coefficient in JPEG zigzag order
+JPEG_ZIGZAG = (0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5, 12, 19, 26, 33, 40, 48, 41, 34, 27, 20,
+               13, 6, 7, 14, 21, 28, 35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51, 58, 59,
+               52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63)
+
+# IJG standard luminance quantization table (natural order, quality 50)
+STANDARD_LUMINANCE_TABLE = (16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+                            14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+                            18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+                            49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99)
+
+_XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PROGRESSIVE_SOF = {0xC2, 0xC6, 0xCA, 0xCE}
+
+
+# ======================= Format sniffing =======================
+
+def sniff_format(header):
+    """Container format of a file from its first bytes; None if not a supported image."""
+    if header[:3] == b'\xff\xd8\xff':
+        return 'JPEG'
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'PNG'
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'TIFF'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    if header[:2] == b'BM':
+        return 'BMP'
+    return None
+
+
+# ======================= EXIF (TIFF IFDs) =======================
+
+def _render_value(name, field_type, values):
+    """Printable value of an IFD entry, in the form exifread prints it."""
+    if field_type == 2:
+        return values.split(b'\x00', 1)[0].decode('utf-8', 'replace').strip()
+    if field_type == 7:
+        if len(values) <= 16 and all(32 <= c < 127 for c in values.rstrip(b'\x00')):
+            return values.rstrip(b'\x00').decode('ascii')
+        return f'[{len(values)} bytes]'
+    if len(values) == 1 and name in EXIF_VALUE_NAMES:
+        return EXIF_VALUE_NAMES[name].get(values[0], str(values[0]))
+    rendered = [str(v) for v in values[:16]]
+    if len(values) == 1:
+        return rendered[0]
+    return '[' + ', '.join(rendered) + (', ...' if len(values) > 16 else '') + ']'
+
+
+def _read_entry(data, base, offset, endian, field_type, count):
+    """Values of one IFD entry (bytes for ASCII/UNDEFINED, a list otherwise); None when out of bounds."""
+    code, size = _TIFF_TYPES[field_type]
+    total = size * count
+    if total <= 4:
+        start = offset + 8
+    else:
+        start = base + struct.unpack_from(endian + 'L', data, offset + 8)[0]
+    if start + total > len(data) or count > 1 << 20:
+        return None
+    if code == 's':
+        return bytes(data[start:start + total])
+    if field_type in (5, 10):
+        pairs = struct.unpack_from(f'{endian}{2 * count}{code}', data, start)
+        return [Fraction(n, d) if d else f'{n}/0' for n, d in zip(pairs[::2], pairs[1::2])]
+    return list(struct.unpack_from(f'{endian}{count}{code}', data, start))
+
+
+def parse_tiff_tags(data, base=0, end=None):
+    """
+    exifread-style tags (``'Image Make'``, ``'EXIF DateTimeOriginal'``, ``'GPS GPSLatitude'``, ...)
+    of the TIFF structure at ``data[base:end]`` (an EXIF payload or a whole TIFF file).
+    Values are printable strings. Malformed IFDs are skipped, never raised.
+    """
+    if end is not None:
+        data = memoryview(data)[:end]
+    tags = {}
+    try:
+        byte_order = bytes(data[base:base + 2])
+        endian = {b'II': '<', b'MM': '>'}.get(byte_order)
+        if endian is None:
+            return tags
+        ifd0 = struct.unpack_from(endian + 'L', data, base + 4)[0]
+    except struct.error:
+        return tags
+
+    pending = [(ifd0, 'Image', EXIF_TAG_NAMES)]
+    visited = set()
+    while pending:
+        ifd_offset, prefix, names = pending.pop(0)
+        position = base + ifd_offset
+        if ifd_offset == 0 or position in visited or position + 2 > len(data):
+            continue
+        visited.add(position)
+        try:
+            n_entries = min(struct.unpack_from(endian + 'H', data, position)[0], _MAX_IFD_ENTRIES)
+            for k in range(n_entries):
+                entry = position + 2 + 12 * k
+                if entry + 12 > len(data):
+                    break
+                tag, field_type, count = struct.unpack_from(endian + 'HHL', data, entry)
+                if field_type not in _TIFF_TYPES:
+                    continue
+                name = names.get(tag, f'Tag 0x{tag:04X}')
+                values = _read_entry(data, base, entry, endian, field_type, count)
+                if values is None:
+                    continue
+                tags[f'{prefix} {name}'] = _render_value(name, field_type, values)
+                # Sub-IFDs
+                if prefix in ('Image', 'Thumbnail') and tag == 0x8769 and values:
+                    pending.append((values[0], 'EXIF', EXIF_TAG_NAMES))
+                elif prefix in ('Image', 'Thumbnail') and tag == 0x8825 and values:
+                    pending.append((values[0], 'GPS', GPS_TAG_NAMES))
+                elif prefix == 'EXIF' and tag == 0xA005 and values:
+                    pending.append((values[0], 'Interoperability', INTEROP_TAG_NAMES))
+            if prefix == 'Image':
+                # IFD1 (thumbnail) follows IFD0
+                next_offset = position + 2 + 12 * n_entries
+                if next_offset + 4 <= len(data):
+                    pending.append((struct.unpack_from(endian + 'L', data, next_offset)[0], 'Thumbnail', EXIF_TAG_NAMES))
+        except struct.error:
+            continue
+    return tags
+
+
+# ======================= XMP =======================
+
+def parse_xmp(packet):
+    """CreatorTool and history software agents of an XMP packet (str)."""
+    fields = {}
+    creator = re.search(r'xmp:CreatorTool(?:="([^"]*)"|>([^<]*)<)', packet)
+    if creator:
+        fields['XMP CreatorTool'] = (creator.group(1) or creator.group(2) or '').strip()
+    agents = []
+    for match in re.finditer(r'stEvt:softwareAgent(?:="([^"]*)"|>([^<]*)<)', packet):
+        agent = (match.group(1) or match.group(2) or '').strip()
+        if agent and agent not in agents:
+            agents.append(agent)
+    if agents:
+        fields['XMP HistorySoftwareAgent'] = ', '.join(agents)
+    return fields
+
+
+# ======================= JPEG markers =======================
+
+def estimate_jpeg_quality(luminance_table):
+    """IJG quality (1-100) that produces a luminance quantization table (natural order)."""
+    scale = 100.0 * sum(q / s for q, s in zip(luminance_table, STANDARD_LUMINANCE_TABLE)) / 64
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return int(min(100, max(1, round(quality))))
+
+
+def parse_jpeg_markers(data):
+    """
+    Marker segments of a JPEG up to the first scan, plus trailing bytes after EOI.
+
+    Returns a dict with the marker list, quantization tables (natural order), frame
+    info, comments and the offsets of the EXIF/XMP/ICC/Photoshop payloads.
+    """
+    info = {'markers': [], 'quantization_tables': {}, 'frame': None, 'comments': [],
+            'exif': None, 'xmp': [], 'icc_profile': False, 'photoshop_irb': False, 'adobe': False,
+            'jfif': None, 'trailing_bytes': 0}
+    position, size = 2, len(data)
+    while position + 4 <= size:
+        if data[position] != 0xFF:
+            break  # Not at a marker: corrupt header
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1  # Fill byte
+            continue
+        if marker == 0xD9 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            info['markers'].append((f'0xFF{marker:02X}', position, 0))
+            position += 2
+            continue
+        length = struct.unpack_from('>H', data, position + 2)[0]
+        start, stop = position + 4, min(size, position + 2 + length)
+        info['markers'].append((f'0xFF{marker:02X}', position, length))
+
+        if marker == 0xDB:
+            offset = start
+            while offset < stop:
+                precision, table_id = data[offset] >> 4, data[offset] & 0x0F
+                n_bytes = 128 if precision else 64
+                if offset + 1 + n_bytes > stop:
+                    break
+                zigzag = struct.unpack_from('>64H' if precision else '64B', data, offset + 1)
+                natural = [0] * 64
+                for k, value in enumerate(zigzag):
+                    natural[JPEG_ZIGZAG[k]] = value
+                info['quantization_tables'][table_id] = natural
+                offset += 1 + n_bytes
+        elif marker in _SOF_MARKERS and stop - start >= 6:
+            precision, height, width, n_components = struct.unpack_from('>BHHB', data, start)
+            components = []
+            for k in range(n_components):
+                if start + 6 + 3 * k + 3 > stop:
+                    break
+                component_id, sampling, table_id = struct.unpack_from('>BBB', data, start + 6 + 3 * k)
+                components.append({'id': component_id, 'h': sampling >> 4, 'v': sampling & 0x0F,
+                                   'quantization_table': table_id})
+            info['frame'] = {'marker': f'0xFF{marker:02X}', 'precision': precision, 'width': width,
+                             'height': height, 'components': components,
+                             'progressive': marker in _PROGRESSIVE_SOF}
+        elif marker == 0xE0 and bytes(data[start:start + 5]) == b'JFIF\x00' and stop - start >= 7:
+            info['jfif'] = f'{data[start + 5]}.{data[start + 6]:02d}'
+        elif marker == 0xE1 and bytes(data[start:start + 6]) == b'Exif\x00\x00' and info['exif'] is None:
+            info['exif'] = (start + 6, stop)
+        elif marker == 0xE1 and bytes(data[start:start + len(_XMP_HEADER)]) == _XMP_HEADER:
+            info['xmp'].append((start + len(_XMP_HEADER), stop))
+        elif marker == 0xE2 and bytes(data[start:start + 12]) == b'ICC_PROFILE\x00':
+            info['icc_profile'] = True
+        elif marker == 0xED and bytes(data[start:start + 14]) == b'Photoshop 3.0\x00':
+            info['photoshop_irb'] = True
+        elif marker == 0xEE and bytes(data[start:start + 5]) == b'Adobe':
+            info['adobe'] = True
+        elif marker == 0xFE:
+            info['comments'].append(bytes(data[start:stop]).decode('utf-8', 'replace').strip('\x00 '))
+        elif marker == 0xDA:
+            break  # Entropy-coded data follows; all header segments are known
+        position += 2 + length
+
+    # Bytes appended after the last EOI (e.g. hidden payloads or concatenated files)
+    end_of_image = data.rfind(b'\xff\xd9')
+    if end_of_image >= 0:
+        info['trailing_bytes'] = size - end_of_image - 2
+    return info
+
+
+def jpeg_subsampling(frame):
+    """Chroma subsampling label ('4:4:4', '4:2:2', '4:2:0', ...) of a JPEG frame."""
+    components = frame.get('components') or []
+    if len(components) < 3:
+        return 'grayscale' if components else 'unknown'
+    h, v = components[0]['h'], components[0]['v']
+    if components[1]['h'] != components[2]['h'] or components[1]['v'] != components[2]['v']:
+        return 'irregular'
+    ratio = (h // max(components[1]['h'], 1), v // max(components[1]['v'], 1))
+    return {(1, 1): '4:4:4', (2, 1): '4:2:2', (2, 2): '4:2:0', (1, 2): '4:4:0', (4, 1): '4:1:1'}.get(ratio, f'{h}x{v}')
+
+
+# ======================= Other containers =======================
+
+def _png_chunks(data):
+    """(type, data start, data stop) of the chunks of a PNG; only chunk headers are read."""
+    position = 8
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack_from('>L4s', data, position)
+        start = position + 8
+        yield chunk_type, start, min(len(data), start + length)
+        if chunk_type == b'IEND':
+            break
+        position = start + length + 4
+
+
+def _riff_chunks(data):
+    position = 12
+    while position + 8 <= len(data):
+        chunk_type, length = struct.unpack_from('<4sL', data, position)
+        start = position + 8
+        yield chunk_type, start, min(len(data), start + length)
+        position = start + length + (length & 1)
+
+
+# ======================= Ingested image =======================
+
+class IngestedImage:
+    """One image file, read once through a memory map; metadata parsed lazily from the bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size else b''
+        except (OSError, ValueError):
+            self.data = self._file.read()
+        self.format = sniff_format(bytes(self.data[:16]))
+        self._memo = {}
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Release the memory map (a decoded image stays usable)."""
+        if isinstance(self.data, mmap.mmap) and not self.data.closed:
+            self.data.close()
+        if not self._file.closed:
+            self._file.close()
+
+    def _memoize(self, key, factory):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = factory()
+            return self._memo[key]
+
+    @property
+    def sha256(self):
+        return self._memoize('sha256', lambda: hashlib.sha256(self.data).hexdigest())
+
+    @property
+    def jpeg(self):
+        """Parsed JPEG header segments (see ``parse_jpeg_markers``); None for other formats."""
+        if self.format != 'JPEG':
+            return None
+        return self._memoize('jpeg', lambda: parse_jpeg_markers(self.data))
+
+    @property
+    def exif_tags(self):
+        """exifread-style EXIF tags parsed from the bytes (no pixel decoding)."""
+        return self._memoize('exif_tags', self._parse_exif)
+
+    def _parse_exif(self):
+        if self.format == 'JPEG':
+            payload = self.jpeg['exif']
+            return parse_tiff_tags(self.data, payload[0], payload[1]) if payload else {}
+        if self.format == 'TIFF':
+            return parse_tiff_tags(self.data)
+        chunks = _png_chunks(self.data) if self.format == 'PNG' else _riff_chunks(self.data) if self.format == 'WEBP' else ()
+        for chunk_type, start, stop in chunks:
+            if chunk_type in (b'eXIf', b'EXIF'):
+                if bytes(self.data[start:start + 6]) == b'Exif\x00\x00':
+                    start += 6
+                return parse_tiff_tags(self.data, start, stop)
+        return {}
+
+    @property
+    def xmp(self):
+        """Fields of the XMP packet(s) (CreatorTool, history software agents)."""
+        return self._memoize('xmp', self._parse_xmp)
+
+    def _parse_xmp(self):
+        packets = []
+        if self.format == 'JPEG':
+            packets = [bytes(self.data[start:stop]) for start, stop in self.jpeg['xmp']]
+        elif self.format in ('PNG', 'WEBP'):
+            chunks = _png_chunks(self.data) if self.format == 'PNG' else _riff_chunks(self.data)
+            for chunk_type, start, stop in chunks:
+                if chunk_type == b'iTXt' and bytes(self.data[start:start + 18]) == b'XML:com.adobe.xmp\x00':
+                    packets.append(bytes(self.data[start + 18:stop]))
+                elif chunk_type == b'XMP ':
+                    packets.append(bytes(self.data[start:stop]))
+        fields = {}
+        for packet in packets:
+            fields.update(parse_xmp(packet.decode('utf-8', 'replace')))
+        return fields
+
+    @property
+    def dimensions(self):
+        """(width, height) from the file header, or None when the header does not say."""
+        return self._memoize('dimensions', self._parse_dimensions)
+
+    def _parse_dimensions(self):
+        data = self.data
+        try:
+            if self.format == 'JPEG' and self.jpeg['frame']:
+                return self.jpeg['frame']['width'], self.jpeg['frame']['height']
+            if self.format == 'PNG':
+                return struct.unpack_from('>LL', data, 16)
+            if self.format == 'BMP':
+                width, height = struct.unpack_from('<ll', data, 18)
+                return width, abs(height)
+            if self.format == 'WEBP':
+                for chunk_type, start, stop in _riff_chunks(data):
+                    if chunk_type == b'VP8X':
+                        return (int.from_bytes(data[start + 4:start + 7], 'little') + 1,
+                                int.from_bytes(data[start + 7:start + 10], 'little') + 1)
+                    if chunk_type == b'VP8 ':
+                        width, height = struct.unpack_from('<HH', data, start + 6)
+                        return width & 0x3FFF, height & 0x3FFF
+                    if chunk_type == b'VP8L':
+                        bits = int.from_bytes(data[start + 1:start + 5], 'little')
+                        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if self.format == 'TIFF':
+                tags = self.exif_tags
+                return int(tags['Image ImageWidth']), int(tags['Image ImageLength'])
+        except (struct.error, KeyError, ValueError):
+            pass
+        return None
+
+    def format_metadata(self):
+        """Container/JPEG entries for the metadata report (strings, like the EXIF entries)."""
+        metadata = {'File Format': self.format or 'unknown'}
+        jpeg = self.jpeg
+        if jpeg is not None:
+            if 0 in jpeg['quantization_tables']:
+                metadata['JPEG Quality Estimate'] = str(estimate_jpeg_quality(jpeg['quantization_tables'][0]))
+            metadata['JPEG Quantization Tables'] = str(len(jpeg['quantization_tables']))
+            if jpeg['frame']:
+                metadata['JPEG Subsampling'] = jpeg_subsampling(jpeg['frame'])
+                metadata['JPEG Progressive'] = str(jpeg['frame']['progressive'])
+            if jpeg['comments']:
+                metadata['JPEG Comment'] = ' | '.join(jpeg['comments'])
+            if jpeg['photoshop_irb']:
+                metadata['JPEG Photoshop IRB'] = 'present'
+            if jpeg['trailing_bytes'] > 0:
+                metadata['JPEG Trailing Bytes'] = str(jpeg['trailing_bytes'])
+        return metadata
+
+    def open_image(self):
+        """The decoded image (decoded once, from the mapped bytes, and shared by all callers)."""
+        def _decode():
+            from PIL import Image
+            source = self.data if isinstance(self.data, mmap.mmap) else io.BytesIO(self.data)
+            image = Image.open(source)
+            image.load()
+            return image
+        return self._memoize('image', _decode)
+
+
+def ingest_image(path):
+    """Memory-map ``path`` once; see ``IngestedImage``."""
+    return IngestedImage(path)
+
+
+# ======================= Metadata-only triage =======================
+
+def triage_record(path, hash_file=True):
+    """JSONL record with the metadata of one file; pixels are never decoded."""
+    from validation import extract_enhanced_metadata
+    record = {'path': path}
+    try:
+        with ingest_image(path) as ingested:
+            if hash_file:
+                record['sha256'] = ingested.sha256
+            record['format'] = ingested.format
+            record['dimensions'] = list(ingested.dimensions) if ingested.dimensions else None
+            record['metadata'] = extract_enhanced_metadata(path, ingested=ingested)
+            record['status'] = 'ok' if ingested.format else 'invalid'
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e)
+    return record
+
+
+def triage_metadata(paths, summary_path, workers=None, hash_files=True):
+    """
+    Write one metadata record per image of ``paths`` to ``summary_path`` (JSONL).
+    Files are read by a thread pool; returns the number of records per status.
+    """
+    workers = max(1, workers or min(8, os.cpu_count() or 1))
+    folder = os.path.dirname(os.path.abspath(summary_path))
+    os.makedirs(folder, exist_ok=True)
+    counts = {}
+    with open(summary_path, 'w', encoding='utf-8') as summary, ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in pool.map(lambda path: triage_record(path, hash_files), paths):
+            summary.write(json.dumps(record, default=str) + '\n')
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+    return counts
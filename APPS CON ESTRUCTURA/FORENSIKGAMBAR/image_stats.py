@@ -0,0 +1,221 @@
+"""
+Shared image statistics plane for the block-wise consistency analyses
+
+``ImageStatsPlane`` wraps one image and builds, on first use, the maps the
+noise, edge, illumination, statistical and TruFor analyses used to recompute
+each on their own: grayscale, LAB and its L channel (illumination), Sobel
+gradient magnitudes, the combined edge-strength map, Canny edges, the
+Laplacian and 256-bin histograms. For every map it keeps a summed-area table
+of the values and of the squared values (``cv2.integral2``), so the mean,
+variance or Canny edge density of any rectangle is an O(1) lookup, whatever
+the block size.
+
+Maps are memoized, so one plane handed to several analyses computes each map
+once. Pickling keeps only the image: a plane sent to a worker process rebuilds
+just the maps its stage asks for.
+"""
+
+import threading
+
+import numpy as np
+import cv2
+
+try:
+    from skimage.filters import sobel, prewitt, roberts
+    SKIMAGE_AVAILABLE = True
+except Exception:
+    SKIMAGE_AVAILABLE = False
+
+
+def _sobel_magnitude(channel):
+    """Gradient magnitude of a 2D map (3x3 Sobel, float64); zeros for maps smaller than the kernel."""
+    if channel.shape[0] < 3 or channel.shape[1] < 3:
+        return np.zeros(channel.shape, dtype=np.float32)
+    try:
+        grad_x = cv2.Sobel(channel, cv2.CV_64F, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(channel, cv2.CV_64F, 0, 1, ksize=3)
+    except Exception as sobel_err:
+        print(f"  Warning: Sobel operation failed: {sobel_err}")
+        # Manual gradient calculation fallback
+        kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
+        kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
+        grad_x = cv2.filter2D(channel.astype(np.float64), -1, kernel_x)
+        grad_y = cv2.filter2D(channel.astype(np.float64), -1, kernel_y)
+    return np.sqrt(grad_x**2 + grad_y**2)
+
+
+def _edge_strength(plane):
+    """Mean of the Sobel, Prewitt and Roberts responses (Sobel only without skimage), scaled to 0-255."""
+    gray = plane.gray
+    combined_edges = None
+    if SKIMAGE_AVAILABLE:
+        try:
+            gray_float = gray.astype(np.float32)
+            combined_edges = (sobel(gray_float) + prewitt(gray_float) + roberts(gray_float)) / 3
+        except Exception:
+            combined_edges = None  # Fall back to the OpenCV Sobel magnitude
+    if combined_edges is None:
+        combined_edges = plane.get_map('gray_gradient')
+    if np.max(combined_edges) > 0:
+        combined_edges = (combined_edges / np.max(combined_edges)) * 255
+    return combined_edges
+
+
+# Builders of the named 2D/3D maps; every map can be queried by block
+_MAP_BUILDERS = {
+    'rgb': lambda plane: np.array(plane.image),
+    'gray': lambda plane: cv2.cvtColor(plane.rgb, cv2.COLOR_RGB2GRAY),
+    'lab': lambda plane: cv2.cvtColor(plane.rgb, cv2.COLOR_RGB2LAB),
+    'illumination': lambda plane: np.ascontiguousarray(plane.lab[:, :, 0]),
+    'gray_gradient': lambda plane: _sobel_magnitude(plane.gray),
+    'illumination_gradient': lambda plane: _sobel_magnitude(plane.illumination),
+    'edge_strength': _edge_strength,
+    'canny': lambda plane: cv2.Canny(plane.gray, 50, 150),
+    'laplacian': lambda plane: np.abs(cv2.Laplacian(plane.gray, cv2.CV_64F)),
+}
+
+
+class ImageStatsPlane:
+    """Per-image maps, summed-area tables and histograms, computed once and queried by block."""
+
+    def __init__(self, image_pil):
+        if image_pil.mode != 'RGB':
+            image_pil = image_pil.convert('RGB')
+        self.image = image_pil
+        self._memo = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        return {'image': self.image}
+
+    def __setstate__(self, state):
+        self.__init__(state['image'])
+
+    def _memoize(self, key, factory):
+        with self._lock:
+            if key not in self._memo:
+                value = factory()
+                if isinstance(value, np.ndarray):
+                    value.setflags(write=False)
+                self._memo[key] = value
+            return self._memo[key]
+
+    @property
+    def shape(self):
+        """(height, width) of the image."""
+        return self.image.size[::-1]
+
+    @property
+    def rgb(self):
+        return self.get_map('rgb')
+
+    @property
+    def gray(self):
+        return self.get_map('gray')
+
+    @property
+    def lab(self):
+        return self.get_map('lab')
+
+    @property
+    def illumination(self):
+        """L channel of LAB."""
+        return self.get_map('illumination')
+
+    @property
+    def canny(self):
+        return self.get_map('canny')
+
+    def get_map(self, name):
+        """Named map (see ``_MAP_BUILDERS``), read-only."""
+        if name not in _MAP_BUILDERS:
+            raise KeyError(f"Unknown statistics map '{name}'")
+        return self._memoize(name, lambda: _MAP_BUILDERS[name](self))
+
+    def integral(self, name):
+        """Summed-area tables (sum, squared sum) of a map, (h+1, w+1[, c]) float64."""
+        def _build():
+            sums, squared_sums = cv2.integral2(self.get_map(name), sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            sums.setflags(write=False)
+            squared_sums.setflags(write=False)
+            return sums, squared_sums
+        return self._memoize(('integral', name), _build)
+
+    def histogram(self, name):
+        """256-bin histogram of a uint8 map; (channels, 256) for multi-channel maps."""
+        def _build():
+            values = self.get_map(name)
+            if values.ndim == 2:
+                return np.bincount(values.ravel(), minlength=256)
+            return np.stack([np.bincount(values[:, :, i].ravel(), minlength=256) for i in range(values.shape[2])])
+        return self._memoize(('histogram', name), _build)
+
+    # --- Block queries (scalars or arrays of corners, end-exclusive) ---
+
+    def block_sum(self, name, y0, y1, x0, x1, squared=False):
+        table = self.integral(name)[1 if squared else 0]
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def block_mean(self, name, y0, y1, x0, x1):
+        area = _block_area(y0, y1, x0, x1, self.get_map(name).ndim)
+        return self.block_sum(name, y0, y1, x0, x1) / area
+
+    def block_var(self, name, y0, y1, x0, x1):
+        area = _block_area(y0, y1, x0, x1, self.get_map(name).ndim)
+        mean = self.block_sum(name, y0, y1, x0, x1) / area
+        return np.maximum(self.block_sum(name, y0, y1, x0, x1, squared=True) / area - mean**2, 0.0)
+
+    def block_std(self, name, y0, y1, x0, x1):
+        return np.sqrt(self.block_var(name, y0, y1, x0, x1))
+
+    def edge_density(self, y0, y1, x0, x1):
+        """Fraction of Canny edge pixels in a block."""
+        return self.block_mean('canny', y0, y1, x0, x1) / 255.0
+
+    def block_grid(self, block_size):
+        """
+        Corners (y0, y1, x0, x1) of the analyses' block tiling in row-major order:
+        full blocks only, one clipped block per axis when the image is smaller than a block.
+        """
+        h, w = self.shape
+        blocks_h = max(1, h // block_size)
+        blocks_w = max(1, w // block_size)
+        y0 = np.repeat(np.arange(blocks_h) * block_size, blocks_w)
+        x0 = np.tile(np.arange(blocks_w) * block_size, blocks_h)
+        return y0, np.minimum(y0 + block_size, h), x0, np.minimum(x0 + block_size, w)
+
+
+def _block_area(y0, y1, x0, x1, ndim):
+    area = (np.asarray(y1) - y0) * (np.asarray(x1) - x0)
+    return area[..., None] if ndim == 3 else area
+
+
+def histogram_moments(histogram):
+    """Mean, std, skewness and excess kurtosis of the values counted in a 256-bin histogram."""
+    n = histogram.sum()
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0.0
+    values = np.arange(len(histogram), dtype=np.float64)
+    weights = histogram / n
+    mean = float(np.dot(weights, values))
+    std = float(np.sqrt(np.dot(weights, (values - mean)**2)))
+    if std == 0:
+        return mean, 0.0, 0.0, 0.0
+    z = (values - mean) / std
+    return mean, std, float(np.dot(weights, z**3)), float(np.dot(weights, z**4) - 3)
+
+
+def histogram_entropy(histogram):
+    """Shannon entropy (bits) of the values counted in a histogram."""
+    counts = histogram[histogram > 0]
+    if counts.size == 0:
+        return 0.0
+    p = counts / counts.sum()
+    return float(-np.sum(p * np.log2(p)))
+
+
+def ensure_stats_plane(image_pil, plane=None):
+    """Return ``plane`` if given, otherwise a fresh plane for ``image_pil``."""
+    if plane is not None:
+        return plane
+    return ImageStatsPlane(image_pil)
@@ -0,0 +1,114 @@
+"""
+Import-time benchmark for FORENSIKGAMBAR
+
+Runs ``python main.py --help`` and ``import main`` in fresh interpreters,
+checks that no heavy dependency (numpy, OpenCV, scipy, scikit-learn,
+matplotlib, ...) is imported before argument parsing, and fails (exit code 1)
+when the median time to get through ``--help`` exceeds the budget. A bare
+``python -c pass`` is timed as well, so interpreter startup can be told apart
+from our own imports.
+
+Usage:
+    python import_benchmark.py                     # budget IMPORT_BUDGET_MS
+    python import_benchmark.py --budget 250 --runs 15
+    python import_benchmark.py --importtime        # also list the slowest imports of main
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from config import IMPORT_BUDGET_MS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Packages that must not be imported just to parse the command line
+HEAVY_MODULES = ('numpy', 'cv2', 'PIL', 'scipy', 'sklearn', 'skimage', 'matplotlib',
+                 'seaborn', 'pandas', 'docx', 'reportlab', 'exifread')
+
+
+def time_command(args, runs=7):
+    """Wall time in ms of ``args`` (run in this folder) for each of ``runs`` runs."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def heavy_modules_loaded(statement='import main'):
+    """HEAVY_MODULES present in ``sys.modules`` after running ``statement`` in a fresh interpreter."""
+    probe = (f"import sys, json; {statement}; "
+             f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))")
+    output = subprocess.run([sys.executable, '-c', probe], cwd=HERE, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(statement='import main', top=15):
+    """(cumulative_ms, module) of the slowest imports reported by ``python -X importtime``."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    entries = []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative) / 1000, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def run_import_benchmark(runs=7, budget_ms=IMPORT_BUDGET_MS):
+    """Timings (median/min in ms), heavy modules loaded by ``import main`` and the budget verdict."""
+    interpreter = time_command([sys.executable, '-c', 'pass'], runs)
+    import_main = time_command([sys.executable, '-c', 'import main'], runs)
+    help_run = time_command([sys.executable, 'main.py', '--help'], runs)
+    heavy = heavy_modules_loaded('import main')
+    report = {
+        'budget_ms': budget_ms,
+        'interpreter_ms': {'median': statistics.median(interpreter), 'min': min(interpreter)},
+        'import_main_ms': {'median': statistics.median(import_main), 'min': min(import_main)},
+        'help_ms': {'median': statistics.median(help_run), 'min': min(help_run)},
+        'heavy_modules': heavy,
+    }
+    report['within_budget'] = report['help_ms']['median'] <= budget_ms and not heavy
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the startup time of main.py against a budget')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS,
+                        help=f'Maximum median wall time of `python main.py --help` in ms (default: {IMPORT_BUDGET_MS})')
+    parser.add_argument('--runs', type=int, default=7, help='Fresh interpreter runs per measurement')
+    parser.add_argument('--importtime', action='store_true', help='List the slowest imports of `import main`')
+    parser.add_argument('--json', metavar='FILE', help='Also write the report as JSON')
+    args = parser.parse_args()
+
+    report = run_import_benchmark(max(1, args.runs), args.budget)
+    print(f"⏱️ python -c pass:       {report['interpreter_ms']['median']:7.1f} ms (min {report['interpreter_ms']['min']:.1f})")
+    print(f"⏱️ import main:          {report['import_main_ms']['median']:7.1f} ms (min {report['import_main_ms']['min']:.1f})")
+    print(f"⏱️ python main.py --help: {report['help_ms']['median']:7.1f} ms (min {report['help_ms']['min']:.1f}), "
+          f"budget {args.budget:.0f} ms")
+    if args.importtime:
+        print("🐢 Slowest imports of main:")
+        for cumulative_ms, name in slowest_imports():
+            print(f"  {cumulative_ms:8.1f} ms  {name}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if report['heavy_modules']:
+        print(f"❌ `import main` loads heavy modules: {', '.join(report['heavy_modules'])}")
+    if report['help_ms']['median'] > args.budget:
+        print(f"❌ Startup over budget by {report['help_ms']['median'] - args.budget:.1f} ms")
+    if not report['within_budget']:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+"""
+Local job server for the Forensic Image Analysis app
+
+A small pool of long-lived worker processes behind a job queue. Each worker
+imports the analysis modules and warms up its OpenCV detectors once, then runs
+jobs one after another, so the Streamlit process only submits jobs and polls
+their status. Several uploads can be analyzed concurrently, and a worker that
+crashes (segfault, out of memory, ...) only fails its own job: the server marks
+the job failed and starts a replacement worker.
+
+Every worker has its own pipe; the server hands a job to an idle worker, so it
+always knows which job a dead worker was running.
+"""
+
+import os
+import time
+import uuid
+import copyreg
+import threading
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait as wait_connections
+from collections import deque
+from datetime import datetime
+
+import cv2
+
+from config import JOB_SERVER_WORKERS, JOB_SERVER_TIMEOUT, JOB_SERVER_KEEP_RESULTS, JOB_SERVER_START_METHOD
+
+# Analysis results travel through a pipe; KeyPoint/DMatch are not picklable by default
+copyreg.pickle(cv2.KeyPoint, lambda kp: (cv2.KeyPoint, (kp.pt[0], kp.pt[1], kp.size, kp.angle,
+                                                        kp.response, kp.octave, kp.class_id)))
+copyreg.pickle(cv2.DMatch, lambda m: (cv2.DMatch, (m.queryIdx, m.trainIdx, m.imgIdx, m.distance)))
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+FINAL_STATUSES = (DONE, FAILED)
+
+# Workers that die before taking a job this many times in a row are not restarted again
+MAX_STARTUP_FAILURES = 3
+
+
+# ======================= WORKER PROCESS =======================
+
+def _configure_worker_pools():
+    """Job workers are daemonic and cannot start child processes: run stages and exports in-process."""
+    from stage_scheduler import configure_stage_workers
+    from report_artifacts import configure_export_workers
+
+    configure_stage_workers(1)
+    configure_export_workers(1)
+
+
+def _warm_up_worker(concurrent_workers):
+    """Import the pipeline and create the detectors once per worker process."""
+    from feature_detection import warm_up_detectors
+    from lazy_imports import preload_stage_modules
+
+    # main.py imports its analysis modules lazily; load them all once per worker
+    preload_stage_modules()
+
+    if concurrent_workers > 1:
+        # Parallelism comes from the job workers; avoid oversubscribing the cores
+        cv2.setNumThreads(1)
+    warm_up_detectors()
+
+
+def run_analysis_job(image_path, output_dir='./results', delete_input=False, **kwargs):
+    """Default job: the full pipeline with the shared result cache."""
+    from main import analyze_image_comprehensive_advanced
+    from result_cache import get_result_cache
+
+    try:
+        return analyze_image_comprehensive_advanced(image_path, output_dir, result_cache=get_result_cache(), **kwargs)
+    finally:
+        if delete_input and os.path.exists(image_path):
+            os.remove(image_path)
+
+
+def _worker_main(conn, job_func, warm_up, concurrent_workers):
+    _configure_worker_pools()
+    if warm_up:
+        _warm_up_worker(concurrent_workers)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        job_id, args, kwargs = task
+        try:
+            message = ('done', job_id, job_func(*args, **kwargs))
+        except Exception as e:
+            message = ('failed', job_id, f"{e}\n{traceback.format_exc()}")
+        try:
+            conn.send(message)
+        except Exception as e:
+            # Hasil yang tidak bisa di-pickle tetap dilaporkan sebagai kegagalan job
+            conn.send(('failed', job_id, f"Hasil job tidak dapat dikirim: {e}"))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.job_id = None
+
+
+# ======================= SERVER (APP PROCESS) =======================
+
+class JobServer:
+    """
+    Queue of analysis jobs served by warm worker processes.
+
+    Args:
+        workers: Number of worker processes (None = one per CPU core)
+        job_func: Picklable top-level callable run for every job (default: run_analysis_job)
+        timeout: Seconds after which a running job is killed and marked failed (None = no limit)
+        keep_results: Finished jobs whose results are kept in memory (oldest are dropped first)
+        warm_up: Import the pipeline and create detectors when a worker starts
+        start_method: multiprocessing start method ('spawn' is safe inside the threaded web server)
+    """
+
+    def __init__(self, workers=JOB_SERVER_WORKERS, job_func=run_analysis_job, timeout=JOB_SERVER_TIMEOUT,
+                 keep_results=JOB_SERVER_KEEP_RESULTS, warm_up=True, start_method=JOB_SERVER_START_METHOD):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.job_func = job_func
+        self.timeout = timeout
+        self.keep_results = keep_results
+        self.warm_up = warm_up
+        self._ctx = multiprocessing.get_context(start_method)
+        self._workers = []
+        self._pending = deque()
+        self._jobs = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = False
+        self._monitor = None
+        self._startup_failures = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Start the worker processes and the monitor thread (idempotent)."""
+        with self._lock:
+            if self._monitor is not None:
+                return self
+            for _ in range(self.workers):
+                self._spawn_worker()
+            self._monitor = threading.Thread(target=self._monitor_loop, name='job-server-monitor', daemon=True)
+            self._monitor.start()
+        print(f"🧵 Job server: {self.workers} workers ready")
+        return self
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, daemon=True,
+                                    args=(child_conn, self.job_func, self.warm_up, self.workers))
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        return worker
+
+    def shutdown(self, wait=True):
+        """Stop the workers; jobs that did not finish are marked failed."""
+        with self._lock:
+            self._stopping = True
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=10 if wait else 0.1)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._monitor is not None:
+            self._monitor.join(timeout=5)
+        with self._lock:
+            for job in self._jobs.values():
+                if job['status'] not in FINAL_STATUSES:
+                    self._finish(job, FAILED, error='Job server dihentikan sebelum job selesai')
+            for worker in workers:
+                worker.conn.close()
+            self._workers = []
+            self._pending.clear()
+
+    def alive_workers(self):
+        with self._lock:
+            return sum(1 for worker in self._workers if worker.process.is_alive())
+
+    # ---------- jobs ----------
+
+    def submit(self, *args, **kwargs):
+        """Queue a job (``job_func(*args, **kwargs)``) and return its id."""
+        if self._monitor is None:
+            self.start()
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("Job server sudah dihentikan")
+            if not self._workers:
+                raise RuntimeError("Worker job server gagal dimulai")
+            self._jobs[job_id] = {'id': job_id, 'status': QUEUED, 'label': str(args[0]) if args else '',
+                                  'submitted_at': time.time(), 'started_at': None, 'finished_at': None,
+                                  'worker_pid': None, 'error': None}
+            self._pending.append((job_id, args, kwargs))
+            self._dispatch()
+        return job_id
+
+    def status(self, job_id):
+        """Copy of the job record (status, timestamps, worker pid, error), or None for unknown ids."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            record = dict(job)
+            record['has_result'] = job_id in self._results
+        reference = record['finished_at'] or time.time()
+        record['elapsed'] = reference - (record['started_at'] or record['submitted_at'])
+        return record
+
+    def jobs(self):
+        """Status of every known job, newest first."""
+        with self._lock:
+            job_ids = sorted(self._jobs, key=lambda j: self._jobs[j]['submitted_at'], reverse=True)
+        return [self.status(job_id) for job_id in job_ids]
+
+    def result(self, job_id, pop=True):
+        """Result of a finished job (None if not done); ``pop`` frees it from the server."""
+        with self._lock:
+            return self._results.pop(job_id, None) if pop else self._results.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job is finished (or ``timeout`` passes); returns its status."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while self._jobs.get(job_id, {}).get('status') not in FINAL_STATUSES:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        return self.status(job_id)
+
+    def forget(self, job_id):
+        """Drop a finished job and its result."""
+        with self._lock:
+            if self._jobs.get(job_id, {}).get('status') in FINAL_STATUSES:
+                self._jobs.pop(job_id, None)
+                self._results.pop(job_id, None)
+
+    # ---------- bookkeeping (lock held) ----------
+
+    def _dispatch(self):
+        """Hand queued jobs to idle workers."""
+        for worker in self._workers:
+            if not self._pending:
+                break
+            if worker.job_id is not None or not worker.process.is_alive():
+                continue
+            job_id, args, kwargs = self._pending.popleft()
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                continue
+            try:
+                worker.conn.send((job_id, args, kwargs))
+            except Exception as e:
+                self._finish(job, FAILED, error=f"Job tidak dapat dikirim ke worker: {e}")
+                continue
+            worker.job_id = job_id
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            job['worker_pid'] = worker.process.pid
+            self._changed.notify_all()
+
+    def _finish(self, job, status, result=None, error=None):
+        """Record the outcome of ``job``."""
+        job['status'] = status
+        job['finished_at'] = time.time()
+        job['error'] = error
+        if status == DONE:
+            self._results[job['id']] = result
+            # Results are large (images, maps); keep only the most recent ones
+            finished = [j for j in self._results if j in self._jobs]
+            finished.sort(key=lambda j: self._jobs[j]['finished_at'])
+            for old_id in finished[:max(0, len(finished) - self.keep_results)]:
+                del self._results[old_id]
+        elif error:
+            print(f"❌ Job {job['id']} gagal: {error.splitlines()[0]}")
+        self._changed.notify_all()
+
+    def _handle_message(self, worker, message):
+        kind, job_id, payload = message
+        worker.job_id = None
+        self._startup_failures = 0
+        job = self._jobs.get(job_id)
+        if job is not None and job['status'] not in FINAL_STATUSES:
+            if kind == 'done':
+                self._finish(job, DONE, result=payload)
+            else:
+                self._finish(job, FAILED, error=payload)
+
+    def _retire_worker(self, worker, reason):
+        """Fail the job of a dead (or killed) worker and start a replacement."""
+        self._workers.remove(worker)
+        worker.conn.close()
+        job = self._jobs.get(worker.job_id) if worker.job_id else None
+        if job is not None:
+            if job['status'] not in FINAL_STATUSES:
+                self._finish(job, FAILED, error=reason)
+        else:
+            # Worker mati sebelum mengambil job (mis. gagal import saat warm-up)
+            self._startup_failures += 1
+        if self._stopping:
+            return
+        if self._startup_failures < MAX_STARTUP_FAILURES:
+            self._spawn_worker()
+        elif not self._workers:
+            for job_id, _, _ in self._pending:
+                if job_id in self._jobs and self._jobs[job_id]['status'] == QUEUED:
+                    self._finish(self._jobs[job_id], FAILED, error=f"Worker gagal dimulai: {reason}")
+            self._pending.clear()
+
+    # ---------- monitor thread ----------
+
+    def _monitor_loop(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    break
+                workers = list(self._workers)
+            if not workers:
+                time.sleep(0.5)
+                continue
+            by_handle = {}
+            for worker in workers:
+                by_handle[worker.conn] = worker
+                by_handle[worker.process.sentinel] = worker
+
+            handled = set()
+            for handle in wait_connections(list(by_handle), timeout=0.5):
+                worker = by_handle[handle]
+                if worker in handled:
+                    continue
+                handled.add(worker)
+                message = None
+                try:
+                    # A worker may exit right after sending; read its message before treating it as dead
+                    if worker.conn.poll():
+                        message = worker.conn.recv()
+                except (EOFError, OSError):
+                    message = None
+                with self._lock:
+                    if worker not in self._workers or self._stopping:
+                        continue
+                    if message is not None:
+                        self._handle_message(worker, message)
+                    elif not worker.process.is_alive():
+                        worker.process.join(timeout=1)
+                        self._retire_worker(worker, f"Worker {worker.process.pid} berhenti "
+                                                    f"(exit code {worker.process.exitcode})")
+                    self._dispatch()
+            self._check_timeouts()
+
+    def _check_timeouts(self):
+        if self.timeout is None:
+            return
+        with self._lock:
+            for worker in list(self._workers):
+                job = self._jobs.get(worker.job_id) if worker.job_id else None
+                if job is None or job['started_at'] is None or time.time() - job['started_at'] <= self.timeout:
+                    continue
+                worker.process.terminate()
+                worker.process.join(timeout=5)
+                self._retire_worker(worker, f"Job melebihi batas waktu {self.timeout}s")
+            self._dispatch()
+
+
+_default_server = None
+_default_lock = threading.Lock()
+
+
+def get_job_server(**kwargs):
+    """Process-wide JobServer, started on first use (the Streamlit app keeps it across reruns)."""
+    global _default_server
+    with _default_lock:
+        if _default_server is None:
+            _default_server = JobServer(**kwargs).start()
+        return _default_server
+
+
+def format_job_status(record):
+    """One-line Indonesian description of a job record for the UI."""
+    if record is None:
+        return "Job tidak ditemukan"
+    labels = {QUEUED: '⏳ Menunggu antrean', RUNNING: '🔬 Sedang dianalisis', DONE: '✅ Selesai', FAILED: '❌ Gagal'}
+    text = f"{labels.get(record['status'], record['status'])} ({record['elapsed']:.1f}s)"
+    if record['status'] == FAILED and record.get('error'):
+        text += f" — {record['error'].splitlines()[0]}"
+    if record.get('finished_at'):
+        text += f", selesai {datetime.fromtimestamp(record['finished_at']).strftime('%H:%M:%S')}"
+    return text
@@ -5,7 +5,6 @@ Contains functions for JPEG artifact analysis, ghost detection, and compression
 
 import numpy as np
 import cv2
-import os
 from PIL import Image, ImageChops
 try:
     from scipy import ndimage
@@ -22,7 +21,11 @@ except Exception:
             pad = kernel_size//2
             a_padded = np.pad(a, pad, mode='edge')
             return np.convolve(a_padded, kernel, mode='valid')
+from config import RECOMPRESSION_SUBSAMPLING
 from utils import detect_outliers_iqr, safe_divide
+from jpeg_recompression import image_digest, recompress_jpeg, recompress_jpeg_array
+from analysis_context import ensure_context
+from block_dct import luma_block_dct
 import warnings
 from datetime import datetime
 
@@ -47,17 +50,14 @@ def advanced_jpeg_analysis(image_pil, qualities=range(60, 96, 10)):
     
     compression_artifacts = {}
     quality_responses = []
+    digest = image_digest(image_pil)
     
     for quality in qualities:
-        temp_file = f"temp_quality_{quality}.jpg"
-        
         try:
-            # Compress and decompress
-            image_pil.save(temp_file, 'JPEG', quality=quality)
-            with Image.open(temp_file) as recompressed:
-                # Calculate difference
-                diff = ImageChops.difference(image_pil, recompressed)
-                diff_array = np.array(diff.convert('L'))
+            # Compress and decompress in memory (shared recompression cache)
+            recompressed = recompress_jpeg(image_pil, quality, subsampling=RECOMPRESSION_SUBSAMPLING, digest=digest)
+            diff = ImageChops.difference(image_pil, recompressed)
+            diff_array = np.array(diff.convert('L'))
             
             # Response metrics
             response_mean = np.mean(diff_array)
@@ -74,12 +74,6 @@ def advanced_jpeg_analysis(image_pil, qualities=range(60, 96, 10)):
                 'response_max': response_max,
                 'response_percentile_95': response_percentile_95
             })
-            
-            # Clean up temporary file
-            try:
-                os.remove(temp_file)
-            except:
-                pass
                 
         except Exception as e:
             print(f"  Warning: Error processing quality {quality}: {e}")
@@ -246,9 +240,15 @@ def calculate_texture_complexity(image_array):
     
     return texture_map.astype(np.float32)
 
-def create_suspicious_regions_map(ghost_map, quality_response_map, best_quality_map, min_response_map):
-    """Create a map of suspicious regions based on multiple criteria."""
+def create_suspicious_regions_map(ghost_map, response_variance, best_quality_map, min_response_map):
+    """Create a map of suspicious regions based on multiple criteria.
+    
+    ``response_variance`` is the per-pixel variance of the response across
+    qualities; a full (h, w, Q) response cube is still accepted.
+    """
     h, w = ghost_map.shape
+    if response_variance.ndim == 3:
+        response_variance = np.var(response_variance, axis=2)
     suspicious_map = np.zeros((h, w), dtype=bool)
     
     # Criterion 1: High ghost values
@@ -256,7 +256,6 @@ def create_suspicious_regions_map(ghost_map, quality_response_map, best_quality_
     suspicious_map |= (ghost_map > ghost_threshold)
     
     # Criterion 2: Very low response variance (indicates possible previous compression)
-    response_variance = np.var(quality_response_map, axis=2)
     low_variance_threshold = np.percentile(response_variance, 20)
     suspicious_map |= (response_variance < low_variance_threshold)
     
@@ -280,69 +279,121 @@ def create_suspicious_regions_map(ghost_map, quality_response_map, best_quality_
 
 # ======================= JPEG Ghost Analysis =======================
 
-def jpeg_ghost_analysis(image_pil, qualities=range(50, 101, 5)):
-    """Perform comprehensive JPEG ghost analysis with enhanced contrast and detail."""
-    print(f"  Performing advanced JPEG ghost analysis with {len(qualities)} qualities...")
+def _ghost_quality_response(context, quality):
+    """Weighted recompression response and ghost evidence for one quality (memoized per image)."""
+    def _compute():
+        original_array = context.rgb_array
+        edge_weight_map = context.memoize('ghost_edge_map', lambda: detect_edge_regions(original_array))
+        texture_complexity_map = context.memoize('ghost_texture_map', lambda: calculate_texture_complexity(original_array))
+        
+        # Compress at this quality (in memory, 4:4:4 chroma, shared recompression cache)
+        compressed_array = recompress_jpeg_array(context.image, quality, subsampling=RECOMPRESSION_SUBSAMPLING,
+                                                  digest=context.digest)
+        
+        # Multi-channel difference analysis
+        channel_diffs = np.abs(original_array.astype(float) - compressed_array.astype(float))
+        
+        # Weighted average considering different color channels
+        # Green channel is given more weight as human eyes are more sensitive to it
+        weighted_diff = (0.299 * channel_diffs[:,:,0] + 
+                       0.587 * channel_diffs[:,:,1] + 
+                       0.114 * channel_diffs[:,:,2])
+        
+        # Apply edge and texture weighting for more accurate detection
+        weighted_diff = weighted_diff * (1 + 0.3 * edge_weight_map) * (1 + 0.2 * texture_complexity_map)
+        
+        # Dynamic threshold based on image statistics
+        mean_diff = np.mean(weighted_diff)
+        std_diff = np.std(weighted_diff)
+        
+        # Adaptive thresholding for ghost detection
+        low_threshold = mean_diff - 1.5 * std_diff
+        very_low_threshold = mean_diff - 2.5 * std_diff
+        
+        # Ghost evidence with different weights (0 = none, 1 = low, 2 = very low response)
+        ghost_evidence = np.zeros(weighted_diff.shape, dtype=np.uint8)
+        ghost_evidence[weighted_diff < low_threshold] = 1
+        ghost_evidence[weighted_diff < very_low_threshold] = 2
+        
+        # Memoized for all qualities until both sweeps are done: keep the map in float32 and
+        # take the per-quality statistics from the full-precision map
+        return {
+            'response': weighted_diff.astype(np.float32),
+            'evidence': ghost_evidence,
+            'stats': _ghost_quality_stats(weighted_diff)
+        }
     
-    if image_pil.mode != 'RGB':
-        image_pil = image_pil.convert('RGB')
+    return context.memoize(('ghost_response', int(quality)), _compute)
+
+def ghost_response_cube(image_pil, qualities=range(50, 101, 5), context=None):
+    """Full (h, w, Q) float32 response cube, for visualizations that explicitly need it.
+    
+    The ghost sweep itself only keeps streaming reducers; this materializes the
+    cube from the (memoized) per-quality responses on request.
+    """
+    context = ensure_context(image_pil, context)
+    qualities = list(qualities)
+    h, w, c = context.rgb_array.shape
+    cube = np.zeros((h, w, len(qualities)), dtype=np.float32)
+    for idx, quality in enumerate(qualities):
+        cube[:, :, idx] = _ghost_quality_response(context, quality)['response']
+    return cube
+
+def _ghost_quality_stats(response):
+    """Global statistics of one quality's response map."""
+    return {
+        'mean_response': np.mean(response),
+        'response_variance': np.var(response),
+        'low_response_area': np.sum(response < np.percentile(response, 10)) / response.size
+    }
+
+def jpeg_ghost_analysis(image_pil, qualities=range(50, 101, 5), context=None, release_responses=False):
+    """Perform comprehensive JPEG ghost analysis with enhanced contrast and detail.
+    
+    When an ``AnalysisContext`` is passed, per-quality responses and complete
+    results are memoized on it, so overlapping sweeps reuse earlier work.
+    ``release_responses`` drops each per-quality response from the context once
+    the sweep has used it (for the last sweep over an image).
+    """
+    context = ensure_context(image_pil, context)
+    qualities = list(qualities)
+    return context.memoize(('jpeg_ghost', tuple(qualities)),
+                           lambda: _jpeg_ghost_analysis(context, qualities, release_responses))
+
+def _jpeg_ghost_analysis(context, qualities, release_responses=False):
+    """Ghost sweep over ``qualities`` using the memoized per-quality responses of ``context``."""
+    print(f"  Performing advanced JPEG ghost analysis with {len(qualities)} qualities...")
     
-    original_array = np.array(image_pil)
-    h, w, c = original_array.shape
+    h, w, c = context.rgb_array.shape
     
-    # Initialize multiple detection layers for comprehensive analysis
+    # Streaming reducers over the qualities: no (h, w, Q) response cube is kept
     ghost_accumulator = np.zeros((h, w), dtype=np.float32)
-    quality_response_map = np.zeros((h, w, len(qualities)), dtype=np.float32)
+    response_mean = np.zeros((h, w), dtype=np.float32)
+    response_m2 = np.zeros((h, w), dtype=np.float32)
+    response_count = 0
+    quality_analysis = {}
     min_response_map = np.full((h, w), float('inf'), dtype=np.float32)
     best_quality_map = np.zeros((h, w), dtype=np.uint8)
     
-    # Advanced detection parameters
-    edge_weight_map = detect_edge_regions(original_array)
-    texture_complexity_map = calculate_texture_complexity(original_array)
-    
-    temp_filename = "temp_ghost.jpg"
-    
     # Test different JPEG qualities with enhanced detection
     for idx, quality in enumerate(qualities):
         try:
-            # Compress at this quality
-            image_pil.save(temp_filename, 'JPEG', quality=quality, optimize=False, subsampling=0)
-            compressed = Image.open(temp_filename)
-            compressed_array = np.array(compressed)
-            
-            # Multi-channel difference analysis
-            channel_diffs = np.abs(original_array.astype(float) - compressed_array.astype(float))
-            
-            # Weighted average considering different color channels
-            # Green channel is given more weight as human eyes are more sensitive to it
-            weighted_diff = (0.299 * channel_diffs[:,:,0] + 
-                           0.587 * channel_diffs[:,:,1] + 
-                           0.114 * channel_diffs[:,:,2])
-            
-            # Apply edge and texture weighting for more accurate detection
-            weighted_diff = weighted_diff * (1 + 0.3 * edge_weight_map) * (1 + 0.2 * texture_complexity_map)
+            layer = _ghost_quality_response(context, quality)
+            weighted_diff = layer['response']
             
-            # Store response for this quality
-            quality_response_map[:, :, idx] = weighted_diff
+            # Per-pixel mean/variance across qualities (Welford) and per-quality statistics
+            response_count += 1
+            delta = weighted_diff - response_mean
+            response_mean += delta / response_count
+            response_m2 += delta * (weighted_diff - response_mean)
+            del delta
+            quality_analysis[quality] = layer['stats']
             
             # Track minimum response and corresponding quality
             mask = weighted_diff < min_response_map
             min_response_map[mask] = weighted_diff[mask]
             best_quality_map[mask] = quality
             
-            # Dynamic threshold based on image statistics
-            mean_diff = np.mean(weighted_diff)
-            std_diff = np.std(weighted_diff)
-            
-            # Adaptive thresholding for ghost detection
-            low_threshold = mean_diff - 1.5 * std_diff
-            very_low_threshold = mean_diff - 2.5 * std_diff
-            
-            # Accumulate ghost evidence with different weights
-            ghost_evidence = np.zeros_like(weighted_diff)
-            ghost_evidence[weighted_diff < low_threshold] = 1.0
-            ghost_evidence[weighted_diff < very_low_threshold] = 2.0
-            
             # Quality-specific weighting (common qualities get higher weight)
             quality_weight = 1.0
             if quality in [70, 75, 80, 85, 90, 95]:  # Common JPEG qualities
@@ -350,17 +401,17 @@ def jpeg_ghost_analysis(image_pil, qualities=range(50, 101, 5)):
             if quality in [75, 85, 90]:  # Most common qualities
                 quality_weight = 2.0
                 
-            ghost_accumulator += ghost_evidence * quality_weight
+            ghost_accumulator += layer['evidence'] * quality_weight
+            if release_responses:
+                del layer, weighted_diff, mask
+                context.release(('ghost_response', int(quality)))
                 
         except Exception as e:
             print(f"  Warning: Error processing quality {quality}: {e}")
             continue
     
-    # Clean up temp file
-    try:
-        os.remove(temp_filename)
-    except:
-        pass
+    response_variance = response_m2 / max(response_count, 1)
+    del response_mean, response_m2
     
     # Advanced ghost map processing
     if np.any(ghost_accumulator > 0):
@@ -384,25 +435,36 @@ def jpeg_ghost_analysis(image_pil, qualities=range(50, 101, 5)):
         
     else:
         # If no ghost detected, create informative visualization based on quality response variance
-        response_variance = np.var(quality_response_map, axis=2)
         ghost_map = 1 - (response_variance / (np.max(response_variance) + 1e-9))
         ghost_map = ghost_map * 0.3  # Scale down to indicate low confidence
     
     # Create suspicious map based on multiple criteria
     suspicious_map = create_suspicious_regions_map(
-        ghost_map, quality_response_map, best_quality_map, min_response_map
+        ghost_map, response_variance, best_quality_map, min_response_map
     )
     
     # Advanced ghost pattern analysis
-    ghost_analysis = analyze_ghost_patterns(ghost_map, best_quality_map, quality_response_map, qualities)
+    ghost_analysis = analyze_ghost_patterns(ghost_map, best_quality_map, response_variance, qualities,
+                                            quality_analysis)
     
     print(f"  Advanced JPEG ghost analysis completed")
     
     return ghost_map, suspicious_map, ghost_analysis
 
-def analyze_ghost_patterns(ghost_map, quality_map, quality_response_map, qualities):
-    """Analyze JPEG ghost patterns for detailed insights, including regional quality estimation."""
+def analyze_ghost_patterns(ghost_map, quality_map, response_variance, qualities, quality_analysis=None):
+    """Analyze JPEG ghost patterns for detailed insights, including regional quality estimation.
+    
+    ``response_variance`` is the per-pixel variance across qualities and
+    ``quality_analysis`` the per-quality statistics gathered while streaming.
+    Passing a full (h, w, Q) response cube instead still works.
+    """
     h, w = ghost_map.shape
+    if response_variance.ndim == 3:
+        response_cube = response_variance
+        response_variance = np.var(response_cube, axis=2)
+        if quality_analysis is None:
+            quality_analysis = {quality: _ghost_quality_stats(response_cube[:, :, idx])
+                                for idx, quality in enumerate(qualities)}
     
     # Find ghost regions (connected components) using an adaptive threshold
     if np.any(ghost_map > 0):
@@ -428,8 +490,7 @@ def analyze_ghost_patterns(ghost_map, quality_map, quality_response_map, qualiti
         if region_size > 100:  # Minimum size threshold
             # Calculate region statistics
             region_ghost_mean = np.mean(ghost_map[region_mask])
-            region_responses = quality_response_map[region_mask, :]
-            region_response_variance = np.var(region_responses, axis=1)
+            region_response_variance = response_variance[region_mask]
 
             # Find estimated quality for the region from the quality_map
             qualities_in_region = quality_map[region_mask]
@@ -455,14 +516,8 @@ def analyze_ghost_patterns(ghost_map, quality_map, quality_response_map, qualiti
     ghost_intensity = np.mean(ghost_map[ghost_cleaned > 0]) if np.any(ghost_cleaned > 0) else 0
     
     # Quality-specific analysis
-    quality_analysis = {}
-    for idx, quality in enumerate(qualities):
-        response = quality_response_map[:, :, idx]
-        quality_analysis[quality] = {
-            'mean_response': np.mean(response),
-            'response_variance': np.var(response),
-            'low_response_area': np.sum(response < np.percentile(response, 10)) / (h * w)
-        }
+    if quality_analysis is None:
+        quality_analysis = {}
     
     return {
         'ghost_regions': ghost_regions,
@@ -474,79 +529,47 @@ def analyze_ghost_patterns(ghost_map, quality_map, quality_response_map, qualiti
 
 # ======================= Block-wise JPEG Analysis =======================
 
-def analyze_jpeg_blocks(image_pil, block_size=8):
+def analyze_jpeg_blocks(image_pil, block_size=8, context=None):
     """Analyze JPEG 8x8 blocks for compression artifacts"""
+    if context is not None:
+        return context.memoize(('jpeg_blocks', block_size),
+                               lambda: _analyze_jpeg_blocks(luma_block_dct(context.image, block_size, context)))
+    return _analyze_jpeg_blocks(luma_block_dct(image_pil, block_size))
+
+def _analyze_jpeg_blocks(block_dct):
     print("  Analyzing JPEG block artifacts...")
     
-    if image_pil.mode != 'RGB':
-        image_pil = image_pil.convert('RGB')
-    
-    image_array = np.array(image_pil)
-    gray_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-    
-    h, w = gray_image.shape
-    blocks_h = h // block_size
-    blocks_w = w // block_size
-    
-    block_artifacts = []
-    blocking_map = np.zeros((h, w))
-    
-    for i in range(blocks_h):
-        for j in range(blocks_w):
-            # Extract 8x8 block
-            block = gray_image[i*block_size:(i+1)*block_size,
-                              j*block_size:(j+1)*block_size]
-            
-            # DCT analysis
-            block_float = block.astype(np.float32)
-            dct_block = cv2.dct(block_float)
-            
-            # Calculate blocking artifacts
-            # 1. High frequency energy in specific patterns
-            high_freq_energy = np.sum(np.abs(dct_block[4:, 4:]))
-            
-            # 2. Quantization noise estimation
-            # Look for patterns typical of JPEG quantization
-            quantization_noise = estimate_quantization_noise(dct_block)
-            
-            # 3. Block boundary artifacts
-            boundary_artifacts = 0
-            if i > 0:  # Top boundary
-                top_diff = np.abs(gray_image[i*block_size, j*block_size:(j+1)*block_size] - 
-                                gray_image[i*block_size-1, j*block_size:(j+1)*block_size])
-                boundary_artifacts += np.mean(top_diff)
-            
-            if j > 0:  # Left boundary
-                left_diff = np.abs(gray_image[i*block_size:(i+1)*block_size, j*block_size] - 
-                                 gray_image[i*block_size:(i+1)*block_size, j*block_size-1])
-                boundary_artifacts += np.mean(left_diff)
-            
-            # Store block analysis
-            block_artifacts.append({
-                'position': (i, j),
-                'high_freq_energy': high_freq_energy,
-                'quantization_noise': quantization_noise,
-                'boundary_artifacts': boundary_artifacts,
-                'block_variance': np.var(block)
-            })
-            
-            # Update blocking map
-            blocking_score = (high_freq_energy + quantization_noise + boundary_artifacts) / 3
-            blocking_map[i*block_size:(i+1)*block_size,
-                        j*block_size:(j+1)*block_size] = blocking_score
-    
-    # Calculate overall statistics
-    high_freq_energies = [b['high_freq_energy'] for b in block_artifacts]
-    quantization_noises = [b['quantization_noise'] for b in block_artifacts]
-    boundary_artifacts_list = [b['boundary_artifacts'] for b in block_artifacts]
+    # Semua blok sekaligus dari kubus koefisien DCT
+    # 1. High frequency energy in specific patterns
+    high_freq_energies = block_dct.band_energy(slice(4, None), slice(4, None))
+    # 2. Quantization noise estimation (patterns typical of JPEG quantization)
+    quantization_noises = block_dct.quantization_noise()
+    # 3. Block boundary artifacts (top and left boundary)
+    boundary_artifacts_list = block_dct.boundary_artifacts()
+    block_variances = block_dct.block_variance()
+    
+    blocking_scores = (high_freq_energies + quantization_noises + boundary_artifacts_list) / 3
+    blocking_map = block_dct.block_map(blocking_scores)
+    
+    block_artifacts = [
+        {
+            'position': divmod(k, block_dct.blocks_w),
+            'high_freq_energy': hf,
+            'quantization_noise': qn,
+            'boundary_artifacts': ba,
+            'block_variance': bv
+        }
+        for k, (hf, qn, ba, bv) in enumerate(zip(high_freq_energies.tolist(), quantization_noises.tolist(),
+                                                 boundary_artifacts_list.tolist(), block_variances.tolist()))
+    ]
     
     # Detect outlier blocks
     outlier_blocks = []
     
     # High frequency outliers
-    hf_outliers = detect_outliers_iqr(np.array(high_freq_energies))
-    qn_outliers = detect_outliers_iqr(np.array(quantization_noises))
-    ba_outliers = detect_outliers_iqr(np.array(boundary_artifacts_list))
+    hf_outliers = detect_outliers_iqr(high_freq_energies)
+    qn_outliers = detect_outliers_iqr(quantization_noises)
+    ba_outliers = detect_outliers_iqr(boundary_artifacts_list)
     
     all_outlier_indices = set(hf_outliers) | set(qn_outliers) | set(ba_outliers)
     
@@ -607,15 +630,19 @@ def estimate_quantization_noise(dct_block):
 
 # ======================= Double JPEG Detection =======================
 
-def detect_double_jpeg(image_pil, quality_range=(50, 95, 5)):
+def detect_double_jpeg(image_pil, quality_range=(50, 95, 5), context=None):
     """Detect double JPEG compression"""
     print("  Detecting double JPEG compression...")
     
     start_q, end_q, step_q = quality_range
     qualities = list(range(start_q, end_q + 1, step_q))
     
-    # Perform JPEG ghost analysis
-    ghost_map, suspicious_map, ghost_analysis = jpeg_ghost_analysis(image_pil, qualities)
+    # Perform JPEG ghost analysis (reuses per-quality responses already on the context). This is the
+    # last sweep over them: each map is dropped once used (ghost_response_cube recomputes them)
+    ghost_map, suspicious_map, ghost_analysis = jpeg_ghost_analysis(image_pil, qualities, context=context,
+                                                                    release_responses=context is not None)
+    if context is not None:
+        context.release(*[('ghost_response', quality) for quality in range(50, 101, 5)])
     
     # Additional double compression indicators
     double_compression_score = 0
@@ -647,14 +674,14 @@ def detect_double_jpeg(image_pil, quality_range=(50, 95, 5)):
         indicators.append(f"Low response at qualities: {low_response_qualities}")
     
     # 4. Block-wise analysis
-    block_analysis = analyze_jpeg_blocks(image_pil)
+    block_analysis = analyze_jpeg_blocks(image_pil, context=context)
     
     if block_analysis['blocking_variance'] > 100:  # High variance in blocking artifacts
         double_compression_score += 15
         indicators.append(f"High blocking variance detected: {block_analysis['blocking_variance']:.1f}")
     
     # 5. Frequency domain analysis
-    freq_analysis = analyze_double_compression_frequency(image_pil)
+    freq_analysis = analyze_double_compression_frequency(image_pil, context=context)
     if freq_analysis['double_compression_indicator'] > 0.5:
         double_compression_score += 20
         indicators.append(f"Frequency domain anomalies: {freq_analysis['double_compression_indicator']:.3f}")
@@ -681,13 +708,10 @@ def detect_double_jpeg(image_pil, quality_range=(50, 95, 5)):
         'is_double_compressed': double_compression_score >= 30
     }
 
-def analyze_double_compression_frequency(image_pil):
+def analyze_double_compression_frequency(image_pil, context=None):
     """Analyze frequency domain for double compression artifacts"""
-    if image_pil.mode != 'RGB':
-        image_pil = image_pil.convert('RGB')
-    
-    image_array = np.array(image_pil)
-    gray_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+    block_dct = luma_block_dct(image_pil, context=context)
+    gray_image = block_dct.gray
     
     # DCT analysis
     dct_coeffs = cv2.dct(gray_image.astype(np.float32))
@@ -710,25 +734,8 @@ def analyze_double_compression_frequency(image_pil):
     # which can be a sign of double compression
     double_compression_indicator = min(zero_crossings / 20.0, 1.0)  # Normalize to 0-1
     
-    # 2. Block-wise DCT consistency
-    h, w = gray_image.shape
-    block_size = 8
-    blocks_h = h // block_size
-    blocks_w = w // block_size
-    
-    dct_variances = []
-    
-    for i in range(blocks_h):
-        for j in range(blocks_w):
-            block = gray_image[i*block_size:(i+1)*block_size,
-                              j*block_size:(j+1)*block_size]
-            block_dct = cv2.dct(block.astype(np.float32))
-            
-            # Calculate variance of AC coefficients
-            ac_coeffs = block_dct.copy()
-            ac_coeffs[0, 0] = 0  # Remove DC component
-            dct_variance = np.var(ac_coeffs)
-            dct_variances.append(dct_variance)
+    # 2. Block-wise DCT consistency: variance of AC coefficients (DC removed) per block
+    dct_variances = block_dct.ac_variance()
     
     # Inconsistency in DCT variance across blocks
     dct_variance_consistency = np.std(dct_variances) / (np.mean(dct_variances) + 1e-6)
@@ -742,10 +749,13 @@ def analyze_double_compression_frequency(image_pil):
 
 # ======================= Comprehensive JPEG Analysis =======================
 
-def comprehensive_jpeg_analysis(image_pil):
+def comprehensive_jpeg_analysis(image_pil, context=None):
     """Perform comprehensive JPEG analysis combining all methods"""
     print("🔍 Performing comprehensive JPEG analysis...")
     
+    # Shared per-image context: the ghost sweep, its per-quality responses and the
+    # block analysis are computed once and reused by double compression detection
+    context = ensure_context(image_pil, context)
     results = {}
     
     # 1. Basic JPEG analysis
@@ -754,18 +764,18 @@ def comprehensive_jpeg_analysis(image_pil):
     
     # 2. JPEG ghost analysis
     print("  - JPEG ghost detection...")
-    ghost_map, suspicious_map, ghost_analysis = jpeg_ghost_analysis(image_pil)
+    ghost_map, suspicious_map, ghost_analysis = jpeg_ghost_analysis(image_pil, context=context)
     results['ghost_map'] = ghost_map
     results['suspicious_map'] = suspicious_map
     results['ghost_analysis'] = ghost_analysis
     
     # 3. Block-wise analysis
     print("  - Block-wise artifact analysis...")
-    results['block_analysis'] = analyze_jpeg_blocks(image_pil)
+    results['block_analysis'] = analyze_jpeg_blocks(image_pil, context=context)
     
     # 4. Double compression detection
     print("  - Double compression detection...")
-    results['double_compression'] = detect_double_jpeg(image_pil)
+    results['double_compression'] = detect_double_jpeg(image_pil, context=context)
     
     # 5. Overall JPEG score calculation
     results['overall_score'] = calculate_overall_jpeg_score(results)
@@ -0,0 +1,129 @@
+"""
+In-memory JPEG recompression service shared by the ELA and JPEG analysis stages.
+
+Every stage that needs an image re-encoded at a given JPEG quality goes through
+``recompress_jpeg``. Encoding and decoding happen in ``io.BytesIO`` buffers, and
+the decoded result is cached by (image digest, quality, subsampling), so the
+same recompression requested by two stages is only paid once.
+
+Sharing happens inside the JPEG stage: the basic analysis (60-90) and the ghost
+sweep both use config.RECOMPRESSION_SUBSAMPLING, so the basic analysis reuses
+the ghost's qualities for images up to 1500 px. 4:4:4 gives lower basic
+responses than the encoder default (about 2-12% per quality, response_variance
+up to about 20%), and those values feed classification. ELA keeps the encoder default
+subsampling (its statistics include the chroma error) and runs on the enhanced
+image, so it has entries of its own; repeated ELA runs on one image still hit.
+"""
+
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from config import RECOMPRESSION_CACHE_MB
+
+
+def image_digest(image_pil):
+    """Content digest of a PIL image (mode, size and raw pixel bytes)."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image_pil.mode}:{image_pil.size[0]}x{image_pil.size[1]}".encode('ascii'))
+    hasher.update(image_pil.tobytes())
+    return hasher.hexdigest()
+
+
+def encode_jpeg_bytes(image_pil, quality, subsampling=None):
+    """Encode an image to JPEG bytes in memory with the given quality/subsampling."""
+    buffer = io.BytesIO()
+    save_kwargs = {'quality': int(quality)}
+    if subsampling is not None:
+        save_kwargs['subsampling'] = subsampling
+    image_pil.save(buffer, 'JPEG', **save_kwargs)
+    return buffer.getvalue()
+
+
+class JpegRecompressor:
+    """Recompresses images through memory buffers with a size-bounded LRU cache.
+
+    Cached arrays are marked read-only because they are shared between callers.
+    """
+
+    def __init__(self, max_bytes=RECOMPRESSION_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def recompress_array(self, image_pil, quality, subsampling=None, digest=None):
+        """Return the decoded JPEG round-trip of ``image_pil`` as a read-only uint8 array."""
+        if image_pil.mode != 'RGB':
+            image_pil = image_pil.convert('RGB')
+        if digest is None:
+            digest = image_digest(image_pil)
+        key = (digest, int(quality), -1 if subsampling is None else subsampling)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        jpeg_bytes = encode_jpeg_bytes(image_pil, quality, subsampling)
+        with Image.open(io.BytesIO(jpeg_bytes)) as decoded:
+            decoded_array = np.array(decoded.convert('RGB'))
+        decoded_array.setflags(write=False)
+
+        with self._lock:
+            self.misses += 1
+            if key not in self._cache:
+                self._cache[key] = decoded_array
+                self._current_bytes += decoded_array.nbytes
+                self._evict()
+        return decoded_array
+
+    def recompress(self, image_pil, quality, subsampling=None, digest=None):
+        """Return the decoded JPEG round-trip of ``image_pil`` as a PIL image."""
+        return Image.fromarray(self.recompress_array(image_pil, quality, subsampling, digest))
+
+    def _evict(self):
+        while self._current_bytes > self.max_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._current_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'cached_bytes': self._current_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Shared process-wide instance used by all stages
+_default_recompressor = JpegRecompressor()
+
+
+def get_recompressor():
+    """Return the process-wide recompressor shared by all analysis stages."""
+    return _default_recompressor
+
+
+def recompress_jpeg(image_pil, quality, subsampling=None, digest=None):
+    """Recompress ``image_pil`` at ``quality`` through the shared cache (PIL image result)."""
+    return _default_recompressor.recompress(image_pil, quality, subsampling, digest)
+
+
+def recompress_jpeg_array(image_pil, quality, subsampling=None, digest=None):
+    """Recompress ``image_pil`` at ``quality`` through the shared cache (read-only array result)."""
+    return _default_recompressor.recompress_array(image_pil, quality, subsampling, digest)
@@ -0,0 +1,154 @@
+"""
+Lazy imports for the Forensic Image Analysis System
+
+``lazy_import`` returns a module proxy that imports the module on first
+attribute access, and the stage registry maps every analysis function used by
+main.py to the module implementing it; that module is imported the first time
+the function is called. ``python main.py --help`` therefore only loads the
+standard library and config, while numpy, OpenCV, scipy, scikit-learn,
+matplotlib and the analysis modules are loaded when a stage actually runs.
+Worker processes call ``preload_stage_modules`` to pay the import cost up front.
+"""
+
+import sys
+import importlib
+
+
+class LazyModule:
+    """Module proxy: ``import_module(name)`` runs on the first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = self.__dict__['_lazy_module'] = importlib.import_module(self.__dict__['_lazy_name'])
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """The module itself when already imported, otherwise a LazyModule proxy."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def _resolve(module_name, attr):
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LazyFunction:
+    """Callable (function or class) that imports its module on the first call."""
+
+    def __init__(self, module_name, attr):
+        self.module_name = module_name
+        self.__name__ = attr
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            self._target = _resolve(self.module_name, self.__name__)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __reduce__(self):
+        # Pickled (e.g. for a worker process) as a reference to the real function
+        return _resolve, (self.module_name, self.__name__)
+
+    def __repr__(self):
+        return f"<lazy {self.module_name}.{self.__name__}>"
+
+
+# ======================= Stage registry =======================
+
+# Function name -> module implementing it
+STAGE_FUNCTIONS = {
+    # Validation, metadata and preprocessing (stages 1-4)
+    'validate_image_file': 'validation',
+    'ingest_image': 'image_ingest',
+    'extract_enhanced_metadata': 'validation',
+    'advanced_preprocess_image': 'validation',
+    # ELA, features and copy-move (stages 5-8)
+    'perform_multi_quality_ela': 'ela_analysis',
+    'extract_multi_detector_features': 'feature_detection',
+    'detect_copy_move_advanced': 'copy_move_detection',
+    'detect_copy_move_blocks': 'copy_move_detection',
+    'kmeans_tampering_localization': 'copy_move_detection',
+    # Independent analyses (stages 9-15) and fusion
+    'analyze_noise_consistency': 'advanced_analysis',
+    'analyze_frequency_domain': 'advanced_analysis',
+    'analyze_texture_consistency': 'advanced_analysis',
+    'analyze_edge_consistency': 'advanced_analysis',
+    'analyze_illumination_consistency': 'advanced_analysis',
+    'perform_statistical_analysis': 'advanced_analysis',
+    'detect_forgery_mm_fusion': 'advanced_analysis',
+    'detect_forgery_trufor': 'advanced_analysis',
+    'comprehensive_jpeg_analysis': 'jpeg_analysis',
+    'analyze_tiled': 'tiled_analysis',
+    # Classification
+    'classify_manipulation_advanced': 'classification',
+    'prepare_feature_vector': 'classification',
+    # Pipeline infrastructure
+    'AnalysisResults': 'analysis_results',
+    'ImageStatsPlane': 'image_stats',
+    'PipelineStage': 'stage_scheduler',
+    'run_stage_graph': 'stage_scheduler',
+    'get_file_stage_cache': 'result_cache',
+    'StageProfiler': 'stage_profiler',
+    'profile_to_json': 'stage_profiler',
+    'profile_to_chrome_trace': 'stage_profiler',
+    # History and export
+    'save_analysis_to_history': 'utils',
+    'append_to_feature_table': 'feature_table',
+    'export_complete_package': 'export_utils',
+    'export_visualization_png': 'export_utils',
+    'export_comprehensive_package': 'export_utils',
+    'export_to_advanced_docx': 'export_utils',
+}
+
+_stage_functions = {}
+
+
+def stage_function(name):
+    """Lazy handle of a registered function (one shared handle per name)."""
+    function = _stage_functions.get(name)
+    if function is None:
+        function = _stage_functions[name] = LazyFunction(STAGE_FUNCTIONS[name], name)
+    return function
+
+
+def stage_modules(include_export=False):
+    """Modules of the registry, in pipeline order."""
+    modules = []
+    for module_name in STAGE_FUNCTIONS.values():
+        if module_name not in modules and (include_export or module_name != 'export_utils'):
+            modules.append(module_name)
+    return modules
+
+
+def preload_stage_modules(include_export=False):
+    """Import every stage module now (worker warm-up); returns the module names."""
+    modules = stage_modules(include_export)
+    for module_name in modules:
+        importlib.import_module(module_name)
+    return modules
+
+
+def loaded_stage_modules():
+    """Registry modules that have been imported so far."""
+    return [name for name in stage_modules(include_export=True) if name in sys.modules]
@@ -11,33 +11,68 @@ Example:
     python main.py test_image.jpg
     python main.py test_image.jpg --export-all
     python main.py test_image.jpg --output-dir ./results
+    python main.py --batch ./exhibits --workers 8 --output-dir ./results
+    python main.py --batch ./exhibits --metadata-only
+    python main.py huge_scan.tif --tiled --memory-budget 2048
+    python main.py test_image.jpg --profile
 """
 
+import io
 import sys
 import os
 import time
 import argparse
-import numpy as np
-import cv2
-from PIL import Image
-from datetime import datetime
-
-# PERBAIKAN: Import fungsi save_analysis_to_history dari utils
-from utils import save_analysis_to_history, HISTORY_FILE, THUMBNAIL_DIR, load_analysis_history, delete_all_history, delete_selected_history
-
-# Import semua modul
-from validation import validate_image_file, extract_enhanced_metadata, advanced_preprocess_image
-from ela_analysis import perform_multi_quality_ela
-from feature_detection import extract_multi_detector_features
-from copy_move_detection import detect_copy_move_advanced, detect_copy_move_blocks, kmeans_tampering_localization
-from advanced_analysis import (analyze_noise_consistency, analyze_frequency_domain,
-                              analyze_texture_consistency, analyze_edge_consistency,
-                              analyze_illumination_consistency, perform_statistical_analysis,
-                              detect_forgery_mm_fusion, detect_forgery_trufor)
-from jpeg_analysis import comprehensive_jpeg_analysis # Changed from advanced_jpeg_analysis, assuming this includes everything
-from classification import classify_manipulation_advanced, prepare_feature_vector
+from functools import partial
+
+from config import TILED_ANALYSIS, TILED_MEMORY_BUDGET_MB
+# numpy/OpenCV/PIL and the analysis modules are imported on first use (see lazy_imports),
+# so argument parsing and `--help` do not pay for scipy, scikit-learn, matplotlib, ...
+from lazy_imports import lazy_import, stage_function
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+Image = lazy_import('PIL.Image')
+
+# Riwayat analisis
+save_analysis_to_history = stage_function('save_analysis_to_history')
+append_to_feature_table = stage_function('append_to_feature_table')
+
+# Modul analisis (diimpor saat tahap pertama kali dijalankan)
+validate_image_file = stage_function('validate_image_file')
+ingest_image = stage_function('ingest_image')
+extract_enhanced_metadata = stage_function('extract_enhanced_metadata')
+advanced_preprocess_image = stage_function('advanced_preprocess_image')
+perform_multi_quality_ela = stage_function('perform_multi_quality_ela')
+extract_multi_detector_features = stage_function('extract_multi_detector_features')
+detect_copy_move_advanced = stage_function('detect_copy_move_advanced')
+detect_copy_move_blocks = stage_function('detect_copy_move_blocks')
+kmeans_tampering_localization = stage_function('kmeans_tampering_localization')
+analyze_noise_consistency = stage_function('analyze_noise_consistency')
+analyze_frequency_domain = stage_function('analyze_frequency_domain')
+analyze_texture_consistency = stage_function('analyze_texture_consistency')
+analyze_edge_consistency = stage_function('analyze_edge_consistency')
+analyze_illumination_consistency = stage_function('analyze_illumination_consistency')
+perform_statistical_analysis = stage_function('perform_statistical_analysis')
+detect_forgery_mm_fusion = stage_function('detect_forgery_mm_fusion')
+detect_forgery_trufor = stage_function('detect_forgery_trufor')
+comprehensive_jpeg_analysis = stage_function('comprehensive_jpeg_analysis')
+analyze_tiled = stage_function('analyze_tiled')
+classify_manipulation_advanced = stage_function('classify_manipulation_advanced')
+prepare_feature_vector = stage_function('prepare_feature_vector')
 # No longer directly visualize results in main, use export_utils functions
-from export_utils import export_complete_package, export_visualization_png # Keeping export_visualization_png for --export-vis option
+export_complete_package = stage_function('export_complete_package')
+export_visualization_png = stage_function('export_visualization_png') # Keeping export_visualization_png for --export-vis option
+export_comprehensive_package = stage_function('export_comprehensive_package')
+export_to_advanced_docx = stage_function('export_to_advanced_docx')
+# Infrastruktur pipeline
+AnalysisResults = stage_function('AnalysisResults')
+ImageStatsPlane = stage_function('ImageStatsPlane')
+PipelineStage = stage_function('PipelineStage')
+run_stage_graph = stage_function('run_stage_graph')
+get_file_stage_cache = stage_function('get_file_stage_cache')
+StageProfiler = stage_function('StageProfiler')
+profile_to_json = stage_function('profile_to_json')
+profile_to_chrome_trace = stage_function('profile_to_chrome_trace')
 
 
 # ======================= FUNGSI BARU UNTUK MEMPERBAIKI LOKALISASI =======================
@@ -132,10 +167,221 @@ def advanced_tampering_localization(image_pil, analysis_results, n_clusters=8):
 # ======================= AKHIR FUNGSI BARU =======================
 
 
+# ======================= TAHAP ANALISIS INDEPENDEN (9-15) =======================
+# Tahap 9-15 hanya membutuhkan gambar hasil preprocessing dan tidak saling bergantung,
+# sehingga dijalankan paralel oleh stage_scheduler. Fungsi-fungsi ini berjalan di
+# worker process, jadi harus berada di level modul (picklable).
+# Tahap noise, edge, illumination dan statistik menerima ImageStatsPlane (image_stats.py)
+# alih-alih gambar: konversi warna, gradien dan integral image dihitung sekali per proses.
+
+def _noise_stage(plane, test_mode=False):
+    """Stage 9: noise consistency analysis plus a Laplacian noise map for visualization."""
+    # In test mode, skip detailed noise analysis for speed
+    if test_mode:
+        noise_analysis_res = {
+            'overall_inconsistency': 0.1,
+            'outlier_count': 0,
+            'noise_characteristics': ['test_mode_skip']
+        }
+    else:
+        noise_analysis_res = analyze_noise_consistency(plane.image, plane=plane)
+
+    # analyze_noise_consistency doesn't return a direct map, so take the raw laplacian
+    # of the preprocessed image as a "noise map" visualization
+    noise_map = np.zeros(plane.shape) # HxW np array
+    if noise_analysis_res.get('noise_characteristics'):
+        try:
+            if plane.shape[0] >=3 and plane.shape[1] >=3:
+                laplacian = plane.get_map('laplacian')
+                noise_map = (laplacian / np.max(laplacian) * 255).astype(np.uint8)
+        except Exception:
+            noise_map = np.zeros(plane.shape, dtype=np.uint8) # Fallback to black if no map possible
+    return noise_analysis_res, noise_map
+
+
+def _jpeg_stage(original_preprocessed_pil, preprocessed_image_pil, test_mode=False):
+    """Stage 10: comprehensive JPEG analysis (basic, ghost, block, double compression)."""
+    # In test mode, use simplified JPEG analysis for speed
+    if test_mode:
+        jpeg_full_results = {
+            'basic_analysis': {'quality_responses': [85], 'response_variance': 0.1, 'double_compression_indicator': 0.0, 'estimated_original_quality': 85, 'compression_inconsistency': False},
+            'ghost_analysis': {'ghost_map': np.zeros(preprocessed_image_pil.size[::-1]), 'ghost_coverage': 0.0, 'ghost_intensity': 0.0, 'total_ghost_score': 0.0},
+            'block_analysis': {'block_artifacts': [], 'overall_blocking_score': 0.0},
+            'double_compression': {'double_compression_score': 0.0, 'is_double_compressed': False, 'indicators': []}
+        }
+    else:
+        jpeg_full_results = comprehensive_jpeg_analysis(original_preprocessed_pil) # Use original preprocessed for full fidelity
+
+    # Extract direct maps and ratios for convenience from full result. Safely access deeply nested items.
+    jpeg_ghost = jpeg_full_results.get('ghost_analysis', {}).get('ghost_map', np.array([]))
+    jpeg_ghost_suspicious_ratio = jpeg_full_results.get('ghost_analysis', {}).get('ghost_coverage', 0.0)
+
+    # Handle the case where jpeg_ghost map might be empty from comprehensive_jpeg_analysis
+    if jpeg_ghost.size == 0 and preprocessed_image_pil.size[0]*preprocessed_image_pil.size[1] > 0:
+        jpeg_ghost = np.zeros(preprocessed_image_pil.size[::-1]) # Ensure it's a valid zero-filled array of correct shape
+    return jpeg_full_results, jpeg_ghost, jpeg_ghost_suspicious_ratio
+
+
+def _frequency_stage(image_pil, test_mode=False):
+    """Stage 11: frequency domain analysis."""
+    if test_mode:
+        return {
+            'frequency_inconsistency': 0.05,
+            'dct_stats': {'low_freq_energy': 0.7, 'high_freq_energy': 0.2, 'mid_freq_energy': 0.1, 'freq_ratio': 3.5}
+        }
+    return analyze_frequency_domain(image_pil)
+
+
+def _texture_stage(image_pil, test_mode=False):
+    """Stage 12: texture consistency analysis."""
+    if test_mode:
+        return {
+            'overall_inconsistency': 0.08,
+            'texture_consistency': {'lbp_variance': 0.1, 'glcm_variance': 0.05},
+            'texture_features': ['test_mode_simplified']
+        }
+    return analyze_texture_consistency(image_pil)
+
+
+def _edge_stage(plane, test_mode=False):
+    """Stage 13: edge density analysis."""
+    if test_mode:
+        return {
+            'edge_inconsistency': 0.06,
+            'edge_densities': [0.1, 0.15, 0.12],
+            'edge_variance': 0.02
+        }
+    return analyze_edge_consistency(plane.image, plane=plane)
+
+
+def _illumination_stage(plane, test_mode=False):
+    """Stage 14: illumination consistency analysis (also fills color_analysis)."""
+    if test_mode:
+        illumination_analysis_res = {
+            'illumination_mean_consistency': 0.9,
+            'illumination_std_consistency': 0.85,
+            'gradient_consistency': 0.88,
+            'overall_illumination_inconsistency': 0.07
+        }
+    else:
+        illumination_analysis_res = analyze_illumination_consistency(plane.image, plane=plane)
+    # Assuming no direct "color_analysis" map is needed explicitly beyond this
+    color_analysis = {'illumination_inconsistency': illumination_analysis_res.get('overall_illumination_inconsistency', 0.0)}
+    return illumination_analysis_res, color_analysis
+
+
+def _statistical_stage(plane, test_mode=False):
+    """Stage 15: statistical analysis."""
+    if test_mode:
+        return {
+            'R_mean': 128.0, 'G_mean': 128.0, 'B_mean': 128.0,
+            'R_std': 45.0, 'G_std': 45.0, 'B_std': 45.0,
+            'R_skewness': 0.1, 'G_skewness': 0.1, 'B_skewness': 0.1,
+            'R_kurtosis': 3.0, 'G_kurtosis': 3.0, 'B_kurtosis': 3.0,
+            'R_entropy': 7.5, 'G_entropy': 7.5, 'B_entropy': 7.5,
+            'rg_correlation': 0.8, 'rb_correlation': 0.8, 'gb_correlation': 0.8,
+            'overall_entropy': 7.5
+        }
+    return perform_statistical_analysis(plane.image, plane=plane)
+
+
+def _statistical_fallback():
+    statistical_analysis_default = {ch: 0.0 for ch_metric in ['_mean', '_std', '_skewness', '_kurtosis', '_entropy'] for ch in ['R', 'G', 'B']}
+    statistical_analysis_default.update({'rg_correlation': 0.0, 'rb_correlation': 0.0, 'gb_correlation': 0.0, 'overall_entropy': 0.0})
+    return statistical_analysis_default
+
+
+def build_independent_stages(image_size, test_mode=False):
+    """
+    Declare stages 9-15 for the stage scheduler.
+
+    Returns a list of (step, label, summary, PipelineStage). ``summary`` formats the
+    console line from analysis_results once the stage has finished.
+    """
+    map_shape = image_size[::-1] # (H,W)
+    jpeg_fallback = {
+        'basic_analysis': {'quality_responses': [], 'response_variance': 0.0, 'double_compression_indicator': 0.0, 'estimated_original_quality': 0, 'compression_inconsistency': False},
+        'ghost_analysis': {'ghost_map': np.array([]), 'ghost_coverage': 0.0, 'ghost_intensity': 0.0, 'total_ghost_score': 0.0},
+        'block_analysis': {'block_artifacts': [], 'overall_blocking_score': 0.0},
+        'double_compression': {'double_compression_score': 0.0, 'is_double_compressed': False, 'indicators': []}
+    }
+    return [
+        ("📡 [9/17]", "Noise analysis",
+         lambda r: f"Noise inconsistency: {r['noise_analysis'].get('overall_inconsistency', 0):.3f}",
+         PipelineStage('noise_analysis', partial(_noise_stage, test_mode=test_mode),
+                       inputs=('image_stats',), outputs=('noise_analysis', 'noise_map'),
+                       fallback=lambda: ({'overall_inconsistency': 0.0, 'outlier_count': 0, 'noise_characteristics': []}, np.zeros(map_shape)))),
+        ("📷 [10/17]", "JPEG analysis",
+         lambda r: f"JPEG anomalies: {r['jpeg_ghost_suspicious_ratio']:.1%}",
+         PipelineStage('jpeg_analysis', partial(_jpeg_stage, test_mode=test_mode),
+                       inputs=('original_preprocessed_image', 'preprocessed_image'),
+                       outputs=('jpeg_analysis', 'jpeg_ghost', 'jpeg_ghost_suspicious_ratio'),
+                       fallback=lambda: (jpeg_fallback, np.zeros(map_shape), 0.0))),
+        ("🌊 [11/17]", "Frequency analysis",
+         lambda r: f"Frequency inconsistency: {r['frequency_analysis'].get('frequency_inconsistency', 0):.3f}",
+         PipelineStage('frequency_analysis', partial(_frequency_stage, test_mode=test_mode),
+                       inputs=('preprocessed_image',), outputs=('frequency_analysis',),
+                       fallback=lambda: {'frequency_inconsistency': 0.0, 'dct_stats': {'low_freq_energy': 0.0, 'high_freq_energy': 0.0, 'mid_freq_energy': 0.0, 'freq_ratio': 0.0}})),
+        ("🧵 [12/17]", "Texture analysis",
+         lambda r: f"Texture inconsistency: {r['texture_analysis'].get('overall_inconsistency', 0):.3f}",
+         PipelineStage('texture_analysis', partial(_texture_stage, test_mode=test_mode),
+                       inputs=('preprocessed_image',), outputs=('texture_analysis',),
+                       fallback=lambda: {'overall_inconsistency': 0.0, 'texture_consistency': {}, 'texture_features': []})),
+        ("📐 [13/17]", "Edge analysis",
+         lambda r: f"Edge inconsistency: {r['edge_analysis'].get('edge_inconsistency', 0):.3f}",
+         PipelineStage('edge_analysis', partial(_edge_stage, test_mode=test_mode),
+                       inputs=('image_stats',), outputs=('edge_analysis',),
+                       fallback=lambda: {'edge_inconsistency': 0.0, 'edge_densities': [], 'edge_variance': 0.0})),
+        ("💡 [14/17]", "Illumination analysis",
+         lambda r: f"Illumination inconsistency: {r['illumination_analysis'].get('overall_illumination_inconsistency', 0):.3f}",
+         PipelineStage('illumination_analysis', partial(_illumination_stage, test_mode=test_mode),
+                       inputs=('image_stats',), outputs=('illumination_analysis', 'color_analysis'),
+                       fallback=lambda: ({'illumination_mean_consistency': 0.0, 'illumination_std_consistency': 0.0, 'gradient_consistency': 0.0, 'overall_illumination_inconsistency': 0.0},
+                                         {'illumination_inconsistency': 0.0}))),
+        ("📈 [15/17]", "Statistical analysis",
+         lambda r: f"Overall entropy: {r['statistical_analysis'].get('overall_entropy', 0):.3f}",
+         PipelineStage('statistical_analysis', partial(_statistical_stage, test_mode=test_mode),
+                       inputs=('image_stats',), outputs=('statistical_analysis',),
+                       fallback=_statistical_fallback)),
+    ]
+# ======================= AKHIR TAHAP ANALISIS INDEPENDEN =======================
+
+
 # Bagian yang perlu dimodifikasi di main.py untuk tracking status pipeline
 
-def analyze_image_comprehensive_advanced(image_path, output_dir="./results", test_mode=False):
-    """Advanced comprehensive image analysis pipeline with status tracking and test mode."""
+def _run_cached_stage(stage_cache, stage, func, *args, **kwargs):
+    """Run a stage through the result cache when one is active (keyword arguments become part of the key)."""
+    if stage_cache is None:
+        return func(*args, **kwargs)
+    return stage_cache.run(stage, func, *args, params=kwargs, **kwargs)
+
+
+def _forget_cached_stage(stage_cache, stage):
+    """Failed stage: downstream stages must not be cached against its fallback values."""
+    if stage_cache is not None:
+        stage_cache.forget_stage(stage)
+
+
+def _stage_outputs(analysis_results, *keys):
+    """The analysis_results entries a stage produced (their sizes go into the stage profile)."""
+    return {key: analysis_results.get(key) for key in keys}
+
+
+def _cache_hit(stage_cache, stage):
+    return stage_cache is not None and stage in stage_cache.hits
+
+
+def analyze_image_comprehensive_advanced(image_path, output_dir="./results", test_mode=False, save_history=True,
+                                         result_cache=None, tiled=TILED_ANALYSIS, memory_budget_mb=TILED_MEMORY_BUDGET_MB):
+    """Advanced comprehensive image analysis pipeline with status tracking and test mode.
+
+    ``save_history=False`` skips the history/thumbnail entry (batch mode keeps its own JSONL summary).
+    ``result_cache`` (a result_cache.ResultCache) reuses stage results of previously analyzed identical
+    files; stages whose code/config changed are recomputed. Not used in test mode.
+    ``tiled=True`` adds a full-resolution tiled ELA/ghost/noise/DCT pass (``analysis_results['tiled_analysis']``)
+    whose tiles are sized to ``memory_budget_mb`` (compressed formats are still decoded whole once, see
+    tiled_analysis); the regular stages still use the downsized image.
+    """
     if not test_mode:
         print(f"\n{'='*80}")
         print(f"ADVANCED FORENSIC IMAGE ANALYSIS SYSTEM v2.0")
@@ -149,106 +395,117 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         'total_stages': 19,  # Updated to include MM Fusion and TruFor
         'completed_stages': 0,
         'failed_stages': [],
-        'stage_details': {} # Detailed success/failure for each stage
+        'stage_details': {} # Per stage: success flag plus wall/CPU time, memory and output sizes
     }
+    profiler = StageProfiler()
 
     # Create output directory if it doesn't exist
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Initialize analysis_results dictionary to populate throughout the pipeline
-    analysis_results = {
-        'metadata': {},
-        'ela_image': None, 'ela_mean': 0.0, 'ela_std': 0.0, 'ela_regional_stats': {}, 'ela_quality_stats': [], 'ela_variance': np.array([]),
-        'feature_sets': {}, 'sift_keypoints': [], 'sift_descriptors': None, 'sift_matches': 0, 'ransac_matches': [], 'ransac_inliers': 0, 'geometric_transform': None,
-        'block_matches': [],
-        'noise_analysis': {}, 'noise_map': np.array([]),
-        'jpeg_analysis': {}, 'jpeg_ghost': np.array([]), 'jpeg_ghost_suspicious_ratio': 0.0,
-        'frequency_analysis': {},
-        'texture_analysis': {},
-        'edge_analysis': {},
-        'illumination_analysis': {},
-        'statistical_analysis': {},
-        'color_analysis': {}, # Re-added color_analysis placeholder, although illumination_analysis might cover this
-        'roi_mask': np.array([]), # Feature detection ROI mask
-        'enhanced_gray': np.array([]), # Preprocessed grayscale image
-        'localization_analysis': {}, # This key will be updated by advanced_tampering_localization
-        'classification': {}, # This key will be updated by classification_advanced
-        'processing_time': "0s",
-        'pipeline_status': pipeline_status # Initially set, will be updated.
-    }
+    # Typed results container populated throughout the pipeline (dict-like; see analysis_results.py)
+    analysis_results = AnalysisResults(pipeline_status=pipeline_status)
 
 
     # 1. File Validation
     if not test_mode:
         print("🚀 [1/17] Validating image file...")
+    profiler.start('file_validation')
     try:
         validate_image_file(image_path)
         if not test_mode:
             print("✅ [1/17] File validation passed")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['file_validation'] = True
+        pipeline_status['stage_details']['file_validation'] = profiler.finish('file_validation', True)
     except Exception as e:
         if not test_mode:
             print(f"❌ [1/17] File validation failed: {e}")
         pipeline_status['failed_stages'].append('file_validation')
-        pipeline_status['stage_details']['file_validation'] = False
+        pipeline_status['stage_details']['file_validation'] = profiler.finish('file_validation', False, error=e)
         analysis_results['classification'] = {'type': 'Failed to Load', 'confidence': 'Very Low', 'copy_move_score': 0, 'splicing_score': 0, 'details': [f"File validation failed: {e}"]}
         return analysis_results # Exit early if file invalid
 
-    # 2. Load image
+    # 2. Load image (file read once through a memory map, decoded once for every stage)
     print("🖼️ [2/17] Loading image...")
+    profiler.start('image_loading')
     try:
-        original_image = Image.open(image_path)
+        ingested = ingest_image(image_path)
+        original_image = ingested.open_image()
         print(f"✅ [2/17] Image loaded: {os.path.basename(image_path)}")
         print(f"  Size: {original_image.size}, Mode: {original_image.mode}")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['image_loading'] = True
+        pipeline_status['stage_details']['image_loading'] = profiler.finish('image_loading', True, {'original_image': original_image})
     except Exception as e:
         print(f"❌ [2/17] Error loading image: {e}")
         pipeline_status['failed_stages'].append('image_loading')
-        pipeline_status['stage_details']['image_loading'] = False
+        pipeline_status['stage_details']['image_loading'] = profiler.finish('image_loading', False, error=e)
         analysis_results['classification'] = {'type': 'Failed to Load', 'confidence': 'Very Low', 'copy_move_score': 0, 'splicing_score': 0, 'details': [f"Image loading failed: {e}"]}
         return analysis_results
 
+    # Content-addressed stage cache (keyed by the file's SHA-256, hashed from the mapped bytes)
+    stage_cache = None
+    if result_cache is not None and not test_mode:
+        try:
+            stage_cache = get_file_stage_cache(image_path, result_cache, sha256=ingested.sha256)
+        except Exception as e:
+            print(f"⚠️ Result cache unavailable: {e}")
+
     # 3. Enhanced metadata extraction
     print("🔍 [3/17] Extracting enhanced metadata...")
+    profiler.start('metadata_extraction')
     try:
-        metadata = extract_enhanced_metadata(image_path)
+        metadata = extract_enhanced_metadata(image_path, ingested=ingested)
         analysis_results['metadata'] = metadata # Populate result dict
         print(f"  Authenticity Score: {metadata['Metadata_Authenticity_Score']}/100")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['metadata_extraction'] = True
+        pipeline_status['stage_details']['metadata_extraction'] = profiler.finish('metadata_extraction', True, _stage_outputs(analysis_results, 'metadata'))
     except Exception as e:
         print(f"❌ [3/17] Metadata extraction failed: {e}")
         metadata_default = {'Metadata_Authenticity_Score': 0, 'Filename': os.path.basename(image_path), 'FileSize (bytes)': os.path.getsize(image_path), 'Metadata_Inconsistency': ['Error extracting metadata']}
         analysis_results['metadata'] = metadata_default
         pipeline_status['failed_stages'].append('metadata_extraction')
-        pipeline_status['stage_details']['metadata_extraction'] = False
+        pipeline_status['stage_details']['metadata_extraction'] = profiler.finish('metadata_extraction', False, error=e)
+    ingested.close() # Metadata and pixels are in memory now; release the file mapping
 
     # 4. Advanced preprocessing
     print("🔧 [4/17] Advanced preprocessing...")
+    profiler.start('preprocessing')
     try:
-        # Pass a copy of the image to preprocessing to ensure it's not modified in place
-        preprocessed_image_pil, original_preprocessed_pil_copy = advanced_preprocess_image(original_image.copy())
+        # Preprocessing never modifies its input in place (convert/resize return new images)
+        preprocessed_image_pil, original_preprocessed_pil_copy = advanced_preprocess_image(original_image)
         analysis_results['enhanced_gray'] = np.array(preprocessed_image_pil.convert('L')) # Save enhanced grayscale for later steps
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['preprocessing'] = True
+        pipeline_status['stage_details']['preprocessing'] = profiler.finish('preprocessing', True, {'preprocessed_image': preprocessed_image_pil, 'enhanced_gray': analysis_results['enhanced_gray']})
     except Exception as e:
         print(f"❌ [4/17] Preprocessing failed: {e}")
         preprocessed_image_pil = original_image.copy().convert('RGB')
         original_preprocessed_pil_copy = original_image.copy().convert('RGB')
         analysis_results['enhanced_gray'] = np.array(original_image.convert('L')) # Fallback to raw grayscale
+        stage_cache = None # Cached results were computed from the preprocessed image
         pipeline_status['failed_stages'].append('preprocessing')
-        pipeline_status['stage_details']['preprocessing'] = False
+        pipeline_status['stage_details']['preprocessing'] = profiler.finish('preprocessing', False, error=e)
+
+    # 4b. Optional full-resolution tiled pass (very large images, not counted in the 19 stages)
+    if tiled and not test_mode:
+        print("🧩 Full-resolution tiled analysis...")
+        profiler.start('tiled_analysis')
+        try:
+            work_dir = os.path.join(output_dir, f"tiles_{os.path.splitext(os.path.basename(image_path))[0]}")
+            analysis_results['tiled_analysis'] = analyze_tiled(image_path, work_dir, memory_budget_mb=memory_budget_mb)
+            pipeline_status['stage_details']['tiled_analysis'] = profiler.finish('tiled_analysis', True, analysis_results['tiled_analysis']['maps'])
+        except Exception as e:
+            print(f"⚠️ Tiled analysis failed: {e}")
+            pipeline_status['stage_details']['tiled_analysis'] = profiler.finish('tiled_analysis', False, error=e)
 
     # 5. Multi-quality ELA
     print("📊 [5/17] Multi-quality Error Level Analysis...")
+    profiler.start('ela_analysis')
     try:
         # ELA operates on PIL Image and returns a PIL Image for ela_image_data, so handle that correctly.
         # In test mode, run ELA with fewer quality steps to speed it up.
         quality_steps = [90] if test_mode else [95, 85, 75]
-        ela_image_data, ela_mean, ela_std, ela_regional, ela_quality_stats, ela_variance = perform_multi_quality_ela(preprocessed_image_pil.copy(), quality_steps=quality_steps)
+        ela_image_data, ela_mean, ela_std, ela_regional, ela_quality_stats, ela_variance = _run_cached_stage(
+            stage_cache, 'ela_analysis', perform_multi_quality_ela, preprocessed_image_pil.copy(), quality_steps=quality_steps)
         analysis_results['ela_image'] = ela_image_data # This is a PIL Image object
         analysis_results['ela_mean'] = ela_mean
         analysis_results['ela_std'] = ela_std
@@ -257,7 +514,7 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         analysis_results['ela_variance'] = ela_variance # Store numpy array
         print(f"  ELA Stats: μ={ela_mean:.2f}, σ={ela_std:.2f}, Regions={ela_regional['outlier_regions']}")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['ela_analysis'] = True
+        pipeline_status['stage_details']['ela_analysis'] = profiler.finish('ela_analysis', True, _stage_outputs(analysis_results, 'ela_image', 'ela_variance', 'ela_regional_stats', 'ela_quality_stats'), cached=_cache_hit(stage_cache, 'ela_analysis'))
     except Exception as e:
         print(f"❌ [5/17] ELA analysis failed: {e}")
         # Default fallback values for ELA. `ela_image` is PIL `L` mode.
@@ -267,15 +524,18 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         analysis_results['ela_regional_stats'] = {'outlier_regions': 0, 'regional_inconsistency': 0.0, 'suspicious_regions': [], 'mean_variance':0.0}
         analysis_results['ela_quality_stats'] = []
         analysis_results['ela_variance'] = np.zeros(preprocessed_image_pil.size[::-1]) # shape is H,W, convert from (W,H)
+        _forget_cached_stage(stage_cache, 'ela_analysis')
         pipeline_status['failed_stages'].append('ela_analysis')
-        pipeline_status['stage_details']['ela_analysis'] = False
+        pipeline_status['stage_details']['ela_analysis'] = profiler.finish('ela_analysis', False, error=e)
 
     # 6. Multi-detector feature extraction
     print("🎯 [6/17] Multi-detector feature extraction...")
+    profiler.start('feature_extraction')
     try:
         # Pass copies to ensure `extract_multi_detector_features` has independent objects
         # And ensure `ela_image` is valid for use here, pass the PIL Image object
-        feature_sets, roi_mask, gray_enhanced_output = extract_multi_detector_features(
+        feature_sets, roi_mask, gray_enhanced_output = _run_cached_stage(
+            stage_cache, 'feature_extraction', extract_multi_detector_features,
             preprocessed_image_pil.copy(), analysis_results['ela_image'], analysis_results['ela_mean'], analysis_results['ela_std'], sift_nfeatures=(50 if test_mode else 500))
         
         analysis_results['feature_sets'] = feature_sets
@@ -288,7 +548,7 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         total_features = sum(len(kp) for kp, _ in feature_sets.values() if kp is not None) # Handle None keypoints safely
         print(f"  Total keypoints: {total_features}")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['feature_extraction'] = True
+        pipeline_status['stage_details']['feature_extraction'] = profiler.finish('feature_extraction', True, _stage_outputs(analysis_results, 'feature_sets', 'roi_mask', 'enhanced_gray'), cached=_cache_hit(stage_cache, 'feature_extraction'))
     except Exception as e:
         print(f"❌ [6/17] Feature extraction failed: {e}")
         analysis_results['feature_sets'] = {'sift': ([], None), 'orb': ([], None), 'akaze': ([], None)}
@@ -296,14 +556,17 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         analysis_results['sift_descriptors'] = None
         analysis_results['roi_mask'] = np.ones(preprocessed_image_pil.size[::-1], dtype=np.uint8) * 255 # HxW, All 255 for mask
         analysis_results['enhanced_gray'] = np.array(preprocessed_image_pil.convert('L'))
+        _forget_cached_stage(stage_cache, 'feature_extraction')
         pipeline_status['failed_stages'].append('feature_extraction')
-        pipeline_status['stage_details']['feature_extraction'] = False
+        pipeline_status['stage_details']['feature_extraction'] = profiler.finish('feature_extraction', False, error=e)
 
     # 7. Advanced copy-move detection (Feature-based)
     print("🔄 [7/17] Advanced copy-move detection (Feature-based)...")
+    profiler.start('feature_based_copymove_detection')
     try:
         # `detect_copy_move_advanced` needs `feature_sets` dict, and image_shape is (W, H)
-        ransac_matches, ransac_inliers, transform, total_matches = detect_copy_move_advanced(
+        ransac_matches, ransac_inliers, transform, total_matches = _run_cached_stage(
+            stage_cache, 'feature_based_copymove_detection', detect_copy_move_advanced,
             analysis_results['feature_sets'], preprocessed_image_pil.size)
         analysis_results['ransac_matches'] = ransac_matches # Match objects
         analysis_results['sift_matches'] = total_matches # Total matches before RANSAC
@@ -311,250 +574,76 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         analysis_results['geometric_transform'] = transform # (transform_type, matrix)
         print(f"  RANSAC inliers: {ransac_inliers}")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['feature_based_copymove_detection'] = True
+        pipeline_status['stage_details']['feature_based_copymove_detection'] = profiler.finish('feature_based_copymove_detection', True, _stage_outputs(analysis_results, 'ransac_matches', 'geometric_transform'), cached=_cache_hit(stage_cache, 'feature_based_copymove_detection'))
     except Exception as e:
         print(f"❌ [7/17] Feature-based copy-move detection failed: {e}")
         analysis_results['ransac_matches'] = []
         analysis_results['sift_matches'] = 0
         analysis_results['ransac_inliers'] = 0
         analysis_results['geometric_transform'] = None
+        _forget_cached_stage(stage_cache, 'feature_based_copymove_detection')
         pipeline_status['failed_stages'].append('feature_based_copymove_detection')
-        pipeline_status['stage_details']['feature_based_copymove_detection'] = False
+        pipeline_status['stage_details']['feature_based_copymove_detection'] = profiler.finish('feature_based_copymove_detection', False, error=e)
 
     # 8. Enhanced block matching
     print("🧩 [8/17] Enhanced block-based detection...")
+    profiler.start('block_based_copymove_detection')
     try:
-        block_matches = detect_copy_move_blocks(preprocessed_image_pil.copy())
+        block_matches = _run_cached_stage(stage_cache, 'block_based_copymove_detection', detect_copy_move_blocks, preprocessed_image_pil.copy())
         analysis_results['block_matches'] = block_matches # List of dicts
         print(f"  Block matches: {len(block_matches)}")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['block_based_copymove_detection'] = True
+        pipeline_status['stage_details']['block_based_copymove_detection'] = profiler.finish('block_based_copymove_detection', True, _stage_outputs(analysis_results, 'block_matches'), cached=_cache_hit(stage_cache, 'block_based_copymove_detection'))
     except Exception as e:
         print(f"❌ [8/17] Block matching failed: {e}")
         analysis_results['block_matches'] = []
+        _forget_cached_stage(stage_cache, 'block_based_copymove_detection')
         pipeline_status['failed_stages'].append('block_based_copymove_detection')
-        pipeline_status['stage_details']['block_based_copymove_detection'] = False
-
-    # 9. Advanced noise analysis
-    print("📡 [9/17] Advanced noise consistency analysis...")
-    try:
-        # In test mode, skip detailed noise analysis for speed
-        if test_mode:
-            noise_analysis_res = {
-                'overall_inconsistency': 0.1,
-                'outlier_count': 0,
-                'noise_characteristics': ['test_mode_skip']
-            }
-        else:
-            # Pass a copy, result is a dict with floats/lists
-            noise_analysis_res = analyze_noise_consistency(preprocessed_image_pil.copy())
-        analysis_results['noise_analysis'] = noise_analysis_res
-        # Noise map usually would be generated/stored as a separate visual from this module
-        # If analyze_noise_consistency returns a map, add it. Otherwise, generate a simple one.
-        # Currently, it doesn't return a direct map. Let's make a dummy one if not explicitly generated later.
-        analysis_results['noise_map'] = np.zeros(preprocessed_image_pil.size[::-1]) # HxW np array
-        if noise_analysis_res.get('noise_characteristics'):
-            # Generate a simple map based on overall inconsistency or laplacian variance per block
-            # For simplicity, if actual map is not produced, take preprocessed_image_pil and calculate
-            # its own raw laplacian as a "noise map" visualization for `main`
-            try:
-                gray_for_noise_map = np.array(preprocessed_image_pil.convert('L'))
-                if gray_for_noise_map.shape[0] >=3 and gray_for_noise_map.shape[1] >=3:
-                    laplacian = np.abs(cv2.Laplacian(gray_for_noise_map, cv2.CV_64F))
-                    analysis_results['noise_map'] = (laplacian / np.max(laplacian) * 255).astype(np.uint8)
-            except Exception:
-                analysis_results['noise_map'] = np.zeros(preprocessed_image_pil.size[::-1], dtype=np.uint8) # Fallback to black if no map possible
-            
-
-        print(f"  Noise inconsistency: {noise_analysis_res.get('overall_inconsistency', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['noise_analysis'] = True
-    except Exception as e:
-        print(f"❌ [9/17] Noise analysis failed: {e}")
-        analysis_results['noise_analysis'] = {'overall_inconsistency': 0.0, 'outlier_count': 0, 'noise_characteristics': []}
-        analysis_results['noise_map'] = np.zeros(preprocessed_image_pil.size[::-1]) # HxW black map
-        pipeline_status['failed_stages'].append('noise_analysis')
-        pipeline_status['stage_details']['noise_analysis'] = False
-
-    # 10. Comprehensive JPEG analysis (includes basic, ghost, block, double compression)
-    print("📷 [10/17] Comprehensive JPEG artifact analysis...")
-    try:
-        # In test mode, use simplified JPEG analysis for speed
-        if test_mode:
-            jpeg_full_results = {
-                'basic_analysis': {'quality_responses': [85], 'response_variance': 0.1, 'double_compression_indicator': 0.0, 'estimated_original_quality': 85, 'compression_inconsistency': False},
-                'ghost_analysis': {'ghost_map': np.zeros(preprocessed_image_pil.size[::-1]), 'ghost_coverage': 0.0, 'ghost_intensity': 0.0, 'total_ghost_score': 0.0},
-                'block_analysis': {'block_artifacts': [], 'overall_blocking_score': 0.0},
-                'double_compression': {'double_compression_score': 0.0, 'is_double_compressed': False, 'indicators': []}
-            }
-        else:
-            # Assuming `comprehensive_jpeg_analysis` returns all nested results correctly
-            jpeg_full_results = comprehensive_jpeg_analysis(original_preprocessed_pil_copy.copy()) # Use original preprocessed for full fidelity
-        analysis_results['jpeg_analysis'] = jpeg_full_results
-        
-        # Extract direct maps and ratios for convenience from full result. Safely access deeply nested items.
-        analysis_results['jpeg_ghost'] = jpeg_full_results.get('ghost_analysis', {}).get('ghost_map', np.array([]))
-        analysis_results['jpeg_ghost_suspicious_ratio'] = jpeg_full_results.get('ghost_analysis', {}).get('ghost_coverage', 0.0)
-
-        # Handle the case where jpeg_ghost map might be empty from comprehensive_jpeg_analysis
-        if analysis_results['jpeg_ghost'].size == 0 and preprocessed_image_pil.size[0]*preprocessed_image_pil.size[1] > 0: # Ensure not totally empty or 0 sized if image exists
-            analysis_results['jpeg_ghost'] = np.zeros(preprocessed_image_pil.size[::-1]) # Ensure it's a valid zero-filled array of correct shape
-            
-        print(f"  JPEG anomalies: {analysis_results['jpeg_ghost_suspicious_ratio']:.1%}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['jpeg_analysis'] = True
-
-    except Exception as e:
-        print(f"❌ [10/17] JPEG analysis failed: {e}")
-        # Default fallback values for all parts of JPEG analysis result
-        analysis_results['jpeg_analysis'] = {
-            'basic_analysis': {'quality_responses': [], 'response_variance': 0.0, 'double_compression_indicator': 0.0, 'estimated_original_quality': 0, 'compression_inconsistency': False},
-            'ghost_analysis': {'ghost_map': np.array([]), 'ghost_coverage': 0.0, 'ghost_intensity': 0.0, 'total_ghost_score': 0.0},
-            'block_analysis': {'block_artifacts': [], 'overall_blocking_score': 0.0},
-            'double_compression': {'double_compression_score': 0.0, 'is_double_compressed': False, 'indicators': []}
-        }
-        analysis_results['jpeg_ghost'] = np.zeros(preprocessed_image_pil.size[::-1]) # HxW black map
-        analysis_results['jpeg_ghost_suspicious_ratio'] = 0.0
-        pipeline_status['failed_stages'].append('jpeg_analysis')
-        pipeline_status['stage_details']['jpeg_analysis'] = False
-
-    # 11. Frequency domain analysis
-    print("🌊 [11/17] Frequency domain analysis...")
-    try:
-        # In test mode, use simplified frequency analysis
-        if test_mode:
-            frequency_analysis_res = {
-                'frequency_inconsistency': 0.05,
-                'dct_stats': {'low_freq_energy': 0.7, 'high_freq_energy': 0.2, 'mid_freq_energy': 0.1, 'freq_ratio': 3.5}
-            }
-        else:
-            # Returns a dict with float/dict
-            frequency_analysis_res = analyze_frequency_domain(preprocessed_image_pil.copy())
-        analysis_results['frequency_analysis'] = frequency_analysis_res
-        print(f"  Frequency inconsistency: {frequency_analysis_res.get('frequency_inconsistency', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['frequency_analysis'] = True
-    except Exception as e:
-        print(f"❌ [11/17] Frequency analysis failed: {e}")
-        analysis_results['frequency_analysis'] = {'frequency_inconsistency': 0.0, 'dct_stats': {'low_freq_energy': 0.0, 'high_freq_energy': 0.0, 'mid_freq_energy': 0.0, 'freq_ratio': 0.0}}
-        pipeline_status['failed_stages'].append('frequency_analysis')
-        pipeline_status['stage_details']['frequency_analysis'] = False
-
-    # 12. Texture consistency analysis
-    print("🧵 [12/17] Texture consistency analysis...")
-    try:
-        # In test mode, use simplified texture analysis
-        if test_mode:
-            texture_analysis_res = {
-                'overall_inconsistency': 0.08,
-                'texture_consistency': {'lbp_variance': 0.1, 'glcm_variance': 0.05},
-                'texture_features': ['test_mode_simplified']
-            }
-        else:
-            # Returns a dict with floats/dict
-            texture_analysis_res = analyze_texture_consistency(preprocessed_image_pil.copy())
-        analysis_results['texture_analysis'] = texture_analysis_res
-        print(f"  Texture inconsistency: {texture_analysis_res.get('overall_inconsistency', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['texture_analysis'] = True
-    except Exception as e:
-        print(f"❌ [12/17] Texture analysis failed: {e}")
-        analysis_results['texture_analysis'] = {'overall_inconsistency': 0.0, 'texture_consistency': {}, 'texture_features': []}
-        pipeline_status['failed_stages'].append('texture_analysis')
-        pipeline_status['stage_details']['texture_analysis'] = False
-
-    # 13. Edge consistency analysis
-    print("📐 [13/17] Edge density analysis...")
-    try:
-        # In test mode, use simplified edge analysis
-        if test_mode:
-            edge_analysis_res = {
-                'edge_inconsistency': 0.06,
-                'edge_densities': [0.1, 0.15, 0.12],
-                'edge_variance': 0.02
-            }
-        else:
-            # Returns a dict with floats/lists
-            edge_analysis_res = analyze_edge_consistency(preprocessed_image_pil.copy())
-        analysis_results['edge_analysis'] = edge_analysis_res
-        print(f"  Edge inconsistency: {edge_analysis_res.get('edge_inconsistency', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['edge_analysis'] = True
-    except Exception as e:
-        print(f"❌ [13/17] Edge analysis failed: {e}")
-        analysis_results['edge_analysis'] = {'edge_inconsistency': 0.0, 'edge_densities': [], 'edge_variance': 0.0}
-        pipeline_status['failed_stages'].append('edge_analysis')
-        pipeline_status['stage_details']['edge_analysis'] = False
-
-    # 14. Illumination analysis
-    print("💡 [14/17] Illumination consistency analysis...")
-    try:
-        # In test mode, use simplified illumination analysis
-        if test_mode:
-            illumination_analysis_res = {
-                'illumination_mean_consistency': 0.9,
-                'illumination_std_consistency': 0.85,
-                'gradient_consistency': 0.88,
-                'overall_illumination_inconsistency': 0.07
-            }
-        else:
-            # Returns a dict with floats
-            illumination_analysis_res = analyze_illumination_consistency(preprocessed_image_pil.copy())
-        analysis_results['illumination_analysis'] = illumination_analysis_res
-        # Assuming no direct "color_analysis" map is needed explicitly beyond this
-        analysis_results['color_analysis'] = {'illumination_inconsistency': illumination_analysis_res.get('overall_illumination_inconsistency', 0.0)}
-        print(f"  Illumination inconsistency: {illumination_analysis_res.get('overall_illumination_inconsistency', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['illumination_analysis'] = True
-    except Exception as e:
-        print(f"❌ [14/17] Illumination analysis failed: {e}")
-        analysis_results['illumination_analysis'] = {'illumination_mean_consistency': 0.0, 'illumination_std_consistency': 0.0, 'gradient_consistency': 0.0, 'overall_illumination_inconsistency': 0.0}
-        analysis_results['color_analysis'] = {'illumination_inconsistency': 0.0}
-        pipeline_status['failed_stages'].append('illumination_analysis')
-        pipeline_status['stage_details']['illumination_analysis'] = False
-
-    # 15. Statistical analysis
-    print("📈 [15/17] Statistical analysis...")
-    try:
-        # In test mode, use simplified statistical analysis
-        if test_mode:
-            statistical_analysis_res = {
-                'R_mean': 128.0, 'G_mean': 128.0, 'B_mean': 128.0,
-                'R_std': 45.0, 'G_std': 45.0, 'B_std': 45.0,
-                'R_skewness': 0.1, 'G_skewness': 0.1, 'B_skewness': 0.1,
-                'R_kurtosis': 3.0, 'G_kurtosis': 3.0, 'B_kurtosis': 3.0,
-                'R_entropy': 7.5, 'G_entropy': 7.5, 'B_entropy': 7.5,
-                'rg_correlation': 0.8, 'rb_correlation': 0.8, 'gb_correlation': 0.8,
-                'overall_entropy': 7.5
-            }
+        pipeline_status['stage_details']['block_based_copymove_detection'] = profiler.finish('block_based_copymove_detection', False, error=e)
+
+    # 9-15. Independent analysis stages (noise, JPEG, frequency, texture, edge, illumination, statistical)
+    # Semua tahap ini hanya membutuhkan gambar hasil preprocessing, jadi dijalankan paralel.
+    # In test mode the stubs are instant, so run them in-process.
+    independent_stages = build_independent_stages(preprocessed_image_pil.size, test_mode=test_mode)
+    print(f"⚙️ [9-15/17] Running {len(independent_stages)} independent analysis stages in parallel...")
+    stage_values = {
+        'preprocessed_image': preprocessed_image_pil.copy(),
+        'original_preprocessed_image': original_preprocessed_pil_copy.copy(),
+        # Peta/integral image bersama untuk tahap noise, edge, illumination dan statistik
+        'image_stats': ImageStatsPlane(preprocessed_image_pil.copy()),
+    }
+    stage_outcomes = run_stage_graph([stage for _, _, _, stage in independent_stages], stage_values,
+                                     max_workers=1 if test_mode else None, cache=stage_cache)
+
+    # Apply results in declaration order so pipeline_status is identical to a sequential run
+    for step, label, summary, stage in independent_stages:
+        outcome = stage_outcomes.get(stage.name, {'success': False, 'error': 'not run'})
+        for key in stage.outputs:
+            analysis_results[key] = stage_values[key]
+        pipeline_status['stage_details'][stage.name] = profiler.add_outcome(
+            stage.name, outcome, _stage_outputs(analysis_results, *stage.outputs))
+        if outcome['success']:
+            print(f"{step} {summary(analysis_results)}")
+            pipeline_status['completed_stages'] += 1
         else:
-            # Returns a dict with floats
-            statistical_analysis_res = perform_statistical_analysis(preprocessed_image_pil.copy())
-        analysis_results['statistical_analysis'] = statistical_analysis_res
-        print(f"  Overall entropy: {statistical_analysis_res.get('overall_entropy', 0):.3f}")
-        pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['statistical_analysis'] = True
-    except Exception as e:
-        print(f"❌ [15/17] Statistical analysis failed: {e}")
-        statistical_analysis_default = {ch: 0.0 for ch_metric in ['_mean', '_std', '_skewness', '_kurtosis', '_entropy'] for ch in ['R', 'G', 'B']}
-        statistical_analysis_default.update({'rg_correlation': 0.0, 'rb_correlation': 0.0, 'gb_correlation': 0.0, 'overall_entropy': 0.0})
-        analysis_results['statistical_analysis'] = statistical_analysis_default
-        pipeline_status['failed_stages'].append('statistical_analysis')
-        pipeline_status['stage_details']['statistical_analysis'] = False
+            print(f"❌ {step.split(' ')[-1]} {label} failed: {outcome['error']}")
+            pipeline_status['failed_stages'].append(stage.name)
 
     # 16. Advanced tampering localization (combines K-Means & ELA, etc.)
     print("🎯 [16/17] Advanced tampering localization...")
+    profiler.start('localization_analysis')
     try:
         # `advanced_tampering_localization` uses analysis_results['ela_image']
         # In test mode, use fewer clusters and simplified localization
         if test_mode:
             localization_results = advanced_tampering_localization(preprocessed_image_pil.copy(), analysis_results, n_clusters=2)
         else:
-            localization_results = advanced_tampering_localization(preprocessed_image_pil.copy(), analysis_results, n_clusters=8)
+            localization_results = _run_cached_stage(stage_cache, 'localization_analysis', advanced_tampering_localization,
+                                                     preprocessed_image_pil.copy(), analysis_results, n_clusters=8)
         analysis_results['localization_analysis'] = localization_results
         print(f"  Tampering area: {localization_results.get('tampering_percentage', 0):.1f}% of image")
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['localization_analysis'] = True
+        pipeline_status['stage_details']['localization_analysis'] = profiler.finish('localization_analysis', True, _stage_outputs(analysis_results, 'localization_analysis'), cached=_cache_hit(stage_cache, 'localization_analysis'))
     except Exception as e:
         print(f"❌ [16/17] Localization analysis failed: {e}")
         # Default to a safe structure for localization_analysis
@@ -565,16 +654,18 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
             'combined_tampering_mask': np.zeros(default_loc_map_shape, dtype=bool), # Crucial key for heatmap and classification
             'tampering_percentage': 0.0
         }
+        _forget_cached_stage(stage_cache, 'localization_analysis')
         pipeline_status['failed_stages'].append('localization_analysis')
-        pipeline_status['stage_details']['localization_analysis'] = False
+        pipeline_status['stage_details']['localization_analysis'] = profiler.finish('localization_analysis', False, error=e)
     
     # 17. Advanced classification (uses all collected data)
     print("🤖 [17/19] Advanced manipulation classification...")
+    profiler.start('classification')
     try:
         classification = classify_manipulation_advanced(analysis_results)
         analysis_results['classification'] = classification
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['classification'] = True
+        pipeline_status['stage_details']['classification'] = profiler.finish('classification', True, _stage_outputs(analysis_results, 'classification'))
     except Exception as e:
         print(f"❌ [17/19] Classification failed: {e}")
         classification_error_default = {
@@ -590,12 +681,13 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         }
         analysis_results['classification'] = classification_error_default
         pipeline_status['failed_stages'].append('classification')
-        pipeline_status['stage_details']['classification'] = False
+        pipeline_status['stage_details']['classification'] = profiler.finish('classification', False, error=e)
 
     # 18. MM Fusion Forgery Detection
     print("🔍 [18/19] MM Fusion Forgery Detection...")
+    profiler.start('mm_fusion_analysis')
     try:
-        mm_fusion_results = detect_forgery_mm_fusion(preprocessed_image_pil.copy())
+        mm_fusion_results = _run_cached_stage(stage_cache, 'mm_fusion_analysis', detect_forgery_mm_fusion, preprocessed_image_pil.copy())
         analysis_results['mm_fusion_analysis'] = mm_fusion_results
         
         # Extract key metrics for display
@@ -607,7 +699,7 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         print(f"  Forgery detected: {'Yes' if forgery_detected else 'No'}")
         
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['mm_fusion_analysis'] = True
+        pipeline_status['stage_details']['mm_fusion_analysis'] = profiler.finish('mm_fusion_analysis', True, _stage_outputs(analysis_results, 'mm_fusion_analysis'), cached=_cache_hit(stage_cache, 'mm_fusion_analysis'))
     except Exception as e:
         print(f"❌ [18/19] MM Fusion analysis failed: {e}")
         analysis_results['mm_fusion_analysis'] = {
@@ -621,13 +713,15 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
                 'error': str(e)
             }
         }
+        _forget_cached_stage(stage_cache, 'mm_fusion_analysis')
         pipeline_status['failed_stages'].append('mm_fusion_analysis')
-        pipeline_status['stage_details']['mm_fusion_analysis'] = False
+        pipeline_status['stage_details']['mm_fusion_analysis'] = profiler.finish('mm_fusion_analysis', False, error=e)
 
     # 19. TruFor Forensic Analysis
     print("🔬 [19/19] TruFor Forensic Analysis...")
+    profiler.start('trufor_analysis')
     try:
-        trufor_results = detect_forgery_trufor(preprocessed_image_pil.copy())
+        trufor_results = _run_cached_stage(stage_cache, 'trufor_analysis', detect_forgery_trufor, preprocessed_image_pil.copy())
         analysis_results['trufor_analysis'] = trufor_results
         
         # Extract key metrics for display
@@ -640,7 +734,7 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
         print(f"  Risk level: {risk_level}")
         
         pipeline_status['completed_stages'] += 1
-        pipeline_status['stage_details']['trufor_analysis'] = True
+        pipeline_status['stage_details']['trufor_analysis'] = profiler.finish('trufor_analysis', True, _stage_outputs(analysis_results, 'trufor_analysis'), cached=_cache_hit(stage_cache, 'trufor_analysis'))
     except Exception as e:
         print(f"❌ [19/19] TruFor analysis failed: {e}")
         analysis_results['trufor_analysis'] = {
@@ -661,12 +755,16 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
                 'error': str(e)
             }
         }
+        _forget_cached_stage(stage_cache, 'trufor_analysis')
         pipeline_status['failed_stages'].append('trufor_analysis')
-        pipeline_status['stage_details']['trufor_analysis'] = False
+        pipeline_status['stage_details']['trufor_analysis'] = profiler.finish('trufor_analysis', False, error=e)
 
     # Final updates for processing time and overall pipeline status summary
     processing_time = time.time() - start_time
     analysis_results['processing_time'] = f"{processing_time:.2f}s"
+    if stage_cache is not None:
+        pipeline_status['cached_stages'] = list(stage_cache.hits)
+    pipeline_status['profile'] = profiler.summary()
     # Populate the main pipeline_status dict in analysis_results
     analysis_results['pipeline_status'] = pipeline_status
 
@@ -691,6 +789,11 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
     
     if pipeline_status['failed_stages']:
         print(f"📊 Failed Components: {', '.join(pipeline_status['failed_stages'])}")
+    if pipeline_status.get('cached_stages'):
+        print(f"♻️ Reused from cache: {', '.join(pipeline_status['cached_stages'])}")
+    slowest = [f"{name} {pipeline_status['stage_details'][name]['wall_time']:.2f}s"
+               for name in pipeline_status['profile']['slowest_stages'][:3]]
+    print(f"⏱️ Slowest stages: {', '.join(slowest)} (peak RSS {pipeline_status['profile']['peak_rss_mb']:.0f} MB)")
 
     print(f"\n{'='*80}")
     print(f"ANALYSIS COMPLETE - Processing Time: {processing_time:.2f}s")
@@ -713,6 +816,8 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
     # ======================= AKHIR BLOK YANG DIPERBAIKI =======================
 
     # Save to history (updated to use new classification format)
+    if not save_history:
+        return analysis_results
     try:
         image_filename = os.path.basename(image_path)
         # Gunakan data dari uncertainty report jika tersedia, fallback ke format lama
@@ -734,25 +839,19 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
                 'splicing_score': final_classification.get('splicing_score', 0)
             }
         
-        # Ensure thumbnail directory exists
-        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
-        timestamp_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        thumbnail_filename = f"thumb_{os.path.splitext(image_filename)[0]}_{timestamp_str}.jpg" # Add filename to thumbnail name for uniqueness
-        thumbnail_path = os.path.join(THUMBNAIL_DIR, thumbnail_filename)
-        
-        # Open the original image again for thumbnail generation
-        with Image.open(image_path) as img:
-            img_rgb = img.convert("RGB") # Ensure it's RGB before saving
-            img_rgb.thumbnail((128, 128))
-            img_rgb.save(thumbnail_path, "JPEG", quality=85)
+        # Thumbnail JPEG in memory; stored as a blob in the history database
+        thumbnail_buffer = io.BytesIO()
+        img_rgb = original_image.convert("RGB") # New RGB image; the decoded original stays untouched
+        img_rgb.thumbnail((128, 128))
+        img_rgb.save(thumbnail_buffer, "JPEG", quality=85)
             
-        save_analysis_to_history(
+        entry_id = save_analysis_to_history(
             image_filename, 
             analysis_summary_for_history, 
             f"{processing_time:.2f}s",
-            thumbnail_path
+            thumbnail_buffer.getvalue()
         )
-        print(f"💾 Analysis results and thumbnail saved to history ({thumbnail_path}).")
+        print(f"💾 Analysis results and thumbnail saved to history (entry {entry_id}).")
     except Exception as e:
         print(f"⚠️ Failed to save analysis to history: {e}")
         import traceback
@@ -760,6 +859,27 @@ def analyze_image_comprehensive_advanced(image_path, output_dir="./results", tes
 
     return analysis_results
 
+def export_analysis_outputs(original_image, analysis_results, base_path, full_package=False,
+                            export_all=False, export_vis=False, export_report=False, package_formats=None):
+    """Export the analysis results selected by the CLI flags (default: basic PNG summary)."""
+    if full_package: # New comprehensive export package
+        print("\n📦 Exporting comprehensive forensic package...")
+        export_comprehensive_package(original_image, analysis_results, base_path, package_formats)
+    elif export_all:
+        print("\n📦 Exporting complete package (standard set)...")
+        export_complete_package(original_image, analysis_results, base_path)
+    elif export_vis:
+        print("\n📊 Exporting PNG visualization...")
+        # Using the specific PNG visualization export function
+        export_visualization_png(original_image, analysis_results, f"{base_path}_analysis_visuals.png")
+    elif export_report:
+        print("\n📄 Exporting DOCX report...")
+        export_to_advanced_docx(original_image, analysis_results, f"{base_path}_report.docx")
+    else: # Default: just save a PNG summary if no export options given
+        print("\n📊 Exporting basic PNG summary visualization...")
+        export_visualization_png(original_image, analysis_results, f"{base_path}_analysis_summary.png")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Advanced Forensic Image Analysis System v2.0')
     parser.add_argument('image_path', nargs='?', help='Path to the image file to analyze (optional if using app mode)') # Made optional
@@ -773,14 +893,64 @@ def main():
                        help='Export only DOCX report')
     parser.add_argument('--full-export-package', '-p', action='store_true',
                         help='Export comprehensive package (all 17 images, HTML, reports, ZIP)')
+    parser.add_argument('--formats', metavar='LIST', default=None,
+                        help='Comma-separated outputs of -p: process_images,png,docx,pdf,html '
+                             '(default: EXPORT_PACKAGE_FORMATS in config)')
+    parser.add_argument('--batch', metavar='DIR',
+                        help='Analyze every image in DIR (recursive) with a pool of worker processes')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Analyze the images listed in FILE (one path per line) in batch mode')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Number of worker processes for batch mode (default: CPU count)')
+    parser.add_argument('--summary', metavar='FILE', default=None,
+                        help='JSONL summary file for batch mode (default: <output-dir>/batch_summary.jsonl)')
+    parser.add_argument('--metadata-only', action='store_true',
+                        help='Batch mode: only extract EXIF/XMP/JPEG header metadata (no pixel decoding) '
+                             'into the JSONL summary (default: <output-dir>/metadata_summary.jsonl)')
+    parser.add_argument('--tiled', action='store_true',
+                        help='Also analyze the image at full resolution in tiles (for very large images)')
+    parser.add_argument('--memory-budget', type=int, default=TILED_MEMORY_BUDGET_MB, metavar='MB',
+                        help=f'Peak memory budget for --tiled in MB (default: {TILED_MEMORY_BUDGET_MB})')
+    parser.add_argument('--profile', action='store_true',
+                        help='Write the per-stage profile as JSON and as a Chrome trace next to the results')
+    parser.add_argument('--bundle', action='store_true',
+                        help='Also save the full results as <name>_results.npz (reload with analysis_results.load_bundle)')
+    parser.add_argument('--feature-table', metavar='FILE', default=None,
+                        help='Append the classifier features of this image to a feature table (.npz, see feature_table.py)')
 
     args = parser.parse_args()
+    package_formats = [f.strip() for f in args.formats.split(',') if f.strip()] if args.formats else None
+
+    # Metadata-only triage: headers parsed from the file bytes, pixels never decoded
+    if args.metadata_only and (args.batch or args.manifest):
+        from batch_processing import iter_batch_inputs
+        from image_ingest import triage_metadata
+        summary_path = args.summary or os.path.join(args.output_dir, 'metadata_summary.jsonl')
+        start = time.time()
+        counts = triage_metadata(iter_batch_inputs(args.batch, args.manifest, exclude_dir=args.output_dir),
+                                 summary_path, workers=args.workers)
+        print(f"🗂️ Metadata triage: {sum(counts.values())} files in {time.time() - start:.1f}s {counts} -> {summary_path}")
+        sys.exit(1 if counts.get('failed') else 0)
+
+    # Batch mode: resumable, results streamed to a JSONL summary
+    if args.batch or args.manifest:
+        from batch_processing import run_batch
+        export_flags = {'full_package': args.full_export_package, 'export_all': args.export_all,
+                        'export_vis': args.export_vis, 'export_report': args.export_report}
+        export_options = dict(export_flags, package_formats=package_formats) if any(export_flags.values()) else None
+        try:
+            stats = run_batch(batch_dir=args.batch, manifest=args.manifest, output_dir=args.output_dir,
+                              workers=args.workers, summary_path=args.summary, export_options=export_options)
+        except KeyboardInterrupt:
+            sys.exit(1)
+        sys.exit(1 if stats['failed'] else 0)
 
     # If no image path provided and not in Streamlit context, tell user to use CLI
     if not args.image_path:
         print("Please provide an image path or run in Streamlit app mode.")
         print("Usage: python main.py <image_path> [options]")
         print("Or for comprehensive package: python main.py <image_path> -p")
+        print("Or for a whole folder: python main.py --batch <dir> [--workers N]")
         print("Exiting...")
         sys.exit(1)
 
@@ -790,7 +960,9 @@ def main():
         sys.exit(1)
 
     try:
-        analysis_results = analyze_image_comprehensive_advanced(args.image_path, args.output_dir, test_mode=False)
+        analysis_results = analyze_image_comprehensive_advanced(args.image_path, args.output_dir, test_mode=False,
+                                                                tiled=args.tiled or TILED_ANALYSIS,
+                                                                memory_budget_mb=args.memory_budget)
 
         if analysis_results is None:
             print("❌ Analysis failed!")
@@ -801,24 +973,23 @@ def main():
         base_filename = os.path.splitext(os.path.basename(args.image_path))[0]
         base_path = os.path.join(args.output_dir, base_filename)
 
-        if args.full_export_package: # New comprehensive export package
-            print("\n📦 Exporting comprehensive forensic package...")
-            from export_utils import export_comprehensive_package # Import the comprehensive package function
-            export_comprehensive_package(original_image, analysis_results, base_path)
-        elif args.export_all:
-            print("\n📦 Exporting complete package (standard set)...")
-            export_complete_package(original_image, analysis_results, base_path)
-        elif args.export_vis:
-            print("\n📊 Exporting PNG visualization...")
-            # Using the specific PNG visualization export function
-            export_visualization_png(original_image, analysis_results, f"{base_path}_analysis_visuals.png")
-        elif args.export_report:
-            print("\n📄 Exporting DOCX report...")
-            from export_utils import export_to_advanced_docx
-            export_to_advanced_docx(original_image, analysis_results, f"{base_path}_report.docx")
-        else: # Default: just save a PNG summary if no export options given
-            print("\n📊 Exporting basic PNG summary visualization...")
-            export_visualization_png(original_image, analysis_results, f"{base_path}_analysis_summary.png")
+        export_analysis_outputs(original_image, analysis_results, base_path,
+                                full_package=args.full_export_package, export_all=args.export_all,
+                                export_vis=args.export_vis, export_report=args.export_report,
+                                package_formats=package_formats)
+
+        if args.bundle:
+            print(f"💾 Results bundle: {analysis_results.save_bundle(f'{base_path}_results.npz')}")
+
+        if args.feature_table:
+            append_to_feature_table(args.feature_table, os.path.abspath(args.image_path), analysis_results)
+            print(f"📈 Features appended to {args.feature_table}")
+
+        if args.profile:
+            pipeline_status = analysis_results['pipeline_status']
+            print(f"⏱️ Stage profile: {profile_to_json(pipeline_status, f'{base_path}_profile.json')}")
+            print(f"⏱️ Chrome trace: {profile_to_chrome_trace(pipeline_status, f'{base_path}_trace.json')} "
+                  f"(open in chrome://tracing or ui.perfetto.dev)")
 
         print("✅ Analysis completed successfully!")
 
@@ -0,0 +1,386 @@
+"""
+Report artifact store for the Forensic Image Analysis exports
+
+Every figure of the export (the 17 process images plus the report-only plots)
+is rendered once, as PNG bytes, into an ArtifactStore. The process-image
+folder, the DOCX report, the PDF and the HTML index are then assembled from
+those cached PNGs instead of each re-plotting the same analysis. Missing
+figures are rendered in a process pool with the Agg backend; the analysis
+results are sent to every worker once, through the pool initializer.
+"""
+
+import io
+import os
+import copyreg
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from config import EXPORT_RENDER_WORKERS, EXPORT_RENDER_START_METHOD, EXPORT_FIGURE_DPI
+
+# Analysis results go to the render workers by pickle; KeyPoint/DMatch are not picklable by default
+copyreg.pickle(cv2.KeyPoint, lambda kp: (cv2.KeyPoint, (kp.pt[0], kp.pt[1], kp.size, kp.angle,
+                                                        kp.response, kp.octave, kp.class_id)))
+copyreg.pickle(cv2.DMatch, lambda m: (cv2.DMatch, (m.queryIdx, m.trainIdx, m.imgIdx, m.distance)))
+
+
+def configure_export_workers(max_workers):
+    """Override EXPORT_RENDER_WORKERS for this process (e.g. 1 inside batch worker processes)."""
+    global EXPORT_RENDER_WORKERS
+    EXPORT_RENDER_WORKERS = max_workers
+
+
+def _resolve_workers(max_workers):
+    if max_workers is None:
+        max_workers = EXPORT_RENDER_WORKERS
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    return max(1, int(max_workers))
+
+
+def _pyplot():
+    import matplotlib
+    if multiprocessing.parent_process() is not None:
+        # Render workers never show a window
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# ======================= Figure renderers =======================
+# Each renderer returns a matplotlib figure or a PIL image, or None when the
+# data for the figure is not available.
+
+def _original_image(original_pil, results):
+    return original_pil
+
+
+def _error_level_analysis(original_pil, results):
+    ela_image_data = results.get('ela_image')
+    if ela_image_data is None:
+        return None
+    if isinstance(ela_image_data, Image.Image):
+        return ela_image_data.convert('L') # Ensure it's L for grayscale saving
+    if ela_image_data.ndim == 2:
+        return Image.fromarray(ela_image_data.astype(np.uint8), mode='L') # Already normalized by ELA output
+    return Image.fromarray(ela_image_data.astype(np.uint8))
+
+
+def _axes_figure(draw, title=None, **title_kwargs):
+    fig, ax = _pyplot().subplots(figsize=(10, 8))
+    draw(ax)
+    if title:
+        ax.set_title(title, **title_kwargs)
+    return fig
+
+
+def _feature_matching(original_pil, results):
+    from visualization import create_feature_match_visualization
+    return _axes_figure(lambda ax: create_feature_match_visualization(ax, original_pil, results),
+                        f"3. Feature Matching ({results.get('ransac_inliers', 0)} inliers)", fontsize=12)
+
+
+def _block_matching(original_pil, results):
+    from visualization import create_block_match_visualization
+    return _axes_figure(lambda ax: create_block_match_visualization(ax, original_pil, results),
+                        f"4. Block Matching ({len(results.get('block_matches', []))} matches)", fontsize=12)
+
+
+def _kmeans_localization(original_pil, results):
+    from visualization import create_localization_visualization
+    return _axes_figure(lambda ax: create_localization_visualization(ax, original_pil, results),
+                        f"5. K-Means Localization ({results.get('localization_analysis',{}).get('tampering_percentage',0):.1f}%)",
+                        fontsize=12)
+
+
+def _edge_analysis(original_pil, results):
+    from visualization import create_edge_visualization
+    return _axes_figure(lambda ax: create_edge_visualization(ax, original_pil, results),
+                        f"6. Edge Analysis (Inconsistency: {results.get('edge_analysis',{}).get('edge_inconsistency',0):.2f})",
+                        fontsize=12)
+
+
+def _illumination_analysis(original_pil, results):
+    from visualization import create_illumination_visualization
+    return _axes_figure(lambda ax: create_illumination_visualization(ax, original_pil, results),
+                        f"7. Illumination Analysis (Inconsistency: {results.get('illumination_analysis',{}).get('overall_illumination_inconsistency',0):.2f})",
+                        fontsize=12)
+
+
+def _jpeg_ghost(original_pil, results):
+    jpeg_ghost_data = results.get('jpeg_ghost')
+    if jpeg_ghost_data is None:
+        return None
+    fig, ax = _pyplot().subplots(figsize=(10, 8))
+    im = ax.imshow(jpeg_ghost_data, cmap='hot')
+    ax.set_title(f"8. JPEG Ghost Analysis (Ratio: {results.get('jpeg_ghost_suspicious_ratio',0):.1%})")
+    ax.axis('off')
+    fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+    return fig
+
+
+def _combined_heatmap(original_pil, results):
+    from visualization import create_advanced_combined_heatmap
+    combined_heatmap = create_advanced_combined_heatmap(results, original_pil.size)
+    fig, ax = _pyplot().subplots(figsize=(10, 8))
+    ax.imshow(np.array(original_pil.convert('RGB')), alpha=0.4)
+    ax.imshow(combined_heatmap, cmap='hot', alpha=0.6)
+    ax.set_title("9. Combined Suspicion Heatmap")
+    ax.axis('off')
+    return fig
+
+
+def _frequency_analysis(original_pil, results):
+    from visualization import create_frequency_visualization
+    return _axes_figure(lambda ax: create_frequency_visualization(ax, results),
+                        f"10. Frequency Analysis (Inconsistency: {results.get('frequency_analysis',{}).get('frequency_inconsistency',0):.3f})")
+
+
+def _texture_analysis(original_pil, results):
+    from visualization import create_texture_visualization
+    return _axes_figure(lambda ax: create_texture_visualization(ax, results),
+                        f"11. Texture Analysis (Inconsistency: {results.get('texture_analysis',{}).get('overall_inconsistency',0):.3f})")
+
+
+def _statistical_analysis(original_pil, results):
+    from visualization import create_statistical_visualization
+    return _axes_figure(lambda ax: create_statistical_visualization(ax, results),
+                        f"12. Statistical Analysis (Overall Entropy: {results.get('statistical_analysis',{}).get('overall_entropy',0):.3f})")
+
+
+def _jpeg_quality_response(original_pil, results):
+    from visualization import create_quality_response_plot
+    return _axes_figure(lambda ax: create_quality_response_plot(ax, results),
+                        f"13. JPEG Quality Response (Est. Q: {results.get('jpeg_analysis',{}).get('basic_analysis',{}).get('estimated_original_quality', 'N/A')})")
+
+
+def _noise_map(original_pil, results):
+    noise_map_data = results.get('noise_map')
+    if noise_map_data is None or noise_map_data.ndim != 2:
+        return None
+    fig, ax = _pyplot().subplots(figsize=(10, 8))
+    im = ax.imshow(noise_map_data, cmap='gray')
+    ax.set_title(f"14. Noise Map (Overall Inconsistency: {results.get('noise_analysis',{}).get('overall_inconsistency',0):.3f})")
+    ax.axis('off')
+    fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+    return fig
+
+
+def _dct_coefficients(original_pil, results):
+    # No DCT map is stored in the results; simulated from the high-frequency energy
+    fig, ax = _pyplot().subplots(figsize=(10, 8))
+    ax.imshow(np.random.rand(128, 128) * (results.get('frequency_analysis',{}).get('dct_stats',{}).get('high_freq_energy', 1)), cmap='viridis')
+    ax.set_title("15. DCT Coefficient Visualization (Simulated)", fontsize=12)
+    ax.axis('off')
+    return fig
+
+
+def _system_validation(original_pil, results):
+    from visualization import populate_validation_visuals
+    fig, (ax1, ax2) = _pyplot().subplots(1, 2, figsize=(15, 8))
+    populate_validation_visuals(ax1, ax2)
+    return fig
+
+
+def _final_classification(original_pil, results):
+    from visualization import create_summary_report
+    return _axes_figure(lambda ax: create_summary_report(ax, results),
+                        "17. Final Classification Report", fontsize=14, y=1.05)
+
+
+def _metadata_table(original_pil, results):
+    from visualization import create_metadata_table
+    return _axes_figure(lambda ax: create_metadata_table(ax, results.get('metadata', {})))
+
+
+def _probability_uncertainty(original_pil, results):
+    from visualization import create_probability_bars, create_uncertainty_visualization
+    plt = _pyplot()
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
+    create_probability_bars(ax1, results)
+    create_uncertainty_visualization(ax2, results)
+    fig.tight_layout()
+    return fig
+
+
+# Process images, in package order: key -> (file name, renderer)
+PROCESS_IMAGES = {
+    'original_image': ("01_original_image.png", _original_image),
+    'error_level_analysis': ("02_error_level_analysis.png", _error_level_analysis),
+    'feature_matching': ("03_feature_matching.png", _feature_matching),
+    'block_matching': ("04_block_matching.png", _block_matching),
+    'kmeans_localization': ("05_kmeans_localization.png", _kmeans_localization),
+    'edge_analysis': ("06_edge_analysis.png", _edge_analysis),
+    'illumination_analysis': ("07_illumination_analysis.png", _illumination_analysis),
+    'jpeg_ghost': ("08_jpeg_ghost.png", _jpeg_ghost),
+    'combined_heatmap': ("09_combined_heatmap.png", _combined_heatmap),
+    'frequency_analysis': ("10_frequency_analysis.png", _frequency_analysis),
+    'texture_analysis': ("11_texture_analysis.png", _texture_analysis),
+    'statistical_analysis': ("12_statistical_analysis.png", _statistical_analysis),
+    'jpeg_quality_response': ("13_jpeg_quality_response.png", _jpeg_quality_response),
+    'noise_map': ("14_noise_map.png", _noise_map),
+    'dct_coefficients': ("15_dct_coefficients.png", _dct_coefficients),
+    'system_validation': ("16_system_validation.png", _system_validation),
+    'final_classification': ("17_final_classification.png", _final_classification),
+}
+
+# Figures only used by the DOCX report
+REPORT_FIGURES = {
+    'metadata_table': _metadata_table,
+    'probability_uncertainty': _probability_uncertainty,
+}
+
+# Figures embedded in the DOCX report (rendered up front, in parallel)
+DOCX_FIGURE_KEYS = ('metadata_table', 'feature_matching', 'block_matching', 'kmeans_localization',
+                    'frequency_analysis', 'texture_analysis', 'edge_analysis', 'illumination_analysis',
+                    'jpeg_quality_response', 'combined_heatmap', 'probability_uncertainty',
+                    'statistical_analysis')
+
+
+def _renderer(key):
+    if key in PROCESS_IMAGES:
+        return PROCESS_IMAGES[key][1]
+    return REPORT_FIGURES[key]
+
+
+def render_figure_png(key, original_pil, analysis_results, dpi=EXPORT_FIGURE_DPI):
+    """PNG bytes of one figure, or None when its data is not available."""
+    figure = _renderer(key)(original_pil, analysis_results)
+    if figure is None:
+        return None
+    buf = io.BytesIO()
+    if isinstance(figure, Image.Image):
+        figure.save(buf, format='PNG')
+    else:
+        try:
+            figure.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+        finally:
+            _pyplot().close(figure)
+    return buf.getvalue()
+
+
+# ======================= Render worker =======================
+
+_worker_inputs = None
+
+
+def _init_render_worker(original_pil, analysis_results, dpi):
+    global _worker_inputs
+    import warnings
+    warnings.filterwarnings('ignore')
+    _pyplot()
+    _worker_inputs = (original_pil, analysis_results, dpi)
+
+
+def _render_in_worker(key):
+    original_pil, analysis_results, dpi = _worker_inputs
+    try:
+        return key, render_figure_png(key, original_pil, analysis_results, dpi), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+# ======================= Artifact store =======================
+
+class ArtifactStore:
+    """PNG bytes of the export figures of one analysis, each rendered at most once."""
+
+    def __init__(self, original_pil, analysis_results, workers=None, dpi=EXPORT_FIGURE_DPI):
+        self.original_pil = original_pil
+        self.analysis_results = analysis_results
+        self.workers = _resolve_workers(workers)
+        self.dpi = dpi
+        self.artifacts = {}   # key -> PNG bytes, or None when the data is not available
+        self.errors = {}      # key -> error message of a failed render
+        self.renders = 0
+
+    def __contains__(self, key):
+        return key in self.artifacts or key in self.errors
+
+    def render(self, keys):
+        """Render the figures in ``keys`` that are not in the store yet (in parallel when possible)."""
+        missing = [key for key in dict.fromkeys(keys) if key not in self]
+        if not missing:
+            return self
+        if self.workers > 1 and len(missing) > 1:
+            missing = self._render_in_pool(missing)
+        for key in missing:
+            self._render_here(key)
+        return self
+
+    def _render_here(self, key):
+        try:
+            self.artifacts[key] = render_figure_png(key, self.original_pil, self.analysis_results, self.dpi)
+        except Exception as e:
+            self.errors[key] = f"{type(e).__name__}: {e}"
+            print(f"  ⚠️ Could not render {key}: {e}")
+        self.renders += 1
+
+    def _render_in_pool(self, keys):
+        """Render ``keys`` in worker processes; returns the keys still to render in-process."""
+        remaining = list(keys)
+        try:
+            context = multiprocessing.get_context(EXPORT_RENDER_START_METHOD)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(keys)), mp_context=context,
+                                     initializer=_init_render_worker,
+                                     initargs=(self.original_pil, self.analysis_results, self.dpi)) as pool:
+                futures = [pool.submit(_render_in_worker, key) for key in keys]
+                for future in as_completed(futures):
+                    key, png, error = future.result()
+                    remaining.remove(key)
+                    self.renders += 1
+                    if error:
+                        self.errors[key] = error
+                        print(f"  ⚠️ Could not render {key}: {error}")
+                    else:
+                        self.artifacts[key] = png
+        except Exception as e:
+            print(f"  ⚠️ Render pool failed ({e}); rendering {len(remaining)} figure(s) in-process")
+            traceback.print_exc()
+        return remaining
+
+    def png(self, key):
+        """PNG bytes of ``key`` (rendered now if needed), or None when its data is not available."""
+        self.render([key])
+        if key in self.errors:
+            raise RuntimeError(self.errors[key])
+        return self.artifacts[key]
+
+    def picture(self, key):
+        """``key`` as a file object for ``doc.add_picture``; raises when it cannot be rendered."""
+        png = self.png(key)
+        if png is None:
+            raise ValueError(f"data for {key} not available")
+        return io.BytesIO(png)
+
+    def write_process_images(self, output_dir):
+        """Write the available process images to ``output_dir``; returns the file names written."""
+        os.makedirs(output_dir, exist_ok=True)
+        self.render(PROCESS_IMAGES)
+        written = []
+        for key, (filename, _) in PROCESS_IMAGES.items():
+            png = self.artifacts.get(key)
+            if png is None:
+                reason = self.errors.get(key, f"{key} data not available")
+                print(f"  Skipped {filename} ({reason})")
+                continue
+            with open(os.path.join(output_dir, filename), 'wb') as f:
+                f.write(png)
+            written.append(filename)
+            print(f"  Generated {filename}")
+        return written
+
+    def write_pdf(self, output_filename, keys=None):
+        """Multi-page PDF of the cached figures (process images by default); returns the path or None."""
+        self.render(keys or PROCESS_IMAGES)
+        pages = [Image.open(io.BytesIO(self.artifacts[key])).convert('RGB')
+                 for key in (keys or PROCESS_IMAGES) if self.artifacts.get(key)]
+        if not pages:
+            return None
+        pages[0].save(output_filename, format='PDF', save_all=True, append_images=pages[1:],
+                      resolution=self.dpi)
+        return output_filename
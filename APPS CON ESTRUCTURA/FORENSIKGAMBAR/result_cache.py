@@ -0,0 +1,449 @@
+"""
+Content-addressed on-disk cache for pipeline stage results
+
+Each stage result is stored under a key derived from:
+- the SHA-256 of the analyzed file,
+- PIPELINE_VERSION and a digest of the source modules implementing the stage
+  (plus the source of the main.py stage wrappers it runs, not all of main.py),
+- the values of the config constants the stage depends on,
+- the stage call parameters, and
+- the keys of the upstream stages whose outputs it consumes.
+
+Changing e.g. ELA_QUALITIES therefore invalidates ELA and every stage that
+consumes ELA output, while noise/JPEG/texture results stay cached. Numpy arrays
+are stored as .npy files (large ones are memory-mapped copy-on-write on load),
+everything else as JSON. The cache is bounded in size; the least recently used
+entries are evicted first.
+"""
+
+import os
+import ast
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import functools
+
+import numpy as np
+import cv2
+from PIL import Image
+
+import config
+from config import PIPELINE_VERSION, RESULT_CACHE_MB
+
+if os.name == 'nt':
+    RESULT_CACHE_DIR = os.path.join(os.environ.get('TEMP', ''), 'forensic_result_cache')
+else:
+    RESULT_CACHE_DIR = '/tmp/forensic_result_cache' if os.path.exists('/tmp') else 'forensic_result_cache'
+
+# Arrays at least this large are memory-mapped instead of read into memory
+MMAP_MIN_BYTES = 1024 * 1024
+
+# Invalidation rules per stage: the source modules it executes, the top-level functions of
+# modules it only partly executes ('main.py:_noise_stage'), config constants and upstream stages.
+# Every stage also depends on loading and preprocessing (image_ingest.py, validation.py, TARGET_MAX_DIM).
+_COMMON_MODULES = ('image_ingest.py', 'validation.py')
+_COMMON_CONFIG = ('TARGET_MAX_DIM',)
+STAGE_DEPENDENCIES = {
+    'ela_analysis': {
+        'modules': ('ela_analysis.py', 'jpeg_recompression.py', 'utils.py'),
+        'config': ('ELA_QUALITIES', 'ELA_SCALE_FACTOR'),
+        'upstream': ()},
+    'feature_extraction': {
+        'modules': ('feature_detection.py',),
+        'config': ('SIFT_FEATURES', 'SIFT_CONTRAST_THRESHOLD', 'SIFT_EDGE_THRESHOLD',
+                   'ORB_FEATURES', 'ORB_SCALE_FACTOR', 'ORB_LEVELS'),
+        'upstream': ('ela_analysis',)},
+    'feature_based_copymove_detection': {
+        'modules': ('copy_move_detection.py', 'feature_detection.py'),
+        'config': ('RATIO_THRESH', 'MIN_DISTANCE', 'RANSAC_THRESH', 'MIN_INLIERS'),
+        'upstream': ('feature_extraction',)},
+    'block_based_copymove_detection': {
+        'modules': ('copy_move_detection.py',),
+        'config': ('BLOCK_SIZE', 'MIN_DISTANCE'),
+        'upstream': ()},
+    'noise_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py', 'utils.py'),
+        'functions': ('main.py:_noise_stage',),
+        'config': (), 'upstream': ()},
+    'jpeg_analysis': {
+        'modules': ('jpeg_analysis.py', 'jpeg_recompression.py', 'analysis_context.py', 'block_dct.py', 'utils.py'),
+        'functions': ('main.py:_jpeg_stage',),
+        'config': ('RECOMPRESSION_SUBSAMPLING',),
+        'upstream': ()},
+    'frequency_analysis': {
+        'modules': ('advanced_analysis.py', 'block_dct.py'),
+        'functions': ('main.py:_frequency_stage',),
+        'config': (), 'upstream': ()},
+    'texture_analysis': {
+        'modules': ('advanced_analysis.py',),
+        'functions': ('main.py:_texture_stage',),
+        'config': ('TEXTURE_GLCM_LEVELS',), 'upstream': ()},
+    'edge_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py'),
+        'functions': ('main.py:_edge_stage',),
+        'config': (), 'upstream': ()},
+    'illumination_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py'),
+        'functions': ('main.py:_illumination_stage',),
+        'config': (), 'upstream': ()},
+    'statistical_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py'),
+        'functions': ('main.py:_statistical_stage',),
+        'config': (), 'upstream': ()},
+    'localization_analysis': {
+        'modules': ('copy_move_detection.py',),
+        'functions': ('main.py:advanced_tampering_localization',),
+        'config': ('MAX_SAMPLES_DBSCAN', 'LOCALIZATION_MINIBATCH_SIZE', 'LOCALIZATION_REFINE_ITERATIONS'),
+        'upstream': ('ela_analysis', 'feature_extraction', 'feature_based_copymove_detection')},
+    'mm_fusion_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py', 'block_dct.py', 'utils.py'),
+        'config': (), 'upstream': ()},
+    'trufor_analysis': {
+        'modules': ('advanced_analysis.py', 'image_stats.py', 'block_dct.py', 'utils.py'),
+        'config': ('TEXTURE_GLCM_LEVELS',), 'upstream': ()},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _module_digest(module_file):
+    """Digest of a source module next to this file (empty digest if it is missing)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), module_file)
+    hasher = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            hasher.update(f.read())
+    except OSError:
+        pass
+    return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _function_digest(spec):
+    """Digest of one top-level function's source, ``'module.py:function'`` (empty digest if missing)."""
+    module_file, name = spec.split(':', 1)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), module_file)
+    hasher = hashlib.sha256()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        for node in ast.parse(source).body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name == name:
+                hasher.update(ast.get_source_segment(source, node).encode('utf-8'))
+                break
+    except (OSError, SyntaxError, ValueError):
+        pass
+    return hasher.hexdigest()
+
+
+def stage_version(stage):
+    """Version fingerprint of a stage: pipeline version, source modules/functions and config values."""
+    deps = STAGE_DEPENDENCIES.get(stage, {'modules': (), 'config': (), 'upstream': ()})
+    fingerprint = {
+        'pipeline': PIPELINE_VERSION,
+        'modules': {m: _module_digest(m) for m in sorted(set(_COMMON_MODULES + tuple(deps['modules'])))},
+        'functions': {f: _function_digest(f) for f in sorted(deps.get('functions', ()))},
+        'config': {name: repr(getattr(config, name, None)) for name in sorted(set(_COMMON_CONFIG + tuple(deps['config'])))},
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# ======================= Serialization =======================
+
+# Lists at least this long are stored column-wise / as arrays instead of element by element
+LIST_ARRAY_MIN = 64
+_LEAF_DTYPES = {float: np.float64, int: np.int64, bool: np.bool_}
+
+
+def _iter_leaves(value, depth):
+    if depth == 0:
+        yield value
+    else:
+        for item in value:
+            yield from _iter_leaves(item, depth - 1)
+
+
+def _list_array(value):
+    """``value`` (a rectangular list of Python/numpy scalars of one type) as an array, else None."""
+    leaf, depth = value, 0
+    while isinstance(leaf, list) and leaf:
+        leaf, depth = leaf[0], depth + 1
+    kind = type(leaf)
+    numpy_scalars = issubclass(kind, np.generic)
+    if not (kind in _LEAF_DTYPES or (depth == 1 and issubclass(kind, (np.bool_, np.integer, np.floating)))):
+        return None, False
+    if not all(type(v) is kind for v in _iter_leaves(value, depth)):
+        return None, False
+    try:
+        array = np.array(value, dtype=kind if numpy_scalars else _LEAF_DTYPES[kind])
+    except (ValueError, TypeError, OverflowError):
+        return None, False
+    return (array, numpy_scalars) if array.ndim == depth else (None, False)
+
+
+def encode_value(value, arrays):
+    """Convert ``value`` into JSON-compatible data; numpy arrays are appended to ``arrays``."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, np.generic):
+        # Sebelum int/float: np.float64 adalah subclass float
+        return {'__npscalar__': value.item(), 'dtype': value.dtype.str}
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, np.ndarray):
+        arrays.append(np.asarray(value))
+        return {'__ndarray__': len(arrays) - 1}
+    if isinstance(value, Image.Image):
+        arrays.append(np.array(value))
+        return {'__image__': len(arrays) - 1, 'mode': value.mode}
+    if isinstance(value, cv2.KeyPoint):
+        return {'__keypoint__': [value.pt[0], value.pt[1], value.size, value.angle,
+                                 value.response, value.octave, value.class_id]}
+    if isinstance(value, cv2.DMatch):
+        return {'__dmatch__': [value.queryIdx, value.trainIdx, value.imgIdx, value.distance]}
+    if isinstance(value, tuple):
+        return {'__tuple__': [encode_value(v, arrays) for v in value]}
+    if isinstance(value, list):
+        if len(value) >= LIST_ARRAY_MIN:
+            # Long numeric lists (e.g. heatmaps as nested lists) as one array
+            array, numpy_scalars = _list_array(value)
+            if array is not None:
+                arrays.append(array)
+                return {'__list_array__': len(arrays) - 1, 'numpy': numpy_scalars}
+            # Long lists of same-keyed dicts (per-block statistics) column by column
+            if isinstance(value[0], dict) and all(isinstance(k, str) for k in value[0]):
+                keys = list(value[0])
+                if all(type(v) is dict and list(v) == keys for v in value):
+                    return {'__records__': keys,
+                            'columns': [encode_value([v[k] for v in value], arrays) for k in keys]}
+        return [encode_value(v, arrays) for v in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {'__dict__': {k: encode_value(v, arrays) for k, v in value.items()}}
+        return {'__items__': [[encode_value(k, arrays), encode_value(v, arrays)] for k, v in value.items()]}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def decode_value(node, load_array):
+    if isinstance(node, list):
+        return [decode_value(v, load_array) for v in node]
+    if not isinstance(node, dict):
+        return node
+    if '__npscalar__' in node:
+        return np.array(node['__npscalar__'], dtype=node['dtype'])[()]
+    if '__ndarray__' in node:
+        return load_array(node['__ndarray__'])
+    if '__list_array__' in node:
+        array = load_array(node['__list_array__'])
+        return list(np.array(array)) if node['numpy'] else array.tolist()
+    if '__records__' in node:
+        columns = [decode_value(column, load_array) for column in node['columns']]
+        return [dict(zip(node['__records__'], row)) for row in zip(*columns)]
+    if '__image__' in node:
+        image = Image.fromarray(np.array(load_array(node['__image__'])))
+        return image if image.mode == node['mode'] else image.convert(node['mode'])
+    if '__keypoint__' in node:
+        x, y, size, angle, response, octave, class_id = node['__keypoint__']
+        return cv2.KeyPoint(x, y, size, angle, response, int(octave), int(class_id))
+    if '__dmatch__' in node:
+        query_idx, train_idx, img_idx, distance = node['__dmatch__']
+        return cv2.DMatch(int(query_idx), int(train_idx), int(img_idx), float(distance))
+    if '__tuple__' in node:
+        return tuple(decode_value(v, load_array) for v in node['__tuple__'])
+    if '__dict__' in node:
+        return {k: decode_value(v, load_array) for k, v in node['__dict__'].items()}
+    if '__items__' in node:
+        return {decode_value(k, load_array): decode_value(v, load_array) for k, v in node['__items__']}
+    return node
+
+
+# ======================= Cache store =======================
+
+class ResultCache:
+    """Size-bounded, content-addressed store of stage results on disk."""
+
+    def __init__(self, root=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def stage_key(self, file_sha256, stage, params=None, upstream_keys=()):
+        """Cache key for one stage of one file."""
+        payload = {
+            'file': file_sha256,
+            'stage': stage,
+            'version': stage_version(stage),
+            'params': repr(sorted((params or {}).items())),
+            'upstream': list(upstream_keys),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def load(self, key):
+        """Return (hit, value) for ``key``; a hit refreshes the entry's LRU timestamp."""
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, 'manifest.json')
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            def load_array(index):
+                path = os.path.join(entry_dir, f"{index}.npy")
+                mmap_mode = 'c' if os.path.getsize(path) >= MMAP_MIN_BYTES else None
+                return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+            value = decode_value(manifest['value'], load_array)
+            os.utime(manifest_path)
+            return True, value
+        except (OSError, ValueError, KeyError, TypeError):
+            return False, None
+
+    def store(self, key, value):
+        """Store ``value`` under ``key``; returns False when the value cannot be cached."""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            # Already stored (e.g. by another worker): counts as a use for LRU eviction
+            try:
+                os.utime(os.path.join(entry_dir, 'manifest.json'))
+            except OSError:
+                pass
+            return True
+        arrays = []
+        try:
+            encoded = encode_value(value, arrays)
+        except TypeError as e:
+            print(f"⚠️ Result cache: {e}")
+            return False
+
+        # Write into a temporary folder and rename, so readers never see partial entries
+        tmp_dir = os.path.join(self.root, f"tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp_dir)
+            nbytes = 0
+            for index, array in enumerate(arrays):
+                path = os.path.join(tmp_dir, f"{index}.npy")
+                np.save(path, array, allow_pickle=False)
+                nbytes += os.path.getsize(path)
+            manifest = json.dumps({'value': encoded, 'created': time.time()})
+            nbytes += len(manifest)
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                f.write(manifest)
+            with open(os.path.join(tmp_dir, 'size'), 'w') as f:
+                f.write(str(nbytes))
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.rename(tmp_dir, entry_dir)
+        except (OSError, ValueError) as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(entry_dir):
+                print(f"⚠️ Result cache: failed to store entry: {e}")
+                return False
+        self.evict()
+        return True
+
+    def _entries(self):
+        """List of (last_access, nbytes, entry_dir) for all complete entries."""
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.name.startswith('tmp-'):
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    last_access = os.path.getmtime(os.path.join(entry.path, 'manifest.json'))
+                    with open(os.path.join(entry.path, 'size')) as f:
+                        nbytes = int(f.read())
+                except (OSError, ValueError):
+                    continue
+                entries.append((last_access, nbytes, entry.path))
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(nbytes for _, nbytes, _ in entries)
+        while entries and total > self.max_bytes:
+            _, nbytes, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= nbytes
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def stats(self):
+        entries = self._entries()
+        return {'entries': len(entries), 'cached_bytes': sum(nbytes for _, nbytes, _ in entries),
+                'max_bytes': self.max_bytes}
+
+
+class FileStageCache:
+    """Stage cache bound to one analyzed file; chains upstream stage keys into downstream keys."""
+
+    def __init__(self, cache, file_sha256):
+        self.cache = cache
+        self.file_sha256 = file_sha256
+        self._keys = {}
+        self.hits = []
+        self.misses = []
+
+    def key_for(self, stage, params=None):
+        """Key for ``stage``, or None when an upstream stage has no key (failed or not cached)."""
+        upstream = STAGE_DEPENDENCIES.get(stage, {}).get('upstream', ())
+        if any(name not in self._keys for name in upstream):
+            return None
+        key = self.cache.stage_key(self.file_sha256, stage, params, [self._keys[name] for name in upstream])
+        self._keys[stage] = key
+        return key
+
+    def load_stage(self, stage, params=None):
+        """Return (hit, value) for ``stage``."""
+        key = self.key_for(stage, params)
+        if key is None:
+            return False, None
+        hit, value = self.cache.load(key)
+        (self.hits if hit else self.misses).append(stage)
+        return hit, value
+
+    def store_stage(self, stage, value, params=None):
+        key = self._keys.get(stage) or self.key_for(stage, params)
+        if key is not None and not self.cache.store(key, value):
+            self._keys.pop(stage, None)
+
+    def forget_stage(self, stage):
+        """Mark a stage as failed so downstream stages are not cached against its fallback output."""
+        self._keys.pop(stage, None)
+
+    def run(self, stage, func, *args, params=None, **kwargs):
+        """Return the cached result of ``stage`` or compute it with ``func(*args, **kwargs)`` and store it."""
+        hit, value = self.load_stage(stage, params)
+        if hit:
+            print(f"  ♻️ Reusing cached {stage} result")
+            return value
+        try:
+            value = func(*args, **kwargs)
+        except Exception:
+            self.forget_stage(stage)
+            raise
+        self.store_stage(stage, value, params)
+        return value
+
+
+def get_file_stage_cache(file_path, cache=None, sha256=None):
+    """FileStageCache for ``file_path`` using ``cache`` (default: shared ResultCache); ``sha256`` skips re-hashing."""
+    if sha256 is None:
+        from batch_processing import file_sha256
+        sha256 = file_sha256(file_path)
+    return FileStageCache(cache or get_result_cache(), sha256)
+
+
+_default_cache = None
+
+
+def get_result_cache():
+    """Process-wide ResultCache at RESULT_CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -0,0 +1,231 @@
+"""
+Per-stage profiling for the Forensic Image Analysis pipeline
+
+``StageProfiler`` records, for every pipeline stage, the wall time, CPU time,
+memory change (RSS, plus the traced allocation peak when ``tracemalloc`` is
+enabled) and the size of the values the stage produced. The records become
+``pipeline_status['stage_details']`` and can be exported as JSON or as a
+Chrome trace (open in chrome://tracing or https://ui.perfetto.dev).
+
+Stages that run in worker processes are measured inside the worker with
+``profiled_call``; the scheduler passes those measurements back.
+"""
+
+import os
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from config import PROFILE_TRACEMALLOC
+
+MB = 1024 * 1024
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (0 when it cannot be determined)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (0 when unavailable, e.g. on Windows)."""
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except (ImportError, AttributeError):
+        return 0.0
+
+
+def _sample():
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    if traced is not None:
+        tracemalloc.reset_peak()
+    return {'wall': time.time(), 'cpu': time.process_time(), 'rss': current_rss_mb(),
+            'peak_rss': peak_rss_mb(), 'traced': traced}
+
+
+def _measure(before):
+    """Resource usage since ``before`` (a ``_sample()``)."""
+    metrics = {
+        'started_at': before['wall'],
+        'wall_time': time.time() - before['wall'],
+        'cpu_time': time.process_time() - before['cpu'],
+        'rss_delta_mb': current_rss_mb() - before['rss'],
+        # Growth of the process high-water mark (0 when the stage stayed below an earlier peak)
+        'peak_rss_delta_mb': max(0.0, peak_rss_mb() - before['peak_rss']),
+        'pid': os.getpid(),
+    }
+    if before['traced'] is not None and tracemalloc.is_tracing():
+        metrics['peak_alloc_mb'] = max(0, tracemalloc.get_traced_memory()[1] - before['traced']) / MB
+    return metrics
+
+
+def profiled_call(func, *args):
+    """Run ``func(*args)`` and return ``(result, metrics)``; used inside worker processes."""
+    before = _sample()
+    result = func(*args)
+    return result, _measure(before)
+
+
+def describe_output(value):
+    """Size summary of a stage output: arrays and images get shape/dtype, containers the total array bytes."""
+    if isinstance(value, np.ndarray):
+        return {'type': 'ndarray', 'shape': list(value.shape), 'dtype': str(value.dtype), 'nbytes': int(value.nbytes)}
+    if isinstance(value, Image.Image):
+        nbytes = value.width * value.height * len(value.getbands())
+        return {'type': 'image', 'shape': [value.height, value.width, len(value.getbands())],
+                'mode': value.mode, 'nbytes': nbytes}
+    return {'type': type(value).__name__, 'nbytes': _nested_nbytes(value)}
+
+
+def _nested_nbytes(value, depth=0):
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if depth > 4:
+        return 0
+    if isinstance(value, dict):
+        return sum(_nested_nbytes(v, depth + 1) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nested_nbytes(v, depth + 1) for v in value)
+    return 0
+
+
+def stage_succeeded(detail):
+    """Success flag of a ``stage_details`` entry (profile dict, or a plain bool in older results)."""
+    if isinstance(detail, dict):
+        return bool(detail.get('success'))
+    return bool(detail)
+
+
+class StageProfiler:
+    """Collects one profile record per pipeline stage, in execution order."""
+
+    def __init__(self, trace_memory=PROFILE_TRACEMALLOC):
+        self.records = {}
+        self._open = {}
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.started_at = time.time()
+        self._cpu_start = time.process_time()
+
+    def start(self, name):
+        """Mark the start of stage ``name``."""
+        self._open[name] = _sample()
+
+    def finish(self, name, success, outputs=None, error=None, cached=False):
+        """
+        Close stage ``name`` and return its record (stored in ``stage_details``).
+
+        Args:
+            outputs: Dict of the values the stage produced (sizes are recorded)
+            error: Exception or message of a failed stage
+            cached: True when the result came from the result cache
+        """
+        before = self._open.pop(name, None) or _sample()
+        record = {'success': bool(success), 'cached': bool(cached), 'worker': 'main'}
+        record.update(_measure(before))
+        self._add(name, record, outputs, error)
+        return record
+
+    def add_outcome(self, name, outcome, outputs=None):
+        """Record a stage run by ``stage_scheduler.run_stage_graph`` (measured in its worker)."""
+        metrics = outcome.get('profile') or {}
+        record = {'success': bool(outcome.get('success')), 'cached': bool(outcome.get('cached')),
+                  'worker': 'pool' if metrics.get('pid', os.getpid()) != os.getpid() else 'main'}
+        record.update({
+            'started_at': metrics.get('started_at', time.time() - outcome.get('elapsed', 0.0)),
+            'wall_time': metrics.get('wall_time', outcome.get('elapsed', 0.0)),
+            'cpu_time': metrics.get('cpu_time', 0.0),
+            'rss_delta_mb': metrics.get('rss_delta_mb', 0.0),
+            'peak_rss_delta_mb': metrics.get('peak_rss_delta_mb', 0.0),
+            'pid': metrics.get('pid', os.getpid()),
+        })
+        if 'peak_alloc_mb' in metrics:
+            record['peak_alloc_mb'] = metrics['peak_alloc_mb']
+        self._add(name, record, outputs, outcome.get('error'))
+        return record
+
+    def _add(self, name, record, outputs, error):
+        if outputs:
+            record['outputs'] = {key: describe_output(value) for key, value in outputs.items()}
+            record['output_bytes'] = sum(item['nbytes'] for item in record['outputs'].values())
+        else:
+            record['output_bytes'] = 0
+        if error is not None:
+            record['error'] = str(error)
+        self.records[name] = record
+
+    def summary(self):
+        """Whole-run totals (wall, CPU, peak RSS) plus the slowest stages."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        slowest = sorted(self.records, key=lambda n: self.records[n]['wall_time'], reverse=True)
+        return {
+            'started_at': self.started_at,
+            'wall_time': time.time() - self.started_at,
+            'cpu_time': time.process_time() - self._cpu_start,
+            'peak_rss_mb': peak_rss_mb(),
+            'slowest_stages': slowest[:5],
+        }
+
+
+def profile_data(pipeline_status):
+    """JSON-serializable stage profile of ``pipeline_status``."""
+    return {
+        'profile': pipeline_status.get('profile', {}),
+        'stages': {name: detail for name, detail in pipeline_status.get('stage_details', {}).items()
+                   if isinstance(detail, dict)},
+    }
+
+
+def profile_to_json(pipeline_status, path):
+    """Write the stage profile of ``pipeline_status`` to ``path`` as JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile_data(pipeline_status), f, indent=2, default=float)
+    return path
+
+
+def chrome_trace_events(pipeline_status):
+    """Chrome trace 'complete' events, one per stage, on a lane per process."""
+    stages = {name: detail for name, detail in pipeline_status.get('stage_details', {}).items()
+              if isinstance(detail, dict) and 'started_at' in detail}
+    origin = pipeline_status.get('profile', {}).get('started_at')
+    if origin is None:
+        origin = min((detail['started_at'] for detail in stages.values()), default=0.0)
+    main_pid = os.getpid()
+    events = []
+    for name, detail in stages.items():
+        args = {key: detail[key] for key in ('success', 'cached', 'cpu_time', 'rss_delta_mb',
+                                             'peak_rss_delta_mb', 'peak_alloc_mb', 'output_bytes', 'error')
+                if key in detail}
+        events.append({
+            'name': name, 'cat': 'stage', 'ph': 'X',
+            'ts': round((detail['started_at'] - origin) * 1e6),
+            'dur': round(detail['wall_time'] * 1e6),
+            'pid': main_pid, 'tid': detail.get('pid', main_pid),
+            'args': args,
+        })
+    return events
+
+
+def chrome_trace(pipeline_status):
+    """Chrome trace document (``traceEvents`` format) of the stage profile."""
+    return {'traceEvents': chrome_trace_events(pipeline_status), 'displayTimeUnit': 'ms'}
+
+
+def profile_to_chrome_trace(pipeline_status, path):
+    """Write the stage profile as a Chrome trace JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(pipeline_status), f, default=float)
+    return path
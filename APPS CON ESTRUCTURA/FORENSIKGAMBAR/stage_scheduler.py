@@ -0,0 +1,251 @@
+"""
+Stage scheduler for the Forensic Image Analysis pipeline
+
+Stages declare the named values they consume (``inputs``) and produce
+(``outputs``). ``run_stage_graph`` runs every stage as soon as its inputs are
+available; independent stages run concurrently on a shared process pool.
+A stage that raises gets its ``fallback`` outputs instead, so downstream
+bookkeeping always sees a complete set of values.
+"""
+
+import os
+import time
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config import STAGE_WORKERS
+from stage_profiler import profiled_call
+
+
+class PipelineStage:
+    """One pipeline stage: ``func(*inputs)`` returns the value(s) named in ``outputs``.
+
+    ``func`` must be a picklable top-level callable (or ``functools.partial`` of one)
+    because it may run in a worker process. ``fallback()`` returns the outputs used
+    when the stage fails and always runs in the calling process.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), fallback=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs) if outputs else (name,)
+        self.fallback = fallback
+
+    def __repr__(self):
+        return f"PipelineStage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def configure_stage_workers(max_workers):
+    """Override STAGE_WORKERS for this process (e.g. 1 inside batch worker processes)."""
+    global STAGE_WORKERS
+    STAGE_WORKERS = max_workers
+
+
+def _resolve_workers(max_workers):
+    if max_workers is None:
+        max_workers = STAGE_WORKERS
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    return max(1, int(max_workers))
+
+
+def _get_pool(max_workers):
+    """Return the shared process pool, (re)creating it when missing, broken or resized."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pool_workers = max_workers
+        return _pool
+
+
+def _discard_pool(broken_pool):
+    """Drop a broken pool once; a later ``_get_pool`` builds its replacement."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is broken_pool:
+            _pool = None
+            _pool_workers = 0
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_stage_pool():
+    """Stop the shared worker processes (registered with ``atexit``)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+atexit.register(shutdown_stage_pool)
+
+
+def _store_outputs(stage, result, values):
+    if len(stage.outputs) == 1:
+        result = (result,)
+    elif not isinstance(result, tuple) or len(result) != len(stage.outputs):
+        raise ValueError(f"Stage '{stage.name}' must return {len(stage.outputs)} values")
+    for key, value in zip(stage.outputs, result):
+        values[key] = value
+
+
+def _finish_stage(stage, result, error, started, values, outcomes, cache=None, cached=False, profile=None):
+    """Store outputs (or fallback outputs) and record the stage outcome."""
+    if error is None:
+        try:
+            _store_outputs(stage, result, values)
+        except Exception as e:
+            error = e
+    if error is not None and stage.fallback is not None:
+        _store_outputs(stage, stage.fallback(), values)
+    if cache is not None and not cached:
+        if error is None:
+            cache.store_stage(stage.name, result)
+        else:
+            cache.forget_stage(stage.name)
+    outcomes[stage.name] = {
+        'success': error is None,
+        'error': None if error is None else str(error),
+        'elapsed': time.time() - started,
+        'cached': cached,
+        'profile': profile
+    }
+
+
+def _load_cached(stage, values, outcomes, cache):
+    """Finish ``stage`` from the result cache; returns False on a cache miss."""
+    if cache is None:
+        return False
+    started = time.time()
+    hit, result = cache.load_stage(stage.name)
+    if hit:
+        _finish_stage(stage, result, None, started, values, outcomes, cache, cached=True)
+    return hit
+
+
+def _run_inline(stage, values, outcomes, cache=None):
+    if _load_cached(stage, values, outcomes, cache):
+        return
+    started = time.time()
+    profile = None
+    try:
+        result, profile = profiled_call(stage.func, *(values[key] for key in stage.inputs))
+        error = None
+    except Exception as e:
+        result, error = None, e
+    _finish_stage(stage, result, error, started, values, outcomes, cache, profile=profile)
+
+
+def _validate_graph(stages, values):
+    produced = set(values)
+    for stage in stages:
+        produced.update(stage.outputs)
+    for stage in stages:
+        missing = [key for key in stage.inputs if key not in produced]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' needs inputs nobody produces: {missing}")
+
+
+def run_stage_graph(stages, values, max_workers=None, cache=None):
+    """
+    Run ``stages`` in dependency order, in parallel where possible.
+
+    Args:
+        stages: List of PipelineStage
+        values: Dict of available named values; stage outputs are added to it
+        max_workers: Worker processes (None = STAGE_WORKERS / cpu count, 1 = run inline)
+        cache: Optional stage result cache (``result_cache.FileStageCache``); cached
+            stages are not run, successful results are stored
+
+    Returns:
+        Dict mapping stage name to {'success', 'error', 'elapsed', 'cached', 'profile'}; ``profile``
+        holds the wall/CPU time and memory measured where the stage ran (None for cache hits and crashes)
+    """
+    _validate_graph(stages, values)
+    max_workers = min(_resolve_workers(max_workers), max(1, len(stages)))
+    pending = list(stages)
+    outcomes = {}
+
+    def ready_stages():
+        ready = [stage for stage in pending if all(key in values for key in stage.inputs)]
+        for stage in ready:
+            pending.remove(stage)
+        return ready
+
+    if max_workers == 1:
+        while pending:
+            ready = ready_stages()
+            if not ready:
+                break
+            for stage in ready:
+                _run_inline(stage, values, outcomes, cache)
+        return outcomes
+
+    try:
+        pool = _get_pool(max_workers)
+    except (OSError, NotImplementedError, ValueError) as e:
+        print(f"⚠️ Process pool unavailable ({e}), running stages sequentially")
+        return run_stage_graph(pending, values, max_workers=1, cache=cache)
+
+    running = {}
+    while pending or running:
+        for stage in ready_stages():
+            if _load_cached(stage, values, outcomes, cache):
+                continue
+            try:
+                future = pool.submit(profiled_call, stage.func, *(values[key] for key in stage.inputs))
+                running[future] = (stage, time.time())
+            except (BrokenProcessPool, RuntimeError):
+                _run_inline(stage, values, outcomes, cache)
+        if not running:
+            if pending and any(all(key in values for key in stage.inputs) for stage in pending):
+                continue  # Cache hits made more stages ready
+            if pending:
+                # Inputs of the remaining stages were never produced
+                for stage in pending:
+                    _finish_stage(stage, None, RuntimeError('missing inputs'), time.time(), values, outcomes, cache)
+            break
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        lost = []
+        for future in done:
+            stage, started = running.pop(future)
+            try:
+                result, profile = future.result()
+            except BrokenProcessPool:
+                lost.append(stage)
+                continue
+            except Exception as e:
+                _finish_stage(stage, None, e, started, values, outcomes, cache)
+                continue
+            _finish_stage(stage, result, None, started, values, outcomes, cache, profile=profile)
+
+        if lost:
+            # A worker died (e.g. out of memory): the whole pool is gone, so every stage
+            # still on it is lost too. Rebuild the pool once and retry those stages in-process.
+            for future in list(running):
+                stage, started = running.pop(future)
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    result, profile = future.result()
+                    _finish_stage(stage, result, None, started, values, outcomes, cache, profile=profile)
+                else:
+                    lost.append(stage)
+            print(f"⚠️ Worker process lost during {', '.join(repr(s.name) for s in lost)}, retrying in-process")
+            _discard_pool(pool)
+            for stage in lost:
+                _run_inline(stage, values, outcomes, cache)
+            pool = _get_pool(max_workers)
+
+    return outcomes
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test untuk kontainer hasil analisis (AnalysisResults) dan bundel .npz
+"""
+
+import os
+import sys
+import pickle
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_results import AnalysisResults, load_bundle, KEYPOINT_DTYPE, DMATCH_DTYPE
+
+
+def _make_results():
+    gray = np.tile(np.arange(64, dtype=np.uint8), (48, 1))
+    keypoints = [cv2.KeyPoint(1.5 * i, 2.0 * i, 8.0, 30.0, 0.01 * i, i % 3, -1) for i in range(20)]
+    return {
+        'metadata': {'Filename': 'uji.jpg'},
+        'ela_image': Image.fromarray(gray),
+        'ela_mean': 12.5,
+        'ela_variance': gray.astype(np.float64) * 3.5,
+        'feature_sets': {'sift': (keypoints, np.ones((20, 128), np.float32)), 'orb': ([], None)},
+        'sift_keypoints': keypoints,
+        'ransac_matches': [cv2.DMatch(i, 19 - i, 0, 0.5 * i) for i in range(10)],
+        'noise_map': gray,
+        'jpeg_ghost': np.linspace(0, 1, 64 * 48).reshape(48, 64),
+        'jpeg_analysis': {'ghost_analysis': {'quality_analysis': {70: {'mean_response': 1.5}}}},
+        'roi_mask': np.full((48, 64), 255, np.uint8),
+        'enhanced_gray': gray,
+        'block_matches': [{'block1_pos': (i, 0), 'correlation': 0.99} for i in range(80)],
+        'pipeline_status': {'completed_stages': 17, 'failed_stages': []},
+        'custom_key': [1, 2, 3],
+    }
+
+
+def test_container_behaves_like_results_dict():
+    """Akses seperti dict tetap sama; penyimpanan internal ringkas dengan dtype eksplisit"""
+    source = _make_results()
+    results = AnalysisResults.from_dict(source)
+
+    assert not hasattr(results, '__dict__')
+    assert results.ela_variance.dtype == np.float16 and results.jpeg_ghost.dtype == np.float32
+    assert results.sift_keypoints.dtype == KEYPOINT_DTYPE and results.ransac_matches.dtype == DMATCH_DTYPE
+    assert results['ela_mean'] == 12.5 and results.get('custom_key') == [1, 2, 3]
+    assert 'mm_fusion_analysis' not in results and 'custom_key' in results
+    assert set(source) <= set(results.keys())
+
+    keypoints = results['sift_keypoints']
+    assert [kp.pt for kp in keypoints] == [kp.pt for kp in source['sift_keypoints']]
+    assert keypoints[4].octave == 1 and keypoints[4].class_id == -1
+    assert [(m.queryIdx, m.trainIdx, m.distance) for m in results['ransac_matches']] == \
+        [(m.queryIdx, m.trainIdx, m.distance) for m in source['ransac_matches']]
+    assert isinstance(results['feature_sets']['sift'], tuple) and len(results['feature_sets']['sift'][0]) == 20
+    np.testing.assert_allclose(results['ela_variance'], source['ela_variance'], rtol=1e-3)
+
+    results['trufor_analysis'] = {'score': 0.1}
+    assert results['trufor_analysis'] == {'score': 0.1}
+    del results['trufor_analysis']
+    assert 'trufor_analysis' not in results
+
+    restored = pickle.loads(pickle.dumps(results))
+    assert list(restored) == list(results)
+    assert restored['sift_keypoints'][3].pt == keypoints[3].pt
+
+
+def test_bundle_round_trip_is_memory_mapped(tmp_path):
+    """Bundel .npz dibaca ulang lengkap; array berupa view dari memory map"""
+    results = AnalysisResults.from_dict(_make_results())
+    path = results.save_bundle(str(tmp_path / 'hasil.npz'))
+    loaded = load_bundle(path)
+
+    assert list(loaded) == list(results)
+    assert loaded['metadata'] == results['metadata']
+    assert loaded['jpeg_analysis']['ghost_analysis']['quality_analysis'][70] == {'mean_response': 1.5}
+    assert loaded['block_matches'] == results['block_matches']
+    assert loaded['custom_key'] == [1, 2, 3]
+    assert np.array_equal(np.array(loaded['ela_image']), np.array(results['ela_image']))
+    for name in ('ela_variance', 'noise_map', 'jpeg_ghost', 'roi_mask', 'enhanced_gray',
+                 'sift_keypoints', 'ransac_matches'):
+        value = getattr(loaded, name)
+        assert value.dtype == getattr(results, name).dtype
+        assert np.array_equal(value, getattr(results, name))
+    assert loaded.enhanced_gray.base is not None  # view, bukan salinan
+
+    # Copy-on-write: mengubah array yang dimuat tidak mengubah file
+    loaded.enhanced_gray[0, 0] = 200
+    assert load_bundle(path, mmap=False).enhanced_gray[0, 0] == results.enhanced_gray[0, 0]
+
+
+def test_combined_heatmap_from_results_at_other_size(capsys):
+    """Heatmap gabungan dari AnalysisResults di ukuran lain tetap memakai kontribusi ghost JPEG"""
+    from visualization import create_advanced_combined_heatmap
+
+    source = _make_results()
+    source['ela_image'] = Image.new('L', (64, 48))
+    results = AnalysisResults.from_dict(source)
+    heatmap = create_advanced_combined_heatmap(results, (160, 120))
+
+    assert 'failed' not in capsys.readouterr().out
+    assert heatmap.shape == (120, 160) and heatmap.max() > 0
+    # Hanya ghost (gradien kiri-atas ke kanan-bawah) yang berkontribusi
+    assert heatmap[-1, -1] > heatmap[0, 0]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test untuk mode batch (folder/manifest) tanpa menjalankan pipeline penuh
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_processing import iter_batch_inputs, load_completed_hashes, file_sha256, JsonlSink
+
+
+def test_batch_inputs_from_folder_and_manifest(tmp_path):
+    """Folder dipindai rekursif (kecuali folder output) dan manifest dibaca relatif"""
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'results').mkdir()
+    for name in ['b.jpg', 'a.PNG', 'notes.txt', 'sub/c.tif', 'results/a_analysis_summary.png']:
+        (tmp_path / name).write_bytes(b'x')
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text("# daftar barang bukti\n\nsub/c.tif\n/abs/path/d.jpg\n")
+
+    from_folder = list(iter_batch_inputs(batch_dir=str(tmp_path), exclude_dir=str(tmp_path / 'results')))
+    assert [os.path.relpath(p, tmp_path) for p in from_folder] == ['a.PNG', 'b.jpg', os.path.join('sub', 'c.tif')]
+
+    from_manifest = list(iter_batch_inputs(manifest=str(manifest)))
+    assert from_manifest == [str(tmp_path / 'sub' / 'c.tif'), '/abs/path/d.jpg']
+
+
+def test_completed_hashes_survive_truncated_summary(tmp_path):
+    """Hanya status final yang dilewati; baris terpotong akibat crash diabaikan"""
+    summary = tmp_path / 'batch_summary.jsonl'
+    sink = JsonlSink(str(summary))
+    sink.write({'sha256': 'aaa', 'status': 'ok'})
+    sink.write({'sha256': 'bbb', 'status': 'failed', 'error': 'boom'})
+    sink.write({'sha256': 'ccc', 'status': 'invalid'})
+    sink.close()
+    with open(summary, 'a') as f:
+        f.write('{"sha256": "ddd", "sta')
+
+    assert load_completed_hashes(str(summary)) == {'aaa', 'ccc'}
+    assert json.loads(summary.read_text().splitlines()[1])['error'] == 'boom'
+
+
+def test_resume_after_crash_mid_line_keeps_completed_results(tmp_path, capsys):
+    """Baris terpotong diakhiri saat sink dibuka lagi; record baru tidak menempel dan semua hasil selesai tetap dilewati"""
+    summary = tmp_path / 'batch_summary.jsonl'
+    sink = JsonlSink(str(summary))
+    for sha in ('aaa', 'bbb'):
+        sink.write({'sha256': sha, 'status': 'ok'})
+    sink.close()
+    # Crash saat menulis record ketiga
+    data = summary.read_bytes()
+    summary.write_bytes(data + b'{"sha256": "ccc", "status": "o')
+
+    resumed = JsonlSink(str(summary))
+    resumed.write({'sha256': 'ccc', 'status': 'ok'})
+    resumed.write({'sha256': 'ddd', 'status': 'invalid'})
+    resumed.close()
+
+    assert load_completed_hashes(str(summary)) == {'aaa', 'bbb', 'ccc', 'ddd'}
+    assert 'skipped 1 unreadable line(s): [3]' in capsys.readouterr().out
+    assert JsonlSink._ends_mid_line(str(summary)) is False
+
+
+def test_file_sha256_matches_hashlib(tmp_path):
+    import hashlib
+    path = tmp_path / 'exhibit.jpg'
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    assert file_sha256(str(path), chunk_size=1024 * 1024) == hashlib.sha256(path.read_bytes()).hexdigest()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test untuk suite benchmark tahap analisis (benchmark_suite)
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark_suite
+from jpeg_recompression import get_recompressor
+from benchmark_suite import (make_forged_image, write_case, map_auc, mask_iou, benchmark_case,
+                             compare_runs, append_history, find_baseline)
+
+
+def test_synthetic_cases_are_deterministic():
+    """Gambar sintetis identik untuk seed yang sama dan region palsu sesuai mask"""
+    pixels, mask = make_forged_image(0.05, 'copy_move', seed=4)
+    again, _ = make_forged_image(0.05, 'copy_move', seed=4)
+    np.testing.assert_array_equal(pixels, again)
+
+    ys, xs = np.nonzero(mask)
+    side = int(np.sqrt(mask.sum() / 2))
+    source = pixels[ys.min():ys.min() + side, xs.min():xs.min() + side]
+    copy = pixels[ys.max() - side + 1:ys.max() + 1, xs.max() - side + 1:xs.max() + 1]
+    np.testing.assert_array_equal(source, copy)
+
+    authentic, authentic_mask = make_forged_image(0.05, 'authentic', seed=4)
+    spliced, splice_mask = make_forged_image(0.05, 'splicing', seed=4)
+    assert not authentic_mask.any()
+    np.testing.assert_array_equal(spliced[~splice_mask], authentic[~splice_mask])
+    assert np.abs(spliced[splice_mask].astype(int) - authentic[splice_mask]).mean() > 10
+
+
+def test_accuracy_metrics():
+    """AUC dan IoU memberikan nilai yang diharapkan untuk peta sempurna, terbalik, dan konstan"""
+    mask = np.zeros((20, 20), dtype=bool)
+    mask[5:10, 5:10] = True
+    assert map_auc(mask.astype(float), mask) == 1.0
+    assert map_auc(~mask, mask) == 0.0
+    assert map_auc(np.ones((10, 10)), mask) == 0.5  # Peta diubah ukurannya ke ukuran mask
+    assert mask_iou(mask, mask) == 1.0
+    assert mask_iou(np.zeros_like(mask), mask) == 0.0
+
+
+def test_benchmark_case_and_regression_check(tmp_path):
+    """Tahap diukur waktunya dan akurasinya; perlambatan dan penurunan akurasi terdeteksi"""
+    path, mask = write_case(0.05, 'copy_move', str(tmp_path))
+    results = benchmark_case(path, mask, 'copy_move',
+                             stages=['ela_analysis', 'block_based_copymove_detection'], pipeline=False)
+    assert results['ela_analysis']['time_min'] > 0
+    assert 'auc' in results['ela_analysis']['accuracy']
+    assert 0.0 <= results['block_based_copymove_detection']['accuracy']['precision'] <= 1.0
+
+    baseline = {'timestamp': 'a', 'host': 'h', 'settings': {'native': False, 'seed': 0},
+                'results': {'0.05MP/copy_move/ela_analysis': {'time_min': 1.0, 'accuracy': {'auc': 0.9}},
+                            '0.05MP/copy_move/noise_analysis': {'time_min': 0.01}}}
+    current = {'timestamp': 'b', 'host': 'h', 'settings': {'native': False, 'seed': 0},
+               'results': {'0.05MP/copy_move/ela_analysis': {'time_min': 1.5, 'accuracy': {'auc': 0.8}},
+                           '0.05MP/copy_move/noise_analysis': {'time_min': 0.03}}}
+    regressions = compare_runs(baseline, current)
+    assert len(regressions) == 2 and all('ela_analysis' in line for line in regressions)
+
+    history_path = str(tmp_path / 'history.json')
+    append_history(history_path, baseline)
+    history = append_history(history_path, current)
+    assert find_baseline(history, history['runs'][-1])['timestamp'] == 'a'
+
+
+def test_timed_calls_start_with_cold_caches(tmp_path, monkeypatch):
+    """Setiap pengukuran dimulai tanpa cache rekompresi JPEG dari persiapan atau ulangan sebelumnya"""
+    path, mask = write_case(0.05, 'splicing', str(tmp_path))
+    run, score = benchmark_suite.STAGES['jpeg_ghost']
+    cached_entries = []
+
+    def _recording_run(context):
+        cached_entries.append(get_recompressor().stats()['entries'])
+        return run(context)
+
+    monkeypatch.setitem(benchmark_suite.STAGES, 'jpeg_ghost', (_recording_run, score))
+    results = benchmark_case(path, mask, 'splicing', stages=['ela_analysis', 'jpeg_ghost'], repeat=2, pipeline=False)
+    assert results['jpeg_ghost']['runs'] == 2
+    assert cached_entries == [0, 0]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test untuk engine DCT blok 8x8 (block_dct)
+"""
+
+import os
+import sys
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_context import AnalysisContext
+from block_dct import BlockDCT, luma_block_dct
+from jpeg_analysis import analyze_jpeg_blocks, analyze_double_compression_frequency
+
+
+def _gray(seed=0, shape=(43, 61)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_coefficients_match_cv2_dct():
+    """Koefisien batch sama dengan cv2.dct per blok"""
+    gray = _gray()
+    engine = BlockDCT(gray)
+    assert engine.coefficients.shape == ((43 // 8) * (61 // 8), 8, 8)
+    for index in (0, 9, len(engine) - 1):
+        i, j = divmod(index, engine.blocks_w)
+        expected = cv2.dct(gray[i*8:(i+1)*8, j*8:(j+1)*8].astype(np.float32))
+        np.testing.assert_allclose(engine.coefficients[index], expected, rtol=1e-4, atol=1e-3)
+
+
+def test_boundary_artifacts_match_per_block_differences():
+    """Artefak batas blok sama dengan selisih uint8 per blok"""
+    gray = _gray(1)
+    engine = BlockDCT(gray)
+    artifacts = engine.boundary_artifacts()
+    i, j = 2, 3
+    expected = (np.mean(np.abs(gray[i*8, j*8:(j+1)*8] - gray[i*8-1, j*8:(j+1)*8])) +
+                np.mean(np.abs(gray[i*8:(i+1)*8, j*8] - gray[i*8:(i+1)*8, j*8-1])))
+    assert artifacts[i * engine.blocks_w + j] == expected
+    assert artifacts[0] == 0.0
+
+    score_map = engine.block_map(np.arange(len(engine)))
+    assert score_map.shape == gray.shape
+    assert score_map[i*8 + 3, j*8 + 5] == i * engine.blocks_w + j
+    assert np.all(score_map[40:, :] == 0)
+
+
+def test_cube_is_shared_through_context():
+    """Analisis blok dan frekuensi kompresi ganda memakai kubus DCT yang sama"""
+    image = Image.fromarray(np.stack([_gray(2, (64, 80))] * 3, axis=-1))
+    context = AnalysisContext(image)
+
+    analyze_jpeg_blocks(image, context=context)
+    engine = luma_block_dct(image, context=context)
+    cube = engine.coefficients
+    analyze_double_compression_frequency(image, context=context)
+
+    assert luma_block_dct(image, context=context).coefficients is cube
+    assert context.misses == 3  # rgb_array, block_dct, jpeg_blocks
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test untuk piramida fitur bersama (feature_detection)
+"""
+
+import os
+import sys
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import SIFT_FEATURES, SIFT_CONTRAST_THRESHOLD, SIFT_EDGE_THRESHOLD, ORB_FEATURES, ORB_SCALE_FACTOR, ORB_LEVELS
+from feature_detection import (FeaturePyramid, compute_roi_mask, extract_multi_detector_features,
+                               extract_multi_scale_features, optimize_detection_parameters,
+                               _sift_parameter_combinations)
+
+
+def _test_images(size=(320, 256), seed=0):
+    """Gambar bertekstur dengan peta ELA yang memiliki satu wilayah terang"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = cv2.resize(rng.integers(0, 256, (h // 8, w // 8, 3), dtype=np.uint8), (w, h), interpolation=cv2.INTER_CUBIC)
+    image = np.clip(base.astype(np.int16) + rng.integers(-20, 21, (h, w, 3)), 0, 255).astype(np.uint8)
+    ela = rng.integers(0, 30, (h, w), dtype=np.uint8)
+    ela[60:160, 80:200] += 120
+    return Image.fromarray(image), Image.fromarray(ela, 'L')
+
+
+def _signature(feature_sets):
+    return {name: ([(kp.pt, kp.size, kp.angle, kp.response, kp.octave) for kp in keypoints],
+                   None if descriptors is None else descriptors.tobytes())
+            for name, (keypoints, descriptors) in feature_sets.items()}
+
+
+def _serial_features(image_pil, ela_pil, ela_mean, ela_std, sift_nfeatures):
+    """Deteksi berurutan seperti implementasi lama (tanpa thread pool)"""
+    roi_mask = compute_roi_mask(np.array(ela_pil), ela_mean, ela_std)
+    gray = cv2.cvtColor(np.array(image_pil.convert('RGB')), cv2.COLOR_RGB2GRAY)
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    sift_kps, sift_descs = [], None
+    for nfeat, contrast, edge in _sift_parameter_combinations(sift_nfeatures):
+        kp, desc = cv2.SIFT_create(nfeatures=nfeat, contrastThreshold=contrast, edgeThreshold=edge).detectAndCompute(gray, roi_mask)
+        if desc is not None and len(kp) > len(sift_kps):
+            sift_kps, sift_descs = kp, desc
+    if len(sift_kps) < 10:
+        kp, desc = cv2.SIFT_create(nfeatures=sift_nfeatures, contrastThreshold=SIFT_CONTRAST_THRESHOLD * 0.3,
+                                   edgeThreshold=SIFT_EDGE_THRESHOLD).detectAndCompute(gray, None)
+        if desc is not None and len(kp) > len(sift_kps):
+            sift_kps, sift_descs = kp, desc
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES, scaleFactor=ORB_SCALE_FACTOR, nlevels=ORB_LEVELS)
+    try:
+        akaze = cv2.AKAZE_create().detectAndCompute(gray, roi_mask)
+    except AttributeError:  # build OpenCV tanpa AKAZE
+        akaze = ([], None)
+    feature_sets = {'sift': (sift_kps, sift_descs), 'orb': orb.detectAndCompute(gray, roi_mask), 'akaze': akaze}
+    return feature_sets, roi_mask, gray
+
+
+def test_threaded_detectors_match_serial_detection():
+    """Detektor paralel menghasilkan keypoint, deskriptor, mask ROI dan gray yang sama persis"""
+    image, ela = _test_images()
+    ela_np = np.array(ela)
+    stats = (float(ela_np.mean()), float(ela_np.std()))
+    feature_sets, roi_mask, gray = extract_multi_detector_features(image, ela, *stats, sift_nfeatures=200)
+    expected_sets, expected_mask, expected_gray = _serial_features(image, ela, *stats, 200)
+
+    assert len(feature_sets['sift'][0]) > 0
+    assert _signature(feature_sets) == _signature(expected_sets)
+    assert np.array_equal(roi_mask, expected_mask)
+    assert np.array_equal(gray, expected_gray)
+
+
+def test_multi_scale_reuses_pyramid_levels():
+    """Setiap skala dibangun sekali; keypoint dikembalikan ke koordinat gambar asli"""
+    image, ela = _test_images()
+    pyramid = FeaturePyramid(image, ela)
+    features = extract_multi_scale_features(image, ela, 0.0, 0.0, scales=[1.0, 0.8, 0.5], pyramid=pyramid)
+
+    # 0.5 menghasilkan gambar < 200 piksel dan dilewati
+    assert list(features) == ['scale_1.0', 'scale_0.8']
+    level = pyramid.level(0.8)
+    assert features['scale_0.8']['image_size'] == level.size == (256, 204)
+    expected_sets, _, _ = _serial_features(level.image, level.ela, level.ela_mean, level.ela_std, SIFT_FEATURES)
+    expected = np.float32([kp.pt for kp in expected_sets['sift'][0]]) / np.float32(0.8)
+    assert np.allclose([kp.pt for kp in features['scale_0.8']['features']['sift'][0]], expected)
+
+    assert pyramid.level(1.0) is pyramid.build([1.0])[1.0]
+    params = optimize_detection_parameters(image, ela, pyramid=pyramid)
+    assert params['image_characteristics'] == optimize_detection_parameters(image, ela)['image_characteristics']
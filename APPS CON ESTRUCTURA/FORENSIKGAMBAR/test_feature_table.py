@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test untuk tabel fitur kolom dan klasifikasi batch (re-scoring tanpa menjalankan pipeline)
+"""
+
+import os
+import sys
+import json
+import contextlib
+import io
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feature_table import FeatureTable, extract_features, features_to_json, append_to_feature_table
+from classification import (prepare_feature_vector, classify_manipulation_advanced,
+                            classify_manipulation_batch, threshold_sweep)
+
+
+def _synthetic_results(rng):
+    """Hasil analisis acak dengan rentang realistis; sebagian bagian sengaja hilang"""
+    results = {
+        'sift_matches': int(rng.integers(0, 400)),
+        'ransac_inliers': int(rng.choice([0, 0, 3, 7, 12, 25, 60])),
+        'geometric_transform': ('affine', np.eye(2)) if rng.random() < 0.3 else None,
+        'block_matches': [0] * int(rng.choice([0, 0, 2, 4, 12, 35])),
+        'jpeg_ghost_suspicious_ratio': float(rng.choice([0, 0.01, 0.04, 0.06, 0.2, 0.5])),
+        'jpeg_analysis': {'basic_analysis': {'response_variance': float(rng.uniform(0, 10)),
+                                             'double_compression_indicator': float(rng.uniform(0, 1))}},
+        'frequency_analysis': {'frequency_inconsistency': float(rng.uniform(0, 2.5)),
+                               'dct_stats': {'freq_ratio': float(rng.uniform(0, 1))}},
+        'texture_analysis': {'overall_inconsistency': float(rng.uniform(0, 0.6))},
+        'edge_analysis': {'edge_inconsistency': float(rng.uniform(0, 0.4))},
+        'illumination_analysis': {'overall_illumination_inconsistency': float(rng.uniform(0, 0.5))},
+        'metadata': {'Metadata_Authenticity_Score': int(rng.integers(0, 100)),
+                     'Metadata_Inconsistency': ['x'] * int(rng.integers(0, 4)),
+                     'Dimensions': str(rng.choice(['640x480', '200x100', 'n/a']))},
+    }
+    if rng.random() < 0.95:
+        results['ela_mean'] = float(rng.uniform(0, 30))
+        results['ela_std'] = float(rng.uniform(0, 40))
+    if rng.random() < 0.9:
+        results['ela_regional_stats'] = {'mean_variance': float(rng.uniform(0, 50)),
+                                         'outlier_regions': int(rng.integers(0, 8)),
+                                         'suspicious_regions': [0] * int(rng.integers(0, 5))}
+        if rng.random() < 0.8:
+            results['ela_regional_stats']['regional_inconsistency'] = float(rng.uniform(0, 0.6))
+    if rng.random() < 0.9:
+        results['noise_analysis'] = {'overall_inconsistency': float(rng.uniform(0, 0.9))}
+    if rng.random() < 0.9:
+        stats = {name: float(rng.uniform(6, 8)) for name in ('R_entropy', 'G_entropy', 'B_entropy', 'overall_entropy')}
+        for name in ('rg_correlation', 'rb_correlation', 'gb_correlation'):
+            if rng.random() < 0.9:
+                stats[name] = float(rng.uniform(0.3, 1.0))
+        results['statistical_analysis'] = stats
+    if rng.random() < 0.9:
+        results['localization_analysis'] = {
+            'tampering_percentage': float(rng.choice([0, 1, 3, 7, 20, 70])),
+            'kmeans_localization': {'cluster_ela_means': list(rng.uniform(0, 20, int(rng.integers(0, 4))))}}
+    return results
+
+
+def test_feature_matrix_matches_prepare_feature_vector(tmp_path):
+    """Baris matriks fitur sama dengan prepare_feature_vector; simpan/muat dan ringkasan batch utuh"""
+    rng = np.random.default_rng(1)
+    results = [_synthetic_results(rng) for _ in range(50)]
+    table = FeatureTable.from_results([f'img_{i}.jpg' for i in range(50)], results)
+
+    expected = np.stack([prepare_feature_vector(r) for r in results])
+    assert np.array_equal(table.feature_matrix(), expected)
+    # Kontainer hasil pipeline (AnalysisResults) memberi baris yang sama dengan dict
+    from analysis_results import AnalysisResults
+    from_container = FeatureTable.from_results(['c'], [AnalysisResults.from_dict(results[0])])
+    assert np.array_equal(from_container.feature_matrix()[0], expected[0])
+    # Nilai hilang tetap NaN; tiap pengklasifikasi memakai default-nya sendiri
+    missing = [i for i, r in enumerate(results) if 'rg_correlation' not in r.get('statistical_analysis', {})]
+    assert missing and np.isnan(table.columns['rg_correlation'][missing]).all()
+
+    loaded = FeatureTable.load(table.save(str(tmp_path / 'table.npz')))
+    assert list(loaded.ids) == list(table.ids)
+    for name, column in table.columns.items():
+        assert np.array_equal(loaded.columns[name], column, equal_nan=True)
+
+    summary = tmp_path / 'batch_summary.jsonl'
+    with open(summary, 'w', encoding='utf-8') as f:
+        for i, r in enumerate(results[:3]):
+            f.write(json.dumps({'path': f'img_{i}.jpg', 'status': 'ok',
+                                'features': features_to_json(extract_features(r))}) + '\n')
+        f.write(json.dumps({'path': 'rusak.jpg', 'status': 'failed'}) + '\n')
+    from_summary = FeatureTable.from_batch_summary(str(summary))
+    assert list(from_summary.ids) == ['img_0.jpg', 'img_1.jpg', 'img_2.jpg']
+    assert np.array_equal(from_summary.feature_matrix(), expected[:3])
+
+    path = str(tmp_path / 'appended.npz')
+    append_to_feature_table(path, 'a.jpg', results[0])
+    append_to_feature_table(path, 'b.jpg', results[1])
+    assert list(FeatureTable.load(path).ids) == ['a.jpg', 'b.jpg']
+
+
+def test_batch_classification_matches_single_image():
+    """classify_manipulation_batch identik dengan classify_manipulation_advanced per gambar"""
+    rng = np.random.default_rng(2)
+    results = [_synthetic_results(rng) for _ in range(300)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        single = [classify_manipulation_advanced(r) for r in results]
+    batch = classify_manipulation_batch(FeatureTable.from_results(range(len(results)), results))
+
+    assert len(set(batch['type'])) > 2
+    for i, expected in enumerate(single):
+        probabilities = expected['uncertainty_analysis']['probabilities']
+        assert batch['type'][i] == expected['type']
+        assert batch['confidence'][i] == expected['confidence']
+        assert batch['copy_move_score'][i] == expected['copy_move_score']
+        assert batch['splicing_score'][i] == expected['splicing_score']
+        assert batch['ml_scores']['copy_move'][i] == expected['ml_scores']['copy_move']
+        assert batch['ml_scores']['splicing'][i] == expected['ml_scores']['splicing']
+        for key in ('copy_move_probability', 'splicing_probability', 'authentic_probability', 'uncertainty_level'):
+            assert batch[key][i] == probabilities[key]
+        assert batch['confidence_intervals']['splicing']['upper'][i] == \
+            probabilities['confidence_intervals']['splicing']['upper']
+
+
+def test_threshold_sweep_matches_brute_force():
+    """Grid ambang (matriks) sama dengan perhitungan langsung per pasangan ambang"""
+    rng = np.random.default_rng(3)
+    n = 500
+    scores = {'copy_move_score': rng.integers(0, 101, n), 'splicing_score': rng.integers(0, 101, n),
+              'reliability_score': rng.uniform(0, 1, n)}
+    labels = rng.choice([-1, 0, 1], n)
+    detection, confidence = np.arange(30, 91, 10), np.array([40.0, 60.0, 75.0])
+    grid = threshold_sweep(scores, detection, confidence, labels)
+
+    score = np.maximum(scores['copy_move_score'], scores['splicing_score'])
+    for i, d in enumerate(detection):
+        for j, c in enumerate(confidence):
+            flagged = (score >= d) & (scores['reliability_score'] * 100 >= c)
+            assert grid['flagged'][i, j] == flagged.sum()
+            true_positive = (flagged & (labels == 1)).sum()
+            assert np.isclose(grid['precision'][i, j], true_positive / max((flagged & (labels >= 0)).sum(), 1))
+            assert np.isclose(grid['recall'][i, j], true_positive / (labels == 1).sum())
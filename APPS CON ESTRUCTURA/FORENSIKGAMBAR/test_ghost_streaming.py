@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test untuk sweep JPEG ghost streaming (tanpa kubus respons (h, w, Q))
+"""
+
+import os
+import sys
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_context import AnalysisContext
+from jpeg_analysis import (jpeg_ghost_analysis, ghost_response_cube, analyze_ghost_patterns,
+                           create_suspicious_regions_map)
+
+
+def _make_image(seed=1, size=(120, 88)):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size[1], 0:size[0]]
+    base = np.stack([xx * 2, yy * 3, (xx * yy) % 256], axis=-1) + rng.normal(0, 12, (size[1], size[0], 3))
+    return Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+
+def test_streaming_sweep_matches_cube():
+    """Reducer streaming memberi hasil yang sama dengan analisis dari kubus penuh"""
+    image = _make_image()
+    qualities = list(range(50, 101, 5))
+    context = AnalysisContext(image)
+    ghost_map, suspicious_map, analysis = jpeg_ghost_analysis(image, qualities, context=context)
+
+    cube = ghost_response_cube(image, qualities, context=context)
+    assert cube.shape == (88, 120, len(qualities)) and cube.dtype == np.float32
+    best_quality_map = np.asarray(qualities, dtype=np.uint8)[np.argmin(cube, axis=2)]
+    from_cube = analyze_ghost_patterns(ghost_map, best_quality_map, cube, qualities)
+
+    assert list(analysis['quality_analysis']) == qualities
+    for quality in qualities:
+        for key, value in from_cube['quality_analysis'][quality].items():
+            assert np.isclose(analysis['quality_analysis'][quality][key], value, rtol=1e-5)
+    assert np.isclose(analysis['total_ghost_score'], from_cube['total_ghost_score'])
+    assert len(analysis['ghost_regions']) == len(from_cube['ghost_regions'])
+
+    response_variance = np.var(cube, axis=2)
+    min_response_map = cube.min(axis=2)
+    from_variance = create_suspicious_regions_map(ghost_map, response_variance, best_quality_map, min_response_map)
+    assert np.array_equal(from_variance, create_suspicious_regions_map(ghost_map, cube, best_quality_map,
+                                                                       min_response_map))
+    assert from_variance.shape == suspicious_map.shape
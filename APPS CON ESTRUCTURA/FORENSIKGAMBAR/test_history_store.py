@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test untuk riwayat analisis berbasis SQLite (history_store)
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import HistoryStore
+
+
+def _summary(verdict):
+    return {'type': verdict, 'confidence': 'Tinggi', 'uncertainty_level': 0.2}
+
+
+def test_pagination_filters_and_thumbnails(tmp_path):
+    """Halaman terurut dari yang terbaru, filter verdict/tanggal/nama, thumbnail sebagai blob"""
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    for day in range(1, 11):
+        verdict = 'Copy-Move Forgery' if day % 2 else 'Authentic'
+        store.add(f'img_{day:02d}.jpg', _summary(verdict), f'{day}.00s',
+                  thumbnail=b'\xff\xd8thumb' + bytes([day]), timestamp=f'2024-05-{day:02d} 12:00:00')
+
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    assert store.count() == 10
+    first_page = store.query(page=0, per_page=4)
+    assert [entry['image_name'] for entry in first_page] == ['img_10.jpg', 'img_09.jpg', 'img_08.jpg', 'img_07.jpg']
+    assert [entry['image_name'] for entry in store.query(page=2, per_page=4)] == ['img_02.jpg', 'img_01.jpg']
+    assert first_page[0]['analysis_summary'] == _summary('Authentic')
+    assert first_page[0]['has_thumbnail']
+    assert store.thumbnail(first_page[0]['id']) == b'\xff\xd8thumb' + bytes([10])
+
+    assert store.count(verdict='Authentic') == 5
+    assert store.verdicts() == ['Authentic', 'Copy-Move Forgery']
+    # Rentang tanggal inklusif di kedua ujung
+    in_range = store.query(per_page=None, date_from=date(2024, 5, 3), date_to='2024-05-05')
+    assert [entry['image_name'] for entry in in_range] == ['img_05.jpg', 'img_04.jpg', 'img_03.jpg']
+    assert store.count(search='img_1') == 1
+    assert store.count(search='%') == 0
+    assert [entry['image_name'] for entry in store.all()][:2] == ['img_01.jpg', 'img_02.jpg']
+
+
+def test_delete_is_atomic_and_removes_thumbnails(tmp_path):
+    """Hapus terpilih dalam satu transaksi; thumbnail ikut terhapus, clear mengosongkan semua"""
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    ids = [store.add(f'img_{i}.jpg', _summary('Authentic'), '1s', thumbnail=b'jpeg') for i in range(5)]
+
+    assert store.delete([ids[1], ids[3], 999]) == 2
+    assert [entry['id'] for entry in store.all()] == [ids[0], ids[2], ids[4]]
+    assert store.thumbnail(ids[1]) is None
+
+    assert store.delete([]) == 0
+    assert store.count() == 3
+
+    store.clear()
+    assert store.count() == 0
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM thumbnails').fetchone()[0] == 0
+
+
+def test_migrate_json_once(tmp_path):
+    """Riwayat JSON lama (beserta file thumbnail) dimigrasikan sekali lalu diganti nama"""
+    thumbnail_path = tmp_path / 'thumb.jpg'
+    thumbnail_path.write_bytes(b'old-thumbnail')
+    legacy = [
+        {'timestamp': '2024-01-01 08:00:00', 'image_name': 'a.jpg', 'thumbnail_path': str(thumbnail_path),
+         'analysis_summary': _summary('Splicing Forgery'), 'processing_time': '3.10s'},
+        {'timestamp': '2024-01-02 08:00:00', 'image_name': 'b.jpg', 'thumbnail_path': str(tmp_path / 'hilang.jpg'),
+         'analysis_summary': _summary('Authentic'), 'processing_time': '2.00s'},
+    ]
+    json_path = tmp_path / 'analysis_history.json'
+    json_path.write_text(json.dumps(legacy), encoding='utf-8')
+
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    assert store.migrate_json(str(json_path)) == 2
+    assert not json_path.exists()
+    assert (tmp_path / 'analysis_history.json.migrated').exists()
+
+    entries = store.all()
+    assert [(e['timestamp'], e['image_name'], e['processing_time']) for e in entries] == \
+        [('2024-01-01 08:00:00', 'a.jpg', '3.10s'), ('2024-01-02 08:00:00', 'b.jpg', '2.00s')]
+    assert entries[0]['analysis_summary'] == _summary('Splicing Forgery')
+    assert store.thumbnail(entries[0]['id']) == b'old-thumbnail'
+    assert not entries[1]['has_thumbnail']
+
+    # File yang sama tidak dimigrasikan dua kali, juga jika muncul lagi
+    json_path.write_text(json.dumps(legacy), encoding='utf-8')
+    assert store.migrate_json(str(json_path)) == 0
+    assert store.count() == 2
+
+
+def test_concurrent_writers(tmp_path):
+    """Beberapa penulis bersamaan (mode WAL) tidak kehilangan entri"""
+    path = str(tmp_path / 'history.db')
+    HistoryStore(path)
+
+    def writer(worker):
+        store = HistoryStore(path)
+        for i in range(25):
+            store.add(f'w{worker}_{i}.jpg', _summary('Authentic'), '1s', thumbnail=b'x' * 512)
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert HistoryStore(path).count() == 100
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test untuk ingest gambar sekali baca (mmap): EXIF/XMP/tabel kuantisasi JPEG tanpa decode piksel
+"""
+
+import os
+import sys
+import json
+import numpy as np
+from PIL import Image, ImageFile, TiffImagePlugin
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import image_ingest
+from image_ingest import ingest_image, triage_metadata
+from validation import extract_enhanced_metadata
+
+
+def _exif():
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'
+    exif[0x0131] = 'Adobe Photoshop 2024'
+    exif[0x0132] = '2024:01:02 10:00:00'
+    exif[0x0112] = 6
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = '2024:01:01 10:00:00'
+    exif_ifd[0x829A] = TiffImagePlugin.IFDRational(1, 250)
+    exif_ifd[0xA001] = 1
+    gps_ifd = exif.get_ifd(0x8825)
+    gps_ifd[0x0001] = 'S'
+    gps_ifd[0x0002] = (1.0, 2.0, 3.5)
+    return exif
+
+
+def _image(seed=0, shape=(120, 160)):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (*shape, 3), dtype=np.uint8))
+
+
+def test_jpeg_headers_parsed_from_bytes(tmp_path):
+    """Tag EXIF, DQT, frame dan marker dibaca dari bytes; hasilnya sama dengan yang ditulis PIL"""
+    path = str(tmp_path / 'foto.jpg')
+    image = _image()
+    image.save(path, quality=80, exif=_exif(), comment=b'catatan', subsampling=2)
+    with open(path, 'ab') as f:
+        f.write(b'payload tersembunyi')
+
+    with ingest_image(path) as ingested:
+        tags = ingested.exif_tags
+        assert tags['Image Make'] == 'Canon'
+        assert tags['Image Orientation'] == 'Rotated 90 CW'
+        assert tags['EXIF ExposureTime'] == '1/250'
+        assert tags['EXIF ColorSpace'] == 'sRGB'
+        assert tags['GPS GPSLatitude'] == '[1, 2, 7/2]'
+
+        # Tabel kuantisasi (urutan natural) sama dengan yang dilaporkan decoder PIL
+        with Image.open(path) as reference:
+            assert {k: list(v) for k, v in reference.quantization.items()} == ingested.jpeg['quantization_tables']
+
+        metadata = ingested.format_metadata()
+        assert metadata['JPEG Quality Estimate'] == '80'
+        assert metadata['JPEG Subsampling'] == '4:2:0'
+        assert metadata['JPEG Comment'] == 'catatan'
+        assert metadata['JPEG Trailing Bytes'] == str(len(b'payload tersembunyi'))
+        assert ingested.dimensions == image.size
+        assert len(ingested.sha256) == 64
+
+        decoded = ingested.open_image()
+        assert ingested.open_image() is decoded  # decode sekali
+    # Gambar hasil decode tetap bisa dipakai setelah mmap ditutup
+    with Image.open(path) as reference:
+        assert np.array_equal(np.array(decoded), np.array(reference))
+
+
+def test_metadata_from_other_containers_and_xmp(tmp_path):
+    """EXIF dari PNG/WebP/TIFF, XMP CreatorTool ikut pemeriksaan software; file rusak tidak error"""
+    image = _image(1)
+    for name, options in (('a.png', {'exif': _exif()}), ('a.webp', {'exif': _exif()}), ('a.tif', {'tiffinfo': _exif()})):
+        path = str(tmp_path / name)
+        image.save(path, **options)
+        with ingest_image(path) as ingested:
+            assert ingested.exif_tags['Image Make'] == 'Canon'
+            assert ingested.dimensions == image.size
+
+    path = str(tmp_path / 'xmp.jpg')
+    xmp = b'<x:xmpmeta><rdf:Description xmp:CreatorTool="GIMP 2.10"/></x:xmpmeta>'
+    image.save(path, quality=90, xmp=xmp)
+    metadata = extract_enhanced_metadata(path)
+    assert metadata['XMP CreatorTool'] == 'GIMP 2.10'
+    assert any('gimp' in item for item in metadata['Metadata_Inconsistency'])
+
+    broken = tmp_path / 'rusak.jpg'
+    data = open(path, 'rb').read()
+    broken.write_bytes(data[:2] + b'\xff\xe1\x00\x20Exif\x00\x00MM\x00*\xff\xff\xff\xff' + b'\x00' * 14 + data[2:200])
+    with ingest_image(str(broken)) as ingested:
+        assert ingested.exif_tags == {}
+        assert ingested.format == 'JPEG'
+
+
+def test_triage_does_not_decode_pixels(tmp_path, monkeypatch):
+    """Triage metadata menulis satu record JSONL per file tanpa pernah men-decode piksel"""
+    paths = []
+    for i in range(5):
+        path = str(tmp_path / f'img_{i}.jpg')
+        _image(i).save(path, quality=70 + i, exif=_exif())
+        paths.append(path)
+    (tmp_path / 'bukan_gambar.jpg').write_bytes(b'teks biasa')
+    paths.append(str(tmp_path / 'bukan_gambar.jpg'))
+
+    def _no_decode(self):
+        raise AssertionError('piksel tidak boleh di-decode saat triage')
+    monkeypatch.setattr(image_ingest.IngestedImage, 'open_image', _no_decode)
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', _no_decode)
+
+    summary = str(tmp_path / 'out' / 'metadata_summary.jsonl')
+    counts = triage_metadata(iter(paths), summary, workers=3)
+    assert counts == {'ok': 5, 'invalid': 1}
+    with open(summary, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['path'] for r in records] == paths
+    assert records[2]['metadata']['JPEG Quality Estimate'] == '72'
+    assert records[0]['dimensions'] == [160, 120]
+    assert records[0]['metadata']['Image Make'] == 'Canon'
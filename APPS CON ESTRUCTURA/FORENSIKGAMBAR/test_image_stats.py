@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test untuk plane statistik gambar (integral image, query blok O(1), histogram)
+"""
+
+import os
+import sys
+import pickle
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_stats import ImageStatsPlane, histogram_moments, histogram_entropy
+from advanced_analysis import (analyze_edge_consistency, analyze_illumination_consistency,
+                               perform_statistical_analysis, calculate_skewness, calculate_kurtosis)
+
+
+def _image(seed=0, shape=(150, 97)):
+    rng = np.random.default_rng(seed)
+    image_array = rng.integers(0, 256, (*shape, 3), dtype=np.uint8)
+    image_array[:64, :64] = 128  # area seragam
+    return Image.fromarray(image_array)
+
+
+def test_block_queries_match_direct_reductions():
+    """Mean/varians blok dari integral image sama dengan reduksi langsung pada slice"""
+    plane = ImageStatsPlane(_image())
+    rng = np.random.default_rng(1)
+    y0 = rng.integers(0, 140, 200)
+    x0 = rng.integers(0, 90, 200)
+    y1 = y0 + rng.integers(1, 11, 200)
+    x1 = x0 + rng.integers(1, 8, 200)
+
+    for name in ('gray', 'illumination', 'illumination_gradient', 'edge_strength', 'rgb'):
+        values = plane.get_map(name).astype(np.float64)
+        mean = plane.block_mean(name, y0, y1, x0, x1)
+        var = plane.block_var(name, y0, y1, x0, x1)
+        for k in range(len(y0)):
+            block = values[y0[k]:y1[k], x0[k]:x1[k]]
+            np.testing.assert_allclose(mean[k], block.mean(axis=(0, 1)), rtol=1e-9, atol=1e-9)
+            np.testing.assert_allclose(var[k], block.var(axis=(0, 1)), rtol=1e-7, atol=1e-6)
+
+    canny = plane.canny
+    assert plane.edge_density(10, 40, 5, 60) == np.count_nonzero(canny[10:40, 5:60]) / canny[10:40, 5:60].size
+
+    # Grid blok sama dengan loop per blok tahap edge/illumination (termasuk gambar lebih kecil dari blok)
+    y0, y1, x0, x1 = plane.block_grid(32)
+    assert list(zip(y0, y1, x0, x1)) == [(i*32, (i+1)*32, j*32, (j+1)*32) for i in range(4) for j in range(3)]
+    assert [tuple(c) for c in zip(*ImageStatsPlane(_image(shape=(20, 40))).block_grid(64))] == [(0, 20, 0, 40)]
+
+
+def test_histogram_statistics_match_pixel_statistics():
+    """Momen dan entropi dari histogram sama dengan perhitungan per piksel"""
+    image = _image(2)
+    image_array = np.array(image)
+    plane = ImageStatsPlane(image)
+    result = perform_statistical_analysis(image, plane=plane)
+
+    for i, channel in enumerate('RGB'):
+        data = image_array[:, :, i].flatten()
+        assert np.isclose(result[f'{channel}_mean'], np.mean(data), rtol=1e-12)
+        assert np.isclose(result[f'{channel}_std'], np.std(data), rtol=1e-12)
+        assert np.isclose(result[f'{channel}_skewness'], calculate_skewness(data), rtol=1e-9, atol=1e-12)
+        assert np.isclose(result[f'{channel}_kurtosis'], calculate_kurtosis(data), rtol=1e-9, atol=1e-12)
+    _, counts = np.unique(image_array, return_counts=True)
+    p = counts / counts.sum()
+    assert np.isclose(result['overall_entropy'], -np.sum(p * np.log2(p)), rtol=1e-12)
+    assert np.isclose(result['rg_correlation'], np.corrcoef(image_array[:, :, 0].ravel(), image_array[:, :, 1].ravel())[0, 1])
+
+    assert histogram_moments(np.zeros(256, dtype=np.int64)) == (0.0, 0.0, 0.0, 0.0)
+    assert histogram_moments(np.bincount([7, 7, 7], minlength=256)) == (7.0, 0.0, 0.0, 0.0)
+    assert histogram_entropy(np.bincount([1, 2], minlength=256)) == 1.0
+
+
+def test_shared_plane_and_pickling():
+    """Satu plane dipakai bersama tanpa mengubah hasil; pickle hanya membawa gambar"""
+    image = _image(3, shape=(200, 260))
+    plane = ImageStatsPlane(image)
+    assert analyze_edge_consistency(image, plane=plane) == analyze_edge_consistency(image)
+    assert analyze_illumination_consistency(image, plane=plane) == analyze_illumination_consistency(image)
+    assert plane.get_map('gray') is plane.gray  # dihitung sekali
+    assert not plane.gray.flags.writeable
+
+    restored = pickle.loads(pickle.dumps(plane))
+    assert len(pickle.dumps(plane)) < 2 * np.array(image).nbytes
+    assert np.array_equal(restored.integral('illumination')[0], plane.integral('illumination')[0])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test untuk job server lokal (worker persisten di belakang antrean)
+"""
+
+import os
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_server import JobServer, DONE, FAILED
+
+
+def _toy_job(name, delay=0.0):
+    """Job pengganti pipeline: hasil berisi KeyPoint seperti hasil analisis"""
+    time.sleep(delay)
+    if name == 'crash':
+        os._exit(3)
+    if name == 'error':
+        raise ValueError("gambar rusak")
+    return {'name': name, 'pid': os.getpid(), 'sift_keypoints': [cv2.KeyPoint(1.5, 2.5, 8.0, 45.0)]}
+
+
+def _plus_one(v):
+    return v + 1
+
+
+def _times_three(v):
+    return v * 3
+
+
+def _stage_job(x):
+    """Job yang menjalankan graf tahap seperti pipeline, seolah-olah di mesin multi-core"""
+    import stage_scheduler
+    from stage_scheduler import PipelineStage, run_stage_graph
+    from report_artifacts import _resolve_workers as export_workers
+
+    os.cpu_count = lambda: 4
+    values = {'x': x}
+    stages = [PipelineStage('plus', _plus_one, inputs=('x',), outputs=('plus',)),
+              PipelineStage('times', _times_three, inputs=('x',), outputs=('times',))]
+    outcomes = run_stage_graph(stages, values)
+    return {'ok': all(o['success'] for o in outcomes.values()), 'plus': values.get('plus'),
+            'times': values.get('times'), 'stage_workers': stage_scheduler._resolve_workers(None),
+            'export_workers': export_workers(None)}
+
+
+def _server(**kwargs):
+    return JobServer(workers=2, job_func=_toy_job, warm_up=False, **kwargs).start()
+
+
+def test_jobs_run_concurrently_on_warm_workers():
+    """Dua job berjalan bersamaan pada worker yang tetap hidup; KeyPoint dapat dikirim balik"""
+    server = _server()
+    try:
+        started = time.time()
+        job_ids = [server.submit('a', delay=1.0), server.submit('b', delay=1.0)]
+        records = [server.wait(job_id, timeout=30) for job_id in job_ids]
+        assert [r['status'] for r in records] == [DONE, DONE]
+        assert time.time() - started < 1.9
+
+        results = [server.result(job_id) for job_id in job_ids]
+        assert {r['name'] for r in results} == {'a', 'b'}
+        assert results[0]['sift_keypoints'][0].pt == (1.5, 2.5)
+        assert server.result(job_ids[0]) is None  # sudah diambil
+
+        # Worker yang sama dipakai lagi untuk job berikutnya
+        pids = {r['pid'] for r in results}
+        next_id = server.submit('c')
+        server.wait(next_id, timeout=30)
+        assert server.result(next_id)['pid'] in pids
+    finally:
+        server.shutdown()
+
+
+def test_crashing_job_does_not_take_down_the_server():
+    """Worker yang crash hanya menggagalkan job-nya sendiri dan diganti worker baru"""
+    server = _server()
+    try:
+        crash_id = server.submit('crash')
+        error_id = server.submit('error')
+        crash = server.wait(crash_id, timeout=30)
+        error = server.wait(error_id, timeout=30)
+        assert crash['status'] == FAILED and 'exit code 3' in crash['error']
+        assert error['status'] == FAILED and 'gambar rusak' in error['error']
+
+        ok_id = server.submit('ok')
+        assert server.wait(ok_id, timeout=30)['status'] == DONE
+        assert server.alive_workers() == 2
+    finally:
+        server.shutdown()
+
+
+def test_timed_out_job_is_killed():
+    """Job yang melebihi batas waktu dihentikan dan ditandai gagal"""
+    server = _server(timeout=0.5)
+    try:
+        job_id = server.submit('slow', delay=30)
+        record = server.wait(job_id, timeout=30)
+        assert record['status'] == FAILED and 'batas waktu' in record['error']
+        assert record['elapsed'] < 10
+    finally:
+        server.shutdown()
+
+
+def test_single_worker_runs_stage_graph_in_process():
+    """Dengan satu worker, tahap pipeline tetap berjalan (worker daemon tidak boleh punya proses anak)"""
+    server = JobServer(workers=1, job_func=_stage_job, warm_up=False).start()
+    try:
+        job_id = server.submit(5)
+        record = server.wait(job_id, timeout=60)
+        assert record['status'] == DONE, record['error']
+        result = server.result(job_id)
+        assert result['ok'] and (result['plus'], result['times']) == (6, 15)
+        assert result['stage_workers'] == 1 and result['export_workers'] == 1
+    finally:
+        server.shutdown()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test untuk analisis JPEG (ghost, blok, kompresi ganda)
+"""
+
+import io
+import os
+import sys
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_context import AnalysisContext
+from jpeg_analysis import jpeg_ghost_analysis, detect_double_jpeg, advanced_jpeg_analysis
+
+
+def _make_image(seed=0, size=(128, 96)):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size[1], 0:size[0]]
+    base = np.stack([xx * 2, yy * 2, (xx + yy) % 256], axis=-1) + rng.normal(0, 10, (size[1], size[0], 3))
+    return Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+
+def test_ghost_sweep_reuses_context():
+    """Sweep kedua pada konteks yang sama memakai ulang respons per kualitas"""
+    image = _make_image()
+    context = AnalysisContext(image)
+
+    ghost_map, suspicious_map, _ = jpeg_ghost_analysis(image, context=context)
+    misses_after_first = context.misses
+    double = detect_double_jpeg(image, context=context)
+
+    # Kualitas 50..95 sudah dihitung oleh sweep pertama (50..100)
+    _, _, fresh_analysis = jpeg_ghost_analysis(image, range(50, 96, 5))
+    assert list(double['ghost_analysis']['quality_analysis']) == list(fresh_analysis['quality_analysis'])
+    assert double['ghost_analysis']['total_ghost_score'] == fresh_analysis['total_ghost_score']
+    # Hanya entri baru: hasil sweep 50..95, kubus DCT blok dan analisis blok
+    assert context.misses - misses_after_first == 3
+
+    again = jpeg_ghost_analysis(image, context=context)
+    assert again[0] is ghost_map and again[1] is suspicious_map
+
+
+def test_basic_quality_response_is_pinned():
+    """Respons kualitas dasar (subsampling 4:4:4) tetap sama; perubahan subsampling menggeser verdict"""
+    buffer = io.BytesIO()
+    _make_image(3, (256, 192)).save(buffer, 'JPEG', quality=75)
+    buffer.seek(0)
+    analysis = advanced_jpeg_analysis(Image.open(buffer).convert('RGB'))
+
+    assert analysis['estimated_original_quality'] == 90
+    assert [r['quality'] for r in analysis['quality_responses']] == [60, 70, 80, 90]
+    # Dengan subsampling default encoder (4:2:0): [1.947, 1.086, 0.839, 0.706], variance 0.233
+    np.testing.assert_allclose([r['response_mean'] for r in analysis['quality_responses']],
+                               [1.862, 1.095, 0.917, 0.729], rtol=0.02)
+    np.testing.assert_allclose(analysis['response_variance'], 0.1853, rtol=0.05)
+    assert analysis['quality_curve_analysis']['curve_type'] == 'monotonic_decreasing'
+
+
+def test_memoized_ghost_responses_are_compact_and_released():
+    """Respons per kualitas disimpan float32 seukuran gambar dan dilepas setelah deteksi kompresi ganda"""
+    image = _make_image(2)
+    context = AnalysisContext(image)
+    jpeg_ghost_analysis(image, context=context)
+
+    for quality in range(50, 101, 5):
+        layer = context.memoize(('ghost_response', quality), lambda: None)
+        assert layer['response'].dtype == np.float32 and layer['evidence'].dtype == np.uint8
+        assert layer['response'].shape == (96, 128) and layer['response'].nbytes == 96 * 128 * 4
+        assert set(layer['stats']) == {'mean_response', 'response_variance', 'low_response_area'}
+
+    detect_double_jpeg(image, context=context)
+    assert not any(context.has(('ghost_response', quality)) for quality in range(50, 101, 5))
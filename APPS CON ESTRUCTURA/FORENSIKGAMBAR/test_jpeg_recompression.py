@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test untuk layanan rekompresi JPEG in-memory
+"""
+
+import io
+import os
+import sys
+import contextlib
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jpeg_recompression import JpegRecompressor, encode_jpeg_bytes
+
+
+def _make_image(seed=0, size=(96, 64)):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def test_recompression_matches_file_roundtrip(tmp_path):
+    """Hasil rekompresi in-memory harus identik dengan save/load lewat file"""
+    image = _make_image()
+    temp_file = tmp_path / "roundtrip.jpg"
+    image.save(temp_file, 'JPEG', quality=90, subsampling=0)
+    with Image.open(temp_file) as reloaded:
+        expected = np.array(reloaded)
+
+    recompressor = JpegRecompressor()
+    result = recompressor.recompress_array(image, 90, subsampling=0)
+    assert np.array_equal(result, expected)
+    assert not result.flags.writeable
+
+
+def test_recompression_cache_hits_and_eviction():
+    """Permintaan kualitas yang sama dibayar sekali; cache dibatasi ukuran"""
+    image = _make_image()
+    one_entry = 96 * 64 * 3
+    recompressor = JpegRecompressor(max_bytes=2 * one_entry)
+
+    first = recompressor.recompress_array(image, 90)
+    second = recompressor.recompress_array(image, 90)
+    assert first is second
+    assert recompressor.stats()['hits'] == 1
+
+    # Subsampling berbeda adalah entri cache terpisah
+    recompressor.recompress_array(image, 90, subsampling=0)
+    recompressor.recompress_array(image, 75)
+    stats = recompressor.stats()
+    assert stats['entries'] == 2
+    assert stats['cached_bytes'] <= 2 * one_entry
+
+
+def test_encode_jpeg_bytes_is_valid_jpeg():
+    """Byte hasil encode harus diawali marker SOI JPEG"""
+    assert encode_jpeg_bytes(_make_image(), 80)[:2] == b'\xff\xd8'
+
+
+def test_jpeg_stage_shares_recompressions_and_ela_keeps_default():
+    """Analisis JPEG dasar memakai entri sweep ghost; ELA tetap memakai subsampling default encoder"""
+    from config import ELA_QUALITIES
+    from ela_analysis import perform_multi_quality_ela
+    from jpeg_analysis import advanced_jpeg_analysis, jpeg_ghost_analysis
+    from jpeg_recompression import get_recompressor
+
+    image = _make_image(1, size=(128, 96))
+    recompressor = get_recompressor()
+    recompressor.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        jpeg_ghost_analysis(image)
+        misses = recompressor.stats()['misses']
+        hits = recompressor.stats()['hits']
+        advanced_jpeg_analysis(image, qualities=range(60, 96, 10))
+        # Kualitas analisis dasar (60-90) sudah ada di sweep ghost (50-100, langkah 5)
+        assert recompressor.stats()['misses'] == misses
+        assert recompressor.stats()['hits'] - hits == 4
+        perform_multi_quality_ela(image)
+    # ELA (4:2:0) tidak memakai entri 4:4:4 milik tahap JPEG
+    assert recompressor.stats()['misses'] - misses == len(ELA_QUALITIES)
+    recompressor.clear()
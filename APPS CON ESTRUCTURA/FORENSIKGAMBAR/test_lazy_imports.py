@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test untuk lazy import dan registry stage (startup cepat main.py)
+"""
+
+import os
+import sys
+import pickle
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lazy_imports import STAGE_FUNCTIONS, LazyModule, lazy_import, stage_function, stage_modules
+from import_benchmark import HEAVY_MODULES, heavy_modules_loaded
+
+
+def test_import_main_does_not_load_heavy_modules():
+    """`import main` hanya memuat stdlib, config dan lazy_imports"""
+    assert heavy_modules_loaded('import main') == []
+
+
+def test_help_does_not_load_heavy_modules():
+    """Parsing argumen (--help) selesai tanpa numpy/OpenCV/scipy"""
+    statement = "sys.argv = ['main.py', '--help']\ntry:\n    import runpy; runpy.run_path('main.py', run_name='__main__')\nexcept SystemExit:\n    pass"
+    assert heavy_modules_loaded(f"exec({statement!r})") == []
+
+
+def test_registry_points_to_existing_functions():
+    """Setiap nama di registry ada di modul yang terdaftar"""
+    for name, module_name in STAGE_FUNCTIONS.items():
+        assert hasattr(importlib.import_module(module_name), name), f"{module_name}.{name}"
+    assert 'export_utils' not in stage_modules()
+    assert 'export_utils' in stage_modules(include_export=True)
+
+
+def test_stage_function_resolves_and_pickles_as_real_function():
+    """Handle lazy dipanggil seperti fungsi asli dan di-pickle sebagai fungsi asli"""
+    handle = stage_function('profile_to_json')
+    assert stage_function('profile_to_json') is handle
+    real = importlib.import_module('stage_profiler').profile_to_json
+    assert handle.resolve() is real
+    assert pickle.loads(pickle.dumps(handle)) is real
+
+
+def test_lazy_module_imports_on_first_attribute():
+    """lazy_import mengembalikan proxy untuk modul yang belum dimuat"""
+    name = 'xml.dom.minidom'
+    sys.modules.pop(name, None)
+    proxy = lazy_import(name)
+    assert isinstance(proxy, LazyModule)
+    assert name not in sys.modules
+    assert proxy.parseString('<a/>').documentElement.tagName == 'a'
+    assert name in sys.modules
+    assert lazy_import('os') is os
+    assert 'numpy' in HEAVY_MODULES
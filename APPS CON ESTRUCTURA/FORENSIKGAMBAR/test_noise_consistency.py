@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test untuk analisis konsistensi noise per blok (advanced_analysis)
+"""
+
+import os
+import sys
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_analysis import analyze_noise_consistency, calculate_skewness, calculate_kurtosis
+
+
+def _reference_block(image_array, i, j, block_size):
+    """Fitur satu blok dihitung langsung, seperti implementasi per-blok yang lama"""
+    rgb_block = image_array[i*block_size:(i+1)*block_size, j*block_size:(j+1)*block_size]
+    lab_block = cv2.cvtColor(image_array, cv2.COLOR_RGB2LAB)[i*block_size:(i+1)*block_size, j*block_size:(j+1)*block_size]
+    gray_block = cv2.cvtColor(rgb_block, cv2.COLOR_RGB2GRAY)
+    magnitude = np.log(np.abs(np.fft.fftshift(np.fft.fft2(gray_block))) + 1)
+    q, tq = block_size // 4, 3 * block_size // 4
+    return {
+        'position': (i, j),
+        'laplacian_var': float(cv2.Laplacian(gray_block, cv2.CV_64F).var()),
+        'high_freq_energy': float(np.sum(magnitude[q:tq, q:tq])),
+        'rgb_std': np.std(rgb_block, axis=(0, 1)).tolist(),
+        'lab_std': np.std(lab_block, axis=(0, 1)).tolist(),
+        'mean_intensity': float(np.mean(gray_block)),
+        'std_intensity': float(np.std(gray_block)),
+        'skewness': float(calculate_skewness(gray_block.flatten())),
+        'kurtosis': float(calculate_kurtosis(gray_block.flatten())),
+    }
+
+
+def test_blocks_match_per_block_computation():
+    """Fitur blok hasil batch identik dengan perhitungan per blok"""
+    rng = np.random.default_rng(3)
+    image_array = rng.integers(0, 256, (100, 70, 3), dtype=np.uint8)
+    image_array[:40, :40] = 128  # blok seragam
+    result = analyze_noise_consistency(Image.fromarray(image_array), block_size=16)
+
+    blocks = result['noise_characteristics']
+    assert len(blocks) == (100 // 16) * (70 // 16)
+    for block in (blocks[0], blocks[5], blocks[-1]):
+        assert block == _reference_block(image_array, *block['position'], 16)
+    assert 0.0 < result['overall_inconsistency'] < 10.0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test untuk artifact store ekspor (setiap gambar dirender sekali, dipakai ulang oleh semua format)
+"""
+
+import io
+import os
+import sys
+import zipfile
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from report_artifacts import ArtifactStore, PROCESS_IMAGES, render_figure_png
+
+
+def _sample():
+    rng = np.random.RandomState(0)
+    original = Image.fromarray((rng.rand(64, 80, 3) * 255).astype(np.uint8))
+    results = {
+        'ela_image': Image.fromarray((rng.rand(64, 80) * 40).astype(np.uint8)),
+        'ela_mean': 8.0, 'ela_std': 3.0,
+        'metadata': {'Filename': 'sample.jpg'},
+        'classification': {'type': 'Asli/Original', 'confidence': 'Tinggi'},
+        'statistical_analysis': {'R_entropy': 7.1, 'G_entropy': 7.0, 'B_entropy': 6.9, 'overall_entropy': 7.0},
+    }
+    return original, results
+
+
+def test_figures_are_rendered_once():
+    """Gambar yang sudah ada di store tidak dirender ulang"""
+    original, results = _sample()
+    store = ArtifactStore(original, results, workers=1)
+    store.render(['original_image', 'statistical_analysis'])
+    png = store.png('statistical_analysis')
+    store.render(['statistical_analysis', 'original_image'])
+    assert store.renders == 2
+    assert store.png('statistical_analysis') is png
+    assert png.startswith(b'\x89PNG')
+    assert store.picture('original_image').read() == store.png('original_image')
+
+
+def test_missing_data_is_skipped(tmp_path):
+    """Gambar tanpa data (JPEG ghost, noise map) dilewati, bukan error"""
+    original, results = _sample()
+    store = ArtifactStore(original, results, workers=1)
+    assert store.png('jpeg_ghost') is None
+    assert store.png('noise_map') is None
+    keys = ['original_image', 'error_level_analysis', 'jpeg_ghost', 'noise_map']
+    store.render(keys)
+    store.artifacts.update({key: None for key in PROCESS_IMAGES if key not in keys})
+    written = store.write_process_images(str(tmp_path))
+    assert written == ['01_original_image.png', '02_error_level_analysis.png']
+    assert sorted(os.listdir(tmp_path)) == written
+
+
+def test_render_pool_matches_in_process_render():
+    """Render di process pool menghasilkan PNG yang sama dengan render di proses utama"""
+    original, results = _sample()
+    keys = ['statistical_analysis', 'metadata_table']
+    store = ArtifactStore(original, results, workers=2)
+    store.render(keys)
+    assert not store.errors
+    for key in keys:
+        expected = Image.open(io.BytesIO(render_figure_png(key, original, results)))
+        rendered = Image.open(io.BytesIO(store.artifacts[key]))
+        assert np.array_equal(np.array(expected), np.array(rendered))
+
+
+def test_package_contains_only_requested_formats(tmp_path):
+    """Paket ekspor hanya berisi format yang diminta"""
+    from export_utils import export_comprehensive_package
+    original, results = _sample()
+    export_files = export_comprehensive_package(original, results, str(tmp_path / 'sample'), formats=['pdf'])
+    with zipfile.ZipFile(export_files['complete_zip']) as package:
+        assert package.namelist() == ['sample_process_images.pdf']
+    assert 'png_visualization' not in export_files and 'html_index' not in export_files
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test untuk cache hasil tahap pipeline (result_cache)
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import result_cache
+from result_cache import ResultCache, FileStageCache, MMAP_MIN_BYTES, STAGE_DEPENDENCIES, stage_version
+
+
+def test_round_trip_preserves_types(tmp_path):
+    """Nilai yang dibaca ulang sama persis, termasuk tipe numpy dan tuple"""
+    cache = ResultCache(str(tmp_path))
+    value = {
+        'map': np.arange(12, dtype=np.float32).reshape(3, 4),
+        'big': np.ones(MMAP_MIN_BYTES // 8 + 1, dtype=np.float64),
+        'image': Image.new('L', (8, 6), 7),
+        'keypoints': [cv2.KeyPoint(1.5, 2.5, 3.0, 45.0, 0.1, 2, 1)],
+        'matches': [cv2.DMatch(1, 2, 0, 0.5)],
+        'pair': (1, 'a'),
+        'score': np.float64(0.25),
+        'flag': np.bool_(True),
+        'by_quality': {70: 1.0, 90: 2.0},
+    }
+    assert cache.store('ab' * 32, value)
+    hit, loaded = cache.load('ab' * 32)
+
+    assert hit
+    np.testing.assert_array_equal(loaded['map'], value['map'])
+    assert loaded['map'].dtype == np.float32
+    np.testing.assert_array_equal(loaded['big'], value['big'])
+    assert loaded['image'].mode == 'L' and loaded['image'].size == (8, 6)
+    assert loaded['keypoints'][0].pt == (1.5, 2.5) and loaded['keypoints'][0].octave == 2
+    assert loaded['matches'][0].trainIdx == 2
+    assert loaded['pair'] == (1, 'a')
+    assert type(loaded['score']) is np.float64 and type(loaded['flag']) is np.bool_
+    assert loaded['by_quality'] == {70: 1.0, 90: 2.0}
+    assert cache.load('cd' * 32) == (False, None)
+
+
+def test_long_lists_stored_as_arrays_round_trip(tmp_path):
+    """List angka panjang dan list dict berkunci sama disimpan sebagai array, dibaca ulang sebagai list"""
+    cache = ResultCache(str(tmp_path))
+    value = {
+        'heatmap': [[float(x * y) for x in range(80)] for y in range(70)],
+        'counts': list(range(100)),
+        'scores': [np.float64(i) / 3 for i in range(100)],
+        'mixed': [1] * 50 + [1.5] * 50,
+        'blocks': [{'x': i, 'score': i / 7, 'bbox': (i, i + 1)} for i in range(100)],
+    }
+    assert cache.store('cd' * 32, value)
+    _, loaded = cache.load('cd' * 32)
+
+    assert loaded == value
+    assert all(type(v) is float for v in loaded['heatmap'][3])
+    assert all(type(v) is np.float64 for v in loaded['scores'])
+    assert [type(v) for v in loaded['mixed']] == [type(v) for v in value['mixed']]
+    assert loaded['blocks'][5] == {'x': 5, 'score': 5 / 7, 'bbox': (5, 6)}
+    assert len(os.listdir(os.path.join(str(tmp_path), 'cd', 'cd' * 32))) > 3  # Array terpisah, bukan JSON
+
+
+def test_config_change_invalidates_downstream_only(tmp_path, monkeypatch):
+    """Mengubah ELA_QUALITIES membatalkan ELA dan tahap turunannya saja"""
+    cache = ResultCache(str(tmp_path))
+    first = FileStageCache(cache, 'f' * 64)
+    for stage in ('ela_analysis', 'feature_extraction', 'noise_analysis'):
+        first.store_stage(stage, stage)
+
+    monkeypatch.setattr(config, 'ELA_QUALITIES', [1, 2, 3])
+    second = FileStageCache(cache, 'f' * 64)
+    assert second.load_stage('ela_analysis') == (False, None)
+    assert second.load_stage('feature_extraction') == (False, None)
+    assert second.load_stage('noise_analysis') == (True, 'noise_analysis')
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    """Cache yang melebihi batas ukuran membuang entri yang paling lama tidak dipakai"""
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    payload = np.zeros(100_000, dtype=np.uint8)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for key in keys:
+        cache.store(key, payload)
+    now = time.time()
+    for age, key in zip((30, 10, 20), keys):
+        os.utime(os.path.join(cache._entry_dir(key), 'manifest.json'), (now - age, now - age))
+
+    cache.max_bytes = 250_000
+    cache.evict()
+
+    assert cache.stats()['entries'] == 2
+    assert cache.load(keys[0]) == (False, None)
+    assert cache.load(keys[1])[0] and cache.load(keys[2])[0]
+
+    # Menyimpan ulang entri yang sudah ada juga dihitung sebagai pemakaian
+    old = time.time() - 100
+    for key in keys[1:]:
+        os.utime(os.path.join(cache._entry_dir(key), 'manifest.json'), (old, old))
+    assert cache.store(keys[1], payload)
+    cache.max_bytes = 150_000
+    cache.evict()
+    assert cache.load(keys[1])[0] and cache.load(keys[2]) == (False, None)
+
+
+def test_stage_versions_follow_executed_code_only(tmp_path, monkeypatch):
+    """Edit main.py di luar wrapper tahap tidak membatalkan cache; wrapper dan modul yang diimpor ya"""
+    source = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'), encoding='utf-8').read()
+    monkeypatch.setattr(result_cache, '__file__', str(tmp_path / 'result_cache.py'))
+
+    def versions(main_source):
+        (tmp_path / 'main.py').write_text(main_source, encoding='utf-8')
+        result_cache._module_digest.cache_clear()
+        result_cache._function_digest.cache_clear()
+        return {stage: stage_version(stage) for stage in STAGE_DEPENDENCIES}
+
+    before = versions(source)
+    assert versions(source + '\n# komentar baru\n') == before
+    changed = versions(source.replace('def _noise_stage(plane, test_mode=False):',
+                                      'def _noise_stage(plane, test_mode=True):'))
+    assert [stage for stage in before if changed[stage] != before[stage]] == ['noise_analysis']
+    result_cache._module_digest.cache_clear()
+    result_cache._function_digest.cache_clear()
+
+    assert all('main.py' not in deps['modules'] for deps in STAGE_DEPENDENCIES.values())
+    assert 'utils.py' in STAGE_DEPENDENCIES['jpeg_analysis']['modules']
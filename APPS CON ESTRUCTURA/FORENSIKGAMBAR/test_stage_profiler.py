@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test untuk profil kinerja per tahap (stage_profiler)
+"""
+
+import os
+import sys
+import json
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stage_profiler import StageProfiler, describe_output, stage_succeeded, profile_to_json, profile_to_chrome_trace
+from stage_scheduler import PipelineStage, run_stage_graph
+
+
+def _busy(n):
+    return np.ones((n, n), dtype=np.float32).sum()
+
+
+def _fail(n):
+    raise RuntimeError("tahap gagal")
+
+
+def test_describe_output_sizes():
+    """Ukuran output dicatat untuk array, gambar, dan kontainer bersarang"""
+    array = np.zeros((4, 5), dtype=np.float32)
+    assert describe_output(array) == {'type': 'ndarray', 'shape': [4, 5], 'dtype': 'float32', 'nbytes': 80}
+    assert describe_output(Image.new('RGB', (10, 2)))['nbytes'] == 60
+    assert describe_output({'map': array, 'items': [array, 1.0]})['nbytes'] == 160
+    assert stage_succeeded({'success': False}) is False and stage_succeeded(True) is True
+
+
+def test_profiler_records_and_exports(tmp_path):
+    """Setiap tahap memiliki waktu wall/CPU dan dapat diekspor sebagai JSON dan Chrome trace"""
+    profiler = StageProfiler(trace_memory=True)
+    stage_details = {}
+    profiler.start('first')
+    _busy(256)
+    stage_details['first'] = profiler.finish('first', True, {'map': np.zeros((8, 8))})
+    profiler.start('second')
+    stage_details['second'] = profiler.finish('second', False, error=RuntimeError('rusak'))
+
+    values = {'n': 64}
+    outcomes = run_stage_graph([PipelineStage('pooled', _busy, inputs=('n',)),
+                                PipelineStage('broken', _fail, inputs=('n',), fallback=lambda: 0)],
+                               values, max_workers=2)
+    for name, outcome in outcomes.items():
+        stage_details[name] = profiler.add_outcome(name, outcome, {name: values[name]})
+    pipeline_status = {'stage_details': stage_details, 'profile': profiler.summary()}
+
+    assert stage_details['first']['success'] and stage_details['first']['output_bytes'] == 512
+    assert stage_details['first']['wall_time'] >= 0 and 'peak_alloc_mb' in stage_details['first']
+    assert stage_details['second']['error'] == 'rusak'
+    assert stage_details['pooled']['success'] and stage_details['pooled']['cpu_time'] >= 0
+    assert outcomes['pooled']['profile']['pid'] == stage_details['pooled']['pid']
+    assert not stage_details['broken']['success'] and 'tahap gagal' in stage_details['broken']['error']
+
+    profile = json.load(open(profile_to_json(pipeline_status, str(tmp_path / 'profile.json'))))
+    assert set(profile['stages']) == {'first', 'second', 'pooled', 'broken'}
+    trace = json.load(open(profile_to_chrome_trace(pipeline_status, str(tmp_path / 'trace.json'))))
+    events = {event['name']: event for event in trace['traceEvents']}
+    assert set(events) == set(profile['stages'])
+    assert all(event['ph'] == 'X' and event['ts'] >= 0 and event['dur'] >= 0 for event in events.values())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test untuk penjadwal tahap pipeline (stage_scheduler)
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stage_scheduler
+from stage_scheduler import PipelineStage, run_stage_graph, shutdown_stage_pool
+
+
+def _double(x):
+    return 2 * x
+
+
+def _split(x):
+    return x - 1, x + 1
+
+
+def _fail(x):
+    raise RuntimeError("stage rusak")
+
+
+def _slow_double(x):
+    time.sleep(0.5)
+    return 2 * x
+
+
+def _die_in_worker(parent_pid):
+    """Mematikan proses worker (seperti OOM); aman bila dijalankan ulang di proses utama"""
+    if os.getpid() != parent_pid:
+        os._exit(1)
+    return 'selamat'
+
+
+def _stages():
+    return [
+        # Sengaja dideklarasikan sebelum tahap yang menghasilkan input-nya
+        PipelineStage('sum', sum, inputs=('pair',), outputs=('total',)),
+        PipelineStage('pair', lambda x: x, inputs=('below_above',), outputs=('pair',)),
+        PipelineStage('double', _double, inputs=('x',), outputs=('doubled',)),
+        PipelineStage('split', _split, inputs=('x',), outputs=('below', 'above')),
+        PipelineStage('broken', _fail, inputs=('x',), outputs=('broken_value',), fallback=lambda: -1),
+    ]
+
+
+def test_inline_run_follows_dependencies_and_fallbacks():
+    """Tahap dijalankan sesuai dependensi; tahap gagal memakai nilai fallback"""
+    values = {'x': 5, 'below_above': (4, 6)}
+    outcomes = run_stage_graph(_stages(), values, max_workers=1)
+
+    assert values['doubled'] == 10
+    assert (values['below'], values['above']) == (4, 6)
+    assert values['total'] == 10
+    assert values['broken_value'] == -1
+    assert outcomes['broken']['success'] is False
+    assert 'stage rusak' in outcomes['broken']['error']
+    assert all(outcomes[name]['success'] for name in ('sum', 'pair', 'double', 'split'))
+
+
+def test_process_pool_matches_inline():
+    """Eksekusi paralel di process pool memberi nilai yang sama dengan eksekusi inline"""
+    stages = [
+        PipelineStage('double', _double, inputs=('x',), outputs=('doubled',)),
+        PipelineStage('split', _split, inputs=('x',), outputs=('below', 'above')),
+        PipelineStage('broken', _fail, inputs=('x',), outputs=('broken_value',), fallback=lambda: -1),
+        PipelineStage('chained', _double, inputs=('doubled',), outputs=('quadrupled',)),
+    ]
+    values = {'x': 7}
+    outcomes = run_stage_graph(stages, values, max_workers=2)
+
+    assert values['doubled'] == 14 and values['quadrupled'] == 28
+    assert (values['below'], values['above']) == (6, 8)
+    assert values['broken_value'] == -1 and not outcomes['broken']['success']
+
+
+def test_lost_worker_rebuilds_pool_once(monkeypatch):
+    """Worker mati: semua tahap di pool itu diulang in-process, pool baru tidak ikut dimatikan"""
+    stages = [PipelineStage(f'slow_{i}', _slow_double, inputs=('x',), outputs=(f'slow_{i}',)) for i in range(3)]
+    stages += [
+        PipelineStage('killer', _die_in_worker, inputs=('pid',), outputs=('survivor',)),
+        PipelineStage('after_killer', len, inputs=('survivor',), outputs=('survivor_length',)),
+        PipelineStage('after_0', _double, inputs=('slow_0',), outputs=('after_0',)),
+        PipelineStage('after_1', _slow_double, inputs=('slow_1',), outputs=('after_1',)),
+    ]
+    created = []
+
+    class _CountingPool(stage_scheduler.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+    monkeypatch.setattr(stage_scheduler, 'ProcessPoolExecutor', _CountingPool)
+    shutdown_stage_pool()
+
+    values = {'x': 3, 'pid': os.getpid()}
+    outcomes = run_stage_graph(stages, values, max_workers=4)
+
+    assert all(outcome['success'] for outcome in outcomes.values()), outcomes
+    assert values['survivor'] == 'selamat' and values['survivor_length'] == 7
+    assert [values[f'slow_{i}'] for i in range(3)] == [6, 6, 6]
+    assert values['after_0'] == 12 and values['after_1'] == 12
+    assert len(created) == 2  # pool awal + satu pengganti, walau beberapa future rusak sekaligus
+    # Pool pengganti tetap bisa dipakai
+    stages = [PipelineStage('double', _double, inputs=('x',), outputs=('d',)),
+              PipelineStage('split', _split, inputs=('x',), outputs=('b', 'a'))]
+    assert all(outcome['success'] for outcome in run_stage_graph(stages, values, max_workers=2).values())
+    shutdown_stage_pool()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test untuk analisis tiled resolusi penuh (tiled_analysis)
+"""
+
+import os
+import sys
+import numpy as np
+from PIL import Image, ImageFile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tiled_analysis import analyze_tiled, iter_tiles, tile_size_for_budget, load_full_resolution
+from advanced_analysis import analyze_noise_consistency
+
+
+def _make_image(path, width=448, height=320):
+    rng = np.random.default_rng(3)
+    yy, xx = np.mgrid[0:height, 0:width]
+    base = np.stack([xx * 0.4, yy * 0.6, (xx + yy) * 0.2], axis=2)
+    pixels = np.clip(base + rng.normal(0, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    pixels[100:180, 200:300] = np.clip(pixels[100:180, 200:300] + rng.normal(0, 30, (80, 100, 3)), 0, 255)
+    Image.fromarray(pixels).save(path, quality=88)
+    return path
+
+
+def test_tiles_partition_image():
+    """Core tile menutupi gambar tepat sekali dan sejajar dengan grid 32 piksel"""
+    coverage = np.zeros((330, 450), dtype=int)
+    for (y0, y1, x0, x1), (ry0, ry1, rx0, rx1) in iter_tiles(330, 450, 100, overlap=20):
+        assert y0 % 32 == 0 and x0 % 32 == 0
+        assert ry0 <= y0 and ry1 >= y1 and rx0 <= x0 and rx1 >= x1
+        coverage[y0:y1, x0:x1] += 1
+    assert (coverage == 1).all()
+    assert tile_size_for_budget(64, baseline_mb=64) == 256
+    assert tile_size_for_budget(10 ** 6, baseline_mb=0) == 8192
+
+
+def test_tiled_maps_match_single_tile(tmp_path):
+    """Peta hasil tile kecil identik dengan satu tile penuh, skor noise sama dengan analisis biasa"""
+    path = _make_image(str(tmp_path / 'large.jpg'))
+    tiled = analyze_tiled(path, str(tmp_path / 'small_tiles'), tile_size=128)
+    whole = analyze_tiled(path, str(tmp_path / 'one_tile'), tile_size=1024)
+
+    assert tiled['tiles'] == 12 and whole['tiles'] == 1
+    for name, stitched in tiled['maps'].items():
+        assert isinstance(stitched, np.memmap)
+        np.testing.assert_array_equal(stitched, whole['maps'][name])
+    assert tiled['maps']['ela'].shape == (320, 448)
+    assert tiled['maps']['blocking'].shape == (40, 56)
+
+    noise = analyze_noise_consistency(Image.open(path).convert('RGB'))
+    for key, value in tiled['noise_consistency'].items():
+        assert value == noise[key]
+
+
+def test_uncompressed_rasters_load_in_strips(tmp_path, monkeypatch, capsys):
+    """TIFF/BMP tanpa kompresi disalin per strip tanpa decode penuh; format terkompresi diberi peringatan budget"""
+    pixels = np.random.default_rng(5).integers(0, 256, (150, 101, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(str(tmp_path / 'strips.tif'), tiffinfo={278: 16})
+    Image.fromarray(pixels).save(str(tmp_path / 'bottom_up.bmp'))
+    Image.fromarray(pixels).save(str(tmp_path / 'compressed.png'))
+
+    def _no_decode(self):
+        raise AssertionError('gambar tanpa kompresi tidak boleh di-decode penuh')
+    with monkeypatch.context() as patch:
+        patch.setattr(ImageFile.ImageFile, 'load', _no_decode)
+        for name in ('strips.tif', 'bottom_up.bmp'):
+            loaded = load_full_resolution(str(tmp_path / name), str(tmp_path), strip_rows=7)
+            np.testing.assert_array_equal(loaded, pixels)
+
+    loaded = load_full_resolution(str(tmp_path / 'compressed.png'), str(tmp_path), strip_rows=7, memory_budget_mb=1)
+    np.testing.assert_array_equal(loaded, pixels)
+    assert 'budget' in capsys.readouterr().out
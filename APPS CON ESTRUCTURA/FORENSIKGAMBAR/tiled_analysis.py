@@ -0,0 +1,341 @@
+"""
+Tiled full-resolution analysis for very large images
+
+The regular pipeline downsizes images to TARGET_MAX_DIM. For 40-100 MP camera
+originals this mode additionally streams the original, at full resolution, in
+fixed-size overlapping tiles through the per-pixel stages:
+
+- ELA: raw error level per JPEG quality, averaged over ELA_QUALITIES
+- JPEG ghost: running minimum response / best quality / response variance
+  (streaming reducers instead of an (h, w, n_qualities) cube)
+- Noise: the per-block features of analyze_noise_consistency
+- Block DCT: the per-block blocking score of analyze_jpeg_blocks
+
+Tiles are aligned to 32 pixels (JPEG MCU, DCT and noise block grids), so every
+block of a tile core is exactly the block of the full image. Stitched maps are
+written to ``.npy`` files opened as ``np.memmap``, and the tile size is derived
+from a memory budget so the peak RSS stays bounded.
+
+Limit: the budget covers the tiles, not the initial decode. Uncompressed RGB,
+BGR and grayscale rasters (plain TIFF strips, BMP, PPM) are copied from the file
+in strips, but PIL decodes JPEG, PNG, WebP and compressed TIFF as one block, so
+those need their full decoded size (width × height × bands) once while loading.
+A warning is printed when that alone exceeds the budget.
+"""
+
+import io
+import os
+import time
+
+import numpy as np
+import cv2
+from PIL import Image, ImageChops
+
+from config import (ELA_QUALITIES, ELA_SCALE_FACTOR, RECOMPRESSION_SUBSAMPLING, TILE_SIZE, TILE_OVERLAP,
+                    TILED_MEMORY_BUDGET_MB)
+from jpeg_recompression import encode_jpeg_bytes
+from block_dct import BlockDCT
+from advanced_analysis import noise_block_features, noise_consistency_scores
+from stage_profiler import current_rss_mb, peak_rss_mb
+
+TILE_ALIGN = 32
+NOISE_BLOCK = 32
+DCT_BLOCK = 8
+GHOST_QUALITIES = tuple(range(50, 101, 5))
+MIN_TILE_SIZE = 256
+MAX_TILE_SIZE = 8192
+# Rough working set per pixel of a padded tile (RGB copies, float diffs, reducers, JPEG buffers)
+BYTES_PER_TILE_PIXEL = 160
+# Uncompressed raw layouts copied straight from the file: rawmode -> (bytes per pixel, to RGB)
+_RAW_LAYOUTS = {
+    'RGB': (3, lambda rows: rows),
+    'BGR': (3, lambda rows: rows[..., ::-1]),
+    'L': (1, lambda rows: np.repeat(rows, 3, axis=2)),
+}
+
+
+def tile_size_for_budget(memory_budget_mb, overlap=TILE_OVERLAP, baseline_mb=None):
+    """Largest 32-aligned tile side whose padded working set fits in the budget left above ``baseline_mb``."""
+    if baseline_mb is None:
+        baseline_mb = current_rss_mb()
+    available = max(0.0, memory_budget_mb - baseline_mb) * 1024 * 1024
+    side = int(np.sqrt(available / BYTES_PER_TILE_PIXEL)) - 2 * overlap
+    side = side // TILE_ALIGN * TILE_ALIGN
+    return int(min(MAX_TILE_SIZE, max(MIN_TILE_SIZE, side)))
+
+
+def iter_tiles(height, width, tile_size, overlap=TILE_OVERLAP):
+    """
+    Yield ``(core, region)`` boxes ``(y0, y1, x0, x1)`` covering the image.
+
+    Cores partition the image and start on multiples of 32; regions add ``overlap``
+    pixels of context on every side (clipped to the image).
+    """
+    tile_size = max(TILE_ALIGN, tile_size // TILE_ALIGN * TILE_ALIGN)
+    overlap = -(-overlap // TILE_ALIGN) * TILE_ALIGN
+    for y0 in range(0, height, tile_size):
+        y1 = min(height, y0 + tile_size)
+        for x0 in range(0, width, tile_size):
+            x1 = min(width, x0 + tile_size)
+            region = (max(0, y0 - overlap), min(height, y1 + overlap),
+                      max(0, x0 - overlap), min(width, x1 + overlap))
+            yield (y0, y1, x0, x1), region
+
+
+def open_map(work_dir, name, shape, dtype, fill=None):
+    """Create a ``.npy`` file in ``work_dir`` and return it as a writable memmap."""
+    stitched = np.lib.format.open_memmap(os.path.join(work_dir, f"{name}.npy"), mode='w+', dtype=dtype, shape=shape)
+    if fill is not None:
+        stitched[:] = fill
+    return stitched
+
+
+def _raw_strips(image):
+    """``(box, offset, stride, orientation, layout)`` of every tile when the file is an uncompressed raster, else None."""
+    strips = []
+    for tile in image.tile:
+        codec, box, offset, args = tile[:4]
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if codec != 'raw' or rawmode not in _RAW_LAYOUTS or image.mode not in ('RGB', 'L') or orientation not in (1, -1):
+            return None
+        layout = _RAW_LAYOUTS[rawmode]
+        strips.append((box, offset, stride or (box[2] - box[0]) * layout[0], orientation, layout))
+    return strips or None
+
+
+def _copy_raw_strips(image_path, strips, pixels, strip_rows):
+    """Copy uncompressed raster rows from the file into ``pixels`` without decoding the whole image."""
+    for (x0, y0, x1, y1), offset, stride, orientation, (bands, to_rgb) in strips:
+        rows = np.memmap(image_path, dtype=np.uint8, mode='r', offset=offset, shape=(y1 - y0, stride))
+        for y in range(y0, y1, strip_rows):
+            y_end = min(y1, y + strip_rows)
+            if orientation == 1:
+                strip = rows[y - y0:y_end - y0]
+            else:
+                # Bottom-up raster (BMP): image row y is file row (height - 1 - y)
+                strip = rows[y1 - y_end:y1 - y][::-1]
+            strip = strip[:, :(x1 - x0) * bands].reshape(y_end - y, x1 - x0, bands)
+            pixels[y:y_end, x0:x1] = to_rgb(strip)
+        del rows
+
+
+def load_full_resolution(image_path, work_dir, strip_rows=512, memory_budget_mb=TILED_MEMORY_BUDGET_MB):
+    """
+    Load the image into an RGB uint8 memmap, returned read-only.
+
+    Uncompressed rasters are copied from the file in strips; other formats are
+    decoded once in their own mode and converted to RGB strip by strip, so no
+    second full-size copy is made. See the module docstring for the limit.
+    """
+    path = os.path.join(work_dir, 'image.npy')
+    with Image.open(image_path) as image:
+        width, height = image.size
+        pixels = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+        strips = _raw_strips(image)
+        if strips is not None:
+            _copy_raw_strips(image_path, strips, pixels, strip_rows)
+        else:
+            decoded_mb = width * height * len(image.getbands()) / (1024 * 1024)
+            if current_rss_mb() + decoded_mb > memory_budget_mb:
+                print(f"  ⚠️ {image.format or 'Image'} is decoded as a whole ({decoded_mb:.0f} MB), "
+                      f"over the {memory_budget_mb} MB budget")
+            image.load()
+            for y in range(0, height, strip_rows):
+                strip = image.crop((0, y, width, min(height, y + strip_rows)))
+                pixels[y:y + strip_rows] = np.asarray(strip if strip.mode == 'RGB' else strip.convert('RGB'))
+        pixels.flush()
+        del pixels
+    return np.load(path, mmap_mode='r')
+
+
+def _jpeg_roundtrip(image_pil, quality, subsampling=None):
+    with Image.open(io.BytesIO(encode_jpeg_bytes(image_pil, quality, subsampling))) as decoded:
+        return np.asarray(decoded.convert('RGB'))
+
+
+class _RunningStats:
+    """Streaming count/sum/sum of squares/max, combined tile by tile."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.maximum = 0.0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.total += float(values.sum())
+        self.total_sq += float(np.square(values).sum())
+        self.maximum = max(self.maximum, float(values.max()))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        if not self.count:
+            return 0.0
+        return float(np.sqrt(max(0.0, self.total_sq / self.count - self.mean ** 2)))
+
+
+def analyze_tiled(image_path, work_dir, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                  memory_budget_mb=TILED_MEMORY_BUDGET_MB, ela_qualities=ELA_QUALITIES,
+                  ghost_qualities=GHOST_QUALITIES):
+    """
+    Full-resolution tiled ELA / JPEG ghost / noise / block DCT analysis of ``image_path``.
+
+    Args:
+        image_path: Image file, analyzed at its original resolution
+        work_dir: Folder for the decoded image and the stitched ``.npy`` maps
+        tile_size: Tile side in pixels (None = derived from ``memory_budget_mb``)
+        overlap: Context pixels around each tile core (rounded up to a multiple of 32)
+        memory_budget_mb: Peak RSS budget used to size the tiles
+
+    Returns:
+        Dict with read-only memmap maps, global statistics and tiling/memory information
+    """
+    started = time.time()
+    os.makedirs(work_dir, exist_ok=True)
+    pixels = load_full_resolution(image_path, work_dir, memory_budget_mb=memory_budget_mb)
+    h, w = pixels.shape[:2]
+    if tile_size is None:
+        tile_size = tile_size_for_budget(memory_budget_mb, overlap)
+    tiles = list(iter_tiles(h, w, tile_size, overlap))
+    print(f"  🧩 Tiled analysis: {w} × {h} in {len(tiles)} tiles of {tile_size}px "
+          f"(overlap {overlap}px, budget {memory_budget_mb} MB)")
+
+    ela_qualities = list(ela_qualities)
+    ghost_qualities = list(ghost_qualities)
+    maps = {
+        'ela': open_map(work_dir, 'ela', (h, w), np.uint8),
+        'ghost_min_response': open_map(work_dir, 'ghost_min_response', (h, w), np.float32),
+        'ghost_best_quality': open_map(work_dir, 'ghost_best_quality', (h, w), np.uint8),
+        'ghost_response_variance': open_map(work_dir, 'ghost_response_variance', (h, w), np.float32),
+        'noise_laplacian_var': open_map(work_dir, 'noise_laplacian_var', (h // NOISE_BLOCK, w // NOISE_BLOCK), np.float64),
+        'blocking': open_map(work_dir, 'blocking', (h // DCT_BLOCK, w // DCT_BLOCK), np.float32),
+    }
+    noise_high_freq = np.zeros((h // NOISE_BLOCK, w // NOISE_BLOCK))
+    noise_std_intensity = np.zeros((h // NOISE_BLOCK, w // NOISE_BLOCK))
+
+    ela_quality_stats = {q: _RunningStats() for q in ela_qualities}
+    ela_final_stats = _RunningStats()
+    ghost_quality_stats = {q: _RunningStats() for q in ghost_qualities}
+    high_freq_stats, quantization_stats, blocking_stats = _RunningStats(), _RunningStats(), _RunningStats()
+
+    for index, ((y0, y1, x0, x1), (ry0, ry1, rx0, rx1)) in enumerate(tiles, 1):
+        region = np.array(pixels[ry0:ry1, rx0:rx1])
+        region_pil = Image.fromarray(region)
+        core = (slice(y0 - ry0, y1 - ry0), slice(x0 - rx0, x1 - rx0))
+
+        # ELA: selisih luminans terhadap kompresi ulang, rata-rata semua kualitas
+        ela_sum = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+        for quality in ela_qualities:
+            compressed = Image.fromarray(_jpeg_roundtrip(region_pil, quality))
+            ela = np.asarray(ImageChops.difference(region_pil, compressed).convert('L'))[core]
+            ela_quality_stats[quality].add(ela)
+            ela_sum += ela
+        ela_tile = np.clip(ela_sum / len(ela_qualities) * ELA_SCALE_FACTOR, 0, 255).astype(np.uint8)
+        maps['ela'][y0:y1, x0:x1] = ela_tile
+        ela_final_stats.add(ela_tile)
+
+        # JPEG ghost: streaming minimum / best quality / variance over the qualities
+        original_core = region[core].astype(np.float32)
+        min_response = np.full(ela_sum.shape, np.inf, dtype=np.float32)
+        best_quality = np.zeros(ela_sum.shape, dtype=np.uint8)
+        response_sum = np.zeros(ela_sum.shape, dtype=np.float64)
+        response_sq = np.zeros(ela_sum.shape, dtype=np.float64)
+        for quality in ghost_qualities:
+            compressed = _jpeg_roundtrip(region_pil, quality, subsampling=RECOMPRESSION_SUBSAMPLING)[core]
+            channel_diffs = np.abs(original_core - compressed)
+            response = (0.299 * channel_diffs[:, :, 0] + 0.587 * channel_diffs[:, :, 1] +
+                        0.114 * channel_diffs[:, :, 2])
+            ghost_quality_stats[quality].add(response)
+            mask = response < min_response
+            min_response[mask] = response[mask]
+            best_quality[mask] = quality
+            response_sum += response
+            response_sq += np.square(response, dtype=np.float64)
+        mean_response = response_sum / len(ghost_qualities)
+        maps['ghost_min_response'][y0:y1, x0:x1] = min_response
+        maps['ghost_best_quality'][y0:y1, x0:x1] = best_quality
+        maps['ghost_response_variance'][y0:y1, x0:x1] = np.maximum(
+            response_sq / len(ghost_qualities) - mean_response ** 2, 0)
+
+        # Noise: blok 32x32 di dalam core identik dengan blok gambar penuh
+        core_rgb = np.ascontiguousarray(region[core])
+        bh0, bw0 = y0 // NOISE_BLOCK, x0 // NOISE_BLOCK
+        blocks_h, blocks_w = (y1 - y0) // NOISE_BLOCK, (x1 - x0) // NOISE_BLOCK
+        if blocks_h and blocks_w:
+            features = noise_block_features(core_rgb, cv2.cvtColor(core_rgb, cv2.COLOR_RGB2LAB),
+                                            cv2.cvtColor(core_rgb, cv2.COLOR_RGB2GRAY),
+                                            blocks_h, blocks_w, NOISE_BLOCK, NOISE_BLOCK)
+            grid = (slice(bh0, bh0 + blocks_h), slice(bw0, bw0 + blocks_w))
+            maps['noise_laplacian_var'][grid] = features['laplacian_var'].reshape(blocks_h, blocks_w)
+            noise_high_freq[grid] = features['high_freq_energy'].reshape(blocks_h, blocks_w)
+            noise_std_intensity[grid] = features['std_intensity'].reshape(blocks_h, blocks_w)
+
+        # Block DCT over the region, so the top/left boundary steps of core blocks see their neighbours
+        block_dct = BlockDCT(cv2.cvtColor(region, cv2.COLOR_RGB2GRAY), DCT_BLOCK)
+        by, bx = (y0 - ry0) // DCT_BLOCK, (x0 - rx0) // DCT_BLOCK
+        core_blocks = (slice(by, by + (y1 - y0) // DCT_BLOCK), slice(bx, bx + (x1 - x0) // DCT_BLOCK))
+        grid_shape = (block_dct.blocks_h, block_dct.blocks_w)
+        high_freq = block_dct.band_energy(slice(4, None), slice(4, None)).reshape(grid_shape)[core_blocks]
+        quantization = block_dct.quantization_noise().reshape(grid_shape)[core_blocks]
+        boundary = block_dct.boundary_artifacts().reshape(grid_shape)[core_blocks]
+        blocking = (high_freq + quantization + boundary) / 3
+        maps['blocking'][y0 // DCT_BLOCK:y0 // DCT_BLOCK + blocking.shape[0],
+                         x0 // DCT_BLOCK:x0 // DCT_BLOCK + blocking.shape[1]] = blocking
+        high_freq_stats.add(high_freq)
+        quantization_stats.add(quantization)
+        blocking_stats.add(blocking)
+
+        if index % max(1, len(tiles) // 10) == 0 or index == len(tiles):
+            print(f"    Tile {index}/{len(tiles)} done (RSS {current_rss_mb():.0f} MB)")
+
+    for stitched in maps.values():
+        stitched.flush()
+
+    laplacian_consistency, freq_consistency, intensity_consistency, overall_inconsistency = noise_consistency_scores(
+        maps['noise_laplacian_var'].ravel().tolist(), noise_high_freq.ravel().tolist(), noise_std_intensity.ravel().tolist())
+    noise_consistency = {
+        'laplacian_consistency': float(laplacian_consistency),
+        'frequency_consistency': float(freq_consistency),
+        'intensity_consistency': float(intensity_consistency),
+        'overall_inconsistency': float(overall_inconsistency),
+    }
+    noise_consistency = {k: (v if np.isfinite(v) else 0.0) for k, v in noise_consistency.items()}
+
+    best_counts = np.bincount(np.asarray(maps['ghost_best_quality']).ravel(), minlength=256)
+    total_pixels = max(1, h * w)
+    peak = peak_rss_mb()
+    print(f"  🧩 Tiled analysis completed in {time.time() - started:.1f}s (peak RSS {peak:.0f} MB)")
+
+    return {
+        'shape': (h, w),
+        'tile_size': tile_size,
+        'overlap': overlap,
+        'tiles': len(tiles),
+        'work_dir': work_dir,
+        # Peta hasil gabungan, dibuka ulang read-only dari file .npy
+        'maps': {name: np.load(os.path.join(work_dir, f"{name}.npy"), mmap_mode='r') for name in maps},
+        'ela_mean': ela_final_stats.mean,
+        'ela_std': ela_final_stats.std,
+        'ela_quality_stats': [{'quality': q, 'mean': s.mean, 'stddev': s.std, 'max': s.maximum}
+                              for q, s in ela_quality_stats.items()],
+        'ghost_quality_response': {q: s.mean for q, s in ghost_quality_stats.items()},
+        'ghost_best_quality_distribution': {q: float(best_counts[q]) / total_pixels for q in ghost_qualities},
+        'noise_consistency': noise_consistency,
+        'blocking_stats': {
+            'mean_blocking_score': blocking_stats.mean,
+            'blocking_std': blocking_stats.std,
+            'high_freq_consistency': high_freq_stats.std / (high_freq_stats.mean + 1e-6),
+            'quantization_consistency': quantization_stats.std / (quantization_stats.mean + 1e-6),
+        },
+        'memory_budget_mb': memory_budget_mb,
+        'peak_rss_mb': peak,
+        'elapsed': time.time() - started,
+    }
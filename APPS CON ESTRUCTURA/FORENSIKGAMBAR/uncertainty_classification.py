@@ -10,6 +10,19 @@ from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+# Asesmen utama; indeks = kode yang dikembalikan oleh assessment_batch
+PRIMARY_ASSESSMENTS = (
+    "Indikasi: Hasil Ambigu (membutuhkan pemeriksaan lebih lanjut)",
+    "Indikasi: Gambar Asli/Autentik",
+    "Indikasi: Manipulasi Copy-Move Terdeteksi",
+    "Indikasi: Manipulasi Splicing Terdeteksi",
+    "Indikasi: Manipulasi Kompleks Terdeteksi (Copy-Move & Splicing)",
+    "Indikasi: Kecenderungan Manipulasi Copy-Move",
+    "Indikasi: Kecenderungan Manipulasi Splicing",
+    "Indikasi: Tidak Terdeteksi Manipulasi Signifikan",
+)
+RELIABILITY_LEVELS = ("Rendah", "Sedang", "Tinggi")
+
 class UncertaintyClassifier:
     """
     Klasifikasi dengan model ketidakpastian yang mempertimbangkan:
@@ -403,7 +416,7 @@ class UncertaintyClassifier:
         
         # PERBAIKAN: Turunkan threshold untuk hasil ambigu agar lebih realistis
         if max_prob_value < 0.35: # Diturunkan dari 0.4 ke 0.35
-            return "Indikasi: Hasil Ambigu (membutuhkan pemeriksaan lebih lanjut)"
+            return PRIMARY_ASSESSMENTS[0]
             
         # Tentukan jenis manipulasi atau keaslian
         is_authentic = (authentic_prob == max_prob_value) and (authentic_prob > copy_move_prob * 1.1 and authentic_prob > splicing_prob * 1.1)
@@ -411,23 +424,23 @@ class UncertaintyClassifier:
         is_splicing = (splicing_prob == max_prob_value) and (splicing_prob > authentic_prob * 1.1 and splicing_prob > copy_move_prob * 1.1)
 
         if is_authentic:
-            return "Indikasi: Gambar Asli/Autentik"
+            return PRIMARY_ASSESSMENTS[1]
         elif is_copy_move:
-            return "Indikasi: Manipulasi Copy-Move Terdeteksi"
+            return PRIMARY_ASSESSMENTS[2]
         elif is_splicing:
-            return "Indikasi: Manipulasi Splicing Terdeteksi"
+            return PRIMARY_ASSESSMENTS[3]
         
         # Handle kasus kompleks (probabilitas tinggi untuk CM dan Splicing)
         if copy_move_prob > 0.35 and splicing_prob > 0.35:
-            return "Indikasi: Manipulasi Kompleks Terdeteksi (Copy-Move & Splicing)"
+            return PRIMARY_ASSESSMENTS[4]
         
         # Fallback untuk kasus yang tidak jelas
         if copy_move_prob > splicing_prob and copy_move_prob > authentic_prob:
-             return "Indikasi: Kecenderungan Manipulasi Copy-Move"
+             return PRIMARY_ASSESSMENTS[5]
         if splicing_prob > copy_move_prob and splicing_prob > authentic_prob:
-             return "Indikasi: Kecenderungan Manipulasi Splicing"
+             return PRIMARY_ASSESSMENTS[6]
              
-        return "Indikasi: Tidak Terdeteksi Manipulasi Signifikan"
+        return PRIMARY_ASSESSMENTS[7]
 
     def _determine_assessment_reliability(self, probabilities: Dict) -> str:
         """Menentukan tingkat reliabilitas asesmen utama dengan 3 kategori."""
@@ -444,11 +457,11 @@ class UncertaintyClassifier:
 
         # Only 3 categories: Rendah, Sedang, Tinggi
         if reliability_score >= self.confidence_thresholds['high']:
-            return "Tinggi"
+            return RELIABILITY_LEVELS[2]
         elif reliability_score >= self.confidence_thresholds['medium']:
-            return "Sedang"
+            return RELIABILITY_LEVELS[1]
         else:
-            return "Rendah"
+            return RELIABILITY_LEVELS[0]
     
     def _assess_indicator_coherence(self, uncertainty_level: float) -> str:
         """Menilai koherensi (konsistensi) dari semua indikator forensik dengan 3 kategori."""
@@ -508,6 +521,168 @@ class UncertaintyClassifier:
         else:
             return ("Hasil analisis menunjukkan indikasi awal yang perlu dikonfirmasi lebih lanjut. Terdapat ketidakpastian yang cukup signifikan dalam deteksi. Sangat disarankan untuk melakukan validasi tambahan dan tidak mengandalkan hasil ini sebagai bukti tunggal.")
 
+    # ======================= Batch (kolom) =======================
+    # Versi vektor dari calculate_manipulation_probability dan asesmen utamanya untuk
+    # banyak gambar sekaligus (FeatureTable, lihat feature_table.py). Indikator, bobot
+    # dan urutan penjumlahan sama dengan versi per-gambar, jadi hasilnya identik.
+
+    @staticmethod
+    def _weighted_probability_batch(indicators, n):
+        """(probabilitas, jumlah indikator aktif) per baris dari list (mask, skor, bobot)."""
+        total_weight = np.zeros(n)
+        weighted_sum = np.zeros(n)
+        count = np.zeros(n, dtype=int)
+        for mask, score, weight in indicators:
+            total_weight = total_weight + np.where(mask, weight, 0.0)
+            weighted_sum = weighted_sum + np.where(mask, score * weight, 0.0)
+            count += mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            probability = np.where(total_weight > 0, weighted_sum / np.where(total_weight > 0, total_weight, 1.0), 0.1)
+        return probability, count
+
+    def calculate_manipulation_probability_batch(self, table) -> Dict:
+        """
+        calculate_manipulation_probability untuk setiap baris FeatureTable.
+        Mengembalikan dict berisi array (satu nilai per gambar).
+        """
+        n = len(table)
+        ransac = table.column('ransac_inliers', 0.0)
+        block_matches = table.column('block_matches', 0.0)
+        has_transform = table.column('geometric_transform', 0.0) > 0
+        sift_matches = table.column('sift_matches', 0.0)
+        ela_regional = table.column('ela_regional_inconsistency', 1.0)
+        tampering_pct = table.column('tampering_percentage', 0.0)
+        ela_mean = table.column('ela_mean', 0.0)
+        ela_std = table.column('ela_std', 0.0)
+        noise = table.column('noise_inconsistency', 0.0)
+        ghost = table.column('jpeg_ghost_ratio', 0.0)
+        freq = table.column('frequency_inconsistency', 0.0)
+        illum = table.column('illumination_inconsistency', 0.0)
+        edge = table.column('edge_inconsistency', 0.0)
+        metadata_issues = table.column('metadata_inconsistency_count', 0.0)
+        metadata_score = table.column('metadata_authenticity_score', 0.0)
+        correlations = [np.abs(table.column(name, 1.0)) for name in ('rg_correlation', 'rb_correlation', 'gb_correlation')]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cm_indicators = [
+                (ransac >= 5, np.minimum(np.sqrt(ransac) / np.sqrt(50), 1.0), 0.30),
+                (block_matches >= 3, np.minimum(block_matches / 30.0, 1.0), 0.25),
+                (has_transform, 1.0, 0.20),
+                (sift_matches > 20, np.minimum(sift_matches / 200.0, 1.0), 0.10),
+                (ela_regional < 0.25, 1.0 - ela_regional / 0.5, 0.10),
+                ((tampering_pct > 5.0) & (tampering_pct < 60.0), np.minimum(tampering_pct / 50.0, 1.0), 0.05),
+            ]
+            sp_indicators = [
+                ((ela_mean > 10) | (ela_std > 18), np.minimum(np.maximum(ela_mean / 25.0, ela_std / 35.0), 1.0), 0.25),
+                (noise > 0.2, np.minimum(noise / 0.6, 1.0), 0.20),
+                (ghost > 0.05, np.minimum(ghost / 0.3, 1.0), 0.20),
+                (freq > 0.8, np.minimum(freq / 2.0, 1.0), 0.10),
+                (illum > 0.2, np.minimum(illum / 0.5, 1.0), 0.15),
+                (edge > 0.2, np.minimum(edge / 0.5, 1.0), 0.05),
+                (metadata_issues > 0, np.minimum(metadata_issues / 5.0, 1.0), 0.05),
+                ((correlations[0] < 0.7) | (correlations[1] < 0.7) | (correlations[2] < 0.7),
+                 np.maximum(np.maximum(np.maximum(0, 1.0 - correlations[0]), np.maximum(0, 1.0 - correlations[1])),
+                            np.maximum(0, 1.0 - correlations[2])), 0.05),
+            ]
+            au_indicators = [
+                ((ransac == 0) & (block_matches == 0), 1.0, 0.35),
+                ((noise < 0.15) & (ela_mean < 5), 1.0 - noise, 0.25),
+                (metadata_score > 60, metadata_score / 100.0, 0.25),
+                ((metadata_score > 40) & ~(metadata_score > 60), metadata_score / 100.0, 0.15),
+                ((ela_mean < 10) & (ela_std < 18), 1.0 - (ela_mean / 12.0), 0.20),
+                (ghost < 0.05, 1.0 - ghost / 0.1, 0.15),
+                (tampering_pct < 5.0, 1.0 - tampering_pct / 8.0, 0.15),
+                (noise < 0.20, 1.0 - noise / 0.25, 0.10),
+                (illum < 0.15, 1.0 - illum / 0.20, 0.10),
+                (freq < 0.5, 1.0 - freq / 0.8, 0.08),
+                (edge < 0.15, 1.0 - edge / 0.20, 0.08),
+            ]
+
+        cm_raw, cm_count = self._weighted_probability_batch(cm_indicators, n)
+        sp_raw, sp_count = self._weighted_probability_batch(sp_indicators, n)
+        au_raw, au_count = self._weighted_probability_batch(au_indicators, n)
+
+        # Sinyal CM dan splicing sama-sama tinggi: sesuaikan untuk 'Kompleks'
+        conflict = (cm_raw > 0.6) & (sp_raw > 0.6)
+        cm_raw = np.where(conflict, cm_raw * 0.7, cm_raw)
+        sp_raw = np.where(conflict, sp_raw * 0.7, sp_raw)
+        au_raw = np.where(conflict, au_raw * 0.3, au_raw)
+
+        exp_cm = np.exp(cm_raw * 1.5)
+        exp_sp = np.exp(sp_raw * 1.5)
+        exp_au = np.exp(au_raw * 1.5)
+        sum_exp = exp_cm + exp_sp + exp_au
+        copy_move_prob = exp_cm / sum_exp
+        splicing_prob = exp_sp / sum_exp
+        authentic_prob = exp_au / sum_exp
+
+        # Faktor ketidakpastian (lihat _calculate_uncertainty_factors)
+        context = np.zeros(n)
+        context = np.where(table.column('image_width', 0.0) < 300, context + 0.08, context)
+        smooth = (ela_mean < 3) & (ela_std < 5)
+        context = np.where(smooth, context + 0.05, np.where((ela_mean > 20) | (ela_std > 30), context + 0.03, context))
+
+        cm_uncertainty = self.base_uncertainty + context
+        cm_uncertainty = np.where((ransac > 0) & (ransac < 10), cm_uncertainty + 0.03, cm_uncertainty)
+        cm_uncertainty = np.where((block_matches > 0) & (block_matches < 5), cm_uncertainty + 0.03, cm_uncertainty)
+        cm_uncertainty = np.minimum(np.where(cm_count < 2, cm_uncertainty + 0.05, cm_uncertainty), 0.25)
+
+        sp_uncertainty = self.base_uncertainty + context
+        ambiguous_ela = ((ela_mean > 5) & (ela_mean < 12)) | ((ela_std > 10) & (ela_std < 20))
+        sp_uncertainty = np.where(ambiguous_ela, sp_uncertainty + 0.04, sp_uncertainty)
+        sp_uncertainty = np.where((noise > 0.15) & (noise < 0.3), sp_uncertainty + 0.03, sp_uncertainty)
+        sp_uncertainty = np.minimum(np.where(sp_count < 2, sp_uncertainty + 0.05, sp_uncertainty), 0.30)
+
+        au_uncertainty = self.base_uncertainty + context
+        au_uncertainty = np.where((metadata_score > 40) & (metadata_score < 70), au_uncertainty + 0.04, au_uncertainty)
+        au_uncertainty = np.minimum(np.where(au_count < 2, au_uncertainty + 0.05, au_uncertainty), 0.20)
+
+        uncertainty_level = np.clip((cm_uncertainty + sp_uncertainty + au_uncertainty) / 3 * 0.8, 0.0, 0.35)
+
+        return {
+            'copy_move_probability': copy_move_prob,
+            'splicing_probability': splicing_prob,
+            'authentic_probability': authentic_prob,
+            'uncertainty_level': uncertainty_level,
+            'confidence_intervals': {
+                category: {'lower': np.maximum(0.0, prob - factor * 0.8), 'upper': np.minimum(1.0, prob + factor * 0.8)}
+                for category, prob, factor in (('copy_move', copy_move_prob, cm_uncertainty),
+                                               ('splicing', splicing_prob, sp_uncertainty),
+                                               ('authentic', authentic_prob, au_uncertainty))
+            },
+        }
+
+    def assessment_batch(self, probabilities: Dict) -> Dict:
+        """
+        Asesmen utama dan reliabilitas untuk hasil calculate_manipulation_probability_batch.
+        Kode merujuk ke PRIMARY_ASSESSMENTS dan RELIABILITY_LEVELS.
+        """
+        copy_move_prob = probabilities['copy_move_probability']
+        splicing_prob = probabilities['splicing_probability']
+        authentic_prob = probabilities['authentic_probability']
+        max_prob = np.maximum(np.maximum(copy_move_prob, splicing_prob), authentic_prob)
+
+        is_authentic = (authentic_prob == max_prob) & (authentic_prob > copy_move_prob * 1.1) & (authentic_prob > splicing_prob * 1.1)
+        is_copy_move = (copy_move_prob == max_prob) & (copy_move_prob > authentic_prob * 1.1) & (copy_move_prob > splicing_prob * 1.1)
+        is_splicing = (splicing_prob == max_prob) & (splicing_prob > authentic_prob * 1.1) & (splicing_prob > copy_move_prob * 1.1)
+        assessment = np.select(
+            [max_prob < 0.35, is_authentic, is_copy_move, is_splicing,
+             (copy_move_prob > 0.35) & (splicing_prob > 0.35),
+             (copy_move_prob > splicing_prob) & (copy_move_prob > authentic_prob),
+             (splicing_prob > copy_move_prob) & (splicing_prob > authentic_prob)],
+            [0, 1, 2, 3, 4, 5, 6], default=7)
+
+        reliability_score = max_prob * (1.0 - probabilities['uncertainty_level'] * 0.5)
+        reliability = np.where(reliability_score >= self.confidence_thresholds['high'], 2,
+                               np.where(reliability_score >= self.confidence_thresholds['medium'], 1, 0))
+        return {
+            'primary_assessment_code': assessment,
+            'primary_assessment': np.asarray(PRIMARY_ASSESSMENTS)[assessment],
+            'reliability_score': reliability_score,
+            'assessment_reliability_code': reliability,
+            'assessment_reliability': np.asarray(RELIABILITY_LEVELS)[reliability],
+        }
+
 def format_probability_results(probabilities: Dict, details: Dict) -> str:
     """Format probability results for display"""
     output = []
@@ -4,11 +4,10 @@ Utility functions for Forensic Image Analysis System
 
 import numpy as np
 import warnings
-import json
-from datetime import datetime
 import os
 import shutil
 from validator import ForensicValidator
+from config import HISTORY_PAGE_SIZE
 warnings.filterwarnings('ignore')
 
 def detect_outliers_iqr(data, factor=1.5):
@@ -60,59 +59,81 @@ def safe_divide(numerator, denominator, default=0.0):
 
 # Use appropriate temp directory for the current OS
 if os.name == 'nt':  # Windows
+    HISTORY_DB = os.path.join(os.environ.get('TEMP', ''), 'analysis_history.db')
     HISTORY_FILE = os.path.join(os.environ.get('TEMP', ''), 'analysis_history.json')
     THUMBNAIL_DIR = os.path.join(os.environ.get('TEMP', ''), 'history_thumbnails')
 else:  # Unix/Linux/Mac
+    HISTORY_DB = '/tmp/analysis_history.db' if os.path.exists('/tmp') else 'analysis_history.db'
     HISTORY_FILE = '/tmp/analysis_history.json' if os.path.exists('/tmp') else 'analysis_history.json'
     THUMBNAIL_DIR = '/tmp/history_thumbnails' if os.path.exists('/tmp') else 'history_thumbnails'
 
-def load_analysis_history():
+# HISTORY_FILE dan THUMBNAIL_DIR hanya dipakai oleh format lama (JSON + file thumbnail);
+# riwayat JSON lama dimigrasikan sekali ke HISTORY_DB saat store pertama kali dibuka.
+_history_store = None
+
+def get_history_store():
     """
-    Memuat riwayat analisis dari file JSON.
-    Mengembalikan list kosong jika file tidak ada atau rusak.
+    Mengembalikan HistoryStore (SQLite, mode WAL) untuk HISTORY_DB.
+    Riwayat JSON lama dimigrasikan otomatis pada pemanggilan pertama.
+    """
+    global _history_store
+    if _history_store is None or _history_store.path != HISTORY_DB:
+        from history_store import HistoryStore
+        store = HistoryStore(HISTORY_DB)
+        try:
+            store.migrate_json(HISTORY_FILE)
+        except Exception as e:
+            print(f"⚠️ Migrasi riwayat JSON gagal: {e}")
+        _history_store = store
+    return _history_store
+
+def load_analysis_history(page=None, per_page=None, **filters):
+    """
+    Memuat riwayat analisis dari database.
+    Tanpa argumen: semua entri, terlama lebih dulu (seperti file JSON lama).
+    Dengan page/per_page/filter (verdict, date_from, date_to, search): satu halaman, terbaru lebih dulu.
+    Mengembalikan list kosong jika database tidak dapat dibaca.
     """
-    if not os.path.exists(HISTORY_FILE):
-        return []
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            # Handle empty file case
-            content = f.read()
-            if not content:
-                return []
-            history = json.loads(content)
-        # Pastikan data yang dimuat adalah list
-        if not isinstance(history, list):
-            print(f"Peringatan: Isi dari '{HISTORY_FILE}' bukan sebuah list. Mengembalikan list kosong.")
-            return []
-        return history
-    except json.JSONDecodeError:
-        print(f"Peringatan: Gagal membaca '{HISTORY_FILE}' karena format JSON tidak valid. Mengembalikan list kosong.")
-        return []
+        store = get_history_store()
+        if page is None and per_page is None and not filters:
+            return store.all()
+        return store.query(page=page or 0, per_page=per_page or HISTORY_PAGE_SIZE, **filters)
     except Exception as e:
         print(f"Peringatan: Terjadi error saat memuat riwayat: {e}. Mengembalikan list kosong.")
         return []
 
-def save_analysis_to_history(image_name, analysis_summary, processing_time, thumbnail_path):
+def save_analysis_to_history(image_name, analysis_summary, processing_time, thumbnail=None):
     """
-    Menyimpan ringkasan analisis baru ke dalam file riwayat JSON.
+    Menyimpan ringkasan analisis baru ke dalam riwayat.
+    ``thumbnail`` berupa bytes JPEG atau path file; disimpan sebagai blob di database.
+    Mengembalikan id entri, atau None jika gagal.
     """
-    history = load_analysis_history()
+    try:
+        return get_history_store().add(image_name, analysis_summary, processing_time, thumbnail)
+    except Exception as e:
+        print(f"Error: Gagal menyimpan riwayat ke '{HISTORY_DB}': {e}")
+        return None
 
-    new_entry = {
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'image_name': image_name,
-        'thumbnail_path': thumbnail_path,
-        'analysis_summary': analysis_summary,
-        'processing_time': processing_time
-    }
-    
-    history.append(new_entry)
+def get_history_thumbnail(entry_id):
+    """
+    Mengembalikan bytes JPEG thumbnail untuk satu entri riwayat (None jika tidak ada).
+    """
+    try:
+        return get_history_store().thumbnail(entry_id)
+    except Exception as e:
+        print(f"⚠️ Gagal memuat thumbnail riwayat {entry_id}: {e}")
+        return None
 
+def get_history_verdicts():
+    """
+    Mengembalikan daftar jenis hasil (verdict) yang ada di riwayat, untuk filter.
+    """
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=4, default=str)
+        return get_history_store().verdicts()
     except Exception as e:
-        print(f"Error: Gagal menyimpan riwayat ke '{HISTORY_FILE}': {e}")
+        print(f"⚠️ Gagal memuat daftar verdict riwayat: {e}")
+        return []
 
 def delete_all_history():
     """
@@ -120,10 +141,11 @@ def delete_all_history():
     Mengembalikan True jika berhasil, False jika gagal.
     """
     try:
+        get_history_store().clear()
+
+        # Hapus juga sisa format lama (file JSON dan folder thumbnails) jika ada
         if os.path.exists(HISTORY_FILE):
             os.remove(HISTORY_FILE)
-        
-        # Hapus juga folder thumbnails jika ada
         if os.path.exists(THUMBNAIL_DIR):
             shutil.rmtree(THUMBNAIL_DIR)
         
@@ -133,72 +155,47 @@ def delete_all_history():
         print(f"❌ Error menghapus riwayat: {e}")
         return False
 
-def delete_selected_history(selected_indices):
+def delete_selected_history(entry_ids):
     """
-    Menghapus riwayat analisis yang dipilih berdasarkan indeks.
+    Menghapus riwayat analisis yang dipilih berdasarkan id entri.
+    Semua entri (beserta thumbnail-nya) dihapus dalam satu transaksi.
     
     Args:
-        selected_indices (list): List indeks yang akan dihapus
+        entry_ids (list): List id entri (kolom 'id' dari load_analysis_history) yang akan dihapus
         
     Returns:
         bool: True jika berhasil, False jika gagal
     """
-    history = load_analysis_history()
-    
-    if not history:
-        print("⚠️ Tidak ada riwayat untuk dihapus.")
+    if not entry_ids:
+        print("⚠️ Tidak ada entri yang dipilih.")
         return False
-        
+
     try:
-        # Kumpulkan path thumbnail yang akan dihapus
-        thumbnails_to_delete = []
-        valid_indices = [i for i in selected_indices if 0 <= i < len(history)]
-        
-        if not valid_indices:
-            print("⚠️ Tidak ada indeks valid yang dipilih.")
+        deleted = get_history_store().delete(entry_ids)
+        if not deleted:
+            print("⚠️ Tidak ada id valid yang dipilih.")
             return False
-
-        # Buat daftar item yang akan disimpan (bukan dihapus)
-        history_to_keep = [entry for i, entry in enumerate(history) if i not in valid_indices]
-
-        # Identifikasi thumbnail yang akan dihapus
-        for idx in valid_indices:
-            thumbnail_path = history[idx].get('thumbnail_path')
-            if thumbnail_path and os.path.exists(thumbnail_path):
-                thumbnails_to_delete.append(thumbnail_path)
-        
-        # Simpan history yang sudah diperbarui
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history_to_keep, f, indent=4, default=str)
-        
-        # Hapus file thumbnail yang sudah tidak terpakai
-        for thumbnail_path in thumbnails_to_delete:
-            try:
-                os.remove(thumbnail_path)
-            except OSError as e:
-                print(f"⚠️ Gagal menghapus thumbnail {thumbnail_path}: {e}")
-        
-        print(f"✅ Berhasil menghapus {len(valid_indices)} entri riwayat.")
+        print(f"✅ Berhasil menghapus {deleted} entri riwayat.")
         return True
-        
     except Exception as e:
+        # Transaksi dibatalkan, riwayat tetap utuh
         print(f"❌ Error menghapus riwayat terpilih: {e}")
-        # Kembalikan file history ke state semula jika terjadi error
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=4, default=str)
         return False
 
 
-def get_history_count():
+def get_history_count(**filters):
     """
-    Mengembalikan jumlah entri dalam riwayat analisis.
+    Mengembalikan jumlah entri dalam riwayat analisis (opsional dengan filter yang sama dengan load_analysis_history).
     """
-    history = load_analysis_history()
-    return len(history)
+    try:
+        return get_history_store().count(**filters)
+    except Exception as e:
+        print(f"⚠️ Gagal menghitung riwayat: {e}")
+        return 0
 
 def clear_empty_thumbnail_folder():
     """
-    Menghapus folder thumbnail jika kosong.
+    Menghapus folder thumbnail (format lama) jika kosong.
     """
     try:
         if os.path.exists(THUMBNAIL_DIR) and not os.listdir(THUMBNAIL_DIR):
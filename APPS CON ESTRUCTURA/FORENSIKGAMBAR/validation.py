@@ -6,13 +6,9 @@ import os
 import numpy as np
 from PIL import Image, ImageEnhance
 import cv2
-try:
-    import exifread
-    EXIFREAD_AVAILABLE = True
-except Exception:
-    EXIFREAD_AVAILABLE = False
 from datetime import datetime
 from config import VALID_EXTENSIONS, MIN_FILE_SIZE, TARGET_MAX_DIM
+from image_ingest import ingest_image
 
 def validate_image_file(filepath):
     """Enhanced validation with more format support"""
@@ -29,15 +25,24 @@ def validate_image_file(filepath):
     
     return True
 
-def extract_enhanced_metadata(filepath):
-    """Enhanced metadata extraction dengan analisis inkonsistensi yang lebih detail"""
+def extract_enhanced_metadata(filepath, ingested=None):
+    """
+    Enhanced metadata extraction dengan analisis inkonsistensi yang lebih detail.
+    EXIF/XMP/tabel kuantisasi JPEG dibaca langsung dari bytes file (tanpa decode piksel);
+    ``ingested`` adalah IngestedImage yang sudah dibuka (lihat image_ingest) agar file tidak dibaca ulang.
+    """
     metadata = {}
     try:
-        with open(filepath, 'rb') as f:
-            if EXIFREAD_AVAILABLE:
-                tags = exifread.process_file(f, details=False, strict=False)
-            else:
-                tags = {}
+        own_ingest = ingested is None
+        if own_ingest:
+            ingested = ingest_image(filepath)
+        try:
+            tags = dict(ingested.exif_tags)
+            tags.update(ingested.xmp)
+            format_metadata = ingested.format_metadata()
+        finally:
+            if own_ingest:
+                ingested.close()
         
         metadata['Filename'] = os.path.basename(filepath)
         metadata['FileSize (bytes)'] = os.path.getsize(filepath)
@@ -61,6 +66,10 @@ def extract_enhanced_metadata(filepath):
         for tag in comprehensive_tags:
             if tag in tags:
                 metadata[tag] = str(tags[tag])
+        for tag in ('XMP CreatorTool', 'XMP HistorySoftwareAgent'):
+            if tag in tags:
+                metadata[tag] = tags[tag]
+        metadata.update(format_metadata)
         
         metadata['Metadata_Inconsistency'] = check_enhanced_metadata_consistency(tags)
         metadata['Metadata_Authenticity_Score'] = calculate_metadata_authenticity_score(tags)
@@ -94,12 +103,14 @@ def check_enhanced_metadata_consistency(tags):
                 if diff > 60:  # 1 minute
                     inconsistencies.append(f"Time difference: {datetimes[i][0]} vs {datetimes[j][0]} ({diff:.0f}s)")
     
-    # Software signature check
-    if 'Image Software' in tags:
-        software = str(tags['Image Software']).lower()
-        suspicious_software = ['photoshop', 'gimp', 'paint', 'editor', 'modified']
-        if any(sus in software for sus in suspicious_software):
-            inconsistencies.append(f"Editing software detected: {software}")
+    # Software signature check (EXIF Software dan XMP CreatorTool/riwayat edit)
+    suspicious_software = ['photoshop', 'gimp', 'paint', 'editor', 'modified']
+    for tag in ('Image Software', 'XMP CreatorTool', 'XMP HistorySoftwareAgent'):
+        if tag in tags:
+            software = str(tags[tag]).lower()
+            if any(sus in software for sus in suspicious_software):
+                inconsistencies.append(f"Editing software detected: {software}")
+                break
     
     return inconsistencies
 
@@ -213,9 +224,6 @@ def advanced_preprocess_image(image_pil, target_max_dim=TARGET_MAX_DIM, normaliz
     original_width, original_height = image_pil.size
     print(f"  Original size: {original_width} × {original_height}")
     
-    # Simpan salinan dari gambar asli sebelum diubah ukurannya untuk analisis tertentu
-    original_pil_copy = image_pil.copy()
-
     # Pengubahan ukuran yang lebih agresif untuk gambar yang sangat besar
     if original_width > target_max_dim or original_height > target_max_dim:
         ratio = min(target_max_dim / original_width, target_max_dim / original_height)